@@ -1,3 +1,7 @@
+from .bucket_sampler import BucketSampler
 from .dataset import BaseDataset
 from .loader import create_dataloader
+from .precompute import PrecomputeEngine, TextEmbeddingEncoder, VAEVideoEncoder, shard_by_cost
+from .sampler import ResumableDistributedSampler
+from .sharded_store import ShardedStoreDataset, ShardedStoreWriter
 from .video_reader import VideoReader
@@ -0,0 +1,164 @@
+import math
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class BucketSampler:
+    """
+    A distributed sampler of variable-size videos, batched by buckets of static shapes (num_frames, height, width).
+
+    The samples are assigned to the buckets from their metadata alone, without decoding them: a sample goes to the
+    buckets of the most frames it has enough frames for (or of the fewest frames if it is too short for all of them),
+    and among them to the bucket of the closest aspect ratio, then of the closest area. Each bucket has its batch size,
+    given or fitted to a budget of tokens per batch.
+
+    At each epoch, the samples of each bucket are shuffled and dealt to the processes, and each process forms full
+    batches of its share: the samples of a bucket are completed with its first samples to the same number of full
+    batches on every process, so that no sample is dropped and every batch has the static shape of its bucket. The
+    batches are then shuffled in the same order on all the processes, so that they process batches of the same bucket
+    at each step. The sampler yields the samples of the batches in order, to be batched with
+    `bucket_batch_by_length` on the bucket IDs of the samples: `create_dataloader` does it when given a `BucketSampler`.
+
+    The dataset resizes each sample to the shape of its bucket, given by `get_bucket`, and returns its bucket ID in a
+    column named `bucket_column`.
+
+    Args:
+        sample_shapes: The (num_frames, height, width) of the samples, e.g. read from the columns of a CSV manifest.
+        buckets: The (num_frames, height, width) of the buckets.
+        batch_sizes: The batch size of each bucket. Default is None (fitted to `max_tokens`).
+        max_tokens: The budget of tokens per batch, used if `batch_sizes` is None: the batch size of a bucket is the
+                    number of its samples that fit in the budget, at least 1. The budget can stand for a memory budget,
+                    as the activations scale with the number of tokens. Default is None.
+        patch_size: The (num_frames, height, width) covered by a token, e.g. the compression of the VAE times the patch
+                    size of the transformer. Default is (1, 1, 1).
+        num_replicas: The number of processes the dataset is sharded across. Default is 1.
+        rank: The rank of the current process. Default is 0.
+        shuffle: Whether to shuffle the samples and the batches at each epoch. Default is True.
+        seed: The random seed of the permutations, must be the same on all the processes. Default is 0.
+        bucket_column: The name of the column of the bucket IDs of the samples. Default is "bucket_id".
+
+    Examples:
+        >>> meta = pd.read_csv("train.csv")
+        >>> sampler = BucketSampler(
+        ...     meta[["num_frames", "height", "width"]].to_numpy(),
+        ...     buckets=[(17, 480, 832), (17, 832, 480), (33, 480, 832), (33, 832, 480)],
+        ...     max_tokens=120_000, patch_size=(4, 16, 16), num_replicas=device_num, rank=rank_id,
+        ... )
+        >>> dataset = MyDataset(meta, bucket_fn=sampler.get_bucket)  # outputs a `bucket_id` column
+        >>> dataloader = create_dataloader(dataset, sampler=sampler)
+    """
+
+    def __init__(
+        self,
+        sample_shapes: Sequence[Tuple[int, int, int]],
+        buckets: Sequence[Tuple[int, int, int]],
+        batch_sizes: Optional[Sequence[int]] = None,
+        max_tokens: Optional[int] = None,
+        patch_size: Tuple[int, int, int] = (1, 1, 1),
+        num_replicas: int = 1,
+        rank: int = 0,
+        shuffle: bool = True,
+        seed: int = 0,
+        bucket_column: str = "bucket_id",
+    ):
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"Invalid rank {rank}, rank should be in the interval [0, {num_replicas - 1}].")
+        if not buckets:
+            raise ValueError("At least one bucket is required.")
+
+        self.buckets = [tuple(int(x) for x in bucket) for bucket in buckets]
+        if batch_sizes is None:
+            if max_tokens is None:
+                raise ValueError("Either `batch_sizes` or `max_tokens` must be set.")
+            batch_sizes = [max(1, max_tokens // self.num_tokens(bucket, patch_size)) for bucket in self.buckets]
+        elif len(batch_sizes) != len(self.buckets):
+            raise ValueError(f"Got {len(batch_sizes)} batch sizes for {len(self.buckets)} buckets.")
+        self.batch_sizes = [int(batch_size) for batch_size in batch_sizes]
+
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.seed = seed
+        self.bucket_column = bucket_column
+        self.bucket_ids = self.assign_buckets(np.asarray(sample_shapes, dtype=np.int64).reshape(-1, 3), self.buckets)
+
+        self._bucket_samples = [np.flatnonzero(self.bucket_ids == i) for i in range(len(self.buckets))]
+        # the number of batches of each bucket on each process
+        self.num_batches = [
+            math.ceil(len(samples) / (batch_size * num_replicas))
+            for samples, batch_size in zip(self._bucket_samples, self.batch_sizes)
+        ]
+        self.num_samples = sum(n * batch_size for n, batch_size in zip(self.num_batches, self.batch_sizes))
+        self.epoch = 0
+
+    @staticmethod
+    def num_tokens(shape: Tuple[int, int, int], patch_size: Tuple[int, int, int] = (1, 1, 1)) -> int:
+        """The number of tokens of a sample of shape (num_frames, height, width)."""
+        return int(np.prod([math.ceil(size / patch) for size, patch in zip(shape, patch_size)]))
+
+    @staticmethod
+    def assign_buckets(sample_shapes: np.ndarray, buckets: Sequence[Tuple[int, int, int]]) -> np.ndarray:
+        """Returns the index of the bucket of each sample of shape (num_frames, height, width)."""
+        bucket_shapes = np.asarray(buckets, dtype=np.int64)
+        frames, heights, widths = (sample_shapes[:, i : i + 1] for i in range(3))
+        bucket_frames, bucket_heights, bucket_widths = bucket_shapes[:, 0], bucket_shapes[:, 1], bucket_shapes[:, 2]
+
+        # the most frames the samples have enough frames for, or the fewest frames for the samples too short for all
+        fits = bucket_frames <= frames
+        most_frames = np.where(fits, bucket_frames, -1).max(axis=1, keepdims=True)
+        target_frames = np.where(most_frames >= 0, most_frames, bucket_frames.min())
+        # then the closest aspect ratio, then the closest area, compared in log scale
+        aspect_distance = np.abs(
+            np.log(np.maximum(heights, 1) / np.maximum(widths, 1)) - np.log(bucket_heights / bucket_widths)
+        )
+        area_distance = np.abs(np.log(np.maximum(heights * widths, 1)) - np.log(bucket_heights * bucket_widths))
+        # the aspect ratios closer than 1e-6 are considered equal
+        aspect_distance = np.where(bucket_frames == target_frames, np.round(aspect_distance, 6), np.inf)
+        closest_aspect = aspect_distance == aspect_distance.min(axis=1, keepdims=True)
+        return np.where(closest_aspect, area_distance, np.inf).argmin(axis=1)
+
+    def get_bucket(self, index: int) -> Tuple[int, int, int]:
+        """The (num_frames, height, width) of the bucket of a sample."""
+        return self.buckets[self.bucket_ids[index]]
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def _epoch_batches(self, epoch: int) -> List[np.ndarray]:
+        rng = np.random.default_rng([self.seed, epoch])
+        batches = []
+        for samples, batch_size, num_batches in zip(self._bucket_samples, self.batch_sizes, self.num_batches):
+            if num_batches == 0:
+                continue
+            if self.shuffle:
+                samples = rng.permutation(samples)
+            # `np.resize` repeats the first samples as many times as needed
+            samples = np.resize(samples, (num_batches, self.num_replicas, batch_size))
+            batches.extend(samples[:, self.rank])
+        if self.shuffle:
+            batches = [batches[j] for j in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self) -> Iterator[int]:
+        # MindSpore also calls `iter` to validate the samplers, the iteration only starts once the indices are consumed
+        def _iter():
+            epoch = self.epoch
+            self.epoch += 1
+            for batch in self._epoch_batches(epoch):
+                yield from batch.tolist()
+
+        return _iter()
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def bucket_batch_kwargs(self) -> Dict:
+        """The arguments of `bucket_batch_by_length` that batch the samples of the sampler."""
+        return {
+            "column_names": [self.bucket_column],
+            "bucket_boundaries": list(range(1, len(self.buckets))),
+            "bucket_batch_sizes": self.batch_sizes,
+            "element_length_function": int,
+            "drop_remainder": False,
+        }
@@ -4,7 +4,9 @@ import mindspore as ms
 from mindspore.communication import get_local_rank, get_local_rank_size
 
 from ..utils.version_control import MS_VERSION
+from .bucket_sampler import BucketSampler
 from .dataset import BaseDataset
+from .sampler import ResumableDistributedSampler
 
 
 def create_dataloader(
@@ -14,6 +16,7 @@ def create_dataloader(
     batch_transforms: Optional[Union[List[dict], dict]] = None,
     project_columns: Optional[List[str]] = None,
     shuffle: bool = False,
+    sampler: Optional[Union[ResumableDistributedSampler, BucketSampler]] = None,
     num_workers: int = 4,
     num_workers_dataset: int = 4,
     num_workers_batch: int = 2,
@@ -44,6 +47,11 @@ def create_dataloader(
         project_columns: Optional list of output columns names from transformations.
                          These names can be used for column selection or sorting in a specific order.
         shuffle: Whether to randomly sample data. Default is False.
+        sampler: Optional sampler of the dataset, which also shards it: `shuffle`, `device_num` and `rank_id` are
+                 ignored when it is set. Use a `ResumableDistributedSampler` to save the position of the dataloader with
+                 the checkpoints and resume training from there. Use a `BucketSampler` to batch samples of variable
+                 sizes by buckets, with the batch size of their bucket: `batch_size` and `drop_remainder` are then
+                 ignored, and the dataset must output the bucket IDs of the samples. Default is None.
         num_workers: The number of workers used for data transformations. Default is 4.
         num_workers_dataset: The number of workers used for reading data from the dataset. Default is 4.
         num_workers_batch: The number of workers used for batch aggregation. Default is 2.
@@ -79,15 +87,17 @@ def create_dataloader(
         device_num = get_local_rank_size()
         rank_id = get_local_rank() % 8
 
+    if sampler is not None:
+        sampling_kwargs = {"sampler": sampler}
+    else:
+        sampling_kwargs = {"num_shards": device_num, "shard_id": rank_id, "shuffle": shuffle}
     dataloader = ms.dataset.GeneratorDataset(
         dataset,
         column_names=dataset.output_columns,
         num_parallel_workers=num_workers_dataset,
-        num_shards=device_num,
-        shard_id=rank_id,
         # file reading is not CPU bounded => use multithreading for reading images and labels
         python_multiprocessing=False,
-        shuffle=shuffle,
+        **sampling_kwargs,
     )
 
     if max_rowsize is None:
@@ -109,7 +119,14 @@ def create_dataloader(
     if project_columns:
         dataloader = dataloader.project(project_columns)
 
-    if getattr(dataset, "pad_info", None):
+    batched = False
+    if isinstance(sampler, BucketSampler):
+        if len(sampler.buckets) > 1:
+            dataloader = dataloader.bucket_batch_by_length(**sampler.bucket_batch_kwargs())
+        else:
+            dataloader = dataloader.batch(sampler.batch_sizes[0], num_parallel_workers=num_workers_batch)
+        batched = True
+    elif getattr(dataset, "pad_info", None):
         if batch_size > 0:
             dataloader = dataloader.padded_batch(
                 batch_size,
@@ -117,21 +134,20 @@ def create_dataloader(
                 num_parallel_workers=num_workers_batch,
                 pad_info=dataset.pad_info,
             )
-    else:
-        if batch_size > 0:
-            dataloader = dataloader.batch(
-                batch_size, drop_remainder=drop_remainder, num_parallel_workers=num_workers_batch
+    elif batch_size > 0:
+        dataloader = dataloader.batch(batch_size, drop_remainder=drop_remainder, num_parallel_workers=num_workers_batch)
+        batched = True
+
+    if batched and batch_transforms is not None:
+        if isinstance(batch_transforms, dict):
+            batch_transforms = [batch_transforms]
+
+        for batch_transform in batch_transforms:
+            dataloader = dataloader.map(
+                **batch_transform,
+                python_multiprocessing=python_multiprocessing,
+                num_parallel_workers=num_workers,
+                max_rowsize=max_rowsize,
             )
-            if batch_transforms is not None:
-                if isinstance(batch_transforms, dict):
-                    batch_transforms = [batch_transforms]
-
-                for batch_transform in batch_transforms:
-                    dataloader = dataloader.map(
-                        **batch_transform,
-                        python_multiprocessing=python_multiprocessing,
-                        num_parallel_workers=num_workers,
-                        max_rowsize=max_rowsize,
-                    )
 
     return dataloader
@@ -0,0 +1,317 @@
+import csv
+import heapq
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import mint
+
+from .sharded_store import ShardedStoreDataset, ShardedStoreWriter
+from .video_reader import VideoReader
+
+__all__ = ["PrecomputeEngine", "TextEmbeddingEncoder", "VAEVideoEncoder", "shard_by_cost"]
+
+_logger = logging.getLogger(__name__)
+
+
+def shard_by_cost(costs: Sequence[float], num_shards: int) -> List[np.ndarray]:
+    """
+    Splits the items of `costs` into `num_shards` shards of balanced total costs: the items are assigned from the
+    costliest one to the shard of the lowest total cost so far. The split is deterministic, every rank computes the
+    same one.
+
+    Returns:
+        List[np.ndarray]: The sorted indices of the items of each shard.
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    shards = [[] for _ in range(num_shards)]
+    loads = [(0.0, shard) for shard in range(num_shards)]
+    for idx in np.argsort(-costs, kind="stable").tolist():
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(idx)
+        heapq.heappush(loads, (load + costs[idx], shard))
+    return [np.sort(np.array(shard, dtype=np.int64)) for shard in shards]
+
+
+class VAEVideoEncoder:
+    """
+    Encodes batches of videos with a `mindone.diffusers` VAE into the mean and standard deviation of their latent
+    distributions, as `latent_mean` and `latent_std`.
+
+    Args:
+        vae: The VAE, whose `encode` returns the concatenated mean and log variance, e.g. `AutoencoderKL` or
+            `AutoencoderKLWan`.
+        temporal: Whether the VAE encodes videos of shape (B, C, T, H, W), whose latents are saved as (C, t, h, w),
+            or images of shape (B, C, H, W), whose latents are saved per frame as (T, C, h, w). Default: True.
+        dtype: The dtype of the inputs of the VAE. Default: float32.
+    """
+
+    def __init__(self, vae, temporal: bool = True, dtype: ms.Type = ms.float32):
+        self.vae = vae
+        self.temporal = temporal
+        self.dtype = dtype
+
+    def __call__(self, videos: np.ndarray) -> Dict[str, np.ndarray]:
+        batch_size, num_frames = videos.shape[:2]
+        x = ms.tensor(videos).to(self.dtype) / 127.5 - 1.0  # B T H W C
+        if self.temporal:
+            x = x.permute(0, 4, 1, 2, 3)
+        else:
+            x = x.reshape(batch_size * num_frames, *x.shape[2:]).permute(0, 3, 1, 2)
+
+        mean, logvar = mint.chunk(self.vae.encode(x)[0].float(), 2, dim=1)
+        std = mint.exp(0.5 * mint.clamp(logvar, -30.0, 20.0))
+        if not self.temporal:
+            mean, std = (t.reshape(batch_size, num_frames, *t.shape[1:]) for t in (mean, std))
+        return {"latent_mean": mean.asnumpy(), "latent_std": std.asnumpy()}
+
+
+class TextEmbeddingEncoder:
+    """
+    Encodes batches of captions with a tokenizer and a `mindone.transformers` text encoder, e.g. T5 or UMT5, into
+    their last hidden states padded to `max_length`, as `text_emb`, and their attention masks, as `mask`.
+
+    Args:
+        tokenizer: The tokenizer of the text encoder.
+        text_encoder: The text encoder, whose first output is the last hidden state.
+        max_length: The number of tokens the captions are padded or truncated to. Default: 300.
+    """
+
+    def __init__(self, tokenizer, text_encoder, max_length: int = 300):
+        self.tokenizer = tokenizer
+        self.text_encoder = text_encoder
+        self.max_length = max_length
+
+    def __call__(self, captions: List[str]) -> Dict[str, np.ndarray]:
+        inputs = self.tokenizer(
+            captions, padding="max_length", truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        mask = inputs["attention_mask"]
+        text_emb = self.text_encoder(ms.tensor(inputs["input_ids"]), attention_mask=ms.tensor(mask))[0]
+        return {"text_emb": text_emb.float().asnumpy(), "mask": mask.astype(np.uint8)}
+
+
+class PrecomputeEngine:
+    """
+    Precomputes the VAE latents and the text embeddings of the videos of a CSV manifest into a `ShardedStoreDataset`,
+    on any number of ranks and resumably.
+
+    The videos are split between the ranks by their estimated cost with `shard_by_cost`: the `cost` column of the
+    manifest if it has one, else the number of pixels of their clips if it has `num_frames`, `height` and `width`
+    columns, else their file size if `stat_files` is set, and a uniform cost otherwise. Each clip
+    is assigned to a (num_frames, height, width) bucket: the largest of `frame_counts` with enough frames, and the
+    resolution of the closest aspect ratio, resized to cover it and center-cropped. `num_workers` threads decode the
+    clips ahead into a bounded queue while the device encodes batches of `batch_size` clips of the same bucket.
+
+    The store is the checkpoint: each rank writes its records under its own name, flushes them every
+    `checkpoint_interval` batches, and skips the videos already in the store when it resumes, with any number of
+    ranks.
+
+    Args:
+        manifest: The path of the CSV manifest, with a `video` column of the paths of the videos relative to
+            `video_folder`, and a `caption` column if a `text_encoder` is given.
+        output_dir: The directory of the store.
+        video_folder: The root folder of the videos. Default: "" (the paths are absolute or relative to the working
+            directory).
+        video_encoder: Encodes the batches of clips of shape (B, T, H, W, 3) in RGB uint8 into a dictionary of arrays
+            of batch size B, e.g. `VAEVideoEncoder`. Default: None (no latents).
+        text_encoder: Encodes the lists of captions into a dictionary of arrays of their batch size, e.g.
+            `TextEmbeddingEncoder`. Default: None (no text embeddings).
+        resolutions: The (height, width) resolutions of the buckets. Default: ((256, 256),).
+        frame_counts: The numbers of frames of the buckets. Default: (16,).
+        stride: The interval of the frames sampled from the videos. Default: 1.
+        batch_size: The number of clips encoded at once. Default: 1.
+        num_workers: The number of decoding threads. Default: 4.
+        prefetch: The number of decoded clips ahead of the encoding. Default: 16.
+        checkpoint_interval: The number of batches between the flushes of the store. Default: 10.
+        stat_files: Whether to estimate the cost of the videos without cost metadata in the manifest by their file
+            size. Every rank reads the size of every such video, which is slow on shared file systems. Default: False.
+        rank_id: The rank of the current process. Default: 0.
+        device_num: The number of ranks. Default: 1.
+
+    Examples:
+        >>> engine = PrecomputeEngine(
+        ...     "train.csv", "latents", video_folder="videos",
+        ...     video_encoder=VAEVideoEncoder(vae), text_encoder=TextEmbeddingEncoder(tokenizer, text_encoder),
+        ...     resolutions=[(480, 832), (832, 480)], frame_counts=[17, 33, 81], batch_size=4,
+        ...     rank_id=get_rank(), device_num=get_group_size(),
+        ... )
+        >>> engine.run()
+    """
+
+    def __init__(
+        self,
+        manifest: str,
+        output_dir: str,
+        video_folder: str = "",
+        video_encoder: Optional[Callable[[np.ndarray], Dict[str, np.ndarray]]] = None,
+        text_encoder: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None,
+        resolutions: Sequence[Tuple[int, int]] = ((256, 256),),
+        frame_counts: Sequence[int] = (16,),
+        stride: int = 1,
+        batch_size: int = 1,
+        num_workers: int = 4,
+        prefetch: int = 16,
+        checkpoint_interval: int = 10,
+        stat_files: bool = False,
+        rank_id: int = 0,
+        device_num: int = 1,
+    ):
+        if video_encoder is None and text_encoder is None:
+            raise ValueError("At least one of `video_encoder` and `text_encoder` must be provided.")
+        with open(manifest, newline="", encoding="utf-8") as f:
+            self.rows = list(csv.DictReader(f))
+        self.output_dir = output_dir
+        self.video_folder = video_folder
+        self.video_encoder = video_encoder
+        self.text_encoder = text_encoder
+        self.resolutions = [tuple(resolution) for resolution in resolutions]
+        self.frame_counts = sorted(frame_counts)
+        self.stride = stride
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        self.checkpoint_interval = checkpoint_interval
+        self.stat_files = stat_files
+        self.rank_id = rank_id
+        self.device_num = device_num
+
+    def _cost(self, row: Dict[str, str]) -> float:
+        if row.get("cost"):
+            return float(row["cost"])
+        if all(row.get(column) for column in ("num_frames", "height", "width")):
+            bucket = self._assign_bucket(int(row["num_frames"]), int(row["height"]), int(row["width"]))
+            return float(np.prod(bucket)) if bucket is not None else 0.0
+        if self.stat_files:
+            try:
+                return float(os.path.getsize(os.path.join(self.video_folder, row["video"])))
+            except OSError:  # a missing video is skipped at decoding
+                pass
+        return 1.0
+
+    def _assign_bucket(self, num_frames: int, height: int, width: int) -> Optional[Tuple[int, int, int]]:
+        frame_counts = [count for count in self.frame_counts if (count - 1) * self.stride + 1 <= num_frames]
+        if not frame_counts:
+            return None
+        aspect_ratios = np.array([h / w for h, w in self.resolutions])
+        resolution = self.resolutions[int(np.argmin(np.abs(np.log(aspect_ratios * width / height))))]
+        return (frame_counts[-1], *resolution)
+
+    def _decode(self, row: Dict[str, str]) -> Optional[np.ndarray]:
+        video_path = os.path.join(self.video_folder, row["video"])
+        with VideoReader(video_path) as reader:
+            (width, height), length = reader.shape, len(reader)
+        bucket = self._assign_bucket(length, height, width)
+        if bucket is None:
+            _logger.warning(f"Video {row['video']} is too short ({length} frames), skipped.")
+            return None
+
+        # resize at decoding to cover the resolution of the bucket, and center-crop
+        num_frames, target_height, target_width = bucket
+        scale = max(target_height / height, target_width / width)
+        size = max(round(width * scale), target_width), max(round(height * scale), target_height)
+        with VideoReader(video_path, size=size) as reader:
+            frames = reader.fetch_frames(num=num_frames, step=self.stride)
+        top, left = (size[1] - target_height) // 2, (size[0] - target_width) // 2
+        return frames[:, top : top + target_height, left : left + target_width]
+
+    @staticmethod
+    def _put(items: queue.Queue, item, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _decode_worker(self, rows: queue.Queue, decoded: queue.Queue, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                idx = rows.get_nowait()
+            except queue.Empty:
+                break
+            frames = None
+            if self.video_encoder is not None:
+                try:
+                    frames = self._decode(self.rows[idx])
+                except Exception as e:
+                    _logger.warning(f"Failed to decode {self.rows[idx]['video']}: {repr(e)}, skipped.")
+                if frames is None:
+                    continue
+            self._put(decoded, (idx, frames), stop)
+        self._put(decoded, (None, None), stop)  # the end of the worker
+
+    def _encode(self, writer: ShardedStoreWriter, batch: List[Tuple[int, Optional[np.ndarray]]]) -> None:
+        records = [{} for _ in batch]
+        if self.video_encoder is not None:
+            for name, arrays in self.video_encoder(np.stack([frames for _, frames in batch])).items():
+                for record, array in zip(records, arrays):
+                    record[name] = array
+        if self.text_encoder is not None:
+            for name, arrays in self.text_encoder([self.rows[idx]["caption"] for idx, _ in batch]).items():
+                for record, array in zip(records, arrays):
+                    record[name] = array
+        for (idx, _), record in zip(batch, records):
+            writer.write(self.rows[idx]["video"], **record)
+
+    def pending_indices(self) -> np.ndarray:
+        """Returns the indices of the rows of the manifest of the current rank that are not in the store yet."""
+        indices = shard_by_cost([self._cost(row) for row in self.rows], self.device_num)[self.rank_id]
+        try:
+            done = set(ShardedStoreDataset(self.output_dir).keys)
+        except FileNotFoundError:  # a new store
+            done = set()
+        return np.array([idx for idx in indices.tolist() if self.rows[idx]["video"] not in done], dtype=np.int64)
+
+    def run(self) -> int:
+        """
+        Precomputes the latents and embeddings of the pending videos of the current rank.
+
+        Returns:
+            int: The number of records written.
+        """
+        indices = self.pending_indices()
+        _logger.info(f"Rank {self.rank_id}: {len(indices)} videos to precompute into {self.output_dir}.")
+
+        rows, decoded = queue.Queue(), queue.Queue(maxsize=self.prefetch)
+        for idx in indices.tolist():
+            rows.put(idx)
+        stop = threading.Event()
+        workers = [
+            threading.Thread(target=self._decode_worker, args=(rows, decoded, stop), daemon=True)
+            for _ in range(self.num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        buckets, num_written, num_batches = {}, 0, 0
+        writer = ShardedStoreWriter(self.output_dir, name=f"rank_{self.rank_id}")
+        try:
+            num_finished = 0
+            while num_finished < len(workers):
+                idx, frames = decoded.get()
+                if idx is None:
+                    num_finished += 1
+                    continue
+                bucket = buckets.setdefault(frames.shape if frames is not None else None, [])
+                bucket.append((idx, frames))
+                if len(bucket) == self.batch_size:
+                    self._encode(writer, bucket)
+                    num_written, num_batches = num_written + len(bucket), num_batches + 1
+                    bucket.clear()
+                    if num_batches % self.checkpoint_interval == 0:
+                        writer.flush()
+            for bucket in buckets.values():  # the last incomplete batches
+                if bucket:
+                    self._encode(writer, bucket)
+                    num_written += len(bucket)
+        finally:
+            stop.set()
+            writer.close()
+        _logger.info(f"Rank {self.rank_id}: {num_written} videos precomputed.")
+        return num_written
@@ -0,0 +1,104 @@
+import math
+from typing import Dict, Iterator
+
+import numpy as np
+
+
+class ResumableDistributedSampler:
+    """
+    A distributed sampler whose position can be saved with the checkpoints and restored in O(1).
+
+    The samples are a stream of epochs: the samples of an epoch are a permutation of the dataset seeded by
+    `(seed, epoch)`, completed with its first samples to a multiple of `num_replicas` (or truncated if `drop_last`) and
+    dealt to the processes in turn. A position `(epoch, offset)` in the stream is thus restored by regenerating the
+    permutation of `epoch`, without reading the samples already consumed.
+
+    Each iteration over the sampler yields the next `len(sampler)` samples of the stream and moves to the same offset
+    of the next epoch: the data pipeline reads the length of the sampler once and expects it for every epoch. An
+    iteration resumed at `offset` thus completes its epoch with the first `offset` samples of the next one, and the
+    samples are in the same order as if the training had not been interrupted. `set_epoch` moves to the beginning of an
+    epoch, for the training loops that end the resumed epoch earlier.
+
+    As the data pipeline prefetches the samples ahead of the training loop, the number of samples consumed by the
+    training is given to `state_dict` by the training loop.
+
+    Args:
+        dataset_size: The number of samples of the dataset.
+        num_replicas: The number of processes the dataset is sharded across. Default is 1.
+        rank: The rank of the current process. Default is 0.
+        shuffle: Whether to shuffle the samples at each epoch. Default is True.
+        seed: The random seed of the permutations, must be the same on all the processes. Default is 0.
+        drop_last: Whether to drop the last samples to make the dataset evenly divisible across the processes instead
+                   of completing it with its first samples. Default is False.
+
+    Examples:
+        >>> sampler = ResumableDistributedSampler(len(dataset), num_replicas=device_num, rank=rank_id, seed=42)
+        >>> sampler.load_state_dict(state)  # e.g. {"seed": 42, "epoch": 3, "offset": 1024}
+        >>> dataloader = create_dataloader(dataset, batch_size=batch_size, sampler=sampler)
+    """
+
+    def __init__(
+        self,
+        dataset_size: int,
+        num_replicas: int = 1,
+        rank: int = 0,
+        shuffle: bool = True,
+        seed: int = 0,
+        drop_last: bool = False,
+    ):
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"Invalid rank {rank}, rank should be in the interval [0, {num_replicas - 1}].")
+
+        self.dataset_size = dataset_size
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.seed = seed
+        if drop_last:
+            self.num_samples = dataset_size // num_replicas
+        else:
+            self.num_samples = math.ceil(dataset_size / num_replicas)
+        # the position of the next iteration, and the position restored by `load_state_dict`
+        self.epoch = self.start_epoch = 0
+        self.offset = self.start_offset = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Moves to the beginning of `epoch`."""
+        self.epoch = epoch
+        self.offset = 0
+
+    def state_dict(self, epoch: int, num_consumed_samples: int) -> Dict[str, int]:
+        """
+        Returns the state to resume from once the training on this process has consumed `num_consumed_samples`
+        samples of the stream from the beginning of `epoch`.
+        """
+        epoch += num_consumed_samples // self.num_samples
+        return {"seed": self.seed, "epoch": epoch, "offset": num_consumed_samples % self.num_samples}
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.seed = int(state["seed"])
+        self.epoch = self.start_epoch = int(state["epoch"])
+        self.offset = self.start_offset = int(state["offset"])
+
+    def _epoch_indices(self, epoch: int) -> np.ndarray:
+        if self.shuffle:
+            indices = np.random.default_rng([self.seed, epoch]).permutation(self.dataset_size)
+        else:
+            indices = np.arange(self.dataset_size)
+        # `np.resize` repeats the first samples as many times as needed
+        indices = np.resize(indices, self.num_samples * self.num_replicas)
+        return indices[self.rank :: self.num_replicas]
+
+    def __iter__(self) -> Iterator[int]:
+        # MindSpore also calls `iter` to validate the samplers, the iteration only starts once the indices are consumed
+        def _iter():
+            epoch, offset = self.epoch, self.offset
+            self.epoch += 1
+            yield from self._epoch_indices(epoch)[offset:].tolist()
+            if offset:
+                yield from self._epoch_indices(epoch + 1)[:offset].tolist()
+
+        return _iter()
+
+    def __len__(self) -> int:
+        return self.num_samples
@@ -0,0 +1,269 @@
+import glob
+import json
+import mmap
+import os
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .dataset import BaseDataset
+
+__all__ = ["ShardedStoreWriter", "ShardedStoreDataset"]
+
+# an entry of the index of a writer: the shard of the writer, the offset and the size of the record in the shard
+_INDEX_DTYPE = np.dtype([("shard", "<u4"), ("offset", "<u8"), ("size", "<u8")])
+_HEADER_SIZE_DTYPE = np.dtype("<u4")
+# the records and their arrays start at multiples of the alignment, for the memory-mapped arrays to be aligned
+_ALIGNMENT = 64
+_COMPRESSIONS = (None, "zlib")
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % _ALIGNMENT)
+
+
+def _shard_path(root: str, name: str, shard: int) -> str:
+    return os.path.join(root, f"{name}-{shard:05d}.bin")
+
+
+class ShardedStoreWriter:
+    """
+    Writes records of named numpy arrays, e.g. the VAE latents and the text embeddings of the videos, to the large
+    append-only shard files of a `ShardedStoreDataset`, instead of a `.npz` file per sample.
+
+    A record is a JSON header of the dtypes, shapes and offsets of its arrays followed by their raw bytes, optionally
+    compressed. The records are appended to the shard `<root>/<name>-<shard>.bin` until it exceeds `shard_size` bytes,
+    and their offsets to the binary index `<root>/<name>.idx` and their keys to `<root>/<name>.keys`. The index is
+    written after the shards are flushed: the records of a writer that is interrupted are lost since its last `flush`,
+    but the store remains readable. A writer reopened with the same name appends to a new shard.
+
+    The processes writing to the same store must have different names, e.g. `rank_{rank_id}`.
+
+    Args:
+        root: The directory of the store.
+        name: The name of the shards and index of the writer. Default: "data".
+        shard_size: The size in bytes above which the writer starts a new shard. Default: 1 GiB.
+        compression: The compression of the arrays of the records, None or "zlib". The compressed arrays are
+            decompressed to memory on reading, instead of being memory-mapped. Default: None.
+        compression_level: The zlib compression level. Default: 1.
+
+    Examples:
+        >>> with ShardedStoreWriter("latents", name=f"rank_{rank_id}") as writer:
+        ...     for video_path, latent_mean, latent_std in extract_latents(videos):
+        ...         writer.write(video_path, latent_mean=latent_mean, latent_std=latent_std)
+    """
+
+    def __init__(
+        self,
+        root: str,
+        name: str = "data",
+        shard_size: int = 1 << 30,
+        compression: Optional[str] = None,
+        compression_level: int = 1,
+    ):
+        if compression not in _COMPRESSIONS:
+            raise ValueError(f"Unsupported compression {compression}, must be one of {_COMPRESSIONS}.")
+        self.root = root
+        self.name = name
+        self.shard_size = shard_size
+        self.compression = compression
+        self.compression_level = compression_level
+
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, f"{name}.idx")
+        self._keys_path = os.path.join(root, f"{name}.keys")
+        self._shard = len(
+            glob.glob(os.path.join(glob.escape(root), f"{glob.escape(name)}-[0-9][0-9][0-9][0-9][0-9].bin"))
+        )
+        self._shard_file = None
+        self._shard_offset = 0
+        # the entries of the records written since the last flush
+        self._entries = []
+        self._keys = []
+
+    def __enter__(self) -> "ShardedStoreWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, key: str, **arrays: np.ndarray) -> None:
+        """
+        Appends a record of `arrays` under `key`, e.g. the path of the video relative to the dataset folder.
+
+        Raises:
+            ValueError: If the key contains a line break.
+            TypeError: If an array has an object dtype.
+        """
+        if "\n" in key:
+            raise ValueError(f"The keys of the records must not contain line breaks, got {repr(key)}.")
+
+        specs, payloads = {}, []
+        offset = 0
+        for array_name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise TypeError(f"Array `{array_name}` of {key} has the unsupported dtype {array.dtype}.")
+            data = (
+                zlib.compress(array, self.compression_level)
+                if self.compression
+                else memoryview(array.reshape(-1)).cast("B")
+            )
+            offset = _align(offset)
+            specs[array_name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset, "size": len(data)}
+            payloads.append((offset, data))
+            offset += len(data)
+
+        header = json.dumps({"compression": self.compression, "arrays": specs}).encode()
+        header_size = _align(_HEADER_SIZE_DTYPE.itemsize + len(header))
+        record = bytearray(_align(header_size + offset))
+        record[: _HEADER_SIZE_DTYPE.itemsize] = np.array(len(header), dtype=_HEADER_SIZE_DTYPE).tobytes()
+        record[_HEADER_SIZE_DTYPE.itemsize : _HEADER_SIZE_DTYPE.itemsize + len(header)] = header
+        for array_offset, data in payloads:
+            record[header_size + array_offset : header_size + array_offset + len(data)] = data
+
+        if self._shard_file is not None and self._shard_offset + len(record) > self.shard_size:
+            self.flush()
+            self._shard_file.close()
+            self._shard_file = None
+            self._shard += 1
+        if self._shard_file is None:
+            self._shard_file = open(_shard_path(self.root, self.name, self._shard), "wb")
+            self._shard_offset = 0
+
+        self._shard_file.write(record)
+        self._entries.append((self._shard, self._shard_offset, len(record)))
+        self._keys.append(key)
+        self._shard_offset += len(record)
+
+    def flush(self) -> None:
+        """Makes the records written so far readable."""
+        if self._shard_file is not None:
+            self._shard_file.flush()
+            os.fsync(self._shard_file.fileno())
+        if self._entries:
+            with open(self._index_path, "ab") as f:
+                f.write(np.array(self._entries, dtype=_INDEX_DTYPE).tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key in self._keys))
+            self._entries, self._keys = [], []
+
+    def close(self) -> None:
+        self.flush()
+        if self._shard_file is not None:
+            self._shard_file.close()
+            self._shard_file = None
+
+
+class ShardedStoreDataset(BaseDataset):
+    """
+    Reads the records of a store written by `ShardedStoreWriter`s. Opening the store reads the indexes of its writers
+    only, and the shards are memory-mapped once per process: the uncompressed arrays are read-only views of the shards,
+    read from the disk (or the page cache) when they are accessed, without any copy.
+
+    Args:
+        root: The directory of the store.
+        output_columns: The arrays of the records output by `__getitem__`, in order. Default: the arrays of the first
+            record.
+
+    Examples:
+        >>> dataset = ShardedStoreDataset("latents", output_columns=["latent_mean", "latent_std"])
+        >>> latent_mean, latent_std = dataset[0]
+        >>> record = dataset.get("videos/clip_0001.mp4")
+        >>> dataloader = create_dataloader(dataset, batch_size=8, shuffle=True)
+    """
+
+    def __init__(self, root: str, output_columns: Optional[List[str]] = None):
+        self.root = root
+        self.keys: List[str] = []
+        self._shard_paths: List[str] = []
+        indexes = []
+        for index_path in sorted(glob.glob(os.path.join(glob.escape(root), "*.idx"))):
+            name = os.path.basename(index_path)[: -len(".idx")]
+            entries = np.fromfile(index_path, dtype=_INDEX_DTYPE)
+            with open(os.path.join(root, f"{name}.keys"), encoding="utf-8") as f:
+                keys = f.read().split("\n")[:-1]
+            if len(keys) != len(entries):
+                raise RuntimeError(f"The index and the keys of {name} in {root} do not match.")
+            if not len(entries):
+                continue
+
+            index = np.empty(len(entries), dtype=[("file", "<u4"), ("offset", "<u8"), ("size", "<u8")])
+            index["file"] = len(self._shard_paths) + entries["shard"]
+            index["offset"], index["size"] = entries["offset"], entries["size"]
+            indexes.append(index)
+            self.keys.extend(keys)
+            self._shard_paths.extend(_shard_path(root, name, shard) for shard in range(entries["shard"].max() + 1))
+
+        if not indexes:
+            raise FileNotFoundError(f"No records found in {root}.")
+        self._index = np.concatenate(indexes)
+        self._key_to_idx = None
+        self._mmaps = {}
+
+        self.output_columns = output_columns or list(self.read(0))
+        self.pad_info = None
+
+    def __getstate__(self):
+        # the memory maps are not picklable, the worker processes map the shards themselves
+        state = self.__dict__.copy()
+        state["_mmaps"] = {}
+        return state
+
+    def _mmap(self, file: int) -> mmap.mmap:
+        if file not in self._mmaps:
+            with open(self._shard_paths[file], "rb") as f:
+                self._mmaps[file] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmaps[file]
+
+    def read(self, idx: int) -> Dict[str, np.ndarray]:
+        """Returns the arrays of the `idx`-th record."""
+        file, offset, _ = self._index[idx].tolist()
+        buffer = self._mmap(file)
+        header_size = int(np.frombuffer(buffer, dtype=_HEADER_SIZE_DTYPE, count=1, offset=offset)[0])
+        header_start = offset + _HEADER_SIZE_DTYPE.itemsize
+        header = json.loads(buffer[header_start : header_start + header_size])
+        payload_offset = offset + _align(_HEADER_SIZE_DTYPE.itemsize + header_size)
+
+        arrays = {}
+        for array_name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            start = payload_offset + spec["offset"]
+            if header["compression"] == "zlib":
+                data = zlib.decompress(memoryview(buffer)[start : start + spec["size"]])
+                arrays[array_name] = np.frombuffer(data, dtype=dtype).reshape(shape)
+            elif spec["size"]:
+                count = spec["size"] // dtype.itemsize
+                arrays[array_name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(shape)
+            else:
+                arrays[array_name] = np.empty(shape, dtype=dtype)
+        return arrays
+
+    def index(self, key: str) -> int:
+        """Returns the index of the record of `key`, the last one if it was written several times."""
+        if self._key_to_idx is None:
+            self._key_to_idx = {key: idx for idx, key in enumerate(self.keys)}
+        return self._key_to_idx[key]
+
+    def get(self, key: str) -> Dict[str, np.ndarray]:
+        """Returns the arrays of the record of `key`."""
+        return self.read(self.index(key))
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self.index(key)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, idx: int):
+        arrays = self.read(idx)
+        return tuple(arrays[column] for column in self.output_columns)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @staticmethod
+    def train_transforms(**kwargs) -> List[dict]:
+        return []
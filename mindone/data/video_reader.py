@@ -1,3 +1,5 @@
+from typing import Optional, Sequence, Tuple
+
 import cv2
 import numpy as np
 
@@ -7,8 +9,16 @@ class VideoReader:
     Extracts information about a video and reads frames in batches using OpenCV.
     Must be used with a context manager.
 
+    The requested frames are decoded in a single sequential pass: the frames in between are grabbed without being
+    converted, and the reader seeks only over the gaps longer than `seek_threshold` frames, as a seek decodes again from
+    the previous keyframe. The frames are converted to RGB (and resized) directly into a preallocated array.
+
     Args:
         video_path (str): Path to the video file.
+        num_threads (int): The number of decoding threads, 0 for the FFmpeg default. Default: 0.
+        size (Tuple[int, int], optional): The size (width, height) to resize the frames to. Default: None (no resizing).
+        seek_threshold (int): The gap in frames above which the reader seeks instead of grabbing the frames in between,
+            typically the GOP size of the videos. Default: 64.
 
     Attributes:
         shape (Tuple[int, int]): The shape (width, height) of the video.
@@ -18,25 +28,38 @@ class VideoReader:
         IOError: If the video cannot be opened.
 
     Examples:
-        >>> with VideoReader("video.mp4") as reader:
+        >>> with VideoReader("video.mp4", num_threads=4) as reader:
         ...     width, height = reader.shape
         ...     fps = reader.fps
         ...     total_frames = len(reader)
         ...     frames = reader.fetch_frames(num=10, start_pos=10, step=2)
+        ...     frames = reader.get_frames([0, 50, 100])
     """
 
-    def __init__(self, video_path: str):
+    def __init__(
+        self,
+        video_path: str,
+        num_threads: int = 0,
+        size: Optional[Tuple[int, int]] = None,
+        seek_threshold: int = 64,
+    ):
         self._video_path = video_path
+        self._num_threads = num_threads
+        self._size = size
+        self._seek_threshold = seek_threshold
         self._cap = None
+        self._pos = 0
         self.shape = (0, 0)
         self.fps = 0
 
     def __enter__(self) -> "VideoReader":
-        self._cap = cv2.VideoCapture(self._video_path, apiPreference=cv2.CAP_FFMPEG)
+        params = [cv2.CAP_PROP_N_THREADS, self._num_threads] if self._num_threads else []
+        self._cap = cv2.VideoCapture(self._video_path, cv2.CAP_FFMPEG, params)
         if not self._cap.isOpened():
             raise IOError(f"Video {self._video_path} cannot be opened.")
         self.shape = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self._pos = 0
         return self
 
     def __exit__(self, *args):
@@ -66,21 +89,48 @@ class VideoReader:
         if len(self) < min_len:
             raise ValueError(f"Number of frames to fetch ({min_len}) must be less than video length ({len(self)}).")
 
-        if start_pos:
-            start_pos = min(start_pos, len(self) - min_len)
-            self._cap.set(cv2.CAP_PROP_POS_FRAMES, start_pos)
+        start_pos = min(start_pos, len(self) - min_len)
+        return self.get_frames(range(start_pos, start_pos + min_len, step))
+
+    def get_frames(self, indices: Sequence[int]) -> np.ndarray:
+        """
+        Fetches the frames at the given indices, in any order and possibly repeated.
 
-        frames = []
-        i = start_pos
-        ret, frame = self._cap.read()
-        while ret and len(frames) < num:
-            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            if step > 1:
-                i += step
-                self._cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = self._cap.read()
+        Parameters:
+            indices: The indices of the frames to fetch.
 
-        if len(frames) != num:
-            raise RuntimeError(f"Failed to read {num} frames from {self._video_path}.")
+        Returns:
+            np.ndarray: A contiguous array of shape (len(indices), height, width, 3) of the RGB frames.
 
-        return np.stack(frames)
+        Raises:
+            RuntimeError: If a requested frame cannot be fetched.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        width, height = self._size or self.shape
+        frames = np.empty((len(indices), height, width, 3), dtype=np.uint8)
+
+        order = np.argsort(indices, kind="stable")
+        frame = None
+        for i, (j, index) in enumerate(zip(order, indices[order])):
+            if i and index == indices[order[i - 1]]:  # repeated frame
+                frames[j] = frames[order[i - 1]]
+                continue
+
+            if index < self._pos or index - self._pos > self._seek_threshold:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                self._pos = int(index)
+            # the frames in between are decoded but not converted
+            while self._pos <= index:
+                if not self._cap.grab():
+                    raise RuntimeError(f"Failed to read frame {index} from {self._video_path}.")
+                self._pos += 1
+
+            ret, frame = self._cap.retrieve(frame)
+            if not ret:
+                raise RuntimeError(f"Failed to read frame {index} from {self._video_path}.")
+            if self._size is not None and self._size != self.shape:
+                interpolation = cv2.INTER_AREA if width * height < self.shape[0] * self.shape[1] else cv2.INTER_LINEAR
+                frame = cv2.resize(frame, self._size, interpolation=interpolation)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frames[j])
+
+        return frames
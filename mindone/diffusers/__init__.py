@@ -131,6 +131,7 @@ _import_structure = {
         "DDIMPipeline",
         "DDPMPipeline",
         "DiffusionPipeline",
+        "DiffusionRequest",
         "DiTPipeline",
         "EasyAnimateControlPipeline",
         "EasyAnimateInpaintPipeline",
@@ -146,6 +147,7 @@ _import_structure = {
         "FluxInpaintPipeline",
         "FluxPipeline",
         "FluxPriorReduxPipeline",
+        "FluxRequestBatchingEngine",
         "HunyuanDiTControlNetPipeline",
         "HunyuanDiTPAGPipeline",
         "HunyuanDiTPipeline",
@@ -206,7 +208,9 @@ _import_structure = {
         "PixArtAlphaPipeline",
         "PixArtSigmaPAGPipeline",
         "PixArtSigmaPipeline",
+        "PromptEmbedsCache",
         "ReduxImageEncoder",
+        "RequestBatchingEngine",
         "SanaPAGPipeline",
         "SanaPipeline",
         "SanaSprintPipeline",
@@ -271,6 +275,7 @@ _import_structure = {
         "StableDiffusionXLPAGInpaintPipeline",
         "StableDiffusionXLPAGPipeline",
         "StableDiffusionXLPipeline",
+        "StableDiffusionXLRequestBatchingEngine",
         "StableUnCLIPImg2ImgPipeline",
         "StableUnCLIPPipeline",
         "StableVideoDiffusionPipeline",
@@ -451,6 +456,7 @@ if TYPE_CHECKING:
         DDIMPipeline,
         DDPMPipeline,
         DiffusionPipeline,
+        DiffusionRequest,
         DiTPipeline,
         EasyAnimateControlPipeline,
         EasyAnimateInpaintPipeline,
@@ -466,6 +472,7 @@ if TYPE_CHECKING:
         FluxInpaintPipeline,
         FluxPipeline,
         FluxPriorReduxPipeline,
+        FluxRequestBatchingEngine,
         HunyuanDiTControlNetPipeline,
         HunyuanDiTPAGPipeline,
         HunyuanDiTPipeline,
@@ -526,7 +533,9 @@ if TYPE_CHECKING:
         PixArtAlphaPipeline,
         PixArtSigmaPAGPipeline,
         PixArtSigmaPipeline,
+        PromptEmbedsCache,
         ReduxImageEncoder,
+        RequestBatchingEngine,
         SanaPAGPipeline,
         SanaPipeline,
         SanaSprintPipeline,
@@ -591,6 +600,7 @@ if TYPE_CHECKING:
         StableDiffusionXLPAGInpaintPipeline,
         StableDiffusionXLPAGPipeline,
         StableDiffusionXLPipeline,
+        StableDiffusionXLRequestBatchingEngine,
         StableUnCLIPImg2ImgPipeline,
         StableUnCLIPPipeline,
         StableVideoDiffusionPipeline,
@@ -21,6 +21,7 @@ import mindspore as ms
 import mindspore.mint.nn.functional as F
 from mindspore import mint, nn, ops
 
+from ...models.modules.sequence_parallel import sequence_parallel_attention
 from ..image_processor import IPAdapterMaskProcessor
 from ..utils import deprecate, is_mindspore_version, logging
 from ..utils.mindspore_utils import dtype_to_min
@@ -289,6 +290,7 @@ class Attention(nn.Cell):
         )
         self._enable_flash_sdp = True
         self.set_flash_attention_force_cast_dtype(ms.float16)
+        self.sequence_parallel_group = None
 
         # set attention processor
         # We use the AttnProcessor2_0 by default when torch 2.x is used which uses
@@ -690,6 +692,18 @@ class Attention(nn.Cell):
         """
         self.fa_force_dtype = force_cast_dtype
 
+    def set_sequence_parallel_group(self, group) -> None:
+        r"""
+        Sets the sequence parallel group the query, key and value sequences are sharded across, or None to disable
+        sequence parallelism. The attention of the local queries on the whole sequence is then computed with the
+        Ulysses and/or ring attention of the group.
+
+        Parameters:
+            group (`SequenceParallelGroup`, *optional*):
+                The group created by `mindone.models.modules.sequence_parallel.create_sequence_parallel_group`.
+        """
+        self.sequence_parallel_group = group
+
     def scaled_dot_product_attention(
         self,
         query: ms.Tensor,
@@ -726,7 +740,32 @@ class Attention(nn.Cell):
               this data-type, the flash attention operator is applied, and the result is cast back to the
               original data type of `query`.
             - Otherwise, the function falls back to the mathematical formula-based attention.
+            - If a sequence parallel group is set, the inputs are the shards of the sequence of the current process
+              and the attention is computed on the whole sequence with the processes of the group.
         """
+        if self.sequence_parallel_group is not None:
+            return sequence_parallel_attention(
+                query,
+                key,
+                value,
+                self.sequence_parallel_group,
+                attn_mask=attn_mask,
+                scale=scale,
+                attn_fn=lambda query, key, value, attn_mask: self._scaled_dot_product_attention(
+                    query, key, value, attn_mask, dropout_p, scale
+                ),
+            )
+        return self._scaled_dot_product_attention(query, key, value, attn_mask, dropout_p, scale)
+
+    def _scaled_dot_product_attention(
+        self,
+        query: ms.Tensor,
+        key: ms.Tensor,
+        value: ms.Tensor,
+        attn_mask: Optional[ms.Tensor] = None,
+        dropout_p: float = 0.0,
+        scale: Optional[float] = None,
+    ):
         head_dim = query.shape[-1]
 
         if not (self.fa_op_available and self._enable_flash_sdp):
@@ -789,7 +828,8 @@ class Attention(nn.Cell):
     ):
         # For most scenarios, qkv has been processed into a BNSD layout before sdp
         input_layout = "BNSD"
-        head_num = self.heads
+        # the heads of the process with Ulysses sequence parallelism
+        head_num = query.shape[1]
 
         # In case qkv is 3-dim after `head_to_batch_dim`
         if query.ndim == 3:
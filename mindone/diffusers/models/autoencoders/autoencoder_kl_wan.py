@@ -742,23 +742,107 @@ class AutoencoderKLWan(ModelMixin, ConfigMixin, FromOriginalModelMixin):
 
         self.diag_gauss_dist = DiagonalGaussianDistribution()
 
+        self.spatial_compression_ratio = 2 ** len(self.temperal_downsample)
+        self.temporal_compression_ratio = 2 ** sum(self.temperal_downsample)
+
+        # The number of causal convolutions is fixed by the architecture, count them once instead of on every call.
+        self._conv_num = self._count_conv3d(self.decoder)
+        self._enc_conv_num = self._count_conv3d(self.encoder)
+
+        # When decoding a batch of video latents at a time, one can save memory by slicing across the batch dimension
+        # to perform decoding of a single video latent at a time.
+        self.use_slicing = False
+
+        # When decoding spatially large video latents, the memory requirement is very high. By breaking the video latent
+        # frames spatially into smaller tiles and performing multiple forward passes for decoding, and then blending the
+        # intermediate tiles together, the memory requirement can be lowered. Every tile keeps its own causal feature
+        # cache, so spatial tiling composes with the chunk-wise temporal processing.
+        self.use_tiling = False
+
+        # The minimal tile height and width for spatial tiling to be used
+        self.tile_sample_min_height = 256
+        self.tile_sample_min_width = 256
+
+        # The minimal distance between two spatial tiles
+        self.tile_sample_stride_height = 192
+        self.tile_sample_stride_width = 192
+
+    def enable_tiling(
+        self,
+        tile_sample_min_height: Optional[int] = None,
+        tile_sample_min_width: Optional[int] = None,
+        tile_sample_stride_height: Optional[int] = None,
+        tile_sample_stride_width: Optional[int] = None,
+    ) -> None:
+        r"""
+        Enable tiled VAE decoding. When this option is enabled, the VAE will split the input tensor into tiles to
+        compute decoding and encoding in several steps. This is useful for saving a large amount of memory and to allow
+        processing larger videos.
+
+        Args:
+            tile_sample_min_height (`int`, *optional*):
+                The height of a tile, in pixels. Samples taller than this are split into tiles across the height
+                dimension.
+            tile_sample_min_width (`int`, *optional*):
+                The width of a tile, in pixels. Samples wider than this are split into tiles across the width
+                dimension.
+            tile_sample_stride_height (`int`, *optional*):
+                The vertical distance between the starts of two consecutive tiles, in pixels. Consecutive tiles
+                overlap by `tile_sample_min_height - tile_sample_stride_height` rows, which are blended to avoid
+                tiling artifacts across the height dimension.
+            tile_sample_stride_width (`int`, *optional*):
+                The horizontal distance between the starts of two consecutive tiles, in pixels. Consecutive tiles
+                overlap by `tile_sample_min_width - tile_sample_stride_width` columns, which are blended to avoid
+                tiling artifacts across the width dimension.
+        """
+        self.use_tiling = True
+        self.tile_sample_min_height = tile_sample_min_height or self.tile_sample_min_height
+        self.tile_sample_min_width = tile_sample_min_width or self.tile_sample_min_width
+        self.tile_sample_stride_height = tile_sample_stride_height or self.tile_sample_stride_height
+        self.tile_sample_stride_width = tile_sample_stride_width or self.tile_sample_stride_width
+
+    def disable_tiling(self) -> None:
+        r"""
+        Disable tiled VAE decoding. If `enable_tiling` was previously enabled, this method will go back to computing
+        decoding in one step.
+        """
+        self.use_tiling = False
+
+    def enable_slicing(self) -> None:
+        r"""
+        Enable sliced VAE decoding. When this option is enabled, the VAE will split the input tensor in slices to
+        compute decoding in several steps. This is useful to save some memory and allow larger batch sizes.
+        """
+        self.use_slicing = True
+
+    def disable_slicing(self) -> None:
+        r"""
+        Disable sliced VAE decoding. If `enable_slicing` was previously enabled, this method will go back to computing
+        decoding in one step.
+        """
+        self.use_slicing = False
+
+    @staticmethod
+    def _count_conv3d(model):
+        count = 0
+        for _, m in model.cells_and_names():
+            if isinstance(m, WanCausalConv3d):
+                count += 1
+        return count
+
     def clear_cache(self):
-        def _count_conv3d(model):
-            count = 0
-            for _, m in model.cells_and_names():
-                if isinstance(m, WanCausalConv3d):
-                    count += 1
-            return count
-
-        self._conv_num = _count_conv3d(self.decoder)
         self._conv_idx = [0]
         self._feat_map = [None] * self._conv_num
         # cache encode
-        self._enc_conv_num = _count_conv3d(self.encoder)
         self._enc_conv_idx = [0]
         self._enc_feat_map = [None] * self._enc_conv_num
 
     def _encode(self, x: ms.Tensor) -> ms.Tensor:
+        _, _, num_frames, height, width = x.shape
+
+        if self.use_tiling and (width > self.tile_sample_min_width or height > self.tile_sample_min_height):
+            return self.tiled_encode(x)
+
         self.clear_cache()
         # cache
         t = x.shape[2]
@@ -796,7 +880,11 @@ class AutoencoderKLWan(ModelMixin, ConfigMixin, FromOriginalModelMixin):
                 The latent representations of the encoded videos. If `return_dict` is True, a
                 [`~models.autoencoder_kl.AutoencoderKLOutput`] is returned, otherwise a plain `tuple` is returned.
         """
-        h = self._encode(x)
+        if self.use_slicing and x.shape[0] > 1:
+            encoded_slices = [self._encode(x_slice) for x_slice in x.split(1)]
+            h = mint.cat(encoded_slices)
+        else:
+            h = self._encode(x)
 
         # we cannot use class in graph mode, even for jit_class or subclass of Tensor. :-(
         # posterior = DiagonalGaussianDistribution(h)
@@ -805,21 +893,66 @@ class AutoencoderKLWan(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             return (h,)
         return AutoencoderKLOutput(latent_dist=h)
 
-    def _decode(self, z: ms.Tensor, return_dict: bool = False) -> Union[DecoderOutput, ms.Tensor]:
-        self.clear_cache()
+    def _decode_frames(self, z: ms.Tensor):
+        r"""
+        Decode `z` one latent frame at a time, yielding the clamped video frames of every latent frame as soon as they
+        are ready. The first latent frame yields a single frame, every following one yields
+        `temporal_compression_ratio` frames.
+        """
+        _, _, num_frames, height, width = z.shape
+        tile_latent_min_height = self.tile_sample_min_height // self.spatial_compression_ratio
+        tile_latent_min_width = self.tile_sample_min_width // self.spatial_compression_ratio
+
+        if self.use_tiling and (width > tile_latent_min_width or height > tile_latent_min_height):
+            yield from self._tiled_decode_frames(z)
+            return
 
-        iter_ = z.shape[2]
         x = self.post_quant_conv(z)
-        for i in range(iter_):
+        self.clear_cache()
+        for i in range(num_frames):
             self._conv_idx = [0]
-            if i == 0:
-                out = self.decoder(x[:, :, i : i + 1, :, :], feat_cache=self._feat_map, feat_idx=self._conv_idx)
-            else:
-                out_ = self.decoder(x[:, :, i : i + 1, :, :], feat_cache=self._feat_map, feat_idx=self._conv_idx)
-                out = mint.cat([out, out_], 2)
-
-        out = mint.clamp(out, min=-1.0, max=1.0)
+            out = self.decoder(x[:, :, i : i + 1, :, :], feat_cache=self._feat_map, feat_idx=self._conv_idx)
+            yield mint.clamp(out, min=-1.0, max=1.0)
         self.clear_cache()
+
+    def _tiled_decode_frames(self, z: ms.Tensor):
+        _, _, num_frames, height, width = z.shape
+        tile_latent_min_height = self.tile_sample_min_height // self.spatial_compression_ratio
+        tile_latent_min_width = self.tile_sample_min_width // self.spatial_compression_ratio
+        sample_height = height * self.spatial_compression_ratio
+        sample_width = width * self.spatial_compression_ratio
+        tile_latent_stride_height = self.tile_sample_stride_height // self.spatial_compression_ratio
+        tile_latent_stride_width = self.tile_sample_stride_width // self.spatial_compression_ratio
+
+        blend_height = self.tile_sample_min_height - self.tile_sample_stride_height
+        blend_width = self.tile_sample_min_width - self.tile_sample_stride_width
+
+        x = self.post_quant_conv(z)
+
+        # Every spatial tile owns an independent causal feature cache which is carried over the latent frames, so the
+        # peak memory is bounded by the tile size rather than the full resolution.
+        row_starts = list(range(0, height, tile_latent_stride_height))
+        col_starts = list(range(0, width, tile_latent_stride_width))
+        feat_maps = [[[None] * self._conv_num for _ in col_starts] for _ in row_starts]
+
+        for k in range(num_frames):
+            rows = []
+            for ri, i in enumerate(row_starts):
+                row = []
+                for ci, j in enumerate(col_starts):
+                    tile = x[:, :, k : k + 1, i : i + tile_latent_min_height, j : j + tile_latent_min_width]
+                    decoded = self.decoder(tile, feat_cache=feat_maps[ri][ci], feat_idx=[0])
+                    row.append(decoded)
+                rows.append(row)
+
+            dec = self._blend_tiles(
+                rows, blend_height, blend_width, self.tile_sample_stride_height, self.tile_sample_stride_width
+            )
+            yield mint.clamp(dec[:, :, :, :sample_height, :sample_width], min=-1.0, max=1.0)
+
+    def _decode(self, z: ms.Tensor, return_dict: bool = False) -> Union[DecoderOutput, ms.Tensor]:
+        out = mint.cat(list(self._decode_frames(z)), dim=2)
+
         if not return_dict:
             return (out,)
 
@@ -839,12 +972,137 @@ class AutoencoderKLWan(ModelMixin, ConfigMixin, FromOriginalModelMixin):
                 If return_dict is True, a [`~models.vae.DecoderOutput`] is returned, otherwise a plain `tuple` is
                 returned.
         """
-        decoded = self._decode(z)[0]
+        if self.use_slicing and z.shape[0] > 1:
+            decoded_slices = [self._decode(z_slice)[0] for z_slice in z.split(1)]
+            decoded = mint.cat(decoded_slices)
+        else:
+            decoded = self._decode(z)[0]
+
         if not return_dict:
             return (decoded,)
 
         return DecoderOutput(sample=decoded)
 
+    def decode_iter(self, z: ms.Tensor):
+        r"""
+        Decode a batch of video latents chunk by chunk along the time axis.
+
+        Unlike [`~AutoencoderKLWan.decode`], the decoded frames are not concatenated: a chunk is yielded as soon as its
+        latent frame has been decoded, so that consumers (e.g. video writers) can overlap their work with decoding and
+        the peak memory does not grow with the number of frames. Spatial tiling is applied when enabled.
+
+        Args:
+            z (`ms.Tensor`): Input batch of latent vectors of shape `(batch_size, z_dim, num_frames, height, width)`.
+
+        Yields:
+            `ms.Tensor`: Decoded frames of shape `(batch_size, 3, num_chunk_frames, height, width)`, clamped to
+            `[-1, 1]`. The first chunk holds 1 frame, the following ones hold `temporal_compression_ratio` frames.
+        """
+        yield from self._decode_frames(z)
+
+    def blend_v(self, a: ms.Tensor, b: ms.Tensor, blend_extent: int) -> ms.Tensor:
+        blend_extent = min(a.shape[-2], b.shape[-2], blend_extent)
+        for y in range(blend_extent):
+            b[:, :, :, y, :] = a[:, :, :, -blend_extent + y, :] * (1 - y / blend_extent) + b[:, :, :, y, :] * (
+                y / blend_extent
+            )
+        return b
+
+    def blend_h(self, a: ms.Tensor, b: ms.Tensor, blend_extent: int) -> ms.Tensor:
+        blend_extent = min(a.shape[-1], b.shape[-1], blend_extent)
+        for x in range(blend_extent):
+            b[:, :, :, :, x] = a[:, :, :, :, -blend_extent + x] * (1 - x / blend_extent) + b[:, :, :, :, x] * (
+                x / blend_extent
+            )
+        return b
+
+    def _blend_tiles(
+        self, rows: List[List[ms.Tensor]], blend_height: int, blend_width: int, stride_height: int, stride_width: int
+    ) -> ms.Tensor:
+        result_rows = []
+        for i, row in enumerate(rows):
+            result_row = []
+            for j, tile in enumerate(row):
+                # blend the above tile and the left tile
+                # to the current tile and add the current tile to the result row
+                if i > 0:
+                    tile = self.blend_v(rows[i - 1][j], tile, blend_height)
+                if j > 0:
+                    tile = self.blend_h(row[j - 1], tile, blend_width)
+                result_row.append(tile[:, :, :, :stride_height, :stride_width])
+            result_rows.append(mint.cat(result_row, dim=-1))
+        return mint.cat(result_rows, dim=3)
+
+    def tiled_encode(self, x: ms.Tensor) -> ms.Tensor:
+        r"""Encode a batch of videos using a tiled encoder.
+
+        Args:
+            x (`ms.Tensor`): Input batch of videos.
+
+        Returns:
+            `ms.Tensor`:
+                The latent representation of the encoded videos.
+        """
+        _, _, num_frames, height, width = x.shape
+        latent_height = height // self.spatial_compression_ratio
+        latent_width = width // self.spatial_compression_ratio
+
+        tile_latent_min_height = self.tile_sample_min_height // self.spatial_compression_ratio
+        tile_latent_min_width = self.tile_sample_min_width // self.spatial_compression_ratio
+        tile_latent_stride_height = self.tile_sample_stride_height // self.spatial_compression_ratio
+        tile_latent_stride_width = self.tile_sample_stride_width // self.spatial_compression_ratio
+
+        blend_height = tile_latent_min_height - tile_latent_stride_height
+        blend_width = tile_latent_min_width - tile_latent_stride_width
+
+        # Split x into overlapping tiles and encode them separately, each with its own causal feature cache.
+        # The tiles have an overlap to avoid seams between tiles.
+        rows = []
+        for i in range(0, height, self.tile_sample_stride_height):
+            row = []
+            for j in range(0, width, self.tile_sample_stride_width):
+                feat_map = [None] * self._enc_conv_num
+                time = []
+                frame_range = 1 + (num_frames - 1) // 4
+                for k in range(frame_range):
+                    if k == 0:
+                        tile = x[:, :, :1, i : i + self.tile_sample_min_height, j : j + self.tile_sample_min_width]
+                    else:
+                        tile = x[
+                            :,
+                            :,
+                            1 + 4 * (k - 1) : 1 + 4 * k,
+                            i : i + self.tile_sample_min_height,
+                            j : j + self.tile_sample_min_width,
+                        ]
+                    tile = self.encoder(tile, feat_cache=feat_map, feat_idx=[0])
+                    time.append(tile)
+                row.append(self.quant_conv(mint.cat(time, dim=2)))
+            rows.append(row)
+
+        enc = self._blend_tiles(rows, blend_height, blend_width, tile_latent_stride_height, tile_latent_stride_width)
+        return enc[:, :, :, :latent_height, :latent_width]
+
+    def tiled_decode(self, z: ms.Tensor, return_dict: bool = False) -> Union[DecoderOutput, ms.Tensor]:
+        r"""
+        Decode a batch of videos using a tiled decoder.
+
+        Args:
+            z (`ms.Tensor`): Input batch of latent vectors.
+            return_dict (`bool`, *optional*, defaults to `False`):
+                Whether or not to return a [`~models.vae.DecoderOutput`] instead of a plain tuple.
+
+        Returns:
+            [`~models.vae.DecoderOutput`] or `tuple`:
+                If return_dict is True, a [`~models.vae.DecoderOutput`] is returned, otherwise a plain `tuple` is
+                returned.
+        """
+        dec = mint.cat(list(self._tiled_decode_frames(z)), dim=2)
+
+        if not return_dict:
+            return (dec,)
+        return DecoderOutput(sample=dec)
+
     def construct(
         self,
         sample: ms.Tensor,
@@ -164,11 +164,13 @@ class ModelMixin(nn.Cell, PushToHubMixin):
     _keep_in_fp32_modules = None
     _skip_layerwise_casting_patterns = None
     _supports_group_offloading = True
+    _sequence_parallel_attention_modules = None
 
     def __init__(self):
         super().__init__()
 
         self._gradient_checkpointing_func = None
+        self.sequence_parallel_group = None
 
     def __getattr__(self, name: str) -> Any:
         """The only reason we overwrite `getattr` here is to gracefully deprecate accessing
@@ -279,6 +281,36 @@ class ModelMixin(nn.Cell, PushToHubMixin):
             if isinstance(module, nn.Cell):
                 fn_recursive_set_mem_eff(module)
 
+    def enable_sequence_parallel(self, group) -> None:
+        r"""
+        Shards the sequence of tokens of the model across the processes of `group`: every process computes the
+        transformer blocks on its shard, and the attention layers on the whole sequence with the Ulysses and/or ring
+        attention of the group. The models supporting it list these attention layers in
+        `_sequence_parallel_attention_modules`, the other ones (e.g. cross-attention on replicated text tokens) being
+        computed locally.
+
+        Parameters:
+            group (`SequenceParallelGroup`):
+                The group created by `mindone.models.modules.sequence_parallel.create_sequence_parallel_group`.
+        """
+        if self._sequence_parallel_attention_modules is None:
+            raise ValueError(f"{self.__class__.__name__} does not support sequence parallelism.")
+        self._set_sequence_parallel_group(group)
+
+    def disable_sequence_parallel(self) -> None:
+        r"""
+        Disables sequence parallelism.
+        """
+        self._set_sequence_parallel_group(None)
+
+    def _set_sequence_parallel_group(self, group) -> None:
+        self.sequence_parallel_group = group
+        for name, module in self.cells_and_names():
+            if hasattr(module, "set_sequence_parallel_group") and (
+                name.split(".")[-1] in self._sequence_parallel_attention_modules
+            ):
+                module.set_sequence_parallel_group(group)
+
     def set_use_memory_efficient_attention_xformers(self, valid: bool, attention_op: Optional[Callable] = None) -> None:
         # Recursively walk through all the children.
         # Any children which exposes the set_use_memory_efficient_attention_xformers method
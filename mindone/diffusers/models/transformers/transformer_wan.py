@@ -336,6 +336,7 @@ class WanTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
     _no_split_modules = ["WanTransformerBlock"]
     _keep_in_fp32_modules = ["time_embedder", "scale_shift_table", "norm1", "norm2", "norm3"]
     _keys_to_ignore_on_load_unexpected = ["norm_added_q"]
+    _sequence_parallel_attention_modules = ["attn1"]
 
     @register_to_config
     def __init__(
@@ -436,10 +437,23 @@ class WanTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
         if encoder_hidden_states_image is not None:
             encoder_hidden_states = mint.concat([encoder_hidden_states_image, encoder_hidden_states], dim=1)
 
+        if self.sequence_parallel_group is not None:
+            # every process computes the blocks on its shard of the video tokens
+            if hidden_states.shape[1] % self.sequence_parallel_group.size != 0:
+                raise ValueError(
+                    f"The number of video tokens {hidden_states.shape[1]} must be divisible by the sequence parallel "
+                    f"size {self.sequence_parallel_group.size}."
+                )
+            hidden_states = self.sequence_parallel_group.split(hidden_states, dim=1)
+            rotary_emb = self.sequence_parallel_group.split(rotary_emb, dim=2)
+
         # 4. Transformer blocks
         for block in self.blocks:
             hidden_states = block(hidden_states, encoder_hidden_states, timestep_proj, rotary_emb)
 
+        if self.sequence_parallel_group is not None:
+            hidden_states = self.sequence_parallel_group.gather(hidden_states, dim=1)
+
         # 5. Output norm, projection & unpatchify
         shift, scale = (self.scale_shift_table + temb.unsqueeze(1)).chunk(2, dim=1)
 
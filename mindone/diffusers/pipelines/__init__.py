@@ -247,6 +247,13 @@ _import_structure = {
         "ImagePipelineOutput",
         "StableDiffusionMixin",
     ],
+    "prompt_embeds_cache": ["PromptEmbedsCache"],
+    "request_batching": [
+        "DiffusionRequest",
+        "FluxRequestBatchingEngine",
+        "RequestBatchingEngine",
+        "StableDiffusionXLRequestBatchingEngine",
+    ],
 }
 
 if TYPE_CHECKING:
@@ -385,6 +392,13 @@ if TYPE_CHECKING:
     from .pia import PIAPipeline
     from .pipeline_utils import AudioPipelineOutput, DiffusionPipeline, ImagePipelineOutput, StableDiffusionMixin
     from .pixart_alpha import PixArtAlphaPipeline, PixArtSigmaPipeline
+    from .prompt_embeds_cache import PromptEmbedsCache
+    from .request_batching import (
+        DiffusionRequest,
+        FluxRequestBatchingEngine,
+        RequestBatchingEngine,
+        StableDiffusionXLRequestBatchingEngine,
+    )
     from .sana import SanaPipeline, SanaSprintPipeline
     from .semantic_stable_diffusion import SemanticStableDiffusionPipeline
     from .shap_e import ShapEImg2ImgPipeline, ShapEPipeline
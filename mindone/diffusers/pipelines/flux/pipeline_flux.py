@@ -209,31 +209,40 @@ class FluxPipeline(
         if isinstance(self, TextualInversionLoaderMixin):
             prompt = self.maybe_convert_prompt(prompt, self.tokenizer_2)
 
-        text_inputs = self.tokenizer_2(
-            prompt,
-            padding="max_length",
-            max_length=max_sequence_length,
-            truncation=True,
-            return_length=False,
-            return_overflowing_tokens=False,
-            return_tensors="np",
-        )
-        text_input_ids = text_inputs.input_ids
-        untruncated_ids = self.tokenizer_2(prompt, padding="longest", return_tensors="np").input_ids
-
-        if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
-            text_input_ids, untruncated_ids
-        ):
-            removed_text = self.tokenizer_2.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
-            logger.warning(
-                "The following part of your input was truncated because `max_sequence_length` is set to "
-                f" {max_sequence_length} tokens: {removed_text}"
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer_2(
+                prompt,
+                padding="max_length",
+                max_length=max_sequence_length,
+                truncation=True,
+                return_length=False,
+                return_overflowing_tokens=False,
+                return_tensors="np",
             )
+            text_input_ids = text_inputs.input_ids
+            untruncated_ids = self.tokenizer_2(prompt, padding="longest", return_tensors="np").input_ids
+
+            if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
+                text_input_ids, untruncated_ids
+            ):
+                removed_text = self.tokenizer_2.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
+                logger.warning(
+                    "The following part of your input was truncated because `max_sequence_length` is set to "
+                    f" {max_sequence_length} tokens: {removed_text}"
+                )
 
-        prompt_embeds = self.text_encoder_2(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=False)[0]
+            prompt_embeds = self.text_encoder_2(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=False)[0]
+            prompt_embeds = prompt_embeds.to(dtype=dtype)
+            return (prompt_embeds,)
 
-        dtype = self.text_encoder_2.dtype
-        prompt_embeds = prompt_embeds.to(dtype=dtype)
+        (prompt_embeds,) = self._encode_prompt_with_cache(
+            self.text_encoder_2,
+            self.tokenizer_2,
+            prompt,
+            encode_fn,
+            max_sequence_length=max_sequence_length,
+            dtype=dtype,
+        )
 
         _, seq_len, _ = prompt_embeds.shape
 
@@ -254,31 +263,35 @@ class FluxPipeline(
         if isinstance(self, TextualInversionLoaderMixin):
             prompt = self.maybe_convert_prompt(prompt, self.tokenizer)
 
-        text_inputs = self.tokenizer(
-            prompt,
-            padding="max_length",
-            max_length=self.tokenizer_max_length,
-            truncation=True,
-            return_overflowing_tokens=False,
-            return_length=False,
-            return_tensors="np",
-        )
-
-        text_input_ids = text_inputs.input_ids
-        untruncated_ids = self.tokenizer(prompt, padding="longest", return_tensors="np").input_ids
-        if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
-            text_input_ids, untruncated_ids
-        ):
-            removed_text = self.tokenizer.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
-            logger.warning(
-                "The following part of your input was truncated because CLIP can only handle sequences up to"
-                f" {self.tokenizer_max_length} tokens: {removed_text}"
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer(
+                prompt,
+                padding="max_length",
+                max_length=self.tokenizer_max_length,
+                truncation=True,
+                return_overflowing_tokens=False,
+                return_length=False,
+                return_tensors="np",
             )
-        prompt_embeds = self.text_encoder(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=False)
 
-        # Use pooled output of CLIPTextModel
-        prompt_embeds = prompt_embeds[1]
-        prompt_embeds = prompt_embeds.to(dtype=self.text_encoder.dtype)
+            text_input_ids = text_inputs.input_ids
+            untruncated_ids = self.tokenizer(prompt, padding="longest", return_tensors="np").input_ids
+            if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
+                text_input_ids, untruncated_ids
+            ):
+                removed_text = self.tokenizer.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
+                logger.warning(
+                    "The following part of your input was truncated because CLIP can only handle sequences up to"
+                    f" {self.tokenizer_max_length} tokens: {removed_text}"
+                )
+            prompt_embeds = self.text_encoder(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=False)
+
+            # Use pooled output of CLIPTextModel
+            return (prompt_embeds[1].to(dtype=self.text_encoder.dtype),)
+
+        (prompt_embeds,) = self._encode_prompt_with_cache(
+            self.text_encoder, self.tokenizer, prompt, encode_fn, max_sequence_length=self.tokenizer_max_length
+        )
 
         # duplicate text embeddings for each generation per prompt, using mps friendly method
         prompt_embeds = prompt_embeds.tile((1, num_images_per_prompt))
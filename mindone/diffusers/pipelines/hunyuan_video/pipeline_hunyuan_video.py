@@ -223,29 +223,43 @@ class HunyuanVideoPipeline(DiffusionPipeline, HunyuanVideoLoraLoaderMixin):
             crop_start -= 2
 
         max_sequence_length += crop_start
-        text_inputs = self.tokenizer(
+
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer(
+                prompt,
+                max_length=max_sequence_length,
+                padding="max_length",
+                truncation=True,
+                return_tensors="np",
+                return_length=False,
+                return_overflowing_tokens=False,
+                return_attention_mask=True,
+            )
+            text_input_ids = ms.tensor(text_inputs.input_ids)
+            prompt_attention_mask = ms.tensor(text_inputs.attention_mask)
+
+            prompt_embeds = self.text_encoder(
+                input_ids=text_input_ids,
+                attention_mask=prompt_attention_mask,
+                output_hidden_states=True,
+            )[2][-(num_hidden_layers_to_skip + 1)]
+            prompt_embeds = prompt_embeds.to(dtype=dtype)
+
+            if crop_start is not None and crop_start > 0:
+                prompt_embeds = prompt_embeds[:, crop_start:]
+                prompt_attention_mask = prompt_attention_mask[:, crop_start:]
+            return prompt_embeds, prompt_attention_mask
+
+        prompt_embeds, prompt_attention_mask = self._encode_prompt_with_cache(
+            self.text_encoder,
+            self.tokenizer,
             prompt,
-            max_length=max_sequence_length,
-            padding="max_length",
-            truncation=True,
-            return_tensors="np",
-            return_length=False,
-            return_overflowing_tokens=False,
-            return_attention_mask=True,
+            encode_fn,
+            max_sequence_length=max_sequence_length,
+            crop_start=crop_start,
+            num_hidden_layers_to_skip=num_hidden_layers_to_skip,
+            dtype=dtype,
         )
-        text_input_ids = ms.tensor(text_inputs.input_ids)
-        prompt_attention_mask = ms.tensor(text_inputs.attention_mask)
-
-        prompt_embeds = self.text_encoder(
-            input_ids=text_input_ids,
-            attention_mask=prompt_attention_mask,
-            output_hidden_states=True,
-        )[2][-(num_hidden_layers_to_skip + 1)]
-        prompt_embeds = prompt_embeds.to(dtype=dtype)
-
-        if crop_start is not None and crop_start > 0:
-            prompt_embeds = prompt_embeds[:, crop_start:]
-            prompt_attention_mask = prompt_attention_mask[:, crop_start:]
 
         # duplicate text embeddings for each generation per prompt, using mps friendly method
         _, seq_len, _ = prompt_embeds.shape
@@ -268,26 +282,31 @@ class HunyuanVideoPipeline(DiffusionPipeline, HunyuanVideoLoraLoaderMixin):
         prompt = [prompt] if isinstance(prompt, str) else prompt
         batch_size = len(prompt)
 
-        text_inputs = self.tokenizer_2(
-            prompt,
-            padding="max_length",
-            max_length=max_sequence_length,
-            truncation=True,
-            return_tensors="np",
-        )
-
-        text_input_ids = text_inputs.input_ids
-        untruncated_ids = self.tokenizer_2(prompt, padding="longest", return_tensors="np").input_ids
-        if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
-            text_input_ids, untruncated_ids
-        ):
-            removed_text = self.tokenizer_2.batch_decode(untruncated_ids[:, max_sequence_length - 1 : -1])
-            logger.warning(
-                "The following part of your input was truncated because CLIP can only handle sequences up to"
-                f" {max_sequence_length} tokens: {removed_text}"
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer_2(
+                prompt,
+                padding="max_length",
+                max_length=max_sequence_length,
+                truncation=True,
+                return_tensors="np",
             )
 
-        prompt_embeds = self.text_encoder_2(ms.tensor(text_input_ids), output_hidden_states=False)[1]
+            text_input_ids = text_inputs.input_ids
+            untruncated_ids = self.tokenizer_2(prompt, padding="longest", return_tensors="np").input_ids
+            if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
+                text_input_ids, untruncated_ids
+            ):
+                removed_text = self.tokenizer_2.batch_decode(untruncated_ids[:, max_sequence_length - 1 : -1])
+                logger.warning(
+                    "The following part of your input was truncated because CLIP can only handle sequences up to"
+                    f" {max_sequence_length} tokens: {removed_text}"
+                )
+
+            return (self.text_encoder_2(ms.tensor(text_input_ids), output_hidden_states=False)[1],)
+
+        (prompt_embeds,) = self._encode_prompt_with_cache(
+            self.text_encoder_2, self.tokenizer_2, prompt, encode_fn, max_sequence_length=max_sequence_length
+        )
 
         # duplicate text embeddings for each generation per prompt, using mps friendly method
         prompt_embeds = prompt_embeds.tile((1, num_videos_per_prompt))
@@ -22,7 +22,7 @@ import os
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Union, get_args, get_origin
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
 
 import numpy as np
 import PIL.Image
@@ -82,6 +82,7 @@ from .pipeline_loading_utils import (
     variant_compatible_siblings,
     warn_deprecated_model_variant,
 )
+from .prompt_embeds_cache import PromptEmbedsCache
 
 logger = logging.get_logger(__name__)
 
@@ -1329,6 +1330,62 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         for module in modules:
             fn_recursive_set_mem_eff(module)
 
+    def enable_prompt_embeds_cache(
+        self,
+        cache: Optional[PromptEmbedsCache] = None,
+        max_size: int = 1024,
+        cache_dir: Optional[Union[str, os.PathLike]] = None,
+    ) -> PromptEmbedsCache:
+        r"""
+        Enable caching of the text encoder outputs. When this option is enabled, `encode_prompt` only runs the text
+        encoders on prompts that have not been encoded before, which saves the text encoding cost of repeated prompts
+        and of constant negative prompts.
+
+        Parameters:
+            cache ([`PromptEmbedsCache`], *optional*):
+                An existing cache, e.g. one shared with other pipelines. If not set, a new one is created from
+                `max_size` and `cache_dir`.
+            max_size (`int`, *optional*, defaults to 1024):
+                The maximum number of prompts kept in memory.
+            cache_dir (`str` or `os.PathLike`, *optional*):
+                The directory of the optional on-disk tier of the cache.
+
+        Returns:
+            [`PromptEmbedsCache`]: The cache used by the pipeline.
+
+        Examples:
+
+        ```py
+        >>> import mindspore as ms
+        >>> from mindone.diffusers import FluxPipeline
+
+        >>> pipe = FluxPipeline.from_pretrained("black-forest-labs/FLUX.1-schnell", mindspore_dtype=ms.bfloat16)
+        >>> cache = pipe.enable_prompt_embeds_cache(cache_dir="./prompt_embeds_cache")
+        >>> image = pipe("A cat holding a sign that says hello world", num_inference_steps=4)[0][0]
+        >>> image = pipe("A cat holding a sign that says hello world", num_inference_steps=4)[0][0]  # cache hit
+        ```
+        """
+        if cache is None:
+            cache = PromptEmbedsCache(max_size=max_size, cache_dir=cache_dir)
+        self._prompt_embeds_cache = cache
+        return cache
+
+    def disable_prompt_embeds_cache(self):
+        r"""
+        Disable caching of the text encoder outputs enabled by `enable_prompt_embeds_cache`.
+        """
+        self._prompt_embeds_cache = None
+
+    def _encode_prompt_with_cache(
+        self, text_encoder, tokenizer, prompt: List[str], encode_fn: Callable, **settings
+    ) -> Tuple[ms.Tensor, ...]:
+        # `encode_fn` maps a list of prompts to a tuple of tensors batched along the first axis.
+        cache = getattr(self, "_prompt_embeds_cache", None)
+        if cache is None:
+            return encode_fn(prompt)
+        tokenizer_id = f"{tokenizer.__class__.__name__}:{getattr(tokenizer, 'name_or_path', '')}"
+        return cache.encode(text_encoder, prompt, encode_fn, tokenizer=tokenizer_id, **settings)
+
     @classmethod
     def from_pipe(cls, pipeline, **kwargs):
         r"""
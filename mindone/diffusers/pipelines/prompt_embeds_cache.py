@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import mint
+
+from ..utils import logging
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+def _encoder_id(encoder: Any) -> str:
+    config = getattr(encoder, "config", None)
+    name_or_path = getattr(config, "_name_or_path", None) or getattr(encoder, "name_or_path", None)
+    # Randomly initialized encoders have no stable name: fall back to the object identity, which is only valid for the
+    # lifetime of the process and therefore never collides with persisted entries of a named encoder.
+    return f"{encoder.__class__.__name__}:{name_or_path or f'id-{id(encoder)}'}"
+
+
+def _lora_state(encoder: Any) -> str:
+    # The encoder outputs depend on its active LoRA adapters and on their scales, e.g. the `lora_scale` applied by the
+    # pipelines with `scale_lora_layers` right before encoding the prompt.
+    if not hasattr(encoder, "cells_and_names"):
+        return ""
+    from .._peft.tuners.tuners_utils import BaseTunerLayer
+
+    states = set()
+    for _, module in encoder.cells_and_names():
+        if isinstance(module, BaseTunerLayer) and not module.disable_adapters:
+            scaling = getattr(module, "scaling", {})
+            states.add(",".join(f"{name}={scaling.get(name)}" for name in sorted(module.active_adapters)))
+    return ";".join(sorted(states))
+
+
+class PromptEmbedsCache:
+    r"""
+    A cache of text encoder outputs shared by diffusion pipelines.
+
+    Entries are keyed by the text encoder identity, the tokenizer settings used to encode the prompt and the prompt
+    itself, and hold the per-prompt outputs of the encoder (e.g. `(prompt_embeds,)` for T5 or `(prompt_embeds,
+    pooled_prompt_embeds)` for CLIP), before they are repeated for `num_images_per_prompt`.
+
+    The cache has two tiers:
+
+        - an in-memory LRU of at most `max_size` entries, holding device tensors so that a hit costs no host/device
+          copy;
+        - an optional on-disk tier under `cache_dir`, with one `.npy` file per output, read back with memory mapping.
+          It survives restarts and can be shared by several processes.
+
+    A single instance can be passed to several pipelines (see [`DiffusionPipeline.enable_prompt_embeds_cache`]) that
+    share a text encoder, e.g. the text-to-video and image-to-video Wan pipelines.
+
+    <Tip warning={true}>
+
+    The cache tracks the active LoRA adapters of the text encoders and their scales, but not the weights of the text
+    encoders. Call [`~PromptEmbedsCache.clear`] after loading LoRA or textual inversion weights into a text encoder.
+
+    </Tip>
+
+    Args:
+        max_size (`int`, *optional*, defaults to 1024):
+            The maximum number of prompts kept in memory. `0` disables the in-memory tier.
+        cache_dir (`str` or `os.PathLike`, *optional*):
+            The directory of the on-disk tier. If not set, only the in-memory tier is used.
+    """
+
+    def __init__(self, max_size: int = 1024, cache_dir: Optional[Union[str, os.PathLike]] = None):
+        self.max_size = max_size
+        self.cache_dir = os.fspath(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[ms.Tensor, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(encoder: Any, prompt: str, **settings) -> str:
+        r"""
+        Build the cache key of `prompt` encoded by `encoder` with the tokenizer/encoding `settings` (e.g.
+        `max_sequence_length`, the tokenizer name or the output dtype).
+        """
+        payload = {"encoder": _encoder_id(encoder), "settings": {k: str(v) for k, v in settings.items()}}
+        payload["prompt"] = prompt
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[Tuple[ms.Tensor, ...]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._load(key) if self.cache_dir is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Tuple[ms.Tensor, ...]):
+        value = tuple(value)
+        self._remember(key, value)
+        if self.cache_dir is not None and not os.path.isdir(self._entry_dir(key)):
+            self._save(key, value)
+
+    def clear(self, disk: bool = False):
+        r"""
+        Drop all in-memory entries, and the on-disk tier as well if `disk` is `True`.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if disk and self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _remember(self, key: str, value: Tuple[ms.Tensor, ...]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _save(self, key: str, value: Tuple[ms.Tensor, ...]):
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        # Write into a temporary directory and rename it, so that concurrent readers never see a partial entry.
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(entry_dir))
+        try:
+            dtypes = []
+            for i, tensor in enumerate(value):
+                dtypes.append(str(tensor.dtype))
+                # numpy has no bfloat16, such tensors are stored as float32 and cast back on load
+                array = tensor.float().asnumpy() if tensor.dtype == ms.bfloat16 else tensor.asnumpy()
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), array)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"dtypes": dtypes}, f)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            # another process may have written the same entry in the meantime
+            logger.debug(f"Failed to persist prompt embeddings `{key}`: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _load(self, key: str) -> Optional[Tuple[ms.Tensor, ...]]:
+        entry_dir = self._entry_dir(key)
+        meta_file = os.path.join(entry_dir, "meta.json")
+        if not os.path.isfile(meta_file):
+            return None
+        with open(meta_file) as f:
+            dtypes = json.load(f)["dtypes"]
+
+        value = []
+        for i, dtype in enumerate(dtypes):
+            array = np.load(os.path.join(entry_dir, f"{i}.npy"), mmap_mode="r")
+            tensor = ms.tensor(array)
+            if str(tensor.dtype) != dtype:
+                tensor = tensor.to(getattr(ms, dtype.lower()))
+            value.append(tensor)
+        return tuple(value)
+
+    def encode(
+        self,
+        encoder: Any,
+        prompt: List[str],
+        encode_fn: Callable[[List[str]], Tuple[ms.Tensor, ...]],
+        **settings,
+    ) -> Tuple[ms.Tensor, ...]:
+        r"""
+        Encode `prompt` with `encode_fn`, only running it on the prompts which are not cached yet. Duplicated prompts
+        of a batch (e.g. a constant negative prompt) are encoded once.
+
+        Args:
+            encoder:
+                The text encoder used by `encode_fn`, identifying the cache entries.
+            prompt (`List[str]`):
+                The prompts to encode.
+            encode_fn (`Callable`):
+                A function encoding a list of prompts into a tuple of tensors whose first dimension is the number of
+                prompts.
+            settings:
+                The tokenizer/encoding settings `encode_fn` depends on.
+
+        Returns:
+            `Tuple[ms.Tensor, ...]`: The output of `encode_fn(prompt)`.
+        """
+        lora_state = _lora_state(encoder)
+        if lora_state:
+            settings = {**settings, "lora": lora_state}
+        keys = [self.make_key(encoder, p, **settings) for p in prompt]
+        outputs: Dict[str, Tuple[ms.Tensor, ...]] = {}
+        missing = []
+        for key in OrderedDict.fromkeys(keys):
+            value = self.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                outputs[key] = value
+
+        if missing:
+            encoded = encode_fn([prompt[keys.index(k)] for k in missing])
+            for i, key in enumerate(missing):
+                value = tuple(t[i : i + 1] for t in encoded)
+                outputs[key] = value
+                self.put(key, value)
+
+        num_outputs = len(outputs[keys[0]])
+        return tuple(mint.cat([outputs[k][j] for k in keys], dim=0) for j in range(num_outputs))
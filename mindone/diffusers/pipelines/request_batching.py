@@ -0,0 +1,446 @@
+import itertools
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import mint
+
+from ..utils import logging
+from ..utils.mindspore_utils import randn_tensor
+from .pipeline_utils import DiffusionPipeline
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+@dataclass
+class DiffusionRequest:
+    r"""
+    A single generation request handled by a [`RequestBatchingEngine`].
+
+    Args:
+        prompt (`str`):
+            The prompt to guide the image generation.
+        negative_prompt (`str`, *optional*):
+            The prompt not to guide the image generation. Only used by rows doing classifier-free guidance.
+        guidance_scale (`float`, defaults to 5.0):
+            The classifier-free guidance scale of this request. Requests with `guidance_scale <= 1` skip the
+            unconditional forward. For guidance-distilled models (e.g. FLUX.1-dev) it is the embedded guidance instead.
+        true_cfg_scale (`float`, defaults to 1.0):
+            The classifier-free guidance scale of guidance-distilled models, see [`FluxPipeline`].
+        num_inference_steps (`int`, defaults to 28):
+            The number of denoising steps of this request.
+        seed (`int`, *optional*):
+            The seed of the initial noise.
+        request_id (`str`, *optional*):
+            An identifier returned with the result, generated if not set.
+    """
+
+    prompt: str
+    negative_prompt: Optional[str] = None
+    guidance_scale: float = 5.0
+    true_cfg_scale: float = 1.0
+    num_inference_steps: int = 28
+    seed: Optional[int] = None
+    request_id: Optional[str] = None
+
+
+@dataclass
+class _RequestState:
+    request: DiffusionRequest
+    scheduler: Any
+    timesteps: ms.Tensor
+    latents: ms.Tensor
+    cond: Dict[str, ms.Tensor]
+    uncond: Optional[Dict[str, ms.Tensor]]
+    cfg_scale: float
+    step: int = 0
+
+    @property
+    def do_cfg(self) -> bool:
+        return self.uncond is not None
+
+    @property
+    def finished(self) -> bool:
+        return self.step >= len(self.timesteps)
+
+
+class RequestBatchingEngine:
+    r"""
+    Packs heterogeneous generation requests into one denoising batch of a [`DiffusionPipeline`].
+
+    Every request keeps its own copy of the scheduler, so requests with different `num_inference_steps` share the
+    denoiser forward: at each step, the rows of all active requests are evaluated with their own timestep. The
+    unconditional rows of classifier-free guidance are only appended for requests that use it, and the guidance is
+    applied with a per-row scale tensor. Requests join the batch and leave it (and are decoded) at step boundaries,
+    so the batch is refilled from the queue as soon as a request finishes.
+
+    All requests of an engine share the output resolution, so that the latents of all rows have the same shape.
+    Subclasses implement the model-specific parts: [`~RequestBatchingEngine.encode`],
+    [`~RequestBatchingEngine.prepare_latents`], [`~RequestBatchingEngine.set_timesteps`],
+    [`~RequestBatchingEngine.predict`] and [`~RequestBatchingEngine.decode`].
+
+    Args:
+        pipeline ([`DiffusionPipeline`]):
+            The pipeline providing the models and the scheduler configuration.
+        height (`int`):
+            The height in pixels of the generated images.
+        width (`int`):
+            The width in pixels of the generated images.
+        max_batch_size (`int`, defaults to 8):
+            The maximum number of rows (conditional plus unconditional) of a denoiser forward.
+        output_type (`str`, defaults to `"pil"`):
+            The output format of the generated images, see [`~image_processor.VaeImageProcessor.postprocess`].
+    """
+
+    def __init__(
+        self,
+        pipeline: DiffusionPipeline,
+        height: int,
+        width: int,
+        max_batch_size: int = 8,
+        output_type: str = "pil",
+    ):
+        if max_batch_size < 2:
+            raise ValueError(f"`max_batch_size` must be at least 2 to fit a guided request, but is {max_batch_size}.")
+        self.pipeline = pipeline
+        self.height = height
+        self.width = width
+        self.max_batch_size = max_batch_size
+        self.output_type = output_type
+
+        self._queue: Deque[DiffusionRequest] = deque()
+        self._active: List[_RequestState] = []
+        self._ids = itertools.count()
+
+    # ----- model specific hooks -----
+
+    def encode(self, request: DiffusionRequest) -> Tuple[Dict[str, ms.Tensor], Optional[Dict[str, ms.Tensor]]]:
+        r"""
+        Returns the conditional inputs of `request`, and its unconditional inputs if it does classifier-free guidance.
+        Every tensor has a leading batch dimension of 1.
+        """
+        raise NotImplementedError
+
+    def prepare_latents(self, request: DiffusionRequest) -> ms.Tensor:
+        r"""
+        Returns the initial latents of `request`, with a leading batch dimension of 1.
+        """
+        raise NotImplementedError
+
+    def set_timesteps(self, scheduler, request: DiffusionRequest) -> ms.Tensor:
+        r"""
+        Sets the timesteps of the per-request `scheduler` and returns them.
+        """
+        scheduler.set_timesteps(request.num_inference_steps)
+        return scheduler.timesteps
+
+    def cfg_scale(self, request: DiffusionRequest) -> float:
+        r"""
+        Returns the classifier-free guidance scale of `request`, a value `<= 1` disables the unconditional rows.
+        """
+        return request.guidance_scale
+
+    def predict(
+        self, latents: ms.Tensor, timesteps: ms.Tensor, inputs: Dict[str, ms.Tensor], states: List[_RequestState]
+    ) -> ms.Tensor:
+        r"""
+        Runs the denoiser on a packed batch. `states[i]` is the request owning row `i`.
+        """
+        raise NotImplementedError
+
+    def decode(self, latents: ms.Tensor) -> Any:
+        r"""
+        Decodes the final latents of the requests finishing at the same step.
+        """
+        raise NotImplementedError
+
+    # ----- scheduling -----
+
+    def submit(self, request: DiffusionRequest) -> str:
+        r"""
+        Queues `request`, it joins the batch at the next step boundary with a free row. Returns its id.
+        """
+        if request.request_id is None:
+            request.request_id = f"request-{next(self._ids)}"
+        self._queue.append(request)
+        return request.request_id
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._queue) + len(self._active)
+
+    def _num_rows(self, states: List[_RequestState]) -> int:
+        return sum(2 if s.do_cfg else 1 for s in states)
+
+    def _admit(self):
+        while self._queue:
+            request = self._queue[0]
+            cfg_scale = self.cfg_scale(request)
+            rows = 2 if cfg_scale > 1.0 else 1
+            if self._num_rows(self._active) + rows > self.max_batch_size:
+                break
+            self._queue.popleft()
+
+            scheduler = self.pipeline.scheduler.__class__.from_config(self.pipeline.scheduler.config)
+            timesteps = self.set_timesteps(scheduler, request)
+            cond, uncond = self.encode(request)
+            if cfg_scale <= 1.0:
+                uncond = None
+            latents = self.prepare_latents(request) * getattr(scheduler, "init_noise_sigma", 1.0)
+            self._active.append(_RequestState(request, scheduler, timesteps, latents, cond, uncond, cfg_scale))
+
+    def step(self) -> List[Tuple[str, Any]]:
+        r"""
+        Admits queued requests into free rows, runs one denoising step for all active requests and decodes those that
+        are done.
+
+        Returns:
+            `List[Tuple[str, Any]]`: The `(request_id, image)` pairs of the requests finished at this step.
+        """
+        self._admit()
+        if not self._active:
+            return []
+
+        states = self._active
+        guided = [s for s in states if s.do_cfg]
+        packed = states + guided
+        num_cond = len(states)
+
+        latent_rows, timestep_rows = [], []
+        for s in packed:
+            t = s.timesteps[s.step]
+            latents = s.latents
+            if hasattr(s.scheduler, "scale_model_input"):
+                latents = s.scheduler.scale_model_input(latents, t).to(s.latents.dtype)
+            latent_rows.append(latents)
+            timestep_rows.append(t.reshape(1))
+        latents = mint.cat(latent_rows)
+        timesteps = mint.cat(timestep_rows)
+        inputs = {
+            k: mint.cat([s.cond[k] for s in states] + [s.uncond[k] for s in guided]) for k in states[0].cond.keys()
+        }
+
+        noise_pred = self.predict(latents, timesteps, inputs, packed)
+
+        # Gather the unconditional prediction of every row, rows without guidance use their conditional one with a
+        # scale of 1, so that the guidance of the whole batch is a single vectorized expression.
+        noise_pred_text = noise_pred[:num_cond]
+        uncond_index, scales, k = [], [], num_cond
+        for i, s in enumerate(states):
+            if s.do_cfg:
+                uncond_index.append(k)
+                scales.append(s.cfg_scale)
+                k += 1
+            else:
+                uncond_index.append(i)
+                scales.append(1.0)
+        noise_pred_uncond = noise_pred[ms.tensor(uncond_index, dtype=ms.int32)]
+        scales = ms.tensor(scales, dtype=noise_pred.dtype).reshape((-1,) + (1,) * (noise_pred.ndim - 1))
+        noise_pred = noise_pred_uncond + scales * (noise_pred_text - noise_pred_uncond)
+
+        for i, s in enumerate(states):
+            t = s.timesteps[s.step]
+            s.latents = s.scheduler.step(noise_pred[i : i + 1], t, s.latents, return_dict=False)[0].to(s.latents.dtype)
+            s.step += 1
+
+        done = [s for s in states if s.finished]
+        self._active = [s for s in states if not s.finished]
+        if not done:
+            return []
+        images = self.decode(mint.cat([s.latents for s in done]))
+        return [(s.request.request_id, images[i]) for i, s in enumerate(done)]
+
+    def run(self, requests: Optional[List[DiffusionRequest]] = None) -> Dict[str, Any]:
+        r"""
+        Submits `requests` and steps until all queued and active requests are done.
+
+        Returns:
+            `Dict[str, Any]`: The generated images keyed by request id.
+        """
+        for request in requests or []:
+            self.submit(request)
+        results = {}
+        while self.num_pending:
+            results.update(self.step())
+        return results
+
+
+class StableDiffusionXLRequestBatchingEngine(RequestBatchingEngine):
+    r"""
+    [`RequestBatchingEngine`] for [`StableDiffusionXLPipeline`].
+    """
+
+    def encode(self, request):
+        pipe = self.pipeline
+        do_cfg = self.cfg_scale(request) > 1.0
+        (
+            prompt_embeds,
+            negative_prompt_embeds,
+            pooled_prompt_embeds,
+            negative_pooled_prompt_embeds,
+        ) = pipe.encode_prompt(
+            prompt=request.prompt,
+            do_classifier_free_guidance=do_cfg,
+            negative_prompt=request.negative_prompt,
+        )
+
+        if pipe.text_encoder_2 is None:
+            text_encoder_projection_dim = int(pooled_prompt_embeds.shape[-1])
+        else:
+            text_encoder_projection_dim = pipe.text_encoder_2.config.projection_dim
+        add_time_ids = pipe._get_add_time_ids(
+            (self.height, self.width),
+            (0, 0),
+            (self.height, self.width),
+            dtype=prompt_embeds.dtype,
+            text_encoder_projection_dim=text_encoder_projection_dim,
+        )
+
+        cond = {"encoder_hidden_states": prompt_embeds, "text_embeds": pooled_prompt_embeds, "time_ids": add_time_ids}
+        uncond = None
+        if do_cfg:
+            uncond = {
+                "encoder_hidden_states": negative_prompt_embeds,
+                "text_embeds": negative_pooled_prompt_embeds,
+                "time_ids": add_time_ids,
+            }
+        return cond, uncond
+
+    def prepare_latents(self, request):
+        pipe = self.pipeline
+        shape = (
+            1,
+            pipe.unet.config.in_channels,
+            self.height // pipe.vae_scale_factor,
+            self.width // pipe.vae_scale_factor,
+        )
+        generator = np.random.default_rng(request.seed)
+        return randn_tensor(shape, generator=generator, dtype=pipe.unet.dtype)
+
+    def predict(self, latents, timesteps, inputs, states):
+        added_cond_kwargs = {"text_embeds": inputs["text_embeds"], "time_ids": inputs["time_ids"]}
+        return self.pipeline.unet(
+            latents,
+            timesteps,
+            encoder_hidden_states=inputs["encoder_hidden_states"],
+            added_cond_kwargs=ms.mutable(added_cond_kwargs),
+            return_dict=False,
+        )[0]
+
+    def decode(self, latents):
+        pipe = self.pipeline
+        needs_upcasting = pipe.vae.dtype == ms.float16 and pipe.vae.config.force_upcast
+        if needs_upcasting:
+            pipe.upcast_vae()
+
+        has_latents_mean = hasattr(pipe.vae.config, "latents_mean") and pipe.vae.config.latents_mean is not None
+        has_latents_std = hasattr(pipe.vae.config, "latents_std") and pipe.vae.config.latents_std is not None
+        if has_latents_mean and has_latents_std:
+            latents_mean = ms.tensor(pipe.vae.config.latents_mean).view(1, 4, 1, 1).to(latents.dtype)
+            latents_std = ms.tensor(pipe.vae.config.latents_std).view(1, 4, 1, 1).to(latents.dtype)
+            latents = latents * latents_std / pipe.vae.config.scaling_factor + latents_mean
+        else:
+            latents = latents / pipe.vae.config.scaling_factor
+        image = pipe.vae.decode(latents.to(pipe.vae.dtype), return_dict=False)[0]
+
+        if needs_upcasting:
+            pipe.vae.to(dtype=ms.float16)
+        if pipe.watermark is not None:
+            image = pipe.watermark.apply_watermark(image)
+        return pipe.image_processor.postprocess(image, output_type=self.output_type)
+
+
+class FluxRequestBatchingEngine(RequestBatchingEngine):
+    r"""
+    [`RequestBatchingEngine`] for [`FluxPipeline`].
+
+    For guidance-distilled checkpoints the `guidance_scale` of every request is passed to the embedded guidance as a
+    per-row tensor, and classifier-free guidance (unconditional rows) is driven by `true_cfg_scale` and
+    `negative_prompt`, like in [`FluxPipeline`].
+    """
+
+    def __init__(self, *args, max_sequence_length: int = 512, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_sequence_length = max_sequence_length
+
+        pipe = self.pipeline
+        self._latent_height = 2 * (int(self.height) // (pipe.vae_scale_factor * 2))
+        self._latent_width = 2 * (int(self.width) // (pipe.vae_scale_factor * 2))
+        self._text_ids = None
+        self._latent_image_ids = pipe._prepare_latent_image_ids(
+            1, self._latent_height // 2, self._latent_width // 2, pipe.transformer.dtype
+        )
+
+    def cfg_scale(self, request):
+        if self.pipeline.transformer.config.guidance_embeds:
+            return request.true_cfg_scale if request.negative_prompt is not None else 1.0
+        return request.guidance_scale
+
+    def encode(self, request):
+        pipe = self.pipeline
+        prompt_embeds, pooled_prompt_embeds, text_ids = pipe.encode_prompt(
+            prompt=request.prompt, prompt_2=None, max_sequence_length=self.max_sequence_length
+        )
+        self._text_ids = text_ids
+        cond = {"encoder_hidden_states": prompt_embeds, "pooled_projections": pooled_prompt_embeds}
+
+        uncond = None
+        if self.cfg_scale(request) > 1.0:
+            negative_prompt_embeds, negative_pooled_prompt_embeds, _ = pipe.encode_prompt(
+                prompt=request.negative_prompt or "", prompt_2=None, max_sequence_length=self.max_sequence_length
+            )
+            uncond = {
+                "encoder_hidden_states": negative_prompt_embeds,
+                "pooled_projections": negative_pooled_prompt_embeds,
+            }
+        return cond, uncond
+
+    def prepare_latents(self, request):
+        pipe = self.pipeline
+        num_channels_latents = pipe.transformer.config.in_channels // 4
+        shape = (1, num_channels_latents, self._latent_height, self._latent_width)
+        generator = np.random.default_rng(request.seed)
+        latents = randn_tensor(shape, generator=generator, dtype=pipe.transformer.dtype)
+        return pipe._pack_latents(latents, 1, num_channels_latents, self._latent_height, self._latent_width)
+
+    def set_timesteps(self, scheduler, request):
+        from .flux.pipeline_flux import calculate_shift
+
+        num_inference_steps = request.num_inference_steps
+        sigmas = np.linspace(1.0, 1 / num_inference_steps, num_inference_steps)
+        image_seq_len = (self._latent_height // 2) * (self._latent_width // 2)
+        mu = calculate_shift(
+            image_seq_len,
+            scheduler.config.get("base_image_seq_len", 256),
+            scheduler.config.get("max_image_seq_len", 4096),
+            scheduler.config.get("base_shift", 0.5),
+            scheduler.config.get("max_shift", 1.15),
+        )
+        scheduler.set_timesteps(sigmas=sigmas, mu=mu)
+        return scheduler.timesteps
+
+    def predict(self, latents, timesteps, inputs, states):
+        pipe = self.pipeline
+        guidance = None
+        if pipe.transformer.config.guidance_embeds:
+            guidance = ms.tensor([s.request.guidance_scale for s in states], dtype=ms.float32)
+        return pipe.transformer(
+            hidden_states=latents,
+            timestep=timesteps.to(latents.dtype) / 1000,
+            guidance=guidance,
+            pooled_projections=inputs["pooled_projections"],
+            encoder_hidden_states=inputs["encoder_hidden_states"],
+            txt_ids=self._text_ids,
+            img_ids=self._latent_image_ids,
+            return_dict=False,
+        )[0]
+
+    def decode(self, latents):
+        pipe = self.pipeline
+        latents = pipe._unpack_latents(latents, self.height, self.width, pipe.vae_scale_factor)
+        latents = (latents / pipe.vae.config.scaling_factor) + pipe.vae.config.shift_factor
+        image = pipe.vae.decode(latents, return_dict=False)[0]
+        return pipe.image_processor.postprocess(image, output_type=self.output_type)
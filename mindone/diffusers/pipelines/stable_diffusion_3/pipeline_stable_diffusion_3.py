@@ -235,30 +235,39 @@ class StableDiffusion3Pipeline(DiffusionPipeline, SD3LoraLoaderMixin, FromSingle
                 dtype=dtype,
             )
 
-        text_inputs = self.tokenizer_3(
-            prompt,
-            padding="max_length",
-            max_length=max_sequence_length,
-            truncation=True,
-            add_special_tokens=True,
-            return_tensors="np",
-        )
-        text_input_ids = text_inputs.input_ids
-        untruncated_ids = self.tokenizer_3(prompt, padding="longest", return_tensors="np").input_ids
-
-        if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
-            text_input_ids, untruncated_ids
-        ):
-            removed_text = self.tokenizer_3.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
-            logger.warning(
-                "The following part of your input was truncated because `max_sequence_length` is set to "
-                f" {max_sequence_length} tokens: {removed_text}"
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer_3(
+                prompt,
+                padding="max_length",
+                max_length=max_sequence_length,
+                truncation=True,
+                add_special_tokens=True,
+                return_tensors="np",
             )
+            text_input_ids = text_inputs.input_ids
+            untruncated_ids = self.tokenizer_3(prompt, padding="longest", return_tensors="np").input_ids
+
+            if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
+                text_input_ids, untruncated_ids
+            ):
+                removed_text = self.tokenizer_3.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
+                logger.warning(
+                    "The following part of your input was truncated because `max_sequence_length` is set to "
+                    f" {max_sequence_length} tokens: {removed_text}"
+                )
 
-        prompt_embeds = self.text_encoder_3(ms.Tensor.from_numpy(text_input_ids))[0]
+            prompt_embeds = self.text_encoder_3(ms.Tensor.from_numpy(text_input_ids))[0]
+            prompt_embeds = prompt_embeds.to(dtype=dtype)
+            return (prompt_embeds,)
 
-        dtype = self.text_encoder_3.dtype
-        prompt_embeds = prompt_embeds.to(dtype=dtype)
+        (prompt_embeds,) = self._encode_prompt_with_cache(
+            self.text_encoder_3,
+            self.tokenizer_3,
+            prompt,
+            encode_fn,
+            max_sequence_length=max_sequence_length,
+            dtype=dtype,
+        )
 
         _, seq_len, _ = prompt_embeds.shape
 
@@ -284,33 +293,43 @@ class StableDiffusion3Pipeline(DiffusionPipeline, SD3LoraLoaderMixin, FromSingle
         prompt = [prompt] if isinstance(prompt, str) else prompt
         batch_size = len(prompt)
 
-        text_inputs = tokenizer(
-            prompt,
-            padding="max_length",
-            max_length=self.tokenizer_max_length,
-            truncation=True,
-            return_tensors="np",
-        )
-
-        text_input_ids = text_inputs.input_ids
-        untruncated_ids = tokenizer(prompt, padding="longest", return_tensors="np").input_ids
-        if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
-            text_input_ids, untruncated_ids
-        ):
-            removed_text = tokenizer.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
-            logger.warning(
-                "The following part of your input was truncated because CLIP can only handle sequences up to"
-                f" {self.tokenizer_max_length} tokens: {removed_text}"
+        def encode_fn(prompt):
+            text_inputs = tokenizer(
+                prompt,
+                padding="max_length",
+                max_length=self.tokenizer_max_length,
+                truncation=True,
+                return_tensors="np",
             )
-        prompt_embeds = text_encoder(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=True)
-        pooled_prompt_embeds = prompt_embeds[0]
 
-        if clip_skip is None:
-            prompt_embeds = prompt_embeds[2][-2]
-        else:
-            prompt_embeds = prompt_embeds[2][-(clip_skip + 2)]
+            text_input_ids = text_inputs.input_ids
+            untruncated_ids = tokenizer(prompt, padding="longest", return_tensors="np").input_ids
+            if untruncated_ids.shape[-1] >= text_input_ids.shape[-1] and not np.array_equal(
+                text_input_ids, untruncated_ids
+            ):
+                removed_text = tokenizer.batch_decode(untruncated_ids[:, self.tokenizer_max_length - 1 : -1])
+                logger.warning(
+                    "The following part of your input was truncated because CLIP can only handle sequences up to"
+                    f" {self.tokenizer_max_length} tokens: {removed_text}"
+                )
+            prompt_embeds = text_encoder(ms.Tensor.from_numpy(text_input_ids), output_hidden_states=True)
+            pooled_prompt_embeds = prompt_embeds[0]
 
-        prompt_embeds = prompt_embeds.to(dtype=self.text_encoder.dtype)
+            if clip_skip is None:
+                prompt_embeds = prompt_embeds[2][-2]
+            else:
+                prompt_embeds = prompt_embeds[2][-(clip_skip + 2)]
+
+            return prompt_embeds.to(dtype=self.text_encoder.dtype), pooled_prompt_embeds
+
+        prompt_embeds, pooled_prompt_embeds = self._encode_prompt_with_cache(
+            text_encoder,
+            tokenizer,
+            prompt,
+            encode_fn,
+            max_sequence_length=self.tokenizer_max_length,
+            clip_skip=clip_skip,
+        )
 
         _, seq_len, _ = prompt_embeds.shape
         # duplicate text embeddings for each generation per prompt, using mps friendly method
@@ -151,23 +151,30 @@ class WanPipeline(DiffusionPipeline, WanLoraLoaderMixin):
         prompt = [prompt_clean(u) for u in prompt]
         batch_size = len(prompt)
 
-        text_inputs = self.tokenizer(
-            prompt,
-            padding="max_length",
-            max_length=max_sequence_length,
-            truncation=True,
-            add_special_tokens=True,
-            return_attention_mask=True,
-            return_tensors="np",
-        )
-        text_input_ids, mask = ms.tensor(text_inputs.input_ids), ms.tensor(text_inputs.attention_mask)
-        seq_lens = mask.gt(0).sum(dim=1).long()
-
-        prompt_embeds = self.text_encoder(text_input_ids, mask)[0]
-        prompt_embeds = prompt_embeds.to(dtype=dtype)
-        prompt_embeds = [u[:v] for u, v in zip(prompt_embeds, seq_lens)]
-        prompt_embeds = mint.stack(
-            [mint.cat([u, u.new_zeros((max_sequence_length - u.shape[0], u.shape[1]))]) for u in prompt_embeds], dim=0
+        def encode_fn(prompt):
+            text_inputs = self.tokenizer(
+                prompt,
+                padding="max_length",
+                max_length=max_sequence_length,
+                truncation=True,
+                add_special_tokens=True,
+                return_attention_mask=True,
+                return_tensors="np",
+            )
+            text_input_ids, mask = ms.tensor(text_inputs.input_ids), ms.tensor(text_inputs.attention_mask)
+            seq_lens = mask.gt(0).sum(dim=1).long()
+
+            prompt_embeds = self.text_encoder(text_input_ids, mask)[0]
+            prompt_embeds = prompt_embeds.to(dtype=dtype)
+            prompt_embeds = [u[:v] for u, v in zip(prompt_embeds, seq_lens)]
+            prompt_embeds = mint.stack(
+                [mint.cat([u, u.new_zeros((max_sequence_length - u.shape[0], u.shape[1]))]) for u in prompt_embeds],
+                dim=0,
+            )
+            return (prompt_embeds,)
+
+        (prompt_embeds,) = self._encode_prompt_with_cache(
+            self.text_encoder, self.tokenizer, prompt, encode_fn, max_sequence_length=max_sequence_length, dtype=dtype
         )
 
         # duplicate text embeddings for each generation per prompt, using mps friendly method
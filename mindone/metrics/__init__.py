@@ -1 +1,12 @@
-from .video_metrics import ClipScoreFrame, ClipScoreText
+from .distribution_metrics import (
+    FeatureSample,
+    FeatureStatistics,
+    FrechetDistance,
+    FrechetInceptionDistance,
+    FrechetVideoDistance,
+    InceptionScore,
+    KernelInceptionDistance,
+    dataset_fingerprint,
+    frechet_distance,
+)
+from .video_metrics import ClipScoreFrame, ClipScoreText, CLIPVideoEncoder, load_video_frames, sample_frame_indices
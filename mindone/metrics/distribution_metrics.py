@@ -0,0 +1,462 @@
+"""
+Metrics of the distance between the distributions of the features of generated and reference samples: FID, FVD and
+KID, and the Inception Score of generated samples.
+
+The features are extracted batch by batch and accumulated into statistics of a fixed size (the mean and the
+covariance of the features, a bounded random sample of them for KID, the sums of the class probabilities for IS), so
+that the features of all the samples are never stored. The statistics of the ranks are merged when the metrics are
+computed, and the statistics of the reference samples can be saved to disk, keyed by a fingerprint of the reference
+dataset, so that they are extracted once for all the evaluations.
+
+Examples:
+    >>> fid = FrechetInceptionDistance(inception)  # e.g. the FID variant of InceptionV3
+    >>> fingerprint = dataset_fingerprint(real_files, resolution=299)
+    >>> if not fid.load_reference("stats_cache", fingerprint):
+    ...     for images in real_loader:
+    ...         fid.update(images, real=True)
+    ...     fid.save_reference("stats_cache", fingerprint)
+    >>> for images in generated_loader:
+    ...     fid.update(images)
+    >>> fid.compute()
+"""
+
+import hashlib
+import os
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import Tensor, ops
+from mindspore.communication import get_group_size, get_rank
+from mindspore.mint.distributed import all_gather_object
+
+Array = Union[Tensor, np.ndarray]
+
+
+def _world_size() -> int:
+    try:
+        return get_group_size()
+    except RuntimeError:  # the communication is not initialized
+        return 1
+
+
+def _rank() -> int:
+    return get_rank() if _world_size() > 1 else 0
+
+
+def _gather(obj) -> list:
+    """Gathers an object from all the ranks, in rank order."""
+    world_size = _world_size()
+    if world_size == 1:
+        return [obj]
+    gathered = [None] * world_size
+    all_gather_object(gathered, obj)
+    return gathered
+
+
+def _as_features(features: Array) -> Array:
+    """Flattens the features to shape (num_samples, num_features), in float32 for tensors."""
+    if isinstance(features, Tensor):
+        return features.reshape(features.shape[0], -1).astype(ms.float32)
+    return np.asarray(features, dtype=np.float64).reshape(len(features), -1)
+
+
+def dataset_fingerprint(files: Sequence[str], **params) -> str:
+    """
+    A fingerprint of a dataset, from the paths, sizes and modification times of its files, and the parameters of its
+    preprocessing and feature extraction (e.g. the resolution, the number of frames, the name of the feature extractor)
+    given as keyword arguments. It changes whenever a file is added, removed or modified, or a parameter changes.
+    """
+    sha = hashlib.sha256()
+    for path in sorted(files):
+        stat = os.stat(path)
+        sha.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    for key in sorted(params):
+        sha.update(f"{key}={params[key]!r}\n".encode())
+    return sha.hexdigest()[:16]
+
+
+class FeatureStatistics:
+    """
+    The mean and the covariance of features, accumulated batch by batch in float64 with the parallel algorithm of Chan
+    et al. The batch statistics of tensors are computed on their device.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self._m2 = None  # sum of the outer products of the deviations from the mean
+
+    def update(self, features: Array):
+        features = _as_features(features)
+        if len(features) == 0:
+            return
+        batch_mean = features.mean(axis=0)
+        deviations = features - batch_mean
+        batch_m2 = ops.matmul(deviations.T, deviations) if isinstance(features, Tensor) else deviations.T @ deviations
+        if isinstance(features, Tensor):
+            batch_mean, batch_m2 = batch_mean.asnumpy().astype(np.float64), batch_m2.asnumpy().astype(np.float64)
+        self._merge(len(features), batch_mean, batch_m2)
+
+    def _merge(self, count: int, mean: np.ndarray, m2: np.ndarray):
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self._m2 = count, mean.copy(), m2.copy()
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self._m2 = self._m2 + m2 + np.outer(delta, delta) * (self.count * count / total)
+        self.count = total
+
+    def merge(self, other: "FeatureStatistics"):
+        self._merge(other.count, other.mean, other._m2)
+
+    @property
+    def covariance(self) -> np.ndarray:
+        """The unbiased covariance of the features."""
+        if self.count < 2:
+            raise ValueError(f"The covariance needs at least 2 samples, got {self.count}.")
+        return self._m2 / (self.count - 1)
+
+    def reduce(self) -> "FeatureStatistics":
+        """Returns the statistics of the features of all the ranks."""
+        reduced = FeatureStatistics()
+        for state in _gather(self.state_dict()):
+            reduced.merge(FeatureStatistics.from_state_dict(state))
+        return reduced
+
+    def state_dict(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "m2": self._m2}
+
+    @classmethod
+    def from_state_dict(cls, state: dict) -> "FeatureStatistics":
+        statistics = cls()
+        if int(state["count"]) > 0:
+            statistics._merge(int(state["count"]), np.asarray(state["mean"]), np.asarray(state["m2"]))
+        return statistics
+
+
+class FeatureSample:
+    """
+    A uniform random sample of at most `max_samples` features, kept by reservoir sampling.
+
+    Args:
+        max_samples: The maximum number of features kept. Default: 10000.
+        seed: The seed of the sampling. Default: 0.
+    """
+
+    def __init__(self, max_samples: int = 10000, seed: int = 0):
+        self.max_samples = max_samples
+        self.count = 0
+        self.features = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, features: Array):
+        features = _as_features(features)
+        if isinstance(features, Tensor):
+            features = features.asnumpy().astype(np.float64)
+        if self.features is None:
+            self.features = np.empty((0, features.shape[1]), dtype=np.float64)
+
+        # the first features fill the reservoir
+        num_free = min(self.max_samples - len(self.features), len(features))
+        self.features = np.concatenate([self.features, features[:num_free]])
+        # the i-th feature of the stream then replaces a random one with probability `max_samples / (i + 1)`
+        positions = self._rng.integers(0, self.count + np.arange(num_free, len(features)) + 1)
+        for j in np.flatnonzero(positions < self.max_samples):
+            self.features[positions[j]] = features[num_free + j]
+        self.count += len(features)
+
+    def reduce(self) -> "FeatureSample":
+        """Returns a uniform random sample of the features of all the ranks."""
+        states = _gather(self.state_dict())
+        counts = np.array([int(state["count"]) for state in states], dtype=np.int64)
+        reduced = FeatureSample(self.max_samples)
+        if len(states) == 1:
+            reduced.count, reduced.features = self.count, self.features
+            return reduced
+
+        # the number of features taken from each rank follows the distribution of a uniform sample of all the features
+        rng = np.random.default_rng(0)
+        num_taken = rng.multivariate_hypergeometric(counts, min(self.max_samples, counts.sum()))
+        reduced.features = np.concatenate(
+            [
+                state["features"][rng.choice(len(state["features"]), n, replace=False)]
+                for state, n in zip(states, num_taken)
+                if n > 0
+            ]
+        )
+        reduced.count = int(counts.sum())
+        return reduced
+
+    def state_dict(self) -> dict:
+        return {"count": self.count, "features": self.features}
+
+    @classmethod
+    def from_state_dict(cls, state: dict, max_samples: int = 10000) -> "FeatureSample":
+        sample = cls(max_samples)
+        sample.count, sample.features = int(state["count"]), np.asarray(state["features"])
+        return sample
+
+
+def frechet_distance(mean1: np.ndarray, covariance1: np.ndarray, mean2: np.ndarray, covariance2: np.ndarray) -> float:
+    """
+    The Fréchet distance between the Gaussians N(mean1, covariance1) and N(mean2, covariance2):
+    ||mean1 - mean2||^2 + Tr(covariance1 + covariance2 - 2 sqrt(covariance1 covariance2)).
+
+    The trace of the square root is the sum of the square roots of the eigenvalues of the symmetric positive
+    semi-definite matrix sqrt(covariance1) covariance2 sqrt(covariance1).
+    """
+    if mean1.shape != mean2.shape or covariance1.shape != covariance2.shape:
+        raise ValueError("The statistics of the two distributions have different dimensions.")
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance1)
+    sqrt_covariance1 = (eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))) @ eigenvectors.T
+    product_eigenvalues = np.linalg.eigvalsh(sqrt_covariance1 @ covariance2 @ sqrt_covariance1)
+    trace_sqrt = np.sqrt(np.clip(product_eigenvalues, 0, None)).sum()
+    diff = mean1 - mean2
+    return float(diff @ diff + np.trace(covariance1) + np.trace(covariance2) - 2 * trace_sqrt)
+
+
+class _DistributionMetric:
+    """
+    A metric of the distance between the distributions of the features of the reference (`real`) and the generated
+    samples, extracted by `feature_extractor` from batches of samples.
+    """
+
+    def __init__(self, feature_extractor: Callable[[Tensor], Tensor]):
+        self.feature_extractor = feature_extractor
+        self.reset(reset_reference=True)
+
+    def _new_state(self):
+        raise NotImplementedError
+
+    def _load_state(self, state: dict):
+        raise NotImplementedError
+
+    def reset(self, reset_reference: bool = False):
+        """Resets the statistics of the generated samples, and of the reference samples if `reset_reference`."""
+        self.fake = self._new_state()
+        if reset_reference:
+            self.real = self._new_state()
+            self._real_reduced = False
+
+    def update(self, samples: Array, real: bool = False):
+        """Extracts the features of a batch of samples, reference samples if `real`, and accumulates them."""
+        features = self.feature_extractor(samples if isinstance(samples, Tensor) else Tensor(samples))
+        if real:
+            if self._real_reduced:
+                raise RuntimeError(
+                    "The reference statistics are already complete, `reset(reset_reference=True)` first."
+                )
+            self.real.update(features)
+        else:
+            self.fake.update(features)
+
+    def cache_path(self, cache_dir: str, fingerprint: str) -> str:
+        return os.path.join(cache_dir, f"{type(self).__name__}_{fingerprint}.npz")
+
+    def load_reference(self, cache_dir: str, fingerprint: str) -> bool:
+        """Loads the cached statistics of the reference dataset of the fingerprint, returns whether they exist."""
+        path = self.cache_path(cache_dir, fingerprint)
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as state:
+            self.real = self._load_state(dict(state))
+        self._real_reduced = True
+        return True
+
+    def save_reference(self, cache_dir: str, fingerprint: str):
+        """Merges the statistics of the reference samples of all the ranks, and caches them from rank 0."""
+        self.real = self._reduced_real()
+        self._real_reduced = True
+        if self.real.count == 0:
+            raise ValueError("No reference samples to save, `update(samples, real=True)` first.")
+        if _rank() == 0:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = self.cache_path(cache_dir, fingerprint)
+            # written then renamed, so that an interrupted write leaves no incomplete cache
+            np.savez(path + ".tmp.npz", **self.real.state_dict())
+            os.replace(path + ".tmp.npz", path)
+
+    def _reduced_real(self):
+        return self.real if self._real_reduced else self.real.reduce()
+
+    def compute(self) -> float:
+        """Computes the metric from the samples of all the ranks: every rank must call it."""
+        raise NotImplementedError
+
+
+class FrechetDistance(_DistributionMetric):
+    """
+    The Fréchet distance between the Gaussians fitted to the features of the reference and the generated samples.
+
+    Args:
+        feature_extractor: A callable returning the features of a batch of samples.
+    """
+
+    def _new_state(self):
+        return FeatureStatistics()
+
+    def _load_state(self, state):
+        return FeatureStatistics.from_state_dict(state)
+
+    def compute(self) -> float:
+        real, fake = self._reduced_real(), self.fake.reduce()
+        return frechet_distance(real.mean, real.covariance, fake.mean, fake.covariance)
+
+
+class FrechetInceptionDistance(FrechetDistance):
+    """
+    FID: the Fréchet distance between the Inception features of reference and generated images.
+
+    Args:
+        feature_extractor: The Inception network returning the 2048 pool features of a batch of images, e.g. the
+            `InceptionV3_FID` of `examples/stable_diffusion_v2/tools/eval/fid`.
+    """
+
+
+class FrechetVideoDistance(FrechetDistance):
+    """
+    FVD: the Fréchet distance between the I3D features of reference and generated videos.
+
+    Args:
+        feature_extractor: The I3D network returning the 400 logits of a batch of videos, e.g. the `InceptionI3d` of
+            `examples/opensora_pku/opensora/models/causalvideovae/eval/fvd/videogpt`.
+    """
+
+
+def _polynomial_mmd(features1: np.ndarray, features2: np.ndarray, degree: int, gamma: float, coef: float) -> float:
+    """The unbiased estimate of the squared MMD of two sets of features of the same size with a polynomial kernel."""
+    k_11 = (features1 @ features1.T * gamma + coef) ** degree
+    k_22 = (features2 @ features2.T * gamma + coef) ** degree
+    k_12 = (features1 @ features2.T * gamma + coef) ** degree
+    m = len(features1)
+    return float((k_11.sum() - np.trace(k_11) + k_22.sum() - np.trace(k_22)) / (m * (m - 1)) - 2 * k_12.sum() / (m * m))
+
+
+class KernelInceptionDistance(_DistributionMetric):
+    """
+    KID: the squared MMD between the Inception features of reference and generated images, with the polynomial kernel
+    (gamma * x.y + coef) ** degree, averaged over random subsets of the features.
+
+    The MMD needs the features themselves, so a uniform random sample of at most `max_samples` features of each set is
+    kept.
+
+    Args:
+        feature_extractor: The Inception network returning the features of a batch of images.
+        subsets: The number of random subsets. Default: 100.
+        subset_size: The number of features of each subset. Default: 1000.
+        degree: The degree of the polynomial kernel. Default: 3.
+        gamma: The scale of the polynomial kernel, 1 / (number of features) if None. Default: None.
+        coef: The constant of the polynomial kernel. Default: 1.
+        max_samples: The maximum number of features kept of each set. Default: 10000.
+        seed: The seed of the sampling of the features and of the subsets. Default: 0.
+    """
+
+    def __init__(
+        self,
+        feature_extractor: Callable[[Tensor], Tensor],
+        subsets: int = 100,
+        subset_size: int = 1000,
+        degree: int = 3,
+        gamma: Optional[float] = None,
+        coef: float = 1.0,
+        max_samples: int = 10000,
+        seed: int = 0,
+    ):
+        if subset_size > max_samples:
+            raise ValueError(f"`subset_size` ({subset_size}) must not exceed `max_samples` ({max_samples}).")
+        self.subsets = subsets
+        self.subset_size = subset_size
+        self.degree = degree
+        self.gamma = gamma
+        self.coef = coef
+        self.max_samples = max_samples
+        self.seed = seed
+        super().__init__(feature_extractor)
+
+    def _new_state(self):
+        return FeatureSample(self.max_samples, self.seed + _rank())
+
+    def _load_state(self, state):
+        return FeatureSample.from_state_dict(state, self.max_samples)
+
+    def compute(self) -> Tuple[float, float]:
+        """Returns the mean and the standard deviation of the MMD over the subsets."""
+        real, fake = self._reduced_real().features, self.fake.reduce().features
+        if real is None or fake is None or min(len(real), len(fake)) < self.subset_size:
+            raise ValueError(f"KID needs at least `subset_size` ({self.subset_size}) reference and generated samples.")
+        gamma = self.gamma if self.gamma is not None else 1.0 / real.shape[1]
+        rng = np.random.default_rng(self.seed)
+        mmds = [
+            _polynomial_mmd(
+                real[rng.choice(len(real), self.subset_size, replace=False)],
+                fake[rng.choice(len(fake), self.subset_size, replace=False)],
+                self.degree,
+                gamma,
+                self.coef,
+            )
+            for _ in range(self.subsets)
+        ]
+        return float(np.mean(mmds)), float(np.std(mmds))
+
+
+class InceptionScore:
+    """
+    IS: the exponential of the mean KL divergence between the class probabilities of generated images and their
+    marginal, computed over `splits` splits of the images.
+
+    The images are assigned to the splits in turn, and each split accumulates its number of images, the sum of their
+    class probabilities and the sum of their negative entropies, from which its KL divergence is computed exactly.
+
+    Args:
+        classifier: The Inception network returning the class logits of a batch of images.
+        splits: The number of splits. Default: 10.
+    """
+
+    def __init__(self, classifier: Callable[[Tensor], Tensor], splits: int = 10):
+        self.classifier = classifier
+        self.splits = splits
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros(self.splits, dtype=np.int64)
+        self.probability_sums = None
+        self.negative_entropy_sums = np.zeros(self.splits, dtype=np.float64)
+        self._num_samples = 0
+
+    def update(self, samples: Array):
+        logits = self.classifier(samples if isinstance(samples, Tensor) else Tensor(samples))
+        logits = logits.reshape(logits.shape[0], -1).astype(ms.float32)
+        log_probabilities = ops.log_softmax(logits, axis=-1)
+        probabilities = ops.exp(log_probabilities)
+        negative_entropies = (probabilities * log_probabilities).sum(axis=-1).asnumpy()
+        probabilities = probabilities.asnumpy().astype(np.float64)
+
+        split_ids = (self._num_samples + np.arange(len(probabilities))) % self.splits
+        self._num_samples += len(probabilities)
+        if self.probability_sums is None:
+            self.probability_sums = np.zeros((self.splits, probabilities.shape[1]), dtype=np.float64)
+        np.add.at(self.probability_sums, split_ids, probabilities)
+        np.add.at(self.negative_entropy_sums, split_ids, negative_entropies)
+        self.counts += np.bincount(split_ids, minlength=self.splits)
+
+    def compute(self) -> Tuple[float, float]:
+        """
+        Returns the mean and the standard deviation of the score over the splits, from the samples of all the ranks:
+        every rank must call it.
+        """
+        states = _gather((self.counts, self.probability_sums, self.negative_entropy_sums))
+        counts = sum(state[0] for state in states)
+        if (counts == 0).any():
+            raise ValueError(f"IS needs at least `splits` ({self.splits}) samples, got {counts.sum()}.")
+        probability_sums = sum(state[1] for state in states if state[1] is not None)
+        negative_entropy_sums = sum(state[2] for state in states)
+
+        marginals = probability_sums / counts[:, None]
+        marginal_negative_entropies = (marginals * np.log(np.clip(marginals, 1e-30, None))).sum(axis=-1)
+        scores = np.exp(negative_entropy_sums / counts - marginal_negative_entropies)
+        return float(scores.mean()), float(scores.std())
@@ -1,37 +1,167 @@
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+from PIL import Image
+
+import mindspore as ms
 from mindspore import Tensor, ops
 
+from ..data import VideoReader
+
 VIDEO_EXTENSIONS = {".mp4"}
 
+Frames = Union[np.ndarray, Sequence[Union[Image.Image, np.ndarray]]]
+
+
+def sample_frame_indices(total_frames: int, num_frames: Optional[int] = None) -> List[int]:
+    """
+    The indices of `num_frames` frames sampled uniformly from a video of `total_frames` frames, at the middle of equal
+    segments. All the frames are returned if `num_frames` is None, negative, or not less than `total_frames`.
+    """
+    if num_frames is None or num_frames < 0 or num_frames >= total_frames:
+        return list(range(total_frames))
+    return ((np.arange(num_frames) + 0.5) * total_frames / num_frames).astype(np.int64).tolist()
+
+
+def load_video_frames(
+    video_path: str, num_frames: Optional[int] = None, size: Optional[Tuple[int, int]] = None
+) -> np.ndarray:
+    """
+    Decodes `num_frames` frames sampled uniformly from the video in a single pass, resized to `size` (width, height)
+    while decoding if given.
+
+    Returns:
+        np.ndarray: The RGB frames of shape (num_frames, height, width, 3).
+    """
+    with VideoReader(video_path, size=size) as reader:
+        return reader.get_frames(sample_frame_indices(len(reader), num_frames))
+
+
+class CLIPVideoEncoder:
+    """
+    Encodes the frames of videos and the prompts with a CLIP model into L2-normalized features.
+
+    The frames of all the videos are preprocessed as tensors and encoded together, `batch_size` frames per forward
+    pass. The features of the prompts are cached, so that each prompt is encoded once.
+
+    Args:
+        model: A `mindone.transformers.CLIPModel`.
+        processor: The `transformers.CLIPProcessor` of the model, for its tokenizer and its image normalization.
+        batch_size: The number of frames (or prompts) per forward pass. Default: 64.
+    """
+
+    def __init__(self, model, processor, batch_size: int = 64):
+        self.model = model
+        self.processor = processor
+        self.batch_size = batch_size
+
+        image_processor = processor.image_processor
+        crop_size = image_processor.crop_size
+        self.image_size = (crop_size["height"], crop_size["width"])
+        self.mean = Tensor(np.array(image_processor.image_mean, dtype=np.float32).reshape(1, 3, 1, 1))
+        self.std = Tensor(np.array(image_processor.image_std, dtype=np.float32).reshape(1, 3, 1, 1))
+        self.dtype = getattr(model, "dtype", ms.float32)
+        self.l2_norm = ops.L2Normalize(axis=-1)
+        self._text_features: Dict[str, Tensor] = {}
+
+    def preprocess(self, frames: Frames) -> Tensor:
+        """
+        Normalizes the RGB frames of a video, resized to the input size of the model if needed.
+
+        Returns:
+            Tensor: The pixel values of shape (num_frames, 3, height, width).
+        """
+        if not isinstance(frames, np.ndarray):
+            frames = np.stack(
+                [np.asarray(frame.convert("RGB") if isinstance(frame, Image.Image) else frame) for frame in frames]
+            )
+        pixel_values = ops.transpose(Tensor(frames), (0, 3, 1, 2)).astype(ms.float32)
+        if pixel_values.shape[2:] != self.image_size:
+            pixel_values = ops.interpolate(pixel_values, size=self.image_size, mode="bicubic", align_corners=False)
+        return (pixel_values / 255.0 - self.mean) / self.std
+
+    def encode_videos(self, videos: Sequence[Frames]) -> Tuple[Tensor, np.ndarray]:
+        """
+        Returns:
+            Tuple[Tensor, np.ndarray]: The features of shape (total number of frames, dim) of the frames of all the
+            videos in order, and the number of frames of each video.
+        """
+        pixel_values = ops.cat([self.preprocess(frames) for frames in videos])
+        features = ops.cat(
+            [
+                self.model.get_image_features(pixel_values[start : start + self.batch_size].astype(self.dtype))
+                for start in range(0, len(pixel_values), self.batch_size)
+            ]
+        )
+        num_frames = np.array([len(frames) for frames in videos], dtype=np.int64)
+        return self.l2_norm(features.astype(ms.float32)), num_frames
+
+    def encode_texts(self, prompts: Sequence[str]) -> Tensor:
+        """Returns the features of shape (len(prompts), dim) of the prompts."""
+        missing = list(dict.fromkeys(prompt for prompt in prompts if prompt not in self._text_features))
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start : start + self.batch_size]
+            inputs = self.processor(text=chunk, padding=True, truncation=True, return_tensors="np")
+            features = self.model.get_text_features(
+                input_ids=Tensor(inputs["input_ids"]), attention_mask=Tensor(inputs["attention_mask"])
+            )
+            features = self.l2_norm(features.astype(ms.float32))
+            self._text_features.update({prompt: features[i] for i, prompt in enumerate(chunk)})
+        return ops.stack([self._text_features[prompt] for prompt in prompts])
+
+
+def _sum_per_video(features: Tensor, num_frames: np.ndarray) -> Tensor:
+    """Sums the features of the frames of each video."""
+    segment_ids = Tensor(np.repeat(np.arange(len(num_frames), dtype=np.int32), num_frames))
+    return ops.unsorted_segment_sum(features, segment_ids, len(num_frames))
+
 
 class ClipScoreText:
-    def __init__(self, model, processor):
+    """
+    The CLIP score of the frames of videos with their prompts: the mean over the frames of the cosine similarity of
+    their CLIP features with the ones of the prompt, scaled by the logit scale of the model.
+    """
+
+    def __init__(self, model, processor, batch_size: int = 64):
         super().__init__()
         self.model = model
         self.processor = processor
+        self.encoder = CLIPVideoEncoder(model, processor, batch_size)
 
-    def score(self, frames, prompt):
-        inputs = self.processor(text=[prompt], images=frames)
-        inputs = {k: Tensor(v) for k, v in inputs.items()}
-        outputs = self.model(**inputs)
-        score = outputs[0].asnumpy().mean()
+    def score(self, frames: Frames, prompt: str) -> float:
+        return self.score_videos([frames], [prompt])[0]
 
-        return score
+    def score_videos(self, videos: Sequence[Frames], prompts: Sequence[str]) -> List[float]:
+        image_features, num_frames = self.encoder.encode_videos(videos)
+        text_features = self.encoder.encode_texts(prompts)
+        # the sum over the frames of the similarities with the prompt is the similarity of the sum of the frames
+        similarities = (_sum_per_video(image_features, num_frames) * text_features).sum(axis=-1)
+        scores = (similarities * self.model.logit_scale.exp().astype(ms.float32)).asnumpy()
+        return (scores / num_frames).tolist()
 
 
 class ClipScoreFrame:
-    def __init__(self, model, processor):
+    """
+    The frame consistency of videos: the mean of the cosine similarities of the CLIP features of all the pairs of
+    different frames, NaN for the videos of a single frame.
+    """
+
+    def __init__(self, model, processor, batch_size: int = 64):
         super().__init__()
         self.model = model
         self.processor = processor
-        self.fill_diagonal = ops.FillDiagonal(0.0)
-
-    def score(self, frames):
-        inputs = self.processor(images=frames)
-        inputs = {k: Tensor(v) for k, v in inputs.items()}
-        image_features = self.model.get_image_features(**inputs).asnumpy()
-        cosine_sim_matrix = cosine_similarity(image_features)
-        cosine_sim_matrix = self.fill_diagonal(Tensor(cosine_sim_matrix))  # set diagonal elements to 0
-        score = cosine_sim_matrix.sum() / (len(frames) * (len(frames) - 1))
-        return score
+        self.encoder = CLIPVideoEncoder(model, processor, batch_size)
+
+    def score(self, frames: Frames) -> float:
+        return self.score_videos([frames])[0]
+
+    def score_videos(self, videos: Sequence[Frames]) -> List[float]:
+        image_features, num_frames = self.encoder.encode_videos(videos)
+        # the sum of the similarity matrix of the normalized features of a video is the squared norm of their sum, and
+        # its diagonal sums to the number of frames
+        sums = _sum_per_video(image_features, num_frames)
+        matrix_sums = (sums * sums).sum(axis=-1).asnumpy()
+        num_pairs = num_frames * (num_frames - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(num_pairs > 0, (matrix_sums - num_frames) / num_pairs, np.nan)
+        return scores.tolist()
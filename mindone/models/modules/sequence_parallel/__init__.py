@@ -0,0 +1,18 @@
+from .attention import ring_attention, sequence_parallel_attention
+from .group import (
+    SequenceParallelGroup,
+    SimulatedSequenceParallelGroup,
+    create_sequence_parallel_group,
+    get_sequence_parallel_group,
+    set_sequence_parallel_group,
+)
+
+__all__ = [
+    "SequenceParallelGroup",
+    "SimulatedSequenceParallelGroup",
+    "create_sequence_parallel_group",
+    "get_sequence_parallel_group",
+    "ring_attention",
+    "sequence_parallel_attention",
+    "set_sequence_parallel_group",
+]
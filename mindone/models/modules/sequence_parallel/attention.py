@@ -0,0 +1,143 @@
+from typing import Callable, Optional
+
+import mindspore as ms
+from mindspore import Tensor, mint, nn
+
+__all__ = ["ring_attention", "sequence_parallel_attention"]
+
+
+def _attention(query: Tensor, key: Tensor, value: Tensor, attn_mask: Optional[Tensor] = None, scale=None) -> Tensor:
+    scale = scale if scale is not None else query.shape[-1] ** -0.5
+    scores = mint.matmul(query, key.swapaxes(-1, -2)) * scale
+    if attn_mask is not None:
+        if attn_mask.dtype == ms.bool_:
+            scores = scores.masked_fill(mint.logical_not(attn_mask), float("-inf"))
+        else:
+            scores = scores + attn_mask
+    return mint.matmul(mint.softmax(scores.float(), dim=-1).to(value.dtype), value)
+
+
+def _block_attention(query: Tensor, key: Tensor, value: Tensor, scale: float):
+    scores = mint.matmul(query, key.swapaxes(-1, -2)) * scale
+    max_scores = mint.max(scores, dim=-1, keepdim=True)[0]
+    probs = mint.exp(scores - max_scores)
+    sum_probs = probs.sum(-1, keepdims=True)
+    return mint.matmul(probs / sum_probs, value), max_scores + mint.log(sum_probs)
+
+
+class _RingAttention(nn.Cell):
+    """
+    Attention of the local queries on the key and value shards of the processes of the ring, passed around the ring.
+    The outputs of the shards are merged with their log-sum-exp, which is returned for the backward pass.
+    """
+
+    def __init__(self, group, scale: float) -> None:
+        super().__init__()
+        self.group = group
+        self.scale = scale
+
+    def construct(self, query: Tensor, key: Tensor, value: Tensor):
+        query, key, value = query.float(), key.float(), value.float()
+        output, lse = _block_attention(query, key, value, self.scale)
+        for _ in range(self.group.ring_size - 1):
+            key, value = self.group.ring_shift(key, value)
+            block_output, block_lse = _block_attention(query, key, value, self.scale)
+            new_lse = mint.maximum(lse, block_lse)
+            new_lse = new_lse + mint.log(mint.exp(lse - new_lse) + mint.exp(block_lse - new_lse))
+            output = output * mint.exp(lse - new_lse) + block_output * mint.exp(block_lse - new_lse)
+            lse = new_lse
+        return output, lse
+
+    def bprop(self, query: Tensor, key: Tensor, value: Tensor, out, dout):
+        dtypes = query.dtype, key.dtype, value.dtype
+        output, lse = out
+        grad_output = dout[0].float()
+        query, key, value = query.float(), key.float(), value.float()
+        delta = (grad_output * output).sum(-1, keepdims=True)
+
+        grad_query = mint.zeros(query.shape, dtype=ms.float32)
+        grad_key, grad_value = mint.zeros(key.shape, dtype=ms.float32), mint.zeros(value.shape, dtype=ms.float32)
+        # the gradients of the key and value shards go around the ring with them, back to their process
+        for _ in range(self.group.ring_size):
+            probs = mint.exp(mint.matmul(query, key.swapaxes(-1, -2)) * self.scale - lse)
+            grad_value = grad_value + mint.matmul(probs.swapaxes(-1, -2), grad_output)
+            grad_scores = probs * (mint.matmul(grad_output, value.swapaxes(-1, -2)) - delta) * self.scale
+            grad_query = grad_query + mint.matmul(grad_scores, key)
+            grad_key = grad_key + mint.matmul(grad_scores.swapaxes(-1, -2), query)
+            key, value, grad_key, grad_value = self.group.ring_shift(key, value, grad_key, grad_value)
+        return tuple(grad.to(dtype) for grad, dtype in zip((grad_query, grad_key, grad_value), dtypes))
+
+
+def ring_attention(query: Tensor, key: Tensor, value: Tensor, group, scale: Optional[float] = None) -> Tensor:
+    """
+    Attention of the queries of the local sequence shard on the whole sequence, whose key and value shards are passed
+    around the ring of `group`, so that no process holds the keys and values of the whole sequence.
+
+    Args:
+        query: The queries of shape (batch_size, num_heads, seq_len / ring_size, head_dim).
+        key: The keys of the same shape.
+        value: The values of the same shape.
+        group: The `SequenceParallelGroup` (or `SimulatedSequenceParallelGroup`) whose ring shares the sequence.
+        scale: The scale of the attention scores. Default is `head_dim ** -0.5`.
+
+    Returns:
+        Tensor: The attention outputs of the local shard, of the shape and dtype of `query`.
+    """
+    scale = scale if scale is not None else query.shape[-1] ** -0.5
+    output, _ = _RingAttention(group, scale)(query, key, value)
+    return output.to(query.dtype)
+
+
+def sequence_parallel_attention(
+    query: Tensor,
+    key: Tensor,
+    value: Tensor,
+    group,
+    attn_mask: Optional[Tensor] = None,
+    scale: Optional[float] = None,
+    attn_fn: Optional[Callable[..., Tensor]] = None,
+) -> Tensor:
+    """
+    Attention of the queries of the local sequence shard on the whole sequence, sharded across the processes of
+    `group`: the Ulysses groups exchange the sequence shards of their heads with all-to-all communications, and the
+    rings compute the ring attention of those heads on their longer shards.
+
+    The key and value shards are concatenated in order of the ranks of the processes, the attention is thus computed
+    on the whole sequence only if it is sharded in that order, and the outputs are the ones of the local shard.
+
+    Args:
+        query: The queries of shape (batch_size, num_heads, seq_len / group.size, head_dim), the number of heads must
+            be divisible by `group.ulysses_size`.
+        key: The keys of the same shape.
+        value: The values of the same shape.
+        group: The `SequenceParallelGroup` (or `SimulatedSequenceParallelGroup`) the sequence is sharded across.
+        attn_mask: Optional mask of the attention on the whole sequence, broadcastable to (batch_size, 1, seq_len,
+            seq_len), which is not supported by ring attention. Default is None.
+        scale: The scale of the attention scores. Default is `head_dim ** -0.5`.
+        attn_fn: The attention of a process on the whole sequence, called as `attn_fn(query, key, value, attn_mask)`
+            when the group uses no ring attention, e.g. a flash attention. Default is the attention computed in
+            float32.
+
+    Returns:
+        Tensor: The attention outputs of the local shard, of the shape of `query`.
+    """
+    if group.ulysses_size > 1:
+        if query.shape[1] % group.ulysses_size or key.shape[1] % group.ulysses_size:
+            raise ValueError(
+                f"The number of heads ({query.shape[1]} and {key.shape[1]}) must be divisible by the Ulysses size "
+                f"{group.ulysses_size}."
+            )
+        query, key, value = (group.all_to_all(x, scatter_dim=1, gather_dim=2) for x in (query, key, value))
+
+    if group.ring_size > 1:
+        if attn_mask is not None:
+            raise NotImplementedError("Attention masks are not supported by ring attention.")
+        output = ring_attention(query, key, value, group, scale=scale)
+    elif attn_fn is not None:
+        output = attn_fn(query, key, value, attn_mask)
+    else:
+        output = _attention(query, key, value, attn_mask, scale=scale)
+
+    if group.ulysses_size > 1:
+        output = group.all_to_all(output, scatter_dim=2, gather_dim=1)
+    return output
@@ -0,0 +1,247 @@
+from typing import List, Optional
+
+from mindspore import Tensor, mint, nn
+from mindspore.communication import create_group, get_group_size, get_rank
+from mindspore.mint.distributed import P2POp, all_gather, all_to_all, batch_isend_irecv
+
+__all__ = [
+    "SequenceParallelGroup",
+    "SimulatedSequenceParallelGroup",
+    "create_sequence_parallel_group",
+    "get_sequence_parallel_group",
+    "set_sequence_parallel_group",
+]
+
+_SEQUENCE_PARALLEL_GROUP = None
+
+
+def _all_to_all(x: Tensor, scatter_dim: int, gather_dim: int, group: str, world_size: int) -> Tensor:
+    input_list = [t.contiguous() for t in mint.chunk(x, world_size, dim=scatter_dim)]
+    output_list = [mint.empty_like(input_list[0]) for _ in range(world_size)]
+    all_to_all(output_list, input_list, group=group)
+    return mint.cat(output_list, dim=gather_dim)
+
+
+def _all_gather(x: Tensor, dim: int, group: str, world_size: int) -> Tensor:
+    output_list = [mint.empty_like(x) for _ in range(world_size)]
+    all_gather(output_list, x.contiguous(), group=group)
+    return mint.cat(output_list, dim=dim)
+
+
+class _AllToAll(nn.Cell):
+    def __init__(self, scatter_dim: int, gather_dim: int, group: str, world_size: int) -> None:
+        super().__init__()
+        self.scatter_dim = scatter_dim
+        self.gather_dim = gather_dim
+        self.group = group
+        self.world_size = world_size
+
+    def construct(self, x: Tensor) -> Tensor:
+        return _all_to_all(x, self.scatter_dim, self.gather_dim, self.group, self.world_size)
+
+    def bprop(self, x: Tensor, out: Tensor, dout: Tensor):
+        return (_all_to_all(dout, self.gather_dim, self.scatter_dim, self.group, self.world_size),)
+
+
+class _SplitForwardGatherBackward(nn.Cell):
+    def __init__(self, dim: int, group: str, rank: int, world_size: int) -> None:
+        super().__init__()
+        self.dim = dim
+        self.group = group
+        self.rank = rank
+        self.world_size = world_size
+
+    def construct(self, x: Tensor) -> Tensor:
+        return mint.chunk(x, self.world_size, dim=self.dim)[self.rank]
+
+    def bprop(self, x: Tensor, out: Tensor, dout: Tensor):
+        # the input is replicated on the ranks, its gradient is the sum of the gradients of their shards
+        return (_all_gather(dout, self.dim, self.group, self.world_size),)
+
+
+class _GatherForwardSplitBackward(nn.Cell):
+    def __init__(self, dim: int, group: str, rank: int, world_size: int) -> None:
+        super().__init__()
+        self.dim = dim
+        self.group = group
+        self.rank = rank
+        self.world_size = world_size
+
+    def construct(self, x: Tensor) -> Tensor:
+        return _all_gather(x, self.dim, self.group, self.world_size)
+
+    def bprop(self, x: Tensor, out: Tensor, dout: Tensor):
+        return (mint.chunk(dout, self.world_size, dim=self.dim)[self.rank],)
+
+
+class SequenceParallelGroup:
+    """
+    The processes a sequence is sharded across, in order of their global ranks.
+
+    The `size = ulysses_size * ring_size` processes are arranged in `ring_size` Ulysses groups of `ulysses_size`
+    consecutive ranks, which reshard the attention inputs from sequence shards to head shards with all-to-all
+    communications, and the processes of the same rank in each Ulysses group form a ring, which pass the key and value
+    shards to each other for ring attention. The Ulysses groups are best placed within a node.
+
+    Use `create_sequence_parallel_group` to create the groups of the current process.
+
+    Args:
+        rank: The rank of the current process in the sequence parallel group.
+        ranks: The global ranks of the processes of the sequence parallel group.
+        group: The name of the communication group of all the processes.
+        ulysses_size: The number of processes of the Ulysses groups.
+        ulysses_group: The name of the communication group of the Ulysses group of the current process.
+        ring_group: The name of the communication group of the ring of the current process.
+    """
+
+    def __init__(
+        self,
+        rank: int,
+        ranks: List[int],
+        group: str,
+        ulysses_size: int,
+        ulysses_group: Optional[str] = None,
+        ring_group: Optional[str] = None,
+    ) -> None:
+        self.rank = rank
+        self.ranks = ranks
+        self.group = group
+        self.size = len(ranks)
+        self.ulysses_size = ulysses_size
+        self.ring_size = self.size // ulysses_size
+        self.ulysses_group = ulysses_group
+        self.ring_group = ring_group
+
+        self.ring_rank, self.ulysses_rank = divmod(rank, ulysses_size)
+        ring_ranks = ranks[self.ulysses_rank :: ulysses_size]
+        self._next_ring_rank = ring_ranks[(self.ring_rank + 1) % self.ring_size]
+        self._prev_ring_rank = ring_ranks[(self.ring_rank - 1) % self.ring_size]
+
+    def split(self, x: Tensor, dim: int) -> Tensor:
+        """Returns the shard along `dim` of the current process of `x`, which is replicated on the processes."""
+        return _SplitForwardGatherBackward(dim, self.group, self.rank, self.size)(x)
+
+    def gather(self, x: Tensor, dim: int) -> Tensor:
+        """Concatenates the shards along `dim` of the processes."""
+        return _GatherForwardSplitBackward(dim, self.group, self.rank, self.size)(x)
+
+    def all_to_all(self, x: Tensor, scatter_dim: int, gather_dim: int) -> Tensor:
+        """
+        Splits `x` along `scatter_dim` between the processes of the Ulysses group and concatenates the parts they send
+        along `gather_dim`.
+        """
+        return _AllToAll(scatter_dim, gather_dim, self.ulysses_group, self.ulysses_size)(x)
+
+    def ring_shift(self, *tensors: Tensor) -> List[Tensor]:
+        """Sends `tensors` to the next process of the ring and returns the ones of the previous process."""
+        outputs = [mint.empty_like(x) for x in tensors]
+        p2p_ops = []
+        for x, output in zip(tensors, outputs):
+            p2p_ops.append(P2POp("isend", x.contiguous(), self._next_ring_rank, group=self.ring_group))
+            p2p_ops.append(P2POp("irecv", output, self._prev_ring_rank, group=self.ring_group))
+        for work in batch_isend_irecv(p2p_ops):
+            work.wait()
+        return outputs
+
+
+class SimulatedSequenceParallelGroup:
+    """
+    Simulates the processes of a `SequenceParallelGroup` in the current process, to test sequence parallelism on CPU.
+
+    The tensors of the processes are concatenated along the first (batch) axis in order of their ranks, and the
+    communications are computed on them. `split` thus turns a replicated tensor of batch size `b` into the shards of
+    batch size `size * b`, and `gather` turns them back. The tensors broadcast over the batch axis, as position
+    embeddings, must be split from a batch size of 1 and used with a batch size of 1.
+
+    Args:
+        ulysses_size: The number of processes of the Ulysses groups. Default is 1.
+        ring_size: The number of processes of the rings. Default is 1.
+    """
+
+    def __init__(self, ulysses_size: int = 1, ring_size: int = 1) -> None:
+        self.ulysses_size = ulysses_size
+        self.ring_size = ring_size
+        self.size = ulysses_size * ring_size
+
+    def split(self, x: Tensor, dim: int) -> Tensor:
+        return mint.cat(mint.chunk(x, self.size, dim=dim), dim=0)
+
+    def gather(self, x: Tensor, dim: int) -> Tensor:
+        return mint.cat(mint.chunk(x, self.size, dim=0), dim=dim)
+
+    def all_to_all(self, x: Tensor, scatter_dim: int, gather_dim: int) -> Tensor:
+        inputs = [mint.chunk(t, self.ulysses_size, dim=scatter_dim) for t in mint.chunk(x, self.size, dim=0)]
+        outputs = []
+        for start in range(0, self.size, self.ulysses_size):
+            ulysses_inputs = inputs[start : start + self.ulysses_size]
+            for rank in range(self.ulysses_size):
+                outputs.append(mint.cat([parts[rank] for parts in ulysses_inputs], dim=gather_dim))
+        return mint.cat(outputs, dim=0)
+
+    def ring_shift(self, *tensors: Tensor) -> List[Tensor]:
+        # the Ulysses groups are consecutive: the ring of a rank is every `ulysses_size`-th rank
+        outputs = []
+        for x in tensors:
+            shift = self.ulysses_size * x.shape[0] // self.size
+            outputs.append(mint.cat([x[-shift:], x[:-shift]], dim=0))
+        return outputs
+
+
+def create_sequence_parallel_group(sequence_parallel_size: int, ulysses_size: Optional[int] = None):
+    """
+    Creates the sequence parallel group of the current process: the processes are split into consecutive groups of
+    `sequence_parallel_size` ranks, of `ulysses_size` consecutive ranks for the Ulysses attention and the rest of the
+    size for the ring attention. The group is also set as the default one.
+
+    Args:
+        sequence_parallel_size: The number of processes a sequence is sharded across.
+        ulysses_size: The number of processes of the Ulysses groups, which must divide `sequence_parallel_size`.
+            Default is `sequence_parallel_size`, Ulysses attention only. 1 is ring attention only.
+
+    Returns:
+        SequenceParallelGroup: The sequence parallel group of the current process.
+    """
+    if sequence_parallel_size <= 1:
+        raise ValueError(
+            f"`sequence_parallel_size` must be larger than 1 to enable sequence parallel, but got {sequence_parallel_size}."
+        )
+    ulysses_size = ulysses_size or sequence_parallel_size
+    if sequence_parallel_size % ulysses_size != 0:
+        raise ValueError(
+            f"`sequence_parallel_size` {sequence_parallel_size} must be divisible by `ulysses_size` {ulysses_size}."
+        )
+    device_num = get_group_size()
+    if device_num % sequence_parallel_size != 0:
+        raise ValueError(
+            f"Total number of devices {device_num} must be divisible by `sequence_parallel_size` {sequence_parallel_size}."
+        )
+
+    global_rank = get_rank()
+    group_id, rank = divmod(global_rank, sequence_parallel_size)
+    ranks = list(range(group_id * sequence_parallel_size, (group_id + 1) * sequence_parallel_size))
+    group = f"sp_group_{group_id}"
+    create_group(group, ranks)
+
+    ring_rank, ulysses_rank = divmod(rank, ulysses_size)
+    ulysses_group = ring_group = None
+    if ulysses_size > 1:
+        ulysses_group = group if ulysses_size == sequence_parallel_size else f"{group}_ulysses_{ring_rank}"
+        if ulysses_group != group:
+            create_group(ulysses_group, ranks[ring_rank * ulysses_size : (ring_rank + 1) * ulysses_size])
+    if ulysses_size < sequence_parallel_size:
+        ring_group = group if ulysses_size == 1 else f"{group}_ring_{ulysses_rank}"
+        if ring_group != group:
+            create_group(ring_group, ranks[ulysses_rank::ulysses_size])
+
+    sequence_parallel_group = SequenceParallelGroup(rank, ranks, group, ulysses_size, ulysses_group, ring_group)
+    set_sequence_parallel_group(sequence_parallel_group)
+    return sequence_parallel_group
+
+
+def set_sequence_parallel_group(group) -> None:
+    global _SEQUENCE_PARALLEL_GROUP
+    _SEQUENCE_PARALLEL_GROUP = group
+
+
+def get_sequence_parallel_group():
+    return _SEQUENCE_PARALLEL_GROUP
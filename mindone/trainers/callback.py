@@ -9,6 +9,7 @@ from mindspore.communication import get_rank
 from mindspore.communication.management import GlobalComm
 from mindspore.train.callback._callback import Callback, _handle_loss
 
+from ..data.sampler import ResumableDistributedSampler
 from .checkpoint import CheckpointManager
 from .ema import EMA
 from .recorder import PerfRecorder
@@ -70,6 +71,7 @@ class EvalSaveCallback(Callback):
         zero_stage: int = 0,
         optimizer_parallel_group: str = None,
         ckpt_combine_online: bool = False,
+        sampler: Optional[ResumableDistributedSampler] = None,
     ):
         """
         Args:
@@ -84,6 +86,8 @@ class EvalSaveCallback(Callback):
                 using allgather ops to combile the checkpoint online if `ckpt_combine_online=True`, \
                 saving all device parameters if `ckpt_combine_online=False`, \
                 and need to use `convert_checkpoints` to combile the checkpoint offline. default is False.
+            sampler (`ResumableDistributedSampler`, *optional*): the sampler of the train dataloader, its state is \
+                saved in the resume checkpoint so that `resume_train_network` restores the position in the dataset.
         """
         self.rank_id = rank_id
         self.is_main_device = rank_id in [0, None]
@@ -162,6 +166,7 @@ class EvalSaveCallback(Callback):
         self.use_step_unit = use_step_unit
         self.train_steps = train_steps
         self.save_training_resume = save_training_resume
+        self.sampler = sampler
         self.choice_func = None
         if resume_prefix_blacklist:
             if isinstance(resume_prefix_blacklist, str):
@@ -208,6 +213,7 @@ class EvalSaveCallback(Callback):
                         "epoch_num": cur_epoch,
                         "cur_step": cur_step,
                         "loss_scale": self._get_scaling_value_from_cbp(cb_params),
+                        **self._get_sampler_state(cb_params),
                     },
                 )
                 if self.ema is not None:
@@ -319,6 +325,7 @@ class EvalSaveCallback(Callback):
                     append_dict={
                         "epoch_num": cur_epoch,
                         "loss_scale": self._get_scaling_value_from_cbp(cb_params),
+                        **self._get_sampler_state(cb_params),
                     },
                 )
                 if self.ema is not None:
@@ -382,6 +389,19 @@ class EvalSaveCallback(Callback):
                 metrics = {k: f"{v: .4f}" for k, v in metrics.items()}
                 _logger.info(f"Eval result epoch {cb_params.cur_epoch_num}: {metrics}")
 
+    def _get_sampler_state(self, cb_params):
+        if self.sampler is None:
+            return {}
+        # every epoch of the dataset reads `len(sampler)` samples from where the sampler was restored, `cur_step_num`
+        # counting the steps of this run
+        dataset = cb_params.train_dataset
+        epoch, step = divmod(cb_params.cur_step_num, dataset.get_dataset_size())
+        state = self.sampler.state_dict(
+            self.sampler.start_epoch,
+            epoch * len(self.sampler) + self.sampler.start_offset + step * dataset.get_batch_size(),
+        )
+        return {f"sampler_{key}": value for key, value in state.items()}
+
     def _get_optimizer_from_cbp(self, cb_params):
         if cb_params.optimizer is not None:
             optimizer = cb_params.optimizer
@@ -122,12 +122,24 @@ class CheckpointManager:
             )
 
 
-def resume_train_network(network, optimizer, resume_ckpt):
+def resume_train_network(network, optimizer, resume_ckpt, sampler=None):
+    """
+    Loads the network and optimizer parameters of the resume checkpoint, and the state of `sampler`, a
+    `ResumableDistributedSampler`, if it is given and saved in the checkpoint.
+    """
     resume_param = ms.load_checkpoint(resume_ckpt)
     start_epoch = int(resume_param.get("epoch_num", ms.Tensor(0, ms.int32)).asnumpy().item())
     loss_scale = float(resume_param.get("loss_scale", ms.Tensor(0, ms.float32)).asnumpy().item())
     cur_iter = resume_param.get("current_iterator_step", ms.Tensor(0, ms.int32))
     last_overflow_iter = resume_param.get("last_overflow_iterator_step", ms.Tensor(0, ms.int32))
+    if sampler is not None:
+        if "sampler_epoch" in resume_param:
+            sampler.load_state_dict(
+                {key: int(resume_param.pop(f"sampler_{key}").asnumpy().item()) for key in ("seed", "epoch", "offset")}
+            )
+            _logger.info(f"Resume the sampler from epoch {sampler.epoch}, sample {sampler.offset}.")
+        else:
+            _logger.warning(f"No sampler state in {resume_ckpt}, the sampler starts from the beginning of the dataset.")
     # TODO: fix here, ignore optimizer params for network loading
     ms.load_param_into_net(network, resume_param)
     ms.load_param_into_net(optimizer, resume_param)
@@ -269,6 +269,9 @@ class StaticCache(Cache):
 
         self.key_cache = ms.ParameterTuple(key_cache)
         self.value_cache = ms.ParameterTuple(value_cache)
+        # Number of tokens seen by each layer. The states past it are stale and are never read: they are hidden by the
+        # `cache_position` of the next forward pass and by the attention mask, and overwritten by the next updates.
+        self._seq_lengths = [ms.tensor(0, dtype=ms.int32) for _ in range(config.num_hidden_layers)]
 
     def update(
         self,
@@ -301,29 +304,49 @@ class StaticCache(Cache):
         if cache_position is None:
             k_out.copy_(key_states)
             v_out.copy_(value_states)
+            self._seq_lengths[layer_idx] = ms.tensor(key_states.shape[-2], dtype=ms.int32)
         else:
             k_out[:, :, cache_position] = key_states
             v_out[:, :, cache_position] = value_states
+            # the positions of static-shape inputs are padded with zeros, hence the maximum
+            self._seq_lengths[layer_idx] = ops.maximum(
+                self._seq_lengths[layer_idx], cache_position.max().astype(ms.int32) + 1
+            )
 
         return k_out, v_out
 
     def get_seq_length(self, layer_idx: Optional[int] = 0) -> int:
         """Returns the sequence length of the cached states that were seen by the model."""
-        # Occupied cache == any slot in the 3rd dim (sequence length) holds a non-zero value. To save on compute, let's
-        # limit the check to the first batch member and head dimension.
         # TODO: deprecate this function in favor of `cache_position`
-        return (self.key_cache[layer_idx][0, 0].any(axis=-1)).sum()
+        return self._seq_lengths[layer_idx]
 
     def get_max_length(self) -> Optional[int]:
         """Returns the maximum sequence length of the cached states."""
         return self.max_cache_len
 
+    def get_max_cache_shape(self) -> Optional[int]:
+        return self.max_cache_len
+
+    def crop(self, max_length: int):
+        """Crop the past key values up to a new `max_length` in terms of tokens. `max_length` can also be
+        negative to remove `max_length` tokens. This is used in assisted decoding.
+
+        Only the sequence length of each layer is rolled back: the states past `max_length` are left in place, and are
+        overwritten by the next updates."""
+        # In case it is negative
+        if max_length < 0:
+            max_length = int(self.get_seq_length()) - abs(max_length)
+
+        for layer_idx in range(len(self._seq_lengths)):
+            self._seq_lengths[layer_idx] = ops.minimum(self._seq_lengths[layer_idx], max_length)
+
     def reset(self):
         """Resets the cache values while preserving the objects"""
         for layer_idx in range(len(self.key_cache)):
             # In-place ops prevent breaking the static address
-            ops.assign(self.key_cache[layer_idx], ms.Tensor(0.0))
-            ops.assign(self.value_cache[layer_idx], ms.Tensor(0.0))
+            ops.assign(self.key_cache[layer_idx], ops.zeros_like(self.key_cache[layer_idx]))
+            ops.assign(self.value_cache[layer_idx], ops.zeros_like(self.value_cache[layer_idx]))
+            self._seq_lengths[layer_idx] = ms.tensor(0, dtype=ms.int32)
 
 
 class CacheConfig:
@@ -725,9 +748,18 @@ class SlidingWindowCache(StaticCache):
 
         return k_out, v_out
 
+    def get_seq_length(self, layer_idx: Optional[int] = 0) -> int:
+        """Returns the sequence length of the cached states that were seen by the model."""
+        # Occupied cache == any slot in the 3rd dim (sequence length) holds a non-zero value. To save on compute, let's
+        # limit the check to the first batch member and head dimension.
+        return (self.key_cache[layer_idx][0, 0] != 0).any(axis=-1).sum()
+
     def get_max_cache_shape(self) -> Optional[int]:
         return self.max_cache_len
 
+    def crop(self, max_length: int):
+        raise NotImplementedError("`SlidingWindowCache` overwrites the oldest states and cannot be rolled back.")
+
     def reset(self):
         for layer_idx in range(len(self.key_cache)):
             # In-place ops prevent breaking the static address
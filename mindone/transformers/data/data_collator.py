@@ -15,6 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 from collections.abc import Mapping
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, NewType, Optional, Union
@@ -181,3 +182,133 @@ class DataCollatorWithPadding:
             batch["labels"] = batch["label_ids"]
             del batch["label_ids"]
         return batch
+
+
+def pack_sequences(lengths: List[int], max_length: int) -> List[List[int]]:
+    """
+    Groups sequences into bins of at most `max_length` tokens with the best-fit decreasing heuristic: the sequences are
+    taken from the longest to the shortest, and each one is put in the fullest bin it fits in. Sequences longer than
+    `max_length` get a bin of their own, and are truncated by [`DataCollatorForPacking`].
+
+    Args:
+        lengths (`List[int]`):
+            The number of tokens of each sequence.
+        max_length (`int`):
+            The number of tokens of a bin.
+
+    Returns:
+        `List[List[int]]`: the indices of the sequences of each bin.
+    """
+    bins = []
+    # the remaining capacities of the open bins, sorted, and the matching bin indices
+    capacities, bin_indices = [], []
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True):
+        length = min(lengths[index], max_length)
+        position = bisect.bisect_left(capacities, length)
+        if position == len(capacities):
+            bins.append([index])
+            bin_index, capacity = len(bins) - 1, max_length - length
+        else:
+            bin_index, capacity = bin_indices.pop(position), capacities.pop(position) - length
+            bins[bin_index].append(index)
+        if capacity > 0:
+            position = bisect.bisect_left(capacities, capacity)
+            capacities.insert(position, capacity)
+            bin_indices.insert(position, bin_index)
+    return bins
+
+
+class PackedDataset:
+    """
+    Map-style dataset whose items group the examples of `dataset` fitting together in rows of `max_length` tokens, as
+    planned by [`pack_sequences`]. An item is a dictionary with the keys of the examples, mapping to the list of the
+    values of the examples of its row. The rows are built by [`DataCollatorForPacking`].
+
+    Args:
+        dataset:
+            A map-style dataset of dictionaries with an `"input_ids"` key.
+        max_length (`int`):
+            The number of tokens of a row.
+        lengths (`List[int]`, *optional*):
+            The number of tokens of each example, which are read from the dataset if not given.
+    """
+
+    def __init__(self, dataset, max_length: int, lengths: Optional[List[int]] = None):
+        self.dataset = dataset
+        if lengths is None:
+            lengths = [len(dataset[i]["input_ids"]) for i in range(len(dataset))]
+        self.bins = pack_sequences(lengths, max_length)
+
+    def __getitem__(self, index):
+        examples = [self.dataset[int(i)] for i in self.bins[int(index)]]
+        return {key: [example[key] for example in examples] for key in examples[0]}
+
+    def __len__(self):
+        return len(self.bins)
+
+
+@dataclass
+class DataCollatorForPacking:
+    """
+    Data collator concatenating the examples of each feature into a row of exactly `max_length` tokens, so that all
+    the batches have the same static shape. A feature is a single example, or a group of examples as returned by
+    [`PackedDataset`], whose values are lists with one value per example.
+
+    The `position_ids` restart from 0 at the start of each example, which marks the boundaries of the examples: the
+    models supporting packed rows (Llama, Qwen2, Qwen3) restrict their attention to block-diagonal masks when they
+    receive `position_ids` without `attention_mask`, so no `attention_mask` is returned. The first label of each
+    example is ignored, so that no token is trained to predict the next example. The end of the rows is filled with
+    padding tokens, forming a last sequence whose labels are ignored.
+
+    Args:
+        max_length (`int`):
+            The number of tokens of a row. Longer examples are truncated.
+        pad_token_id (`int`, *optional*, defaults to 0):
+            The token id of the padding tokens.
+        label_pad_token_id (`int`, *optional*, defaults to -100):
+            The id to use for the ignored labels, which are ignored by the loss functions.
+        return_segment_ids (`bool`, *optional*, defaults to `False`):
+            Whether to also return the `segment_ids` of the tokens: the 1-based index of their example in the row, or 0
+            for padding tokens.
+        return_tensors (`str`, *optional*, defaults to `"np"`):
+            The type of Tensor to return. Only "np" is supported.
+    """
+
+    max_length: int
+    pad_token_id: int = 0
+    label_pad_token_id: int = -100
+    return_segment_ids: bool = False
+    return_tensors: str = "np"
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.return_tensors != "np":
+            raise NotImplementedError(f"Framework '{self.return_tensors}' is not supported, only 'np' is.")
+
+        batch_size = len(features)
+        input_ids = np.full((batch_size, self.max_length), self.pad_token_id, dtype=np.int64)
+        labels = np.full((batch_size, self.max_length), self.label_pad_token_id, dtype=np.int64)
+        position_ids = np.zeros((batch_size, self.max_length), dtype=np.int64)
+        segment_ids = np.zeros((batch_size, self.max_length), dtype=np.int64)
+        for row, feature in enumerate(features):
+            examples_input_ids = feature["input_ids"]
+            examples_labels = feature.get("labels", examples_input_ids)
+            if np.ndim(examples_input_ids[0]) == 0:
+                # a single example
+                examples_input_ids, examples_labels = [examples_input_ids], [examples_labels]
+
+            start = 0
+            for segment, (example_input_ids, example_labels) in enumerate(zip(examples_input_ids, examples_labels)):
+                length = min(len(example_input_ids), self.max_length - start)
+                if length <= 0:
+                    break
+                input_ids[row, start : start + length] = example_input_ids[:length]
+                labels[row, start + 1 : start + length] = example_labels[1:length]
+                position_ids[row, start : start + length] = np.arange(length)
+                segment_ids[row, start : start + length] = segment + 1
+                start += length
+            position_ids[row, start:] = np.arange(self.max_length - start)
+
+        batch = {"input_ids": input_ids, "labels": labels, "position_ids": position_ids}
+        if self.return_segment_ids:
+            batch["segment_ids"] = segment_ids
+        return batch
@@ -15,4 +15,5 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from .metrics import GenerationMetrics
 from .utils import GenerationMixin
@@ -26,8 +26,9 @@ from transformers import is_sklearn_available
 import mindspore as ms
 from mindspore import mint
 from mindspore import numpy as mnp
+from mindspore import ops
 
-from ..cache_utils import DynamicCache
+from ..cache_utils import DynamicCache, EncoderDecoderCache, StaticCache
 
 if is_sklearn_available():
     from sklearn.metrics import roc_curve
@@ -918,63 +919,56 @@ class PromptLookupCandidateGenerator(CandidateGenerator):
         """
         Fetches the candidates to be tried for the current input.
 
+        The lookup is vectorized over the batch: for every sequence, the continuation of the first earlier occurrence
+        of its longest matching trailing n-gram is proposed. Sequences without a match, or with a shorter
+        continuation, are completed with filler tokens, which is harmless since candidates are verified by the
+        target model.
+
         Args:
             input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
                 Indices of input sequence tokens in the vocabulary. [What are input IDs?](../glossary#input-ids)
 
         Return:
-            `ms.Tensor` of shape `(num_candidates, candidate_length)`: The candidate sequences to be tried.
+            `ms.Tensor` of shape `(batch_size, candidate_length)`: The candidate sequences to be tried.
         """
-        input_length = input_ids.size(1)
+        batch_size, input_length = input_ids.shape
 
         # Don't generate more than `max_length - 1` candidates since the target model generates one extra token.
-        if self.max_length == input_length + 1:
+        num_output_tokens = min(self.num_output_tokens, self.max_length - input_length - 1)
+        if num_output_tokens <= 0:
             return input_ids, None
 
-        chosen_ids = None
-        match_found = False
+        # the largest n-gram size is tried first, and the first occurrence of the n-gram is kept
+        start_idx = ops.zeros(batch_size, dtype=ms.int32)
+        match_found = ops.zeros(batch_size, dtype=ms.bool_)
         for ngram_size in range(min(self.max_matching_ngram_size, input_length - 1), 0, -1):
-            # Create sliding windows of size ngram_size
-            windows = input_ids.unfold(dimension=1, size=ngram_size, step=1)
-
-            # Convert ngram to a tensor for comparison
-            ngram_tensor = input_ids[0, -ngram_size:]
-
-            # Find where the windows match the ngram
-            matches = (windows == ngram_tensor).all(dim=2)
-
-            # Get the indices of matches
-            match_indices = matches.nonzero(as_tuple=True)[1]
-
-            # Iterate through match indices to find a valid continuation
-            for idx in match_indices:
-                start_idx = idx + ngram_size
-                end_idx = start_idx + self.num_output_tokens
-                end_idx = min(end_idx, input_length, self.max_length)
-
-                if start_idx < end_idx:
-                    chosen_ids = input_ids[0, start_idx:end_idx]
-                    match_found = True
-
-                    # remove remaining candidate ids if an "eos" token is found, otherwise the target model may
-                    # accept eos and the rest as valid, thus not stopping generation after "eos"
-                    # NOTE: below code is written based on the fact that assisted decoding supports only bs=1
-                    mask = mnp.isin(chosen_ids, self.eos_token_id)
-                    match_indices_eos = mint.nonzero(mask)
-                    if match_indices_eos.numel() > 0:
-                        first_eos_index = match_indices_eos[0].item()
-                        chosen_ids = chosen_ids[:first_eos_index]
-                    break
-            if match_found:
-                break
-
-        if chosen_ids is None or len(chosen_ids) == 0:
+            # sliding windows of size `ngram_size` followed by at least one token of the sequence
+            num_windows = input_length - ngram_size
+            windows = ops.stack([input_ids[:, i : i + num_windows] for i in range(ngram_size)], axis=-1)
+            matches = (windows == input_ids[:, None, input_length - ngram_size :]).all(-1)
+            first_match = matches.astype(ms.int32).argmax(-1)
+            new_match = matches.any(-1) & ~match_found
+            start_idx = ops.where(new_match, first_match + ngram_size, start_idx)
+            match_found = match_found | new_match
+
+        positions = start_idx[:, None] + ops.arange(num_output_tokens, dtype=ms.int32)[None, :]
+        is_valid = match_found[:, None] & (positions < input_length)
+        chosen_ids = ops.gather_elements(input_ids, 1, positions.clamp(max=input_length - 1))
+
+        # remove the candidate ids from the first "eos" token on, otherwise the target model may accept eos and the
+        # rest as valid, thus not stopping generation after "eos"
+        if self.eos_token_id is not None:
+            is_eos = mnp.isin(chosen_ids, self.eos_token_id)
+            is_valid = is_valid & (is_eos.astype(ms.int32).cumsum(-1) == 0)
+
+        # a single host synchronization trims the candidates to the longest valid continuation of the batch
+        candidate_length = int(is_valid.sum(-1).max())
+        if candidate_length == 0:
             # In case we didn't find a match return the input sequence unchanged, reverts back to autoregressive decoding
             return input_ids, None
 
-        # Now need extend input_ids with chosen_ids
-        chosen_ids = chosen_ids.unsqueeze(0)
-        candidate_input_ids = mint.cat((input_ids, chosen_ids), dim=1)
+        chosen_ids = ops.where(is_valid, chosen_ids, ops.zeros_like(chosen_ids))[:, :candidate_length]
+        candidate_input_ids = ops.cat((input_ids, chosen_ids.to(input_ids.dtype)), axis=1)
         # assisted_generation expects logits as well, but we don't have those here, so returning None
         return candidate_input_ids, None
 
@@ -995,6 +989,132 @@ class PromptLookupCandidateGenerator(CandidateGenerator):
         return
 
 
+class TreeCandidateGenerator(CandidateGenerator):
+    """
+    Abstract base class for the candidate generators proposing a tree of draft tokens rather than a single chain, so
+    that a rejected token does not discard the alternative continuations. The trees of the batch are verified in a
+    single forward pass through a tree attention mask, see [`~masking_utils.create_tree_attention_mask`], and the
+    longest path agreeing with the model is accepted.
+    """
+
+    def get_candidates(self, input_ids: ms.Tensor) -> tuple[ms.Tensor, ms.Tensor]:
+        """
+        Fetches the candidate trees to be tried for the current input.
+
+        Args:
+            input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
+                Indices of input sequence tokens in the vocabulary. [What are input IDs?](../glossary#input-ids)
+
+        Return:
+            `ms.Tensor` of shape `(batch_size, sequence_length + num_nodes)` containing the input sequences followed by
+            the tokens of the draft nodes and a `ms.Tensor` of shape `(batch_size, num_nodes)` containing the index of
+            the parent of each node, or -1 for the children of the last input token. Parents precede their children.
+        """
+        raise NotImplementedError(
+            f"{self.__class__} is an abstract class. Only classes inheriting this class can call `get_candidates`."
+        )
+
+
+class PromptLookupTreeCandidateGenerator(TreeCandidateGenerator):
+    """
+    `TreeCandidateGenerator` class looking up likely continuations in the prompt, as [`PromptLookupCandidateGenerator`],
+    but keeping the continuations of the `num_branches` best matches of the trailing n-grams (the longest n-grams,
+    then the earliest occurrences) instead of a single one. The continuations are merged into a token tree along their
+    shared prefixes.
+
+    Args:
+        eos_token_id (`ms.Tensor`, *optional*):
+            The eos token ids, the draft branches are cut before them.
+        num_output_tokens (`int`):
+            The depth of the trees, i.e. the maximum number of draft tokens accepted at once.
+        max_matching_ngram_size (`int`):
+            The maximum ngram size to be considered for matching in the prompt
+        num_branches (`int`):
+            The maximum number of continuations in a tree.
+        max_length (`int`):
+            The number of total maximum tokens that can be generated. For decoder-only models that includes the prompt length.
+            Defaults to 20, which is the max length used as default in generation config.
+    """
+
+    def __init__(
+        self,
+        eos_token_id: ms.Tensor = None,
+        num_output_tokens: int = 10,
+        max_matching_ngram_size: int = None,
+        num_branches: int = 4,
+        max_length: int = 20,
+    ):
+        self.num_output_tokens = num_output_tokens
+        self.max_matching_ngram_size = max_matching_ngram_size if max_matching_ngram_size else 2
+        self.num_branches = num_branches
+        self.max_length = max_length
+        self.eos_token_id = eos_token_id
+
+        if self.max_matching_ngram_size <= 0 or self.num_output_tokens <= 0 or self.num_branches <= 0:
+            raise ValueError("Invalid max_matching_ngram_size, num_output_tokens or num_branches")
+
+    def get_candidates(self, input_ids: ms.Tensor) -> tuple[ms.Tensor, ms.Tensor]:
+        batch_size, input_length = input_ids.shape
+        no_candidates = (input_ids, ops.zeros((batch_size, 0), dtype=ms.int32))
+
+        # Don't generate more than `max_length - 1` candidates since the target model generates one extra token.
+        depth = min(self.num_output_tokens, self.max_length - input_length - 1)
+        if depth <= 0 or input_length < 2:
+            return no_candidates
+
+        # size of the longest trailing n-gram ending right before each position of the sequence
+        match_sizes = ops.zeros((batch_size, input_length), dtype=ms.int32)
+        for ngram_size in range(min(self.max_matching_ngram_size, input_length - 1), 0, -1):
+            num_windows = input_length - ngram_size
+            windows = ops.stack([input_ids[:, i : i + num_windows] for i in range(ngram_size)], axis=-1)
+            matches = (windows == input_ids[:, None, input_length - ngram_size :]).all(-1)
+            sizes = match_sizes[:, ngram_size:]
+            sizes = ops.where(matches & (sizes == 0), ngram_size, sizes)
+            match_sizes = ops.cat([match_sizes[:, :ngram_size], sizes], axis=1)
+
+        # the continuations of the best matches: longest n-grams first, then earliest occurrences
+        num_branches = min(self.num_branches, input_length - 1)
+        priorities = match_sizes * input_length - ops.arange(input_length, dtype=ms.int32)[None, :]
+        priorities = ops.where(match_sizes > 0, priorities, -1)
+        priorities, start_idx = ops.topk(priorities.float(), num_branches)
+        positions = start_idx[:, :, None] + ops.arange(depth, dtype=ms.int32)[None, None, :]
+        is_valid = (priorities > 0)[:, :, None] & (positions < input_length)
+        chosen_ids = ops.gather_elements(
+            input_ids, 1, positions.clamp(max=input_length - 1).reshape(batch_size, -1)
+        ).reshape(batch_size, num_branches, depth)
+        if self.eos_token_id is not None:
+            is_eos = mnp.isin(chosen_ids, self.eos_token_id)
+            is_valid = is_valid & (is_eos.astype(ms.int32).cumsum(-1) == 0)
+
+        # a single host synchronization trims the trees to the deepest valid branch of the batch
+        depth = int(is_valid.sum(-1).max())
+        if depth == 0:
+            return no_candidates
+        # the trees are written in the cache after the sequence, so they are not larger than the remaining positions
+        num_branches = min(num_branches, (self.max_length - input_length - 1) // depth)
+        # invalid nodes are filler children of the root, which is harmless since they are verified by the target model
+        chosen_ids = ops.where(is_valid, chosen_ids, ops.zeros_like(chosen_ids))[:, :num_branches, :depth]
+        is_valid = is_valid[:, :num_branches, :depth]
+
+        # merge the branches along their shared prefixes: a node is attached to the node at the same depth of the first
+        # branch sharing its prefix
+        same_token = (chosen_ids[:, :, None, :] == chosen_ids[:, None, :, :]) & is_valid[:, :, None, :]
+        same_token = same_token & is_valid[:, None, :, :]
+        same_prefix = (~same_token).astype(ms.int32).cumsum(-1) == 0
+        first_branch = same_prefix.astype(ms.int32).argmax(2).to(ms.int32)  # (batch_size, num_branches, depth)
+        # node `(branch, level)` has the index `branch * depth + level`
+        parents = first_branch[:, :, :-1] * depth + ops.arange(depth - 1, dtype=ms.int32)[None, None, :]
+        parents = ops.cat([ops.full((batch_size, num_branches, 1), -1, dtype=ms.int32), parents], axis=-1)
+        parents = ops.where(is_valid, parents, -1)
+
+        candidate_input_ids = ops.cat((input_ids, chosen_ids.reshape(batch_size, -1).to(input_ids.dtype)), axis=1)
+        return candidate_input_ids, parents.reshape(batch_size, -1)
+
+    def update_candidate_strategy(self, input_ids: ms.Tensor, scores: ms.Tensor, num_matches: int):
+        # Currently does nothing
+        return
+
+
 class EarlyExitCandidateGenerator(AssistedCandidateGenerator):
     """
     `CandidateGenerator` class to be used for assisted generation and speculative decoding. This class generates
@@ -1054,7 +1174,12 @@ class EarlyExitCandidateGenerator(AssistedCandidateGenerator):
 def _crop_past_key_values(model, past_key_values, max_length):
     """Crops the past key values up to a certain maximum length."""
     new_past = []
-    if model.config.is_encoder_decoder:
+    if isinstance(past_key_values, EncoderDecoderCache):
+        past_key_values.self_attention_cache.crop(max_length)
+    elif isinstance(past_key_values, (DynamicCache, StaticCache)):
+        # a `StaticCache` is rolled back in place, without reallocating its states
+        past_key_values.crop(max_length)
+    elif model.config.is_encoder_decoder:
         for idx in range(len(past_key_values)):
             new_past.append(
                 (
@@ -1075,8 +1200,6 @@ def _crop_past_key_values(model, past_key_values, max_length):
         else:
             for idx in range(len(past_key_values)):
                 past_key_values[idx] = past_key_values[idx][:, :, :max_length, :]
-    elif isinstance(past_key_values, DynamicCache):
-        past_key_values.crop(max_length)
     elif past_key_values is not None:
         for idx in range(len(past_key_values)):
             if past_key_values[idx] != ([], []):
@@ -1092,6 +1215,33 @@ def _crop_past_key_values(model, past_key_values, max_length):
     return past_key_values
 
 
+def _select_tree_path_in_cache(model, past_key_values, past_length, path):
+    """
+    Keeps the states of the accepted path of a token tree in the cache, see [`TreeCandidateGenerator`]. The tree was
+    written right after the `past_length` cached tokens, the root first, and `path` of shape `(batch_size, num_accepted)`
+    holds the indices of the accepted draft nodes, the root excluded (the node `i` was written at `past_length + i`).
+    """
+    if isinstance(past_key_values, EncoderDecoderCache):
+        _select_tree_path_in_cache(model, past_key_values.self_attention_cache, past_length, path)
+        return past_key_values
+    if path.shape[1] == 0:
+        return _crop_past_key_values(model, past_key_values, past_length + 1)
+
+    num_accepted = path.shape[1]
+    positions = (past_length + path.to(ms.int32))[:, None, :, None]
+    path_states = []
+    for key_states, value_states in zip(past_key_values.key_cache, past_key_values.value_cache):
+        index = positions.broadcast_to((key_states.shape[0], key_states.shape[1], num_accepted, key_states.shape[3]))
+        path_states.append((ops.gather_elements(key_states, 2, index), ops.gather_elements(value_states, 2, index)))
+
+    # roll back to the root, and write the states of the accepted nodes right after it
+    past_key_values = _crop_past_key_values(model, past_key_values, past_length + 1)
+    cache_position = ops.arange(past_length + 1, past_length + 1 + num_accepted, dtype=ms.int32)
+    for layer_idx, (key_states, value_states) in enumerate(path_states):
+        past_key_values.update(key_states, value_states, layer_idx, {"cache_position": cache_position})
+    return past_key_values
+
+
 def _prepare_attention_mask(model_kwargs: dict[str, Any], new_length: int, is_encoder_decoder: bool) -> dict[str, Any]:
     """Expands or crops the model's mask for decoding purposes, to the defined length"""
 
@@ -18,7 +18,7 @@
 
 import inspect
 import math
-from typing import Callable, Iterable, List, Optional, Union
+from typing import Callable, List, Optional, Union
 
 import numpy as np
 from transformers.utils import add_start_docstrings
@@ -786,71 +786,58 @@ class EtaLogitsWarper(LogitsProcessor):
         return scores_processed
 
 
-def _get_ngrams(ngram_size: int, prev_input_ids: ms.Tensor, num_hypos: int):
+def _get_ngrams(ngram_size: int, prev_input_ids: ms.Tensor) -> ms.Tensor:
     """
     Assume ngram_size=2 and prev_input_ids=tensor([[40, 2883, 2712, 4346]]). The output of generated ngrams look like
-    this {(40,): [2883], (2883,): [2712], (2712,): [4346]}.
+    this tensor([[[40, 2883], [2883, 2712], [2712, 4346]]]).
 
     Args:
         ngram_size (`int`):
             The number sequential tokens taken as a group which may only occur once before being banned.
-        prev_input_ids (`ms.Tensor`):
-           Generated token ids for the current hypothesis.
-        num_hypos (`int`):
-            The number of hypotheses for which n-grams need to be generated.
+        prev_input_ids (`ms.Tensor` of shape `(num_hypos, sequence_length)`):
+           Generated token ids for each hypothesis.
 
     Returns:
-        generated_ngrams (`dict`):
-            Dictionary of generated ngrams.
+        `ms.Tensor` of shape `(num_hypos, sequence_length - ngram_size + 1, ngram_size)`: The sliding windows of
+        `ngram_size` tokens of each hypothesis.
     """
-    # Initialize an empty list of dictionaries, one for each hypothesis (index) in the range of num_hypos
-    generated_ngrams = [{} for _ in range(num_hypos)]
-    for idx in range(num_hypos):
-        gen_tokens = prev_input_ids[idx].tolist()
-        generated_ngram = generated_ngrams[idx]
-        # Loop through each n-gram of size ngram_size in the list of tokens (gen_tokens)
-        for ngram in zip(*[gen_tokens[i:] for i in range(ngram_size)]):
-            prev_ngram_tuple = tuple(ngram[:-1])
-            generated_ngram[prev_ngram_tuple] = generated_ngram.get(prev_ngram_tuple, []) + [ngram[-1]]
-    return generated_ngrams
-
-
-def _get_generated_ngrams(banned_ngrams, prev_input_ids, ngram_size, cur_len):
+    num_ngrams = prev_input_ids.shape[-1] - ngram_size + 1
+    return ops.stack([prev_input_ids[:, i : i + num_ngrams] for i in range(ngram_size)], axis=-1)
+
+
+def _get_banned_ngram_mask(ngrams: ms.Tensor, prev_input_ids: ms.Tensor, vocab_size: int) -> ms.Tensor:
     """
-    Determines the banned tokens for the current hypothesis based on previously generated n-grams.
+    Determines the banned tokens of each hypothesis, i.e. the tokens that would complete one of `ngrams` given the last
+    `ngram_size - 1` tokens of the hypothesis. All hypotheses are matched against all their n-grams at once and the
+    banned tokens are scattered into the mask in a single op, so that no token id ever has to leave the device.
 
     Args:
-        banned_ngrams (`dict`):
-            A dictionary containing previously generated n-grams for each hypothesis.
-        prev_input_ids (`ms.Tensor`):
-            Generated token ids for the current hypothesis.
-        ngram_size (`int`):
-            The number sequential tokens taken as a group which may only occur once before being banned.
-        cur_len (`int`):
-            The current length of the token sequences for which the n-grams are being checked.
+        ngrams (`ms.Tensor` of shape `(num_hypos, num_ngrams, ngram_size)`):
+            The n-grams which may only occur once, as returned by `_get_ngrams`.
+        prev_input_ids (`ms.Tensor` of shape `(num_hypos, sequence_length)`):
+            Generated token ids for each hypothesis.
+        vocab_size (`int`):
+            The size of the vocabulary.
 
     Returns:
-        List of tokens that are banned.
+        `ms.Tensor` of shape `(num_hypos, vocab_size)`: A boolean mask which is `True` for the banned tokens.
     """
-    # Before decoding the next token, prevent decoding of ngrams that have already appeared
-    start_idx = cur_len + 1 - ngram_size
-    ngram_idx = tuple(prev_input_ids[start_idx:cur_len].tolist())
-    return banned_ngrams.get(ngram_idx, [])
-
-
-def _calc_banned_ngram_tokens(
-    ngram_size: int, prev_input_ids: ms.Tensor, num_hypos: int, cur_len: int
-) -> List[Iterable[int]]:
-    """Copied from fairseq for no_repeat_ngram in beam_search"""
-    if cur_len + 1 < ngram_size:
-        # return no banned tokens if we haven't generated no_repeat_ngram_size tokens yet
-        return [[] for _ in range(num_hypos)]
-    generated_ngrams = _get_ngrams(ngram_size, prev_input_ids, num_hypos)
-    banned_tokens = [
-        _get_generated_ngrams(generated_ngrams[hypo_idx], prev_input_ids[hypo_idx], ngram_size, cur_len)
-        for hypo_idx in range(num_hypos)
-    ]
-    return banned_tokens
+    num_hypos, num_ngrams, ngram_size = ngrams.shape
+    if ngram_size > 1:
+        ngram_prefix = prev_input_ids[:, -(ngram_size - 1) :].to(ngrams.dtype)
+        matches = mint.eq(ngrams[..., :-1], ngram_prefix[:, None, :]).all(-1)
+    else:
+        # unigrams have an empty prefix: every previous token is banned
+        matches = ops.ones((num_hypos, num_ngrams), ms.bool_)
+
+    banned_counts = ops.tensor_scatter_elements(
+        ops.zeros((num_hypos, vocab_size), ms.int32),
+        indices=ngrams[..., -1].to(ms.int32),
+        updates=matches.to(ms.int32),
+        axis=1,
+        reduction="add",
+    )
+    return banned_counts > 0
 
 
 class NoRepeatNGramLogitsProcessor(LogitsProcessor):
@@ -902,13 +889,14 @@ class NoRepeatNGramLogitsProcessor(LogitsProcessor):
 
     @add_start_docstrings(LOGITS_PROCESSOR_INPUTS_DOCSTRING)
     def __call__(self, input_ids: ms.Tensor, scores: ms.Tensor) -> ms.Tensor:
-        num_batch_hypotheses = scores.shape[0]
         cur_len = input_ids.shape[-1]
-        scores_processed = scores.clone()
-        banned_batch_tokens = _calc_banned_ngram_tokens(self.ngram_size, input_ids, num_batch_hypotheses, cur_len)
-        for i, banned_tokens in enumerate(banned_batch_tokens):
-            scores_processed[i, banned_tokens] = -float("inf")
+        if cur_len < self.ngram_size:
+            # return no banned tokens if we haven't generated no_repeat_ngram_size tokens yet
+            return scores
 
+        ngrams = _get_ngrams(self.ngram_size, input_ids)
+        banned_tokens_mask = _get_banned_ngram_mask(ngrams, input_ids, scores.shape[-1])
+        scores_processed = scores.masked_fill(banned_tokens_mask, -float("inf"))
         return scores_processed
 
 
@@ -957,25 +945,29 @@ class EncoderNoRepeatNGramLogitsProcessor(LogitsProcessor):
         if len(encoder_input_ids.shape) == 1:
             encoder_input_ids = encoder_input_ids.unsqueeze(0)
         self.batch_size = encoder_input_ids.shape[0]
-        self.generated_ngrams = _get_ngrams(encoder_ngram_size, encoder_input_ids, self.batch_size)
+        # the encoder n-grams never change, they are computed once and matched against the decoder ids at every step
+        self.generated_ngrams = (
+            _get_ngrams(encoder_ngram_size, encoder_input_ids)
+            if encoder_input_ids.shape[-1] >= encoder_ngram_size
+            else None
+        )
+        self._hypo_ngrams = None
 
     @add_start_docstrings(LOGITS_PROCESSOR_INPUTS_DOCSTRING)
     def __call__(self, input_ids: ms.Tensor, scores: ms.Tensor) -> ms.Tensor:
-        # B x num_beams
-        num_hypos = scores.shape[0]
-        num_beams = num_hypos // self.batch_size
         cur_len = input_ids.shape[-1]
-        scores_processed = scores.clone()
-        banned_batch_tokens = [
-            _get_generated_ngrams(
-                self.generated_ngrams[hypo_idx // num_beams], input_ids[hypo_idx], self.ngram_size, cur_len
-            )
-            for hypo_idx in range(num_hypos)
-        ]
+        if self.generated_ngrams is None or cur_len < self.ngram_size - 1:
+            return scores
 
-        for i, banned_tokens in enumerate(banned_batch_tokens):
-            scores_processed[i, banned_tokens] = -float("inf")
+        # B x num_beams
+        num_hypos = scores.shape[0]
+        if self._hypo_ngrams is None or self._hypo_ngrams.shape[0] != num_hypos:
+            num_beams = num_hypos // self.batch_size
+            batch_index = ms.tensor(np.arange(num_hypos) // num_beams, dtype=ms.int32)
+            self._hypo_ngrams = self.generated_ngrams[batch_index]
 
+        banned_tokens_mask = _get_banned_ngram_mask(self._hypo_ngrams, input_ids, scores.shape[-1])
+        scores_processed = scores.masked_fill(banned_tokens_mask, -float("inf"))
         return scores_processed
 
 
@@ -1052,6 +1044,12 @@ class SequenceBiasLogitsProcessor(LogitsProcessor):
         # Bias variables that will be populated on the first call (for retrocompatibility purposes, the vocabulary size
         # is infered in the first usage, which inhibits initializing here)
         self.length_1_bias = None
+        self.prefix_ids = None
+        self.prefix_wildcard_mask = None
+        self.sequence_prefix_index = None
+        self.sequence_last_tokens = None
+        self.sequence_lengths = None
+        self.sequence_biases = None
         self.prepared_bias_variables = False
 
     @add_start_docstrings(LOGITS_PROCESSOR_INPUTS_DOCSTRING)
@@ -1060,32 +1058,43 @@ class SequenceBiasLogitsProcessor(LogitsProcessor):
         if not self.prepared_bias_variables:
             self._prepare_bias_variables(scores)
 
-        # 2 - prepares an empty bias to add
-        bias = mint.zeros_like(scores)
-
-        # 3 - include the bias from length = 1
-        bias += self.length_1_bias
-
-        # 4 - include the bias from length > 1, after determining which biased sequences may be completed.
-        for sequence_ids, sequence_bias in self.sequence_bias.items():
-            if len(sequence_ids) == 1:  # the sequence is of length 1, already applied
-                continue
-            if len(sequence_ids) > input_ids.shape[1]:  # the sequence is longer than the context, ignore
-                continue
-            prefix_length = len(sequence_ids) - 1
-            last_token = sequence_ids[-1]
-            matching_rows = mint.eq(
-                input_ids[:, -prefix_length:],
-                ms.tensor(sequence_ids[:-1], dtype=input_ids.dtype),
-            ).prod(dim=1)
-            bias[:, last_token] += mint.where(
-                matching_rows.bool(),
-                ms.tensor(sequence_bias),
-                ms.tensor(0.0),
-            )
+        # 2 - include the bias from length = 1
+        scores_processed = scores + self.length_1_bias.to(scores.dtype)
+        if self.prefix_ids is None:
+            return scores_processed
+
+        # 3 - match the context against every distinct prefix of the sequences of length > 1 at once. Prefixes are
+        # right-aligned, shorter ones being padded with wildcards, and the context is left-padded with an invalid token
+        # id when it is shorter than the longest prefix.
+        batch_size = input_ids.shape[0]
+        max_prefix_length = self.prefix_ids.shape[-1]
+        context = input_ids[:, -max_prefix_length:].to(self.prefix_ids.dtype)
+        if context.shape[-1] < max_prefix_length:
+            padding = ops.full((batch_size, max_prefix_length - context.shape[-1]), -1, dtype=context.dtype)
+            context = ops.cat([padding, context], axis=-1)
+        prefix_matches = mint.logical_or(
+            mint.eq(context[:, None, :], self.prefix_ids[None]), self.prefix_wildcard_mask[None]
+        ).all(-1)
+
+        # 4 - include the bias from length > 1 of the sequences that may be completed, with a single scatter
+        # the sequences longer than the context are ignored
+        sequence_matches = mint.logical_and(
+            prefix_matches[:, self.sequence_prefix_index], self.sequence_lengths <= input_ids.shape[1]
+        )
+        num_sequences = self.sequence_biases.shape[0]
+        sequence_biases = self.sequence_biases.broadcast_to((batch_size, num_sequences)).masked_fill(
+            ~sequence_matches, 0.0
+        )
+        bias = ops.tensor_scatter_elements(
+            ops.zeros(scores.shape, ms.float32),
+            indices=self.sequence_last_tokens.broadcast_to((batch_size, num_sequences)),
+            updates=sequence_biases,
+            axis=1,
+            reduction="add",
+        )
 
         # 5 - apply the bias to the scores
-        scores_processed = scores + bias
+        scores_processed = scores_processed + bias.to(scores.dtype)
         return scores_processed
 
     def _prepare_bias_variables(self, scores: ms.Tensor):
@@ -1105,10 +1114,37 @@ class SequenceBiasLogitsProcessor(LogitsProcessor):
 
         # Precompute the bias tensors to be applied. Sequences of length 1 are kept separately, as they can be applied
         # with simpler logic.
-        self.length_1_bias = mint.zeros((vocabulary_size,), dtype=ms.float32)
+        length_1_bias = np.zeros((vocabulary_size,), dtype=np.float32)
+        for sequence_ids, bias in self.sequence_bias.items():
+            if len(sequence_ids) == 1:
+                length_1_bias[sequence_ids[-1]] = bias
+        self.length_1_bias = ms.tensor(length_1_bias)
+
+        # Longer sequences are stored as a flattened trie: sequences sharing a prefix (e.g. several continuations of
+        # the same word) point to the same row of the prefix table, which is thus only matched once per step.
+        prefixes = {}
+        prefix_index, last_tokens, lengths, biases = [], [], [], []
         for sequence_ids, bias in self.sequence_bias.items():
             if len(sequence_ids) == 1:
-                self.length_1_bias[sequence_ids[-1]] = bias
+                continue
+            prefix_index.append(prefixes.setdefault(tuple(sequence_ids[:-1]), len(prefixes)))
+            last_tokens.append(sequence_ids[-1])
+            lengths.append(len(sequence_ids))
+            biases.append(bias)
+
+        if len(prefixes) > 0:
+            max_prefix_length = max(len(prefix) for prefix in prefixes)
+            prefix_ids = np.zeros((len(prefixes), max_prefix_length), dtype=np.int64)
+            prefix_wildcard_mask = np.ones((len(prefixes), max_prefix_length), dtype=np.bool_)
+            for prefix, i in prefixes.items():
+                prefix_ids[i, max_prefix_length - len(prefix) :] = prefix
+                prefix_wildcard_mask[i, max_prefix_length - len(prefix) :] = False
+            self.prefix_ids = ms.tensor(prefix_ids)
+            self.prefix_wildcard_mask = ms.tensor(prefix_wildcard_mask)
+            self.sequence_prefix_index = ms.tensor(prefix_index, dtype=ms.int32)
+            self.sequence_last_tokens = ms.tensor(last_tokens, dtype=ms.int32)
+            self.sequence_lengths = ms.tensor(lengths, dtype=ms.int32)
+            self.sequence_biases = ms.tensor(biases, dtype=ms.float32)
 
         self.prepared_bias_variables = True
 
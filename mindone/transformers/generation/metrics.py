@@ -0,0 +1,201 @@
+import bisect
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import mindspore as ms
+
+# upper bounds of the per-token latency histogram buckets, in milliseconds
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class GenerationMetrics:
+    r"""
+    Opt-in recorder of the metrics of [`~GenerationMixin.generate`] calls, passed as
+    `model.generate(..., generation_metrics=metrics)`.
+
+    For every call, it records the time to first token, the split between the prefill step and the decoding steps, a
+    histogram of the per-token latencies, the number of host synchronizations of the generation loop, the cache
+    occupancy and the steps that triggered a graph compilation (the first step seeing a new set of input shapes in
+    `GRAPH_MODE`). A host synchronization is counted every time the generation loop reads a tensor back from the
+    device, the reads done by the forward pass of the model are not counted.
+
+    Like streamers, it is driven by hooks (`on_generate_start`, `on_step_end`, `on_host_sync`, `on_generate_end`) which
+    can be overridden to forward the metrics to a monitoring system. [`~GenerationMetrics.summary`] and
+    [`~GenerationMetrics.to_json`] report them.
+
+    <Tip>
+
+    Latencies are measured on the host between two steps. As kernels are launched asynchronously, the time of a step
+    may be accounted to the next step that synchronizes with the device, but the totals remain exact.
+
+    </Tip>
+
+    Args:
+        latency_buckets_ms (`Sequence[float]`, *optional*):
+            The upper bounds of the per-token latency histogram buckets, in milliseconds. Latencies above the last bound
+            are counted in an overflow bucket.
+        max_records (`int`, *optional*, defaults to 1000):
+            The number of `generate` calls kept, the oldest ones being dropped first.
+
+    Examples:
+
+    ```python
+    >>> from mindone.transformers.generation import GenerationMetrics
+
+    >>> metrics = GenerationMetrics()
+    >>> outputs = model.generate(**inputs, max_new_tokens=32, generation_metrics=metrics)
+    >>> print(metrics.to_json(indent=2))
+    ```
+    """
+
+    def __init__(self, latency_buckets_ms: Optional[Sequence[float]] = None, max_records: int = 1000):
+        self.latency_buckets_ms = tuple(latency_buckets_ms or DEFAULT_LATENCY_BUCKETS_MS)
+        self.max_records = max_records
+        self.records: List[Dict[str, Any]] = []
+        self._seen_signatures = set()
+        self._current = None
+
+    @staticmethod
+    def _signature(model_inputs: Dict[str, Any]) -> Tuple:
+        return tuple(
+            (name, tuple(value.shape), str(value.dtype))
+            for name, value in sorted(model_inputs.items())
+            if isinstance(value, ms.Tensor)
+        )
+
+    def on_generate_start(self, batch_size: int, prompt_length: int, max_length: Optional[int] = None):
+        """Called before the first step of a `generate` call."""
+        self._current = {
+            "batch_size": batch_size,
+            "prompt_length": prompt_length,
+            "max_length": max_length,
+            "num_steps": 0,
+            "host_syncs": 0,
+            "step_latencies_s": [],
+            "compile_events": [],
+            "cache_length": prompt_length,
+            "cache_capacity": None,
+        }
+        self._start_time = self._step_start_time = time.perf_counter()
+
+    def on_step_end(
+        self,
+        model_inputs: Optional[Dict[str, Any]] = None,
+        cache_length: Optional[int] = None,
+        cache_capacity: Optional[int] = None,
+    ):
+        """
+        Called once a step has produced a new token for every sequence.
+
+        Args:
+            model_inputs (`Dict[str, Any]`, *optional*):
+                The inputs of the forward pass of the step, used to detect graph compilations.
+            cache_length (`int`, *optional*):
+                The number of positions of the cache in use after the step.
+            cache_capacity (`int`, *optional*):
+                The number of positions of the cache, for preallocated (static) caches.
+        """
+        now = time.perf_counter()
+        latency = now - self._step_start_time
+        self._step_start_time = now
+
+        record = self._current
+        step = record["num_steps"]
+        record["num_steps"] += 1
+        record["step_latencies_s"].append(latency)
+        if cache_length is not None:
+            record["cache_length"] = cache_length
+        if cache_capacity is not None:
+            record["cache_capacity"] = cache_capacity
+
+        if model_inputs is not None and ms.get_context("mode") == ms.GRAPH_MODE:
+            signature = self._signature(model_inputs)
+            if signature not in self._seen_signatures:
+                self._seen_signatures.add(signature)
+                record["compile_events"].append({"step": step, "latency_s": latency})
+
+    def on_host_sync(self, count: int = 1):
+        """Called when the generation loop reads `count` values back from the device."""
+        self._current["host_syncs"] += count
+
+    def on_generate_end(self):
+        """Called at the end of a `generate` call."""
+        record = self._current
+        self._current = None
+        record["total_time_s"] = time.perf_counter() - self._start_time
+
+        self.records.append(record)
+        if len(self.records) > self.max_records:
+            self.records.pop(0)
+
+    def _histogram(self, latencies_s: List[float]) -> Dict[str, int]:
+        counts = [0] * (len(self.latency_buckets_ms) + 1)
+        for latency in latencies_s:
+            counts[bisect.bisect_left(self.latency_buckets_ms, latency * 1000)] += 1
+        labels = [f"<={bound}ms" for bound in self.latency_buckets_ms] + [f">{self.latency_buckets_ms[-1]}ms"]
+        return dict(zip(labels, counts))
+
+    def _summarize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        latencies = record["step_latencies_s"]
+        decode_latencies = latencies[1:]
+        decode_time = sum(decode_latencies)
+        summary = {
+            "batch_size": record["batch_size"],
+            "prompt_length": record["prompt_length"],
+            "num_new_tokens": record["num_steps"],
+            "total_time_s": record["total_time_s"],
+            # the first step runs the prefill and yields the first token
+            "time_to_first_token_s": latencies[0] if latencies else None,
+            "prefill_time_s": latencies[0] if latencies else None,
+            "decode_time_s": decode_time,
+            "decode_tokens_per_s": len(decode_latencies) * record["batch_size"] / decode_time if decode_time else None,
+            "host_syncs": record["host_syncs"],
+            "host_syncs_per_token": record["host_syncs"] / record["num_steps"] if record["num_steps"] else None,
+            "cache_length": record["cache_length"],
+            "cache_capacity": record["cache_capacity"],
+            "cache_occupancy": (
+                record["cache_length"] / record["cache_capacity"] if record["cache_capacity"] else None
+            ),
+            "compile_events": record["compile_events"],
+            "token_latency_histogram": self._histogram(decode_latencies),
+        }
+        if decode_latencies:
+            p50, p90, p99 = np.percentile(np.array(decode_latencies) * 1000, [50, 90, 99]).tolist()
+            summary.update({"token_latency_p50_ms": p50, "token_latency_p90_ms": p90, "token_latency_p99_ms": p99})
+        return summary
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the metrics of the last `generate` call, and the aggregated metrics of all the recorded calls.
+        """
+        calls = [self._summarize_record(record) for record in self.records]
+        decode_latencies = [latency for record in self.records for latency in record["step_latencies_s"][1:]]
+        first_token_times = [call["time_to_first_token_s"] for call in calls if call["time_to_first_token_s"]]
+        aggregate = {
+            "num_calls": len(calls),
+            "num_new_tokens": sum(call["num_new_tokens"] * call["batch_size"] for call in calls),
+            "host_syncs": sum(call["host_syncs"] for call in calls),
+            "num_compile_events": sum(len(call["compile_events"]) for call in calls),
+            "time_to_first_token_mean_s": float(np.mean(first_token_times)) if first_token_times else None,
+            "token_latency_histogram": self._histogram(decode_latencies),
+        }
+        return {"last_call": calls[-1] if calls else None, "aggregate": aggregate}
+
+    def to_json(self, path: Optional[str] = None, **kwargs) -> str:
+        """
+        Serializes [`~GenerationMetrics.summary`] to JSON, and writes it to `path` if given. `kwargs` are passed to
+        `json.dumps`.
+        """
+        text = json.dumps(self.summary(), **kwargs)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def reset(self):
+        """Drops all the records."""
+        self.records = []
+        self._seen_signatures = set()
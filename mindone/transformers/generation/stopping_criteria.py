@@ -73,11 +73,7 @@ class MaxLengthCriteria(StoppingCriteria):
         self.max_length = max_length
         self.max_position_embeddings = max_position_embeddings
 
-    @add_start_docstrings(STOPPING_CRITERIA_INPUTS_DOCSTRING)
-    def __call__(
-        self, input_ids: Union[ms.Tensor, np.ndarray], scores: Union[ms.Tensor, np.ndarray], **kwargs
-    ) -> Union[ms.Tensor, np.ndarray]:
-        cur_len = input_ids.shape[-1]
+    def _is_done(self, cur_len: int) -> bool:
         is_done = cur_len >= self.max_length
         if self.max_position_embeddings is not None and not is_done and cur_len >= self.max_position_embeddings:
             logger.warning_once(
@@ -85,7 +81,13 @@ class MaxLengthCriteria(StoppingCriteria):
                 f"maximum length ({self.max_position_embeddings}). Depending on the model, you may observe "
                 "exceptions, performance degradation, or nothing at all."
             )
+        return is_done
 
+    @add_start_docstrings(STOPPING_CRITERIA_INPUTS_DOCSTRING)
+    def __call__(
+        self, input_ids: Union[ms.Tensor, np.ndarray], scores: Union[ms.Tensor, np.ndarray], **kwargs
+    ) -> Union[ms.Tensor, np.ndarray]:
+        is_done = self._is_done(input_ids.shape[-1])
         if isinstance(input_ids, ms.Tensor):
             return ops.full((input_ids.shape[0],), is_done, dtype=ms.bool_)
         elif isinstance(input_ids, np.ndarray):
@@ -111,11 +113,14 @@ class MaxTimeCriteria(StoppingCriteria):
         self.max_time = max_time
         self.initial_timestamp = time.time() if initial_timestamp is None else initial_timestamp
 
+    def _is_done(self) -> bool:
+        return time.time() - self.initial_timestamp > self.max_time
+
     @add_start_docstrings(STOPPING_CRITERIA_INPUTS_DOCSTRING)
     def __call__(
         self, input_ids: Union[ms.Tensor, np.ndarray], scores: Union[ms.Tensor, np.ndarray], **kwargs
     ) -> Union[ms.Tensor, np.ndarray]:
-        is_done = time.time() - self.initial_timestamp > self.max_time
+        is_done = self._is_done()
 
         if isinstance(input_ids, ms.Tensor):
             return ops.full((input_ids.shape[0],), is_done, dtype=ms.bool_)
@@ -222,6 +227,11 @@ class StopStringCriteria(StoppingCriteria):
     tracker. The position tracker is now 6, which is greater than the length of the stop string! Don't panic, though -
     this also counts as a match of the stop string. We have matched the entire stop string.
 
+    Generation loops that append one token to the same rows at every step can avoid re-reading the trailing tokens with
+    [`~StopStringCriteria.advance`]. It tracks, for every row, the state of an Aho-Corasick automaton over the characters
+    of the stop strings, lifted to the token level: the state reached from any state after any token, and whether a stop
+    string was completed on the way, are precomputed so that a step is a single table lookup per row.
+
 
     Args:
         tokenizer (`PreTrainedTokenizer`):
@@ -262,34 +272,40 @@ class StopStringCriteria(StoppingCriteria):
         self.stop_strings: tuple[str, ...] = tuple(stop_strings)
         vocab = tokenizer.get_vocab()
         token_list, token_indices = tuple(vocab.keys()), tuple(vocab.values())
-        self.embedding_vec, self.max_valid_positions, self.max_valid_end_lens = self.clean_and_embed_tokens_with_cache(
-            token_list, token_indices, tokenizer
-        )
+        (
+            self.embedding_vec,
+            self.max_valid_positions,
+            self.max_valid_end_lens,
+            self.token_columns,
+            self.transitions,
+            self.completions,
+        ) = self.clean_and_embed_tokens_with_cache(token_list, token_indices, tokenizer)
 
         self.maximum_token_len = max([len(stop_string) for stop_string in self.stop_strings])
         self.num_stop_strings = len(self.stop_strings)
         self.target_lens = ms.tensor([len(stop_string) for stop_string in stop_strings], dtype=ms.int32)
+        # every column of the automaton is the action of at least one token, including the dummy token
+        self.num_columns = int(self.token_columns.max()) + 1
+        self.reset()
 
     def clean_and_embed_tokens_with_cache(self, token_list, token_indices, tokenizer):
         # We don't use the tokenizer in the cache key, because I don't trust it to have well-behaved equality
         if (token_list, token_indices, self.stop_strings) in STOP_STRING_EMBEDDING_CACHE:
-            embedding_vec, max_valid_positions, max_valid_end_lens = STOP_STRING_EMBEDDING_CACHE[
-                (token_list, token_indices, self.stop_strings)
-            ]
+            cached = STOP_STRING_EMBEDDING_CACHE[(token_list, token_indices, self.stop_strings)]
             STOP_STRING_EMBEDDING_CACHE.move_to_end((token_list, token_indices, self.stop_strings))
         else:
             clean_token_list, clean_token_indices = self.clean_tokenizer_vocab(tokenizer)
             embedding_vec, max_valid_positions, max_valid_end_lens = self._stop_string_create_embedding_vec(
                 clean_token_list, clean_token_indices, self.stop_strings
             )
-            STOP_STRING_EMBEDDING_CACHE[(token_list, token_indices, self.stop_strings)] = (
-                embedding_vec,
-                max_valid_positions,
-                max_valid_end_lens,
+            token_columns, transitions, completions = self._stop_string_create_automaton(
+                clean_token_list, clean_token_indices, self.stop_strings
             )
+            cached = (embedding_vec, max_valid_positions, max_valid_end_lens, token_columns, transitions, completions)
+            STOP_STRING_EMBEDDING_CACHE[(token_list, token_indices, self.stop_strings)] = cached
             if len(STOP_STRING_EMBEDDING_CACHE) > 8:
                 STOP_STRING_EMBEDDING_CACHE.popitem(last=False)  # Pop from the start, the least recently used item
-        return embedding_vec, max_valid_positions, max_valid_end_lens
+        return cached
 
     @staticmethod
     def clean_tokenizer_vocab(tokenizer, static_prefix="abcdef"):
@@ -404,6 +420,84 @@ class StopStringCriteria(StoppingCriteria):
 
         return gather_vec, max_valid_positions, max_valid_end_lens
 
+    @staticmethod
+    def _stop_string_create_automaton(
+        token_list, token_indices, stop_strings
+    ) -> tuple[ms.Tensor, ms.Tensor, ms.Tensor]:
+        """This function builds an Aho-Corasick automaton over the characters of the stop strings, and lifts it to the
+        token level: for every automaton state and every token, it precomputes the state reached after reading all the
+        characters of the token, and whether a stop string was completed on the way. A stop string completed while
+        reading a token always overlaps with that token, which is exactly the matching rule of StopStringCriteria.
+
+        Many tokens act identically on all the states (e.g. tokens sharing no character with the stop strings), so
+        the transition table has one column per distinct action rather than one per token.
+
+        Returns a tuple of the token -> column map, the flattened `(num_states, num_columns)` table of next states and
+        the flattened table of stop string completions."""
+        # 1 - the character-level automaton: a trie of the stop strings with failure links. Characters that appear in
+        # no stop string all share the alphabet index 0, which always leads back to the root.
+        alphabet = {char: i + 1 for i, char in enumerate(sorted(set("".join(stop_strings))))}
+        children = [{}]
+        is_output = [False]
+        for stop_string in stop_strings:
+            state = 0
+            for char in stop_string:
+                if char not in children[state]:
+                    children[state][char] = len(children)
+                    children.append({})
+                    is_output.append(False)
+                state = children[state][char]
+            is_output[state] = True
+
+        num_states = len(children)
+        delta = np.zeros((num_states, len(alphabet) + 1), dtype=np.int32)
+        fail = [0] * num_states
+        queue = []
+        for char, child in children[0].items():
+            delta[0, alphabet[char]] = child
+            queue.append(child)
+        for state in queue:  # breadth-first, `queue` grows while iterating
+            is_output[state] = is_output[state] or is_output[fail[state]]
+            for char, index in alphabet.items():
+                if char in children[state]:
+                    child = children[state][char]
+                    fail[child] = delta[fail[state], index]
+                    delta[state, index] = child
+                    queue.append(child)
+                else:
+                    delta[state, index] = delta[fail[state], index]
+        is_output = np.array(is_output, dtype=np.bool_)
+
+        # 2 - run all the tokens from all the states at once. Tokens are sorted by decreasing length, so that the
+        # tokens still being read at a given character position are always a prefix of the list.
+        order = sorted(range(len(token_list)), key=lambda i: -len(token_list[i]))
+        sorted_tokens = [token_list[i] for i in order]
+        states = np.broadcast_to(np.arange(num_states, dtype=np.int32), (len(sorted_tokens), num_states)).copy()
+        completions = np.zeros_like(states, dtype=np.bool_)
+        num_active = len(sorted_tokens)
+        for position in range(len(sorted_tokens[0]) if sorted_tokens else 0):
+            while num_active > 0 and len(sorted_tokens[num_active - 1]) <= position:
+                num_active -= 1
+            chars = np.array([alphabet.get(token[position], 0) for token in sorted_tokens[:num_active]])
+            states[:num_active] = delta[states[:num_active], chars[:, None]]
+            completions[:num_active] |= is_output[states[:num_active]]
+
+        # 3 - deduplicate the token actions into columns. Out-of-vocabulary ids are clamped to a dummy token which
+        # reads no character, i.e. keeps the state and never completes a stop string.
+        actions = np.concatenate([states, completions.astype(np.int32)], axis=1)
+        identity = np.concatenate([np.arange(num_states, dtype=np.int32), np.zeros(num_states, dtype=np.int32)])
+        actions, columns = np.unique(np.concatenate([actions, identity[None]]), axis=0, return_inverse=True)
+        token_columns = np.full((max(token_indices) + 2,), columns[-1], dtype=np.int32)
+        token_columns[np.array(token_indices)[order]] = columns[:-1].reshape(-1)
+
+        transitions = np.ascontiguousarray(actions[:, :num_states].T).reshape(-1)
+        completions = np.ascontiguousarray(actions[:, num_states:].T > 0).reshape(-1)
+        return (
+            ms.tensor(token_columns, dtype=ms.int32),
+            ms.tensor(transitions, dtype=ms.int32),
+            ms.tensor(completions, dtype=ms.bool_),
+        )
+
     @add_start_docstrings(STOPPING_CRITERIA_INPUTS_DOCSTRING)
     def __call__(self, input_ids: ms.Tensor, scores: ms.Tensor, **kwargs) -> ms.Tensor:
         # The maximum length we need to consider is 1 token per character. Note that input_ids can also be
@@ -414,7 +508,7 @@ class StopStringCriteria(StoppingCriteria):
         flipped_ids = mint.flip(input_ids, (1,))
 
         # Clip out-of-vocab values to the dummy value at the end of the embedding vector
-        flipped_ids = mint.clamp(flipped_ids, max=self.embedding_vec.size(0) - 1)
+        flipped_ids = mint.clamp(flipped_ids, max=self.embedding_vec.shape[0] - 1)
 
         # Size of the vector of positions a single token can match
         max_valid_positions = self.max_valid_positions
@@ -463,6 +557,46 @@ class StopStringCriteria(StoppingCriteria):
         # We return a per-sample vector that is True if any stop string is matched for that sample
         return mint.any(string_matches, dim=-1)
 
+    def reset(self):
+        """Forgets the automaton states tracked by [`~StopStringCriteria.advance`], e.g. before a new generation."""
+        self._states = None
+        self._num_tokens = None
+
+    def _step(self, states: ms.Tensor, tokens: ms.Tensor) -> tuple[ms.Tensor, ms.Tensor]:
+        # Clip out-of-vocab values to the dummy token at the end of the column map
+        tokens = mint.clamp(tokens.to(ms.int32), max=self.token_columns.shape[0] - 1)
+        index = states * self.num_columns + self.token_columns[tokens]
+        return self.transitions[index], self.completions[index]
+
+    def advance(self, input_ids: ms.Tensor) -> ms.Tensor:
+        """
+        Stateful equivalent of calling the criteria, for generation loops that append exactly one token to the same
+        rows at every step. The automaton state of every row is kept on device and advanced by the last token only, so
+        the cost of a step does not depend on the length of the stop strings.
+
+        The states are (re)built from the trailing tokens when the rows do not continue the previous call, e.g. on the
+        first step.
+
+        Args:
+            input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
+                Indices of input sequence tokens in the vocabulary.
+
+        Return:
+            `ms.Tensor` of shape `(batch_size,)`: `True` for the rows which just completed a stop string.
+        """
+        batch_size, num_tokens = input_ids.shape
+        if self._states is None or self._states.shape[0] != batch_size or self._num_tokens != num_tokens - 1:
+            # As in `__call__`, a stop string spans at most 1 token per character
+            states = ops.zeros((batch_size,), ms.int32)
+            for i in range(max(num_tokens - self.maximum_token_len, 0), num_tokens - 1):
+                states, _ = self._step(states, input_ids[:, i])
+        else:
+            states = self._states
+
+        self._states, is_done = self._step(states, input_ids[:, -1])
+        self._num_tokens = num_tokens
+        return is_done
+
 
 class EosTokenCriteria(StoppingCriteria):
     """
@@ -540,6 +674,58 @@ class StoppingCriteriaList(list):
 
         return is_done
 
+    def reset(self):
+        """Resets the stateful criteria, see [`~StoppingCriteriaList.update_unfinished_sequences`]."""
+        for criteria in self:
+            if isinstance(criteria, StopStringCriteria):
+                criteria.reset()
+
+    def update_unfinished_sequences(
+        self, input_ids: ms.Tensor, scores: ms.Tensor, unfinished_sequences: ms.Tensor, **kwargs
+    ) -> tuple[ms.Tensor, Union[bool, ms.Tensor]]:
+        """
+        Fused equivalent of `unfinished_sequences & ~self(input_ids, scores)`, for generation loops that append exactly
+        one token to the same rows at every step.
+
+        The criteria which only depend on the step ([`MaxLengthCriteria`], [`MaxTimeCriteria`]) are evaluated on the
+        host, [`StopStringCriteria`] only advances its automaton by the new tokens, and the remaining criteria are
+        combined into the mask on device. The host thus has to read at most one scalar per step to know if generation
+        is over, and none at all when no criterion depends on the generated tokens.
+
+        Args:
+            input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
+                Indices of input sequence tokens in the vocabulary, including the tokens generated at this step.
+            scores (`ms.Tensor` of shape `(batch_size, config.vocab_size)`):
+                Prediction scores of a language modeling head.
+            unfinished_sequences (`ms.Tensor` of shape `(batch_size,)`):
+                `1` for the sequences which were still being generated before this step, `0` otherwise.
+
+        Return:
+            `Tuple[ms.Tensor, Union[bool, ms.Tensor]]`: The updated `unfinished_sequences`, and whether all the
+            sequences are finished, either as a python `bool` or as a scalar tensor that is still on device.
+        """
+        is_done = None
+        for criteria in self:
+            if isinstance(criteria, MaxLengthCriteria):
+                if criteria._is_done(input_ids.shape[-1]):
+                    return ops.zeros_like(unfinished_sequences), True
+                continue
+            if isinstance(criteria, MaxTimeCriteria):
+                if criteria._is_done():
+                    return ops.zeros_like(unfinished_sequences), True
+                continue
+
+            if isinstance(criteria, StopStringCriteria):
+                criteria_is_done = criteria.advance(input_ids)
+            else:
+                criteria_is_done = ms.Tensor(criteria(input_ids, scores, **kwargs), ms.bool_)
+            is_done = criteria_is_done if is_done is None else ops.logical_or(is_done, criteria_is_done)
+
+        if is_done is None:
+            return unfinished_sequences, False
+        unfinished_sequences = unfinished_sequences & ~is_done
+        return unfinished_sequences, unfinished_sequences.max() == 0
+
     @property
     def max_length(self) -> Optional[int]:
         for stopping_criterium in self:
@@ -18,7 +18,6 @@
 # limitations under the License.
 import copy
 import inspect
-import time
 import warnings
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
@@ -54,7 +53,13 @@ from mindone.transformers.generation.candidate_generator import (
     CandidateGenerator,
     EarlyExitCandidateGenerator,
     PromptLookupCandidateGenerator,
+    PromptLookupTreeCandidateGenerator,
+    TreeCandidateGenerator,
     UniversalSpeculativeDecodingGenerator,
+    _crop_past_key_values,
+    _prepare_attention_mask,
+    _prepare_token_type_ids,
+    _select_tree_path_in_cache,
 )
 from mindone.transformers.generation.logits_process import (
     EncoderNoRepeatNGramLogitsProcessor,
@@ -84,6 +89,7 @@ from mindone.transformers.generation.logits_process import (
     TypicalLogitsWarper,
     UnbatchedClassifierFreeGuidanceLogitsProcessor,
 )
+from mindone.transformers.generation.metrics import GenerationMetrics
 from mindone.transformers.generation.stopping_criteria import (
     ConfidenceCriteria,
     EosTokenCriteria,
@@ -91,7 +97,9 @@ from mindone.transformers.generation.stopping_criteria import (
     MaxTimeCriteria,
     StoppingCriteria,
     StoppingCriteriaList,
+    StopStringCriteria,
 )
+from mindone.transformers.masking_utils import create_tree_attention_mask, tree_ancestor_mask
 from mindone.transformers.mindspore_adapter.paged_attention_block_tables import BlockTables
 from mindone.transformers.mindspore_adapter.select_operator import get_multinomial_op
 
@@ -122,6 +130,11 @@ ALL_CACHE_NAMES = [
     "past_buckets_states",  # reformer
 ]
 
+# Generation options of mindone that are not declared by `transformers.GenerationConfig`, with their default values
+EXTRA_GENERATION_CONFIG_DEFAULTS = {
+    "prompt_lookup_num_branches": None,  # tree-based prompt lookup decoding
+}
+
 
 @dataclass
 class GenerateDecoderOnlyOutput(ModelOutput):
@@ -404,7 +417,9 @@ class GenerationMixin:
             )
             if inputs_embeds is not None and input_ids.shape[1] == 0:  # Exception 4
                 inputs_embeds = inputs_embeds[:, -cache_position.shape[0] :]
-            elif inputs_embeds is not None or cache_position[-1] >= input_ids.shape[1]:  # Exception 1 or # Exception 3
+            elif (
+                inputs_embeds is not None or self._to_host(cache_position[-1]) >= input_ids.shape[1]
+            ):  # Exception 1 or # Exception 3
                 input_ids = input_ids[:, -cache_position.shape[0] :]
             elif input_ids.shape[1] != cache_position.shape[0]:  # Default case (the "else", a no op, is Exception 2)
                 input_ids = input_ids[:, cache_position]
@@ -449,7 +464,8 @@ class GenerationMixin:
                 _past_key_values = past_key_values
                 if (
                     isinstance(past_key_values, (tuple, list))
-                    and get_seq_length(past_key_values, dynamic=self._supports_default_dynamic_input()) == 0
+                    and self._to_host(get_seq_length(past_key_values, dynamic=self._supports_default_dynamic_input()))
+                    == 0
                 ):
                     _past_key_values = None
 
@@ -462,7 +478,7 @@ class GenerationMixin:
                     if self._supports_default_dynamic_input() or attention_mask is None:
                         model_input = model_input[:, -current_input_length:]
                     else:  # static shape input
-                        cur_len = attention_mask.sum(-1).max()
+                        cur_len = int(self._to_host(attention_mask.sum(-1).max()))
                         model_input = model_input[:, cur_len - current_input_length : cur_len]
                     model_input = model_input.clone()
                 model_inputs[model_input_name] = model_input
@@ -886,9 +902,8 @@ class GenerationMixin:
                         [attention_mask, ops.ones((attention_mask.shape[0], 1), dtype=attention_mask.dtype)], axis=-1
                     )
                 else:  # update static attention mask
-                    cur_lens = attention_mask.sum(-1)
-                    for batch_idx in range(attention_mask.shape[0]):
-                        cur_len = int(cur_lens[batch_idx])
+                    cur_lens = self._to_host(attention_mask.sum(-1)).tolist()
+                    for batch_idx, cur_len in enumerate(cur_lens):
                         if cur_len < attention_mask.shape[-1]:
                             attention_mask[batch_idx, cur_len] = 1
                         else:
@@ -914,7 +929,7 @@ class GenerationMixin:
                 and model_kwargs.get("attention_mask", None) is not None
                 and model_kwargs["attention_mask"].shape[-1] == model_kwargs["cache_position"].shape[0]
             ):
-                cur_idx = int(model_kwargs["attention_mask"].sum(-1).max()) - 1
+                cur_idx = int(self._to_host(model_kwargs["attention_mask"].sum(-1).max())) - 1
                 past_idx = cur_idx - 1
                 model_kwargs["cache_position"] = (
                     model_kwargs["cache_position"][past_idx : past_idx + 1] + num_new_tokens
@@ -924,12 +939,12 @@ class GenerationMixin:
         else:
             past_positions = model_kwargs.pop("cache_position")
             if self._supports_default_dynamic_input() or model_kwargs.get("attention_mask", None) is None:
-                cur_idx = int(past_positions[-1]) + 1
+                cur_idx = int(self._to_host(past_positions[-1])) + 1
                 new_positions = mint.arange(cur_idx, cur_idx + num_new_tokens, dtype=past_positions.dtype)
                 model_kwargs["cache_position"] = mint.cat((past_positions, new_positions))
             else:
                 max_len = past_positions.shape[-1]
-                cur_idx = int(model_kwargs["attention_mask"].sum(-1).max()) - 1
+                cur_idx = int(self._to_host(model_kwargs["attention_mask"].sum(-1).max())) - 1
                 new_positions = mint.arange(cur_idx, cur_idx + num_new_tokens, dtype=past_positions.dtype)
                 cache_position = mint.cat((past_positions[:cur_idx], new_positions))
                 if cache_position.shape[-1] < max_len:  # pad to max_len
@@ -971,6 +986,17 @@ class GenerationMixin:
                 inputs_tensor=inputs_tensor,
                 logits_processor=logits_processor,
             )
+        elif (
+            generation_config.prompt_lookup_num_tokens is not None
+            and generation_config.prompt_lookup_num_branches is not None
+        ):
+            candidate_generator = PromptLookupTreeCandidateGenerator(
+                eos_token_id=generation_config._eos_token_tensor,
+                num_output_tokens=generation_config.prompt_lookup_num_tokens,
+                max_matching_ngram_size=generation_config.max_matching_ngram_size,
+                num_branches=generation_config.prompt_lookup_num_branches,
+                max_length=generation_config.max_length,
+            )
         elif generation_config.prompt_lookup_num_tokens is not None:
             candidate_generator = PromptLookupCandidateGenerator(
                 eos_token_id=generation_config._eos_token_tensor,
@@ -1264,8 +1290,7 @@ class GenerationMixin:
                     "model's generation config, but we could not locate a tokenizer. When generating with "
                     "stop strings, you must pass the model's tokenizer to the `tokenizer` argument of `generate`."
                 )
-            # criteria.append(StopStringCriteria(stop_strings=generation_config.stop_strings, tokenizer=tokenizer))
-            raise NotImplementedError
+            criteria.append(StopStringCriteria(stop_strings=generation_config.stop_strings, tokenizer=tokenizer))
         if generation_config._eos_token_tensor is not None:
             criteria.append(EosTokenCriteria(eos_token_id=generation_config._eos_token_tensor))
         if (
@@ -1721,6 +1746,12 @@ class GenerationMixin:
                 if generation_config.decoder_start_token_id is None:
                     generation_config.decoder_start_token_id = self.generation_config.decoder_start_token_id
 
+        # Declare the generation options of mindone that `transformers.GenerationConfig` lacks, so that `update`
+        # applies them instead of returning them as model kwargs
+        for key, default_value in EXTRA_GENERATION_CONFIG_DEFAULTS.items():
+            if not hasattr(generation_config, key):
+                setattr(generation_config, key, default_value)
+
         # Finally, apply any passed kwargs
         model_kwargs = generation_config.update(**kwargs)
 
@@ -1745,6 +1776,7 @@ class GenerationMixin:
                 past_length = get_seq_length(cache, dynamic=self._supports_default_dynamic_input())
             elif hasattr(cache, "get_seq_length") and cache.get_seq_length() is not None:
                 past_length = cache.get_seq_length()
+            past_length = int(self._to_host(past_length))
 
             # [past_length, past_length+1, ..., input_shape-1]
             cache_position = cache_position[past_length:]
@@ -1752,7 +1784,7 @@ class GenerationMixin:
             # for static input, cache fallback to static shape
             if not self._supports_default_dynamic_input() and model_kwargs.get("attention_mask", None) is not None:
                 attention_mask = model_kwargs["attention_mask"]
-                cur_len = int(attention_mask.sum(-1).max())
+                cur_len = int(self._to_host(attention_mask.sum(-1).max()))
                 valid_len = cur_len - past_length
                 max_len = cache_position.shape[0]
                 if valid_len < max_len:
@@ -1944,9 +1976,8 @@ class GenerationMixin:
 
         # Otherwise we NEED to prepare a cache class, based on `generation_config.cache_implementation`
 
-        # TODO(joao): support static caches in assisted generation. assisted generation needs to roll back caches,
-        # which is only supported in dynamic caches atm
-        if assistant_model is not None and generation_config.cache_implementation is not None:
+        # assisted generation needs to roll back caches, which is supported by dynamic caches and by `StaticCache`
+        if assistant_model is not None and generation_config.cache_implementation not in (None, "static", "dynamic"):
             logger.warning_once(
                 "An assistant model is provided, using a dynamic cache instead of a cache of type="
                 f"'{generation_config.cache_implementation}'."
@@ -2099,7 +2130,8 @@ class GenerationMixin:
                 attention_mask = ops.ones(input_ids.shape[:], dtype=ms.bool_)
         else:
             attention_mask = attention_mask.astype(ms.bool_)
-        cur_len = int(attention_mask.sum(-1).max())
+        cur_lens = self._to_host(attention_mask.sum(-1)).tolist()
+        cur_len = max(cur_lens)
 
         if position_ids is None:
             position_ids = ops.arange(0, cur_len, dtype=ms.int32)
@@ -2113,9 +2145,7 @@ class GenerationMixin:
                 dtype=ms.int32,
             )
 
-        for batch_idx, cur_attention_mask in enumerate(attention_mask):
-            cur_len = cur_attention_mask.sum()
-
+        for batch_idx, cur_len in enumerate(cur_lens):
             padded_attention_mask[batch_idx, :cur_len] = attention_mask[batch_idx][:]
             padded_input_ids[batch_idx, : min(cur_len, input_ids[batch_idx].shape[0])] = input_ids[batch_idx][:]
             padded_labels[batch_idx, :cur_len] = labels[batch_idx][:]
@@ -2219,6 +2249,10 @@ class GenerationMixin:
                 Ad hoc parametrization of `generation_config` and/or additional model-specific kwargs that will be
                 forwarded to the `forward` function of the model. If the model is an encoder-decoder model, encoder
                 specific kwargs should not be prefixed and decoder specific kwargs should be prefixed with *decoder_*.
+                A [`~generation.GenerationMetrics`] can be passed as `generation_metrics` to record the latency
+                metrics of sampling and greedy search. Setting `prompt_lookup_num_branches` together with
+                `prompt_lookup_num_tokens` verifies trees of up to `prompt_lookup_num_branches` prompt lookup
+                continuations instead of a single one.
 
         Return:
             [`~utils.ModelOutput`] or `ms.Tensor`: A [`~utils.ModelOutput`] (if `return_dict_in_generate=True`
@@ -2241,6 +2275,7 @@ class GenerationMixin:
         self._validate_model_class()
         tokenizer = kwargs.pop("tokenizer", None)  # Pull this out first, we only use it for stopping criteria
         assistant_tokenizer = kwargs.pop("assistant_tokenizer", None)  # only used for assisted generation
+        generation_metrics = kwargs.pop("generation_metrics", None)  # only used for sampling and greedy search
 
         generation_config, model_kwargs = self._prepare_generation_config(
             generation_config, use_model_defaults, **kwargs
@@ -2332,7 +2367,8 @@ class GenerationMixin:
             input_ids_length=input_ids_length,
         )
 
-        # This lines will always select the last logits, which is not the right way for static shape
+        # This lines will always select the last logits, which is not the right way for static shape. Instead,
+        # `_sample` selects the position to keep at every step.
         # if self._supports_logits_to_keep() and "logits_to_keep" not in model_kwargs:
         #     model_kwargs["logits_to_keep"] = 1
 
@@ -2381,7 +2417,63 @@ class GenerationMixin:
 
         # 10. go into different generation modes
         if generation_mode == GenerationMode.ASSISTED_GENERATION:
-            raise NotImplementedError
+            if generation_config.num_return_sequences > 1:
+                raise ValueError(
+                    "num_return_sequences has to be 1 when doing assisted generate, "
+                    f"but is {generation_config.num_return_sequences}."
+                )
+            if batch_size > 1 and assistant_tokenizer is not None:
+                raise ValueError("assisted generate with different tokenizers is only supported for batch_size = 1")
+            if not model_kwargs["use_cache"]:
+                raise ValueError("assisted generate requires `use_cache=True`")
+            # The states of the rejected candidates are discarded by rolling the cache back. Hybrid and sliding-window
+            # caches overwrite their oldest states once full, and the block tables of paged attention have no rollback.
+            if generation_config.cache_implementation in ["hybrid", "sliding_window"]:
+                raise ValueError("assisted generate is not supported with caches that cannot be rolled back")
+            if self.config._attn_implementation == "paged_attention":
+                raise ValueError("assisted generate is not supported with paged attention")
+            # Static input shapes pad the inputs to `max_length` and decode one position per step, while the number of
+            # accepted candidates varies from step to step.
+            if not self._supports_default_dynamic_input():
+                raise ValueError(
+                    "assisted generate is not supported for models with static input shapes "
+                    "(`_supports_dynamic_input = False`), as the number of accepted tokens varies from step to step"
+                )
+            if getattr(self, "_is_stateful", False):
+                # In assisted generation we need the ability to confirm whether the model would pick certain tokens,
+                # which is not possible with stateful models (they can't reset to a previous subset of generated text)
+                raise ValueError(
+                    f"assisted generation is not supported with stateful models, such as {self.__class__.__name__}"
+                )
+
+            # 11. Get the candidate generator, given the parameterization
+            candidate_generator = self._get_candidate_generator(
+                generation_config=generation_config,
+                input_ids=input_ids,
+                inputs_tensor=inputs_tensor,
+                assistant_model=assistant_model,
+                logits_processor=logits_processor,
+                target_tokenizer=tokenizer,
+                assistant_tokenizer=assistant_tokenizer,
+                model_kwargs=model_kwargs,
+            )
+
+            # 12. run assisted generate
+            decoding_method = (
+                self._tree_assisted_decoding
+                if isinstance(candidate_generator, TreeCandidateGenerator)
+                else self._assisted_decoding
+            )
+            result = decoding_method(
+                input_ids,
+                candidate_generator=candidate_generator,
+                logits_processor=prepared_logits_processor,
+                stopping_criteria=prepared_stopping_criteria,
+                generation_config=generation_config,
+                synced_gpus=synced_gpus,
+                streamer=streamer,
+                **model_kwargs,
+            )
         elif generation_mode == GenerationMode.DOLA_GENERATION:
             raise NotImplementedError
 
@@ -2405,6 +2497,7 @@ class GenerationMixin:
                 generation_config=generation_config,
                 synced_gpus=synced_gpus,
                 streamer=streamer,
+                generation_metrics=generation_metrics,
                 **model_kwargs,
             )
 
@@ -2449,12 +2542,25 @@ class GenerationMixin:
             # send 0.0 if we finished, 1.0 otherwise
             this_peer_finished_flag = ops.AllReduce()(this_peer_finished_flag)
             # did all peers finish? the reduced sum will be 0.0 then
-            if this_peer_finished_flag.item() == 0.0:
+            if self._to_host(this_peer_finished_flag) == 0.0:
                 return False
-        elif this_peer_finished:
+        elif self._to_host(this_peer_finished):
             return False
         return True
 
+    def _to_host(self, value):
+        """
+        Reads a tensor back to the host as a numpy array, which waits for the device to complete the queued operations.
+        The read is counted in the host synchronizations of the `GenerationMetrics` of the running generation, if any.
+        Values that are not tensors are returned as is.
+        """
+        if not isinstance(value, ms.Tensor):
+            return value
+        generation_metrics = getattr(self, "_generation_metrics", None)
+        if generation_metrics is not None:
+            generation_metrics.on_host_sync()
+        return value.asnumpy()
+
     def heal_tokens(self, input_ids: ms.Tensor, tokenizer: Optional["PreTrainedTokenizerBase"] = None) -> ms.Tensor:
         r"""
         Generates sequences of token ids for models with a language modeling head.
@@ -2534,6 +2640,7 @@ class GenerationMixin:
         generation_config: GenerationConfig,
         synced_gpus: bool,
         streamer: Optional["BaseStreamer"],
+        generation_metrics: Optional[GenerationMetrics] = None,
         **model_kwargs,
     ) -> Union[GenerateNonBeamOutput, ms.Tensor]:
         r"""
@@ -2556,6 +2663,8 @@ class GenerationMixin:
             streamer (`BaseStreamer`, *optional*):
                 Streamer object that will be used to stream the generated sequences. Generated tokens are passed
                 through `streamer.put(token_ids)` and the streamer is responsible for any further processing.
+            generation_metrics (`GenerationMetrics`, *optional*):
+                Recorder of the latency, host synchronization, cache and compilation metrics of the generation.
             model_kwargs:
                 Additional model specific kwargs will be forwarded to the `forward` function of the model. If model is
                 an encoder-decoder model the kwargs should include `encoder_outputs`.
@@ -2592,6 +2701,15 @@ class GenerationMixin:
                 model_kwargs["encoder_outputs"].get("hidden_states") if output_hidden_states else None
             )
 
+        if generation_metrics is not None:
+            generation_metrics.on_generate_start(
+                batch_size=input_ids.shape[0], prompt_length=input_ids.shape[1], max_length=generation_config.max_length
+            )
+        # the host synchronizations are recorded where the device values are read, by `_to_host`
+        self._generation_metrics = generation_metrics
+        # the cache is preallocated to `max_length` with static input shape
+        cache_capacity = None if self._supports_default_dynamic_input() else generation_config.max_length
+
         # Padding inputs to avoid dynamic shape
         if not self._supports_default_dynamic_input():
             (
@@ -2617,16 +2735,27 @@ class GenerationMixin:
             if model_kwargs.get("position_ids", None) is not None:
                 model_kwargs["position_ids"] = padded_position_ids
 
+        # With static input shape, the generated tokens are written in place into the padded `(batch_size, max_length)`
+        # input ids, and only the logits of the position being decoded are projected through the LM head: the full
+        # `(batch_size, max_length, vocab_size)` logits would otherwise be computed at the prefill step, and at every
+        # step without cache.
+        static_input_ids = None if self._supports_default_dynamic_input() else input_ids
+        keep_decoded_logits_only = (
+            static_input_ids is not None
+            and model_kwargs.get("attention_mask", None) is not None
+            and self._supports_logits_to_keep()
+            and "logits_to_keep" not in model_kwargs
+        )
+
         # keep track of which sequences are already finished
         batch_size, cur_len = input_ids.shape
         this_peer_finished = False
         unfinished_sequences = ops.ones(batch_size, dtype=ms.int32)
+        stopping_criteria.reset()
         model_kwargs = self._get_initial_cache_position(input_ids, model_kwargs)
 
         multinomial = get_multinomial_op()
         step = 0
-        s_time = time.time()
-        graph_compiled_time_buffer = []
 
         while self._has_unfinished_sequences(this_peer_finished, synced_gpus):
             # prepare model inputs
@@ -2644,6 +2773,17 @@ class GenerationMixin:
             model_inputs.update({"output_attentions": output_attentions})
             model_inputs.update({"output_hidden_states": output_hidden_states})
 
+            if static_input_ids is not None and model_kwargs.get("attention_mask", None) is not None:
+                attention_mask = model_kwargs["attention_mask"]
+                cur_idx = int(self._to_host(attention_mask.sum(-1).max())) - 1
+                if keep_decoded_logits_only:
+                    # a tensor index keeps the same signature at every step, so that graph mode compiles only once
+                    model_input = model_inputs.get("input_ids")
+                    if model_input is None:
+                        model_input = model_inputs["inputs_embeds"]
+                    keep_idx = cur_idx if model_input.shape[1] == attention_mask.shape[-1] else model_input.shape[1] - 1
+                    model_inputs["logits_to_keep"] = ms.tensor([keep_idx], dtype=ms.int32)
+
             # forward pass to get next token
             outputs = self(
                 **model_inputs,
@@ -2659,9 +2799,6 @@ class GenerationMixin:
             if self._supports_default_dynamic_input() or model_kwargs.get("attention_mask", None) is None:
                 next_token_logits = outputs.logits[:, -1, :]
             else:  # Get the right logits from static input shape
-                attention_mask = model_kwargs["attention_mask"]
-                cur_idx = int(attention_mask.sum(-1).max()) - 1
-
                 if outputs.logits.shape[1] == attention_mask.shape[-1]:
                     next_token_logits = outputs.logits[:, cur_idx, :]  # (bs, seq, dim)
                 else:
@@ -2680,16 +2817,6 @@ class GenerationMixin:
             if synced_gpus and this_peer_finished:
                 continue
 
-            step_time = time.time() - s_time
-            if step < 2:
-                print(f"==> sampling, step: {step}, time cost: {step_time:.5f}s")
-            else:
-                graph_compiled_time_buffer.append(step_time)
-                token_speed = len(graph_compiled_time_buffer) / sum(graph_compiled_time_buffer)
-                print(
-                    f"==> sampling, step: {step}, time cost: {step_time:.5f}s, running avg speed: {token_speed:.5f}token/s"
-                )
-            s_time = time.time()
             step += 1
 
             # pre-process distribution
@@ -2726,20 +2853,33 @@ class GenerationMixin:
             next_tokens = next_tokens.to(ms.int32)
 
             # update generated ids, model inputs, and length for next step
-            input_ids = ops.cat([input_ids, next_tokens[:, None]], axis=-1)
+            if static_input_ids is not None and input_ids.shape[1] < static_input_ids.shape[1]:
+                static_input_ids[:, input_ids.shape[1]] = next_tokens
+                input_ids = static_input_ids[:, : input_ids.shape[1] + 1]
+            else:
+                input_ids = ops.cat([input_ids, next_tokens[:, None]], axis=-1)
             if streamer is not None:
-                streamer.put(next_tokens.asnumpy())
+                streamer.put(self._to_host(next_tokens))
 
-            unfinished_sequences = unfinished_sequences & ~ms.Tensor(stopping_criteria(input_ids, scores), ms.bool_)
-            this_peer_finished = unfinished_sequences.max() == 0
+            unfinished_sequences, this_peer_finished = stopping_criteria.update_unfinished_sequences(
+                input_ids, scores, unfinished_sequences
+            )
             cur_len += 1
 
+            if generation_metrics is not None:
+                generation_metrics.on_step_end(
+                    model_inputs=model_inputs, cache_length=input_ids.shape[1], cache_capacity=cache_capacity
+                )
+
             # This is needed to properly delete outputs.logits which may be very large for first iteration
             # Otherwise a reference to outputs is kept which keeps the logits alive in the next iteration
             del outputs
 
         if streamer is not None:
             streamer.end()
+        self._generation_metrics = None
+        if generation_metrics is not None:
+            generation_metrics.on_generate_end()
 
         if return_dict_in_generate:
             if self.config.is_encoder_decoder:
@@ -2766,6 +2906,509 @@ class GenerationMixin:
         else:
             return input_ids
 
+    def _assisted_decoding(
+        self,
+        input_ids: ms.Tensor,
+        candidate_generator: CandidateGenerator,
+        logits_processor: LogitsProcessorList,
+        stopping_criteria: StoppingCriteriaList,
+        generation_config: GenerationConfig,
+        synced_gpus: bool,
+        streamer: Optional["BaseStreamer"],
+        **model_kwargs,
+    ) -> Union[GenerateNonBeamOutput, ms.Tensor]:
+        r"""
+        Generates sequences of token ids for models with a language modeling head using **greedy decoding** or
+        **sample** (depending on `do_sample`), assisted by candidate sequences. Assisted generation is an example of a
+        candidate decoding strategy. Can be used for text-decoder, text-to-text, speech-to-text, and vision-to-text
+        models.
+
+        The candidates of the whole batch are verified with a single forward pass of the model. All the sequences
+        advance by the number of candidate tokens accepted by every unfinished sequence, plus one token selected by
+        the model, and the cache is rolled back past the rejected tokens (for a `StaticCache`, by moving its sequence
+        length back, the stale states being masked out and then overwritten). Since the batch advances together, a
+        single unfinished sequence rejecting its first candidate token, e.g. a sequence without any prompt lookup match
+        whose candidates are filler tokens, reduces the step to a greedy/sample step for the whole batch: batches of
+        similar sequences, or a batch size of 1, get the largest speedups.
+
+        Only models with dynamic input shapes are supported, with a dynamic cache or a `StaticCache`: models with static
+        input shapes (`_supports_dynamic_input = False`, e.g. in graph mode) pad their inputs to `max_length` and
+        decode a single position per step, while the number of accepted tokens varies from step to step. Paged
+        attention, hybrid and sliding-window caches cannot be rolled back and are not supported either.
+
+        Parameters:
+            input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
+                The sequence used as a prompt for the generation.
+            candidate_generator (`CandidateGenerator`):
+                A derived instance of [`CandidateGenerator`] that defines how candidate sequences are generated. For
+                more information, the documentation of [`CandidateGenerator`] should be read.
+            logits_processor (`LogitsProcessorList`):
+                An instance of [`LogitsProcessorList`]. List of instances of class derived from [`LogitsProcessor`]
+                used to modify the prediction scores of the language modeling head applied at each generation step.
+            stopping_criteria (`StoppingCriteriaList`):
+                An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+                used to tell if the generation loop should stop.
+            generation_config ([`~generation.GenerationConfig`]):
+                The generation configuration to be used as parametrization of the decoding method.
+            synced_gpus (`bool`):
+                Whether to continue running the while loop until max_length (needed for ZeRO stage 3)
+            streamer (`BaseStreamer`, *optional*):
+                Streamer object that will be used to stream the generated sequences. Generated tokens are passed
+                through `streamer.put(token_ids)` and the streamer is responsible for any further processing.
+            model_kwargs:
+                Additional model specific keyword arguments will be forwarded to the `forward` function of the model.
+                If model is an encoder-decoder model the kwargs should include `encoder_outputs`.
+
+        Return:
+            [`~generation.GenerateDecoderOnlyOutput`], [`~generation.GenerateEncoderDecoderOutput`] or `ms.Tensor`:
+            A `ms.Tensor` containing the generated tokens (default behaviour) or a
+            [`~generation.GenerateDecoderOnlyOutput`] if `model.config.is_encoder_decoder=False` and
+            `return_dict_in_generate=True` or a [`~generation.GenerateEncoderDecoderOutput`] if
+            `model.config.is_encoder_decoder=True`.
+        """
+        # init values
+        pad_token_id = generation_config._pad_token_tensor
+        eos_token_id = generation_config._eos_token_tensor
+        do_sample = generation_config.do_sample
+        output_attentions = generation_config.output_attentions
+        output_hidden_states = generation_config.output_hidden_states
+        output_scores = generation_config.output_scores
+        output_logits = generation_config.output_logits
+        return_dict_in_generate = generation_config.return_dict_in_generate
+        has_eos_stopping_criteria = any(hasattr(criteria, "eos_token_id") for criteria in stopping_criteria)
+
+        # init attention / hidden states / scores tuples
+        scores = () if (return_dict_in_generate and output_scores) else None
+        raw_logits = () if (return_dict_in_generate and output_logits) else None
+        decoder_attentions = () if (return_dict_in_generate and output_attentions) else None
+        cross_attentions = () if (return_dict_in_generate and output_attentions) else None
+        decoder_hidden_states = () if (return_dict_in_generate and output_hidden_states) else None
+
+        # if model is an encoder-decoder, retrieve encoder attention weights and hidden states
+        if return_dict_in_generate and self.config.is_encoder_decoder:
+            encoder_attentions = model_kwargs["encoder_outputs"].get("attentions") if output_attentions else None
+            encoder_hidden_states = (
+                model_kwargs["encoder_outputs"].get("hidden_states") if output_hidden_states else None
+            )
+
+        # keep track of which sequences are already finished
+        batch_size = input_ids.shape[0]
+        unfinished_sequences = ops.ones(batch_size, dtype=ms.int32)
+        model_kwargs = self._get_initial_cache_position(input_ids, model_kwargs)
+
+        multinomial = get_multinomial_op()
+        this_peer_finished = False
+        is_first_iteration = True  # to preserve the same API in the output as other generation methods
+        while self._has_unfinished_sequences(this_peer_finished, synced_gpus):
+            if input_ids.dtype == ms.int64:
+                input_ids = input_ids.to(ms.int32)
+            cur_len = input_ids.shape[-1]
+
+            #  1. Fetch candidate sequences from a `CandidateGenerator`
+            candidate_input_ids, candidate_logits = candidate_generator.get_candidates(input_ids)
+            candidate_input_ids = candidate_input_ids.to(input_ids.dtype)
+
+            candidate_length = candidate_input_ids.shape[1] - input_ids.shape[1]
+            is_done_candidate = stopping_criteria(candidate_input_ids, None)
+
+            # 2. Use the original model to obtain the next token logits given the candidate sequence. We obtain
+            # `candidate_length + 1` relevant logits from this process: in the event that all candidates are correct,
+            # we use this forward pass to also pick the subsequent logits in the original model.
+
+            # 2.1. Prepare the model inputs
+            candidate_kwargs = copy.copy(model_kwargs)
+            candidate_kwargs = _prepare_attention_mask(
+                candidate_kwargs, candidate_input_ids.shape[1], self.config.is_encoder_decoder
+            )
+            candidate_kwargs = _prepare_token_type_ids(candidate_kwargs, candidate_input_ids.shape[1])
+            if "cache_position" in candidate_kwargs:
+                candidate_kwargs["cache_position"] = ops.cat(
+                    (
+                        candidate_kwargs["cache_position"],
+                        ops.arange(cur_len, cur_len + candidate_length, dtype=candidate_kwargs["cache_position"].dtype),
+                    ),
+                    axis=0,
+                )
+
+            model_inputs = self.prepare_inputs_for_generation(candidate_input_ids, **candidate_kwargs)
+            if "logits_to_keep" in model_inputs:
+                model_inputs["logits_to_keep"] = candidate_length + 1
+
+            # 2.2. Run a forward pass on the candidate sequence of the whole batch
+            # prepare variable output controls (note: some models won't accept all output controls)
+            model_inputs.update({"output_attentions": output_attentions} if output_attentions else {})
+            model_inputs.update({"output_hidden_states": output_hidden_states} if output_hidden_states else {})
+
+            outputs = self(**model_inputs, return_dict=True)
+
+            # 2.3. Process the new logits
+            # .float() is needed to retain precision for later logits manipulations
+            new_logits = outputs.logits[:, -candidate_length - 1 :].float()  # excludes the input prompt if present
+            next_token_logits = new_logits
+            if len(logits_processor) > 0:
+                new_logits = ops.stack(
+                    [
+                        logits_processor(candidate_input_ids[:, : cur_len + i], new_logits[:, i, :])
+                        for i in range(candidate_length + 1)
+                    ],
+                    axis=1,
+                )
+
+            # 3. Select the accepted tokens. There are two possible cases:
+            # Case 1: `do_sample=True` and we have logits for the candidates (originally from speculative decoding)
+            # 👉 Apply algorithm 1 from the speculative decoding paper (https://arxiv.org/pdf/2211.17192.pdf).
+            if do_sample and candidate_logits is not None:
+                valid_tokens, n_matches = _speculative_sampling(
+                    candidate_input_ids,
+                    candidate_logits,
+                    candidate_length,
+                    new_logits,
+                    is_done_candidate,
+                    unfinished_sequences,
+                )
+
+            # Case 2: all other cases (originally from assisted generation) 👉 Compare the tokens selected from the
+            # original model logits with the candidate tokens. We can keep the candidate tokens until the first
+            # mismatch, or until the max length is reached.
+            else:
+                if do_sample:
+                    probs = ops.softmax(new_logits, axis=-1)
+                    selected_tokens = multinomial(probs.reshape(-1, probs.shape[-1]), num_samples=1)
+                    selected_tokens = selected_tokens.reshape(batch_size, candidate_length + 1)
+                else:
+                    selected_tokens = new_logits.argmax(-1)
+                selected_tokens = selected_tokens.to(input_ids.dtype)
+
+                if candidate_length > 0:
+                    candidate_new_tokens = candidate_input_ids[:, cur_len:]
+                    row_matches = (candidate_new_tokens != selected_tokens[:, :-1]).astype(ms.int32).cumsum(-1) < 1
+                    n_matches = _min_unfinished_matches(row_matches.sum(-1), unfinished_sequences, candidate_length)
+                else:
+                    n_matches = 0
+
+                # Ensure we don't generate beyond max_len or an EOS token
+                if n_matches == candidate_length and candidate_length > 0 and bool(is_done_candidate.any()):
+                    n_matches -= 1
+                # the sequences that accepted more candidates selected the same tokens as the candidates
+                valid_tokens = selected_tokens[:, : n_matches + 1]
+
+            # 4. Update variables according to the number of matching assistant tokens. Remember: the token generated
+            # by the model after the last candidate match is also valid, as it is generated from a correct sequence.
+            # Because of this last token, assisted generation search reduces to a normal greedy search/sample if there
+            # is no match.
+
+            # 4.1. Get the valid continuation, after the matching tokens. Finished sequences, and the tokens following
+            # an eos token accepted in this step, are padded
+            if has_eos_stopping_criteria:
+                is_eos = mnp.isin(valid_tokens, eos_token_id)
+                after_eos = (is_eos.astype(ms.int32).cumsum(-1) - is_eos.astype(ms.int32)) > 0
+                is_pad = after_eos | (unfinished_sequences[:, None] == 0)
+                valid_tokens = ops.where(is_pad, pad_token_id.to(valid_tokens.dtype), valid_tokens)
+                unfinished_sequences = unfinished_sequences & ~is_eos.any(-1)
+            input_ids = ops.cat((input_ids, valid_tokens), axis=-1)
+            if streamer is not None:
+                streamer.put(valid_tokens.asnumpy())
+            new_cur_len = input_ids.shape[-1]
+
+            # 4.2. Discard past key values relative to unused assistant tokens
+            new_cache_size = new_cur_len - 1
+            outputs.past_key_values = _crop_past_key_values(self, outputs.past_key_values, new_cache_size)
+
+            # 5. Update the candidate generation strategy if needed
+            candidate_generator.update_candidate_strategy(input_ids, new_logits, n_matches)
+
+            # synced_gpus: don't waste resources running the code we don't need; kwargs must be updated before skipping
+            model_kwargs = self._update_model_kwargs_for_generation(
+                outputs,
+                model_kwargs,
+                is_encoder_decoder=self.config.is_encoder_decoder,
+                num_new_tokens=n_matches + 1,
+            )
+            if synced_gpus and this_peer_finished:
+                continue
+
+            # Store scores, attentions and hidden_states when required
+            # Assistant: modified to append one tuple element per token, as in the other generation methods.
+            if return_dict_in_generate:
+                newly_added_length = n_matches + 1
+                if output_scores:
+                    scores += tuple(new_logits[:, i, :] for i in range(newly_added_length))
+                if output_logits:
+                    raw_logits += tuple(next_token_logits[:, i, :] for i in range(newly_added_length))
+
+                newly_added_length = new_cur_len if is_first_iteration else newly_added_length
+                if output_attentions:
+                    if self.config.is_encoder_decoder:
+                        cross_attentions = _split_model_outputs(
+                            cross_attentions, outputs.cross_attentions, cur_len, newly_added_length
+                        )
+                        decoder_attentions = _split_model_outputs(
+                            decoder_attentions,
+                            outputs.decoder_attentions,
+                            cur_len,
+                            newly_added_length,
+                            is_decoder_attention=True,
+                        )
+                    # some (V)LLMs have hard requirement on SDPA and thus never return attn
+                    elif outputs.attentions[0] is not None:
+                        decoder_attentions = _split_model_outputs(
+                            decoder_attentions,
+                            outputs.attentions,
+                            cur_len,
+                            newly_added_length,
+                            is_decoder_attention=True,
+                        )
+                if output_hidden_states:
+                    if self.config.is_encoder_decoder:
+                        decoder_hidden_states = _split_model_outputs(
+                            decoder_hidden_states, outputs.decoder_hidden_states, cur_len, newly_added_length
+                        )
+                    else:
+                        decoder_hidden_states = _split_model_outputs(
+                            decoder_hidden_states, outputs.hidden_states, cur_len, newly_added_length
+                        )
+
+            unfinished_sequences = unfinished_sequences & ~stopping_criteria(input_ids, scores)
+            this_peer_finished = unfinished_sequences.max() == 0
+            is_first_iteration = False
+
+        if streamer is not None:
+            streamer.end()
+
+        if (
+            hasattr(candidate_generator, "assistant_model")
+            and candidate_generator.assistant_model.generation_config.num_assistant_tokens_schedule == "heuristic"
+        ):
+            candidate_generator.assistant_model.generation_config.num_assistant_tokens = (
+                candidate_generator.num_assistant_tokens
+            )
+        if return_dict_in_generate:
+            if self.config.is_encoder_decoder:
+                return GenerateEncoderDecoderOutput(
+                    sequences=input_ids,
+                    scores=scores,
+                    logits=raw_logits,
+                    encoder_attentions=encoder_attentions,
+                    encoder_hidden_states=encoder_hidden_states,
+                    decoder_attentions=decoder_attentions,
+                    cross_attentions=cross_attentions,
+                    decoder_hidden_states=decoder_hidden_states,
+                    past_key_values=model_kwargs.get("past_key_values"),
+                )
+            else:
+                return GenerateDecoderOnlyOutput(
+                    sequences=input_ids,
+                    scores=scores,
+                    logits=raw_logits,
+                    attentions=decoder_attentions,
+                    hidden_states=decoder_hidden_states,
+                    past_key_values=model_kwargs.get("past_key_values"),
+                )
+        else:
+            return input_ids
+
+    def _tree_assisted_decoding(
+        self,
+        input_ids: ms.Tensor,
+        candidate_generator: TreeCandidateGenerator,
+        logits_processor: LogitsProcessorList,
+        stopping_criteria: StoppingCriteriaList,
+        generation_config: GenerationConfig,
+        synced_gpus: bool,
+        streamer: Optional["BaseStreamer"],
+        **model_kwargs,
+    ) -> Union[GenerateNonBeamOutput, ms.Tensor]:
+        r"""
+        Generates sequences of token ids for models with a language modeling head using **greedy decoding**, assisted
+        by trees of candidate tokens proposed by a [`TreeCandidateGenerator`]. The trees of the whole batch are
+        verified in a single forward pass through a tree attention mask, the longest path of each tree agreeing with
+        the model is accepted, and its states are moved next to the previous tokens in the cache. The outputs are the
+        ones of greedy decoding.
+
+        Parameters:
+            input_ids (`ms.Tensor` of shape `(batch_size, sequence_length)`):
+                The sequence used as a prompt for the generation.
+            candidate_generator (`TreeCandidateGenerator`):
+                A derived instance of [`TreeCandidateGenerator`] that defines how candidate trees are generated.
+            logits_processor (`LogitsProcessorList`):
+                An instance of [`LogitsProcessorList`]. It must be empty, as the tokens of the tree do not share a
+                common context.
+            stopping_criteria (`StoppingCriteriaList`):
+                An instance of [`StoppingCriteriaList`]. List of instances of class derived from [`StoppingCriteria`]
+                used to tell if the generation loop should stop.
+            generation_config ([`~generation.GenerationConfig`]):
+                The generation configuration to be used as parametrization of the decoding method.
+            synced_gpus (`bool`):
+                Whether to continue running the while loop until max_length (needed for ZeRO stage 3)
+            streamer (`BaseStreamer`, *optional*):
+                Streamer object that will be used to stream the generated sequences. Generated tokens are passed
+                through `streamer.put(token_ids)` and the streamer is responsible for any further processing.
+            model_kwargs:
+                Additional model specific keyword arguments will be forwarded to the `forward` function of the model.
+
+        Return:
+            [`~generation.GenerateDecoderOnlyOutput`] or `ms.Tensor`: A `ms.Tensor` containing the generated tokens
+            (default behaviour) or a [`~generation.GenerateDecoderOnlyOutput`] if `return_dict_in_generate=True`.
+        """
+        if generation_config.do_sample:
+            raise ValueError("Tree-based assisted generation only supports greedy decoding, set `do_sample=False`.")
+        if len(logits_processor) > 0:
+            raise ValueError(
+                "Tree-based assisted generation does not support logits processors, as the draft tokens of a tree do "
+                f"not share a common context. Got {logits_processor}."
+            )
+        if self.config.is_encoder_decoder:
+            raise ValueError("Tree-based assisted generation is only supported for decoder-only models.")
+
+        # init values
+        pad_token_id = generation_config._pad_token_tensor
+        eos_token_id = generation_config._eos_token_tensor
+        output_scores = generation_config.output_scores
+        output_logits = generation_config.output_logits
+        return_dict_in_generate = generation_config.return_dict_in_generate
+        has_eos_stopping_criteria = any(hasattr(criteria, "eos_token_id") for criteria in stopping_criteria)
+
+        # init scores tuples
+        scores = () if (return_dict_in_generate and output_scores) else None
+        raw_logits = () if (return_dict_in_generate and output_logits) else None
+
+        # keep track of which sequences are already finished
+        batch_size = input_ids.shape[0]
+        unfinished_sequences = ops.ones(batch_size, dtype=ms.int32)
+        model_kwargs = self._get_initial_cache_position(input_ids, model_kwargs)
+
+        # the trees are verified against a cache holding all the tokens but the root, so the prompt is prefilled
+        # without its last token
+        if model_kwargs["cache_position"].shape[0] > 1:
+            prefill_kwargs = copy.copy(model_kwargs)
+            prefill_kwargs["cache_position"] = model_kwargs["cache_position"][:-1]
+            prefill_kwargs = _prepare_attention_mask(prefill_kwargs, input_ids.shape[1] - 1, False)
+            model_inputs = self.prepare_inputs_for_generation(input_ids[:, :-1], **prefill_kwargs)
+            model_kwargs["past_key_values"] = self(**model_inputs, return_dict=True).past_key_values
+
+        this_peer_finished = False
+        while self._has_unfinished_sequences(this_peer_finished, synced_gpus):
+            if input_ids.dtype == ms.int64:
+                input_ids = input_ids.to(ms.int32)
+            cur_len = input_ids.shape[-1]
+
+            # 1. Fetch candidate trees. The root of the trees is the last token, which is not cached yet
+            candidate_input_ids, tree_parents = candidate_generator.get_candidates(input_ids)
+            candidate_input_ids = candidate_input_ids.to(input_ids.dtype)
+            num_nodes = tree_parents.shape[1]
+            past_length = cur_len - 1
+            tree_ancestors = tree_ancestor_mask(tree_parents)
+            tree_depths = tree_ancestors.astype(ms.int32).sum(-1).to(ms.int32) - 1  # (batch_size, num_nodes + 1)
+
+            # 2. Verify the trees with a single forward pass: the nodes attend to the cached tokens and to their
+            # ancestors, and are positioned at their depth in the tree
+            tree_kwargs = copy.copy(model_kwargs)
+            tree_kwargs = _prepare_attention_mask(tree_kwargs, candidate_input_ids.shape[1], False)
+            past_key_values = tree_kwargs.get("past_key_values")
+            kv_length = cur_len + num_nodes
+            if isinstance(past_key_values, Cache) and past_key_values.get_max_length() is not None:
+                kv_length = past_key_values.get_max_length()
+            # the position of the root skips the left padding
+            root_positions = ms.tensor([[past_length]], dtype=ms.int32)
+            if tree_kwargs.get("attention_mask") is not None:
+                root_positions = tree_kwargs["attention_mask"][:, :cur_len].sum(-1).to(ms.int32)[:, None] - 1
+            tree_kwargs["attention_mask"] = create_tree_attention_mask(
+                tree_ancestors,
+                past_length=past_length,
+                kv_length=kv_length,
+                attention_mask=tree_kwargs.get("attention_mask"),
+                dtype=self.dtype,
+            )
+            tree_kwargs["position_ids"] = root_positions + tree_depths
+            tree_kwargs["cache_position"] = ops.arange(past_length, cur_len + num_nodes, dtype=ms.int32)
+
+            model_inputs = self.prepare_inputs_for_generation(candidate_input_ids, **tree_kwargs)
+            if "logits_to_keep" in model_inputs:
+                model_inputs["logits_to_keep"] = num_nodes + 1
+            outputs = self(**model_inputs, return_dict=True)
+            new_logits = outputs.logits[:, -num_nodes - 1 :].float()  # (batch_size, num_nodes + 1, vocab_size)
+
+            # 3. Select the longest path of each tree agreeing with the model: a node is correct when its token is
+            # the one selected at its parent, and all its ancestors are correct
+            selected_tokens = new_logits.argmax(-1).to(input_ids.dtype)
+            tree_tokens = candidate_input_ids[:, past_length:]  # the root, then the nodes
+            parents = ops.cat([ops.zeros((batch_size, 1), dtype=ms.int32), tree_parents.to(ms.int32) + 1], axis=1)
+            matches = tree_tokens == ops.gather_elements(selected_tokens, 1, parents)
+            matches = ops.cat([ops.ones((batch_size, 1), dtype=ms.bool_), matches[:, 1:]], axis=1)
+            is_correct = ~(tree_ancestors & ~matches[:, None, :]).any(-1)
+            accepted_depths = ops.where(is_correct, tree_depths, -1)
+            best_nodes = accepted_depths.argmax(-1)
+            # the sequences advance together, by the depth accepted by all the unfinished sequences
+            n_matches = _min_unfinished_matches(accepted_depths.max(axis=-1), unfinished_sequences, num_nodes)
+
+            # the path from the root to the accepted node, truncated at the common depth
+            on_path = ops.gather_elements(
+                tree_ancestors, 1, best_nodes[:, None, None].broadcast_to((batch_size, 1, num_nodes + 1))
+            )
+            at_depth = tree_depths[:, None, :] == ops.arange(n_matches + 1, dtype=ms.int32)[None, :, None]
+            path = (on_path & at_depth).astype(ms.int32).argmax(-1)  # (batch_size, n_matches + 1), the root first
+            valid_tokens = ops.cat(
+                [
+                    ops.gather_elements(tree_tokens, 1, path[:, 1:]),
+                    ops.gather_elements(selected_tokens, 1, path[:, -1:]),
+                ],
+                axis=-1,
+            )
+
+            # 4. Update the sequences. Finished sequences, and the tokens following an eos token accepted in this
+            # step, are padded
+            if has_eos_stopping_criteria:
+                is_eos = mnp.isin(valid_tokens, eos_token_id)
+                after_eos = (is_eos.astype(ms.int32).cumsum(-1) - is_eos.astype(ms.int32)) > 0
+                is_pad = after_eos | (unfinished_sequences[:, None] == 0)
+                valid_tokens = ops.where(is_pad, pad_token_id.to(valid_tokens.dtype), valid_tokens)
+                unfinished_sequences = unfinished_sequences & ~is_eos.any(-1)
+            input_ids = ops.cat((input_ids, valid_tokens), axis=-1)
+            if streamer is not None:
+                streamer.put(valid_tokens.asnumpy())
+
+            # 5. Keep the states of the accepted path in the cache, right after the root
+            outputs.past_key_values = _select_tree_path_in_cache(
+                self, outputs.past_key_values, past_length, path[:, 1:]
+            )
+            candidate_generator.update_candidate_strategy(input_ids, new_logits, n_matches)
+
+            # synced_gpus: don't waste resources running the code we don't need; kwargs must be updated before skipping
+            model_kwargs = self._update_model_kwargs_for_generation(
+                outputs,
+                model_kwargs,
+                is_encoder_decoder=self.config.is_encoder_decoder,
+                num_new_tokens=n_matches + 1,
+            )
+            if synced_gpus and this_peer_finished:
+                continue
+
+            if return_dict_in_generate and (output_scores or output_logits):
+                # without logits processors, the scores are the logits
+                index = path[:, :, None].broadcast_to((batch_size, n_matches + 1, new_logits.shape[-1]))
+                path_logits = ops.gather_elements(new_logits, 1, index)
+                path_logits = tuple(path_logits[:, i, :] for i in range(n_matches + 1))
+                if output_scores:
+                    scores += path_logits
+                if output_logits:
+                    raw_logits += path_logits
+
+            unfinished_sequences = unfinished_sequences & ~stopping_criteria(input_ids, scores)
+            this_peer_finished = unfinished_sequences.max() == 0
+
+        if streamer is not None:
+            streamer.end()
+
+        if return_dict_in_generate:
+            return GenerateDecoderOnlyOutput(
+                sequences=input_ids,
+                scores=scores,
+                logits=raw_logits,
+                past_key_values=model_kwargs.get("past_key_values"),
+            )
+        else:
+            return input_ids
+
     # Auxiliary functions for beam search
     def _temporary_reorder_cache(self, past_key_values, beam_idx):
         """
@@ -3300,3 +3943,99 @@ class GenerationMixin:
                 )
         else:
             return sequences
+
+
+def _min_unfinished_matches(num_matches: ms.Tensor, unfinished_sequences: ms.Tensor, candidate_length: int) -> int:
+    """
+    Returns the number of candidate tokens accepted by all the unfinished sequences of the batch, so that the
+    sequences advance together. This is the only host synchronization of a verification step.
+    """
+    num_matches = ops.where(unfinished_sequences.bool(), num_matches, candidate_length)
+    return int(num_matches.min())
+
+
+def _speculative_sampling(
+    candidate_input_ids,
+    candidate_logits,
+    candidate_length,
+    new_logits,
+    is_done_candidate,
+    unfinished_sequences,
+):
+    """
+    Applies sampling as in the speculative decoding paper (https://arxiv.org/pdf/2211.17192.pdf, algorithm 1). Returns
+    the selected tokens, as well as the number of candidate matches.
+
+    The tokens are accepted row by row, and the batch advances by the number of tokens accepted by all its unfinished
+    sequences: at the first position rejected by some sequence, the sequences that accepted it keep the candidate token
+    and the others sample from the adjusted distribution.
+
+    NOTE: Unless otherwise stated, the variable names match those in the paper.
+    """
+    new_candidate_input_ids = candidate_input_ids[:, -candidate_length:]
+    # Gets the probabilities from the logits. q_i and p_i denote the assistant and model probabilities of the tokens
+    # selected by the assistant, respectively.
+    q = ops.softmax(candidate_logits, axis=-1)
+    q_i = ops.gather_elements(q, 2, new_candidate_input_ids[..., None]).squeeze(-1)
+    p = ops.softmax(new_logits, axis=-1)
+    p_i = ops.gather_elements(p[:, :candidate_length], 2, new_candidate_input_ids[..., None]).squeeze(-1)
+    probability_ratio = p_i / q_i
+
+    # When probability_ratio > 1 (i.e. q_i(x) < p_i(x), or "assistant probability of the candidate token is smaller
+    # than the model probability for the same token"), keep the token. Otherwise reject with p = 1 - probability_ratio
+    # (= keep with p = probability_ratio). Keep all the tokens until the first rejection
+    r_i = ops.rand_like(probability_ratio)
+    is_accepted = r_i <= probability_ratio
+    row_matches = ((~is_accepted).astype(ms.int32).cumsum(-1) < 1).sum(-1)  # this is `n` in algorithm 1
+    n_matches = _min_unfinished_matches(row_matches, unfinished_sequences, candidate_length)
+
+    # Ensure we don't generate beyond max_len or an EOS token (not in algorithm 1, but needed for correct behavior)
+    if n_matches == candidate_length and bool(is_done_candidate.any()):
+        # Output length is assumed to be `n_matches + 1`. Since we won't generate another token with the target model
+        # due to acceptance on EOS we fix `n_matches`
+        n_matches -= 1
+        valid_tokens = new_candidate_input_ids[:, : n_matches + 1]
+    else:
+        # Next token selection: if there is a rejection, adjust the distribution from the main model before sampling.
+        gamma = candidate_logits.shape[1]
+        p_n_plus_1 = p[:, n_matches, :]
+        if n_matches < gamma:
+            q_n_plus_1 = q[:, n_matches, :]
+            p_prime = ops.clamp((p_n_plus_1 - q_n_plus_1), min=0)
+            p_prime = p_prime / p_prime.sum(-1, keepdims=True)
+        else:
+            p_prime = p_n_plus_1
+        t = get_multinomial_op()(p_prime, num_samples=1).squeeze(1).to(new_candidate_input_ids.dtype)
+        if n_matches < gamma:
+            t = ops.where(row_matches > n_matches, new_candidate_input_ids[:, n_matches], t)
+
+        # The selected tokens include the matches (if any) plus the next sampled tokens
+        valid_tokens = ops.cat((new_candidate_input_ids[:, :n_matches], t[:, None]), axis=-1)
+
+    return valid_tokens, n_matches
+
+
+def _split_model_outputs(outputs, new_outputs, cur_len, added_len, is_decoder_attention=False):
+    """
+    Given the (decoder/cross attentions)/(decoder hidden states) for multiple generated tokens, splits it into a tuple
+    where each member corresponds to a single generated token.
+    """
+    # Retrocompatibility: in our generation functions, the first iteration includes the attention/hidden states for the
+    # prompt.
+    if len(outputs) == 0:
+        new_tuple = ()
+        for layer in new_outputs:
+            last_dim_size = cur_len if is_decoder_attention else layer.shape[-1]
+            new_tuple += (layer[..., :cur_len, :last_dim_size],)
+        outputs += (new_tuple,)
+        # The first iteration contains the prompt + 1 generated token, let's update the length variables accordingly
+        cur_len += 1
+        added_len -= cur_len
+
+    for i in range(added_len):
+        new_tuple = ()
+        for layer in new_outputs:
+            last_dim_size = cur_len + i if is_decoder_attention else layer.shape[-1]
+            new_tuple += (layer[..., i : i + 1, :last_dim_size],)
+        outputs += (new_tuple,)
+    return outputs
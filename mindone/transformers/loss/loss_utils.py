@@ -15,7 +15,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from mindspore import mint
+from typing import Optional
+
+import mindspore as ms
+from mindspore import mint, nn, ops
 
 
 def fixed_cross_entropy(source, target, num_items_in_batch: int = None, ignore_index: int = -100, **kwargs):
@@ -51,6 +54,105 @@ def ForCausalLMLoss(
     return loss
 
 
+class ChunkedLinearCrossEntropy(nn.Cell):
+    r"""
+    Sum of the cross-entropy losses of a linear layer without bias, computed over chunks of `chunk_size` rows of the
+    input so that the full `(num_tokens, vocab_size)` logits are never materialized. The backward pass recomputes the
+    logits of each chunk, and accumulates the gradient of the weight in float32.
+
+    Args:
+        chunk_size (`int`, *optional*, defaults to 1024):
+            The number of tokens whose logits are computed at once.
+        ignore_index (`int`, *optional*, defaults to -100):
+            The label of the tokens not contributing to the loss.
+        logit_softcapping (`float`, *optional*):
+            If set, the logits are capped to `logit_softcapping * tanh(logits / logit_softcapping)`, as done by Gemma
+            models.
+
+    Inputs:
+        - **hidden_states** (`ms.Tensor` of shape `(num_tokens, hidden_size)`)
+        - **weight** (`ms.Tensor` of shape `(vocab_size, hidden_size)`)
+        - **labels** (`ms.Tensor` of shape `(num_tokens,)`)
+
+    Outputs:
+        The float32 sum of the losses of the tokens whose label is not `ignore_index`.
+    """
+
+    def __init__(self, chunk_size: int = 1024, ignore_index: int = -100, logit_softcapping: Optional[float] = None):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.ignore_index = ignore_index
+        self.logit_softcapping = logit_softcapping
+
+    def _chunk_logits(self, hidden_states, weight):
+        logits = ops.matmul(hidden_states, weight.swapaxes(0, 1)).float()
+        if self.logit_softcapping is not None:
+            logits = ops.tanh(logits / self.logit_softcapping) * self.logit_softcapping
+        return logits
+
+    def construct(self, hidden_states, weight, labels):
+        loss = ops.zeros((), dtype=ms.float32)
+        for start in range(0, hidden_states.shape[0], self.chunk_size):
+            logits = self._chunk_logits(hidden_states[start : start + self.chunk_size], weight)
+            chunk_labels = labels[start : start + self.chunk_size]
+            is_valid = chunk_labels != self.ignore_index
+            target_logits = ops.gather_elements(logits, 1, ops.where(is_valid, chunk_labels, 0)[:, None])[:, 0]
+            loss += ((ops.logsumexp(logits, -1) - target_logits) * is_valid.float()).sum()
+        return loss
+
+    def bprop(self, hidden_states, weight, labels, out, dout):
+        vocab_ids = ops.arange(weight.shape[0], dtype=labels.dtype)
+        grad_hidden_states = []
+        grad_weight = ops.zeros(weight.shape, dtype=ms.float32)
+        for start in range(0, hidden_states.shape[0], self.chunk_size):
+            chunk_hidden_states = hidden_states[start : start + self.chunk_size]
+            logits = self._chunk_logits(chunk_hidden_states, weight)
+            chunk_labels = labels[start : start + self.chunk_size]
+            # d(logsumexp - target) / d(logits) = softmax - one_hot(target)
+            grad_logits = ops.softmax(logits, -1) - (vocab_ids[None, :] == chunk_labels[:, None]).float()
+            grad_logits = grad_logits * ((chunk_labels != self.ignore_index).float() * dout)[:, None]
+            if self.logit_softcapping is not None:
+                grad_logits = grad_logits * (1 - (logits / self.logit_softcapping) ** 2)
+            grad_hidden_states.append(ops.matmul(grad_logits.to(hidden_states.dtype), weight))
+            grad_weight += ops.matmul(grad_logits.swapaxes(0, 1), chunk_hidden_states.float())
+        return ops.cat(grad_hidden_states, axis=0), grad_weight.to(weight.dtype), ops.zeros_like(labels)
+
+
+def ForCausalLMChunkedLoss(
+    hidden_states,
+    lm_head_weight,
+    labels,
+    vocab_size: int,
+    num_items_in_batch: int = None,
+    ignore_index: int = -100,
+    shift_labels=None,
+    chunk_size: int = 1024,
+    logit_softcapping: Optional[float] = None,
+    **kwargs,
+):
+    """
+    Same loss as [`ForCausalLMLoss`], computed from the last hidden states and the weight of the LM head instead of the
+    logits. The logits are computed by chunks of `chunk_size` tokens in the forward pass, and recomputed in the
+    backward pass, which keeps the float32 `(num_tokens, vocab_size)` logits and their gradient out of the peak memory
+    of the training step.
+    """
+    if shift_labels is None:
+        # Shift so that tokens < n predict n
+        labels = mint.nn.functional.pad(labels, (0, 1), value=ignore_index)
+        shift_labels = labels[..., 1:].contiguous()
+
+    # Flatten the tokens
+    hidden_states = hidden_states.view(-1, hidden_states.shape[-1])
+    shift_labels = shift_labels.view(-1)
+    loss = ChunkedLinearCrossEntropy(chunk_size, ignore_index, logit_softcapping)(
+        hidden_states, lm_head_weight, shift_labels
+    )
+    if num_items_in_batch is None:
+        num_items_in_batch = (shift_labels != ignore_index).sum()
+    return loss / num_items_in_batch
+
+
 LOSS_MAPPING = {
     "ForCausalLM": ForCausalLMLoss,
+    "ForCausalLMChunked": ForCausalLMChunkedLoss,
 }
@@ -20,7 +20,7 @@ from typing import Callable, Optional, Union
 from transformers.configuration_utils import PretrainedConfig
 
 import mindspore as ms
-from mindspore import mint
+from mindspore import mint, ops
 
 from .cache_utils import Cache
 from .modeling_attn_mask_utils import dtype_to_min
@@ -435,6 +435,77 @@ def create_causal_mask(
     return causal_mask
 
 
+def tree_ancestor_mask(tree_parents: ms.Tensor) -> ms.Tensor:
+    """
+    Computes the ancestors of the nodes of a batch of token trees, as used in tree-based speculative decoding.
+
+    Args:
+        tree_parents (`ms.Tensor` of shape `(batch_size, num_nodes)`):
+            The index of the parent of each draft node, or -1 for the children of the root (the last token of the
+            sequence). Parents must precede their children.
+
+    Returns:
+        `ms.Tensor` of shape `(batch_size, num_nodes + 1, num_nodes + 1)`: a boolean mask where `[b, i, j]` is True when
+        node `j` is `i` or one of its ancestors. The root is the node `0`, and the draft nodes are shifted by one.
+    """
+    batch_size, num_nodes = tree_parents.shape
+    parents = ops.cat([ops.full((batch_size, 1), -1, dtype=ms.int32), tree_parents.to(ms.int32) + 1], axis=1)
+    node_indices = ops.arange(num_nodes + 1, dtype=ms.int32)
+    # the transitive closure of the parent relation, by repeated squaring of the adjacency matrix
+    ancestors = (parents[:, :, None] == node_indices[None, None, :]) | (node_indices[:, None] == node_indices[None, :])
+    for _ in range(max(num_nodes, 1).bit_length()):
+        ancestors = ancestors.float()
+        ancestors = ops.bmm(ancestors, ancestors) > 0
+    return ancestors
+
+
+def create_tree_attention_mask(
+    tree_ancestors: ms.Tensor,
+    past_length: int,
+    kv_length: int,
+    attention_mask: Optional[ms.Tensor] = None,
+    dtype: ms.Type = ms.float32,
+) -> ms.Tensor:
+    """
+    Create the 4D float mask of shape `(batch_size, 1, num_nodes + 1, kv_length)` used to verify a batch of token trees
+    in a single forward pass: each node attends to the `past_length` cached tokens and to its ancestors in the tree. A
+    value of 0 indicates that the element should take part in the attention computation, and -inf (minimum value for
+    the given `dtype`) that it should not. As 4D masks are passed as-is by the models, it is already in inverted form.
+
+    Args:
+        tree_ancestors (`ms.Tensor` of shape `(batch_size, num_nodes + 1, num_nodes + 1)`):
+            The ancestors of each node of the trees, see [`tree_ancestor_mask`]. The nodes are written in the cache
+            right after the `past_length` cached tokens, the root first.
+        past_length (`int`):
+            The number of cached tokens preceding the root.
+        kv_length (`int`):
+            The size that the key and value states will have during the attention computation, e.g. the length of a
+            static cache.
+        attention_mask (`ms.Tensor`, optional):
+            The 2D attention mask corresponding to padded tokens of shape (batch_size, number_of_seen_tokens+q_length).
+        dtype (`ms.Type`, optional):
+            The dtype to use for the mask. By default, `ms.float32`.
+    """
+    batch_size, num_tree_tokens, _ = tree_ancestors.shape
+    mask = ops.cat(
+        [
+            ops.ones((batch_size, num_tree_tokens, past_length), dtype=ms.bool_),
+            tree_ancestors,
+            ops.zeros((batch_size, num_tree_tokens, kv_length - past_length - num_tree_tokens), dtype=ms.bool_),
+        ],
+        axis=-1,
+    )
+    if attention_mask is not None:
+        padding_mask = attention_mask[:, :kv_length].bool()
+        if padding_mask.shape[-1] < kv_length:
+            padding_mask = ops.cat(
+                [padding_mask, ops.zeros((batch_size, kv_length - padding_mask.shape[-1]), dtype=ms.bool_)], axis=-1
+            )
+        mask = mask & padding_mask[:, None, :]
+    min_dtype = dtype_to_min(dtype)
+    return ops.where(mask[:, None], ms.tensor(0.0, dtype=dtype), ms.tensor(min_dtype, dtype=dtype))
+
+
 LAYER_PATTERN_TO_MASK_FUNCTION_MAPPING = {
     "full_attention": create_causal_mask,
 }
@@ -529,3 +529,55 @@ def _create_4d_causal_attention_mask(
     )
 
     return attention_mask
+
+
+def _find_packed_sequence_indices(position_ids: ms.Tensor) -> ms.Tensor:
+    """
+    Finds the index of the sequence of each token, for rows packing several sequences whose `position_ids` restart
+    from 0, e.g. as built by [`DataCollatorForPacking`].
+
+    Args:
+        position_ids (`ms.Tensor`):
+            A 2D tensor of shape `(batch_size, query_length)`.
+
+    Returns:
+        `ms.Tensor` of shape `(batch_size, query_length)`: the index of the sequence of each token in its row. Rows
+        holding a single sequence only have index 0.
+    """
+    position_ids = position_ids.to(ms.int32)
+    previous_position_ids = ops.cat([position_ids[:, :1] - 1, position_ids[:, :-1]], axis=-1)
+    return ((position_ids - previous_position_ids) != 1).astype(ms.int32).cumsum(-1)
+
+
+def _prepare_4d_packed_causal_attention_mask(
+    position_ids: ms.Tensor, dtype: ms.Type, causal_mask: Optional[ms.Tensor] = None
+) -> ms.Tensor:
+    """
+    Creates a block-diagonal causal 4D mask of shape `(batch_size, 1, query_length, key_value_length)` for rows packing
+    several sequences, which are found from the `position_ids` of a forward pass without cached tokens. The tokens of
+    a sequence only attend to the previous tokens of the same sequence, with any attention implementation taking a 4D
+    mask.
+
+    Args:
+        position_ids (`ms.Tensor`):
+            A 2D tensor of shape `(batch_size, query_length)`, restarting from 0 for each packed sequence.
+        dtype (`ms.dtype`):
+            The mindspore dtype the created mask shall have, if `causal_mask` is not given.
+        causal_mask (`ms.Tensor`, *optional*):
+            The 4D mask in inverted form built by the model, which is restricted to the blocks of the sequences. Its
+            key/value positions following the queries are masked.
+    """
+    sequence_indices = _find_packed_sequence_indices(position_ids)
+    query_length = sequence_indices.shape[-1]
+    key_value_length = causal_mask.shape[-1] if causal_mask is not None else query_length
+    indices = ops.arange(query_length, dtype=ms.int32)
+    allowed = (sequence_indices[:, None, :, None] == sequence_indices[:, None, None, :]) & (
+        indices[None, None, None, :] <= indices[None, None, :, None]
+    )
+    if key_value_length > query_length:
+        allowed = ops.cat(
+            [allowed, ops.zeros(allowed.shape[:-1] + (key_value_length - query_length,), dtype=ms.bool_)], axis=-1
+        )
+    if causal_mask is None:
+        causal_mask = ops.zeros(allowed.shape, dtype=dtype)
+    return ops.where(allowed, causal_mask, dtype_to_min(causal_mask.dtype))
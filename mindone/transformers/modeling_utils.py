@@ -682,6 +682,13 @@ class PreTrainedModel(nn.Cell, ModuleUtilsMixin, GenerationMixin, PushToHubMixin
     # Has support for a `QuantoQuantizedCache` instance as `past_key_values`
     _supports_quantized_cache = False
 
+    # The key of the loss function in `LOSS_MAPPING`. With `"ForCausalLMChunked"`, the causal LMs supporting it pass
+    # their last hidden states and the weight of their LM head to the loss, and do not return the logits
+    loss_type = None
+
+    # Has support for the `"ForCausalLMChunked"` loss type
+    _supports_chunked_loss = False
+
     @property
     def dummy_inputs(self) -> Dict[str, Tensor]:
         """
@@ -846,6 +846,7 @@ class Gemma3TextModel(Gemma3PreTrainedModel):
 
 class Gemma3ForCausalLM(Gemma3PreTrainedModel, GenerationMixin):
     _tied_weights_keys = ["lm_head.weight"]
+    _supports_chunked_loss = True
     _tp_plan = {"lm_head": "colwise_rep"}
     _pp_plan = {"lm_head": (["hidden_states"], ["logits"])}
     config_class = Gemma3TextConfig
@@ -955,14 +956,26 @@ class Gemma3ForCausalLM(Gemma3PreTrainedModel, GenerationMixin):
         hidden_states = outputs[0]
         # Only compute necessary logits, and do not upcast them to float if we are not computing the loss
         slice_indices = slice(-logits_to_keep, None) if isinstance(logits_to_keep, int) else logits_to_keep
-        logits = self.lm_head(hidden_states[:, slice_indices, :])
-        if self.config.final_logit_softcapping is not None:
-            logits = logits / self.config.final_logit_softcapping
-            logits = mint.tanh(logits)
-            logits = logits * self.config.final_logit_softcapping
+        logits = None
+        if labels is None or self.loss_type != "ForCausalLMChunked":
+            logits = self.lm_head(hidden_states[:, slice_indices, :])
+            if self.config.final_logit_softcapping is not None:
+                logits = logits / self.config.final_logit_softcapping
+                logits = mint.tanh(logits)
+                logits = logits * self.config.final_logit_softcapping
 
         loss = None
-        if labels is not None:
+        if labels is not None and logits is None:
+            # the logits are computed by chunks within the loss, and are not materialized
+            loss = self.loss_function(
+                hidden_states=hidden_states[:, slice_indices, :],
+                lm_head_weight=self.lm_head.weight,
+                labels=labels,
+                vocab_size=self.vocab_size,
+                logit_softcapping=self.config.final_logit_softcapping,
+                **loss_kwargs,
+            )
+        elif labels is not None:
             loss = self.loss_function(logits, labels, self.vocab_size, **loss_kwargs)
 
         if not return_dict:
@@ -36,6 +36,7 @@ from ...generation import GenerationMixin
 from ...mindspore_adapter import recompute_except_output
 from ...mindspore_adapter.utils import _MIN_FP16
 from ...mindspore_utils import ALL_LAYERNORM_LAYERS
+from ...modeling_attn_mask_utils import _prepare_4d_packed_causal_attention_mask
 from ...modeling_flash_attention_utils import FlashAttentionKwargs
 from ...modeling_outputs import BaseModelOutputWithPast, CausalLMOutputWithPast, SequenceClassifierOutputWithPast
 from ...modeling_rope_utils import ROPE_INIT_FUNCTIONS
@@ -595,6 +596,9 @@ class LlamaModel(LlamaPreTrainedModel):
         if input_ids is not None and inputs_embeds is None:
             inputs_embeds = self.embed_tokens(input_ids)
 
+        # rows packing several sequences come with restarting `position_ids` and without padding mask
+        is_packed = position_ids is not None and attention_mask is None and past_key_values is None
+
         if cache_position is None:
             past_seen_tokens = get_seq_length(past_key_values) if past_key_values is not None else 0
             cache_position = mint.arange(past_seen_tokens, past_seen_tokens + inputs_embeds.shape[1], dtype=ms.int32)
@@ -605,6 +609,8 @@ class LlamaModel(LlamaPreTrainedModel):
         causal_mask = self._update_causal_mask(
             attention_mask, inputs_embeds, cache_position, past_key_values, output_attentions
         )
+        if is_packed:
+            causal_mask = _prepare_4d_packed_causal_attention_mask(position_ids, inputs_embeds.dtype, causal_mask)
 
         # embed positions
         hidden_states = inputs_embeds
@@ -767,6 +773,7 @@ class KwargsForCausalLM(FlashAttentionKwargs, LossKwargs):
 
 class LlamaForCausalLM(LlamaPreTrainedModel, GenerationMixin):
     _tied_weights_keys = ["lm_head.weight"]
+    _supports_chunked_loss = True
     _tp_plan = {"lm_head": "colwise_rep"}
     _pp_plan = {"lm_head": (["hidden_states"], ["logits"])}
 
@@ -870,10 +877,21 @@ class LlamaForCausalLM(LlamaPreTrainedModel, GenerationMixin):
 
         # Only compute necessary logits, and do not upcast them to float if we are not computing the loss
         slice_indices = slice(-logits_to_keep, None) if isinstance(logits_to_keep, int) else logits_to_keep
-        logits = self.lm_head(hidden_states[:, slice_indices, :])
+        logits = None
+        if labels is None or self.loss_type != "ForCausalLMChunked":
+            logits = self.lm_head(hidden_states[:, slice_indices, :])
 
         loss = None
-        if labels is not None:
+        if labels is not None and logits is None:
+            # the logits are computed by chunks within the loss, and are not materialized
+            loss = self.loss_function(
+                hidden_states=hidden_states[:, slice_indices, :],
+                lm_head_weight=self.lm_head.weight,
+                labels=labels,
+                vocab_size=self.config.vocab_size,
+                **kwargs,
+            )
+        elif labels is not None:
             # Shift so that tokens < n predict n
             # shift_logits = logits[..., :-1, :]
             # shift_labels = labels[..., 1:]
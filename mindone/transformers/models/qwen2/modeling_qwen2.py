@@ -27,7 +27,7 @@ from mindone.transformers.mindspore_adapter import str_to_dtype
 from mindone.transformers.mindspore_adapter.paged_attention_freqs import FreqsMgr
 from mindone.transformers.mindspore_adapter.paged_attention_infer_attention_block import InferAttention
 from mindone.transformers.mindspore_adapter.paged_attention_mask import LowerTriangularMaskWithDynamic
-from mindone.transformers.modeling_attn_mask_utils import dtype_to_min
+from mindone.transformers.modeling_attn_mask_utils import _prepare_4d_packed_causal_attention_mask, dtype_to_min
 from mindone.transformers.modeling_flash_attention_utils import FlashAttentionKwargs
 from mindone.transformers.modeling_outputs import (
     BaseModelOutputWithPast,
@@ -667,6 +667,9 @@ class Qwen2Model(Qwen2PreTrainedModel):
         if inputs_embeds is None:
             inputs_embeds = self.embed_tokens(input_ids)
 
+        # rows packing several sequences come with restarting `position_ids` and without padding mask
+        is_packed = position_ids is not None and attention_mask is None and past_key_values is None
+
         if cache_position is None:
             past_seen_tokens = get_seq_length(past_key_values) if past_key_values is not None else 0
             cache_position = ops.arange(past_seen_tokens, past_seen_tokens + inputs_embeds.shape[1])
@@ -677,6 +680,8 @@ class Qwen2Model(Qwen2PreTrainedModel):
             causal_mask = self._update_causal_mask(
                 attention_mask, inputs_embeds, cache_position, past_key_values, output_attentions
             )
+            if is_packed:
+                causal_mask = _prepare_4d_packed_causal_attention_mask(position_ids, inputs_embeds.dtype, causal_mask)
         else:
             causal_mask = attention_mask
 
@@ -854,6 +859,7 @@ class KwargsForCausalLM(FlashAttentionKwargs, LossKwargs):
 
 class Qwen2ForCausalLM(Qwen2PreTrainedModel, GenerationMixin):
     _tied_weights_keys = ["lm_head.weight"]
+    _supports_chunked_loss = True
 
     def __init__(self, config):
         super().__init__(config)
@@ -1024,11 +1030,22 @@ class Qwen2ForCausalLM(Qwen2PreTrainedModel, GenerationMixin):
         )
 
         hidden_states = outputs[0]
-        logits = self.lm_head(hidden_states)
-        logits = logits.float()
+        logits = None
+        if labels is None or self.loss_type != "ForCausalLMChunked":
+            logits = self.lm_head(hidden_states)
+            logits = logits.float()
 
         loss = None
-        if labels is not None:
+        if labels is not None and logits is None:
+            # the logits are computed by chunks within the loss, and are not materialized
+            loss = self.loss_function(
+                hidden_states=hidden_states,
+                lm_head_weight=self.lm_head.weight,
+                labels=labels,
+                vocab_size=self.config.vocab_size,
+                **kwargs,
+            )
+        elif labels is not None:
             # Shift so that tokens < n predict n
             shift_logits = logits[..., :-1, :]
             shift_labels = labels[..., 1:]
@@ -47,7 +47,7 @@ from ...mindspore_adapter import dtype_to_min, str_to_dtype
 from ...mindspore_adapter.paged_attention_freqs import FreqsMgr
 from ...mindspore_adapter.paged_attention_infer_attention_block import InferAttention
 from ...mindspore_adapter.paged_attention_mask import LowerTriangularMaskWithDynamic
-from ...modeling_attn_mask_utils import AttentionMaskConverter
+from ...modeling_attn_mask_utils import AttentionMaskConverter, _prepare_4d_packed_causal_attention_mask
 from ...modeling_flash_attention_utils import FlashAttentionKwargs
 from ...modeling_outputs import (
     BaseModelOutputWithPast,
@@ -654,6 +654,9 @@ class Qwen3Model(Qwen3PreTrainedModel):
         if inputs_embeds is None:
             inputs_embeds = self.embed_tokens(input_ids)
 
+        # rows packing several sequences come with restarting `position_ids` and without padding mask
+        is_packed = position_ids is not None and attention_mask is None and past_key_values is None
+
         if use_cache and past_key_values is None:
             past_key_values = DynamicCache()
 
@@ -671,6 +674,8 @@ class Qwen3Model(Qwen3PreTrainedModel):
             if not is_page_attention
             else attention_mask
         )
+        if is_packed and not is_page_attention:
+            causal_mask = _prepare_4d_packed_causal_attention_mask(position_ids, inputs_embeds.dtype, causal_mask)
 
         hidden_states = inputs_embeds
 
@@ -881,6 +886,7 @@ class KwargsForCausalLM(FlashAttentionKwargs, LossKwargs):
 
 class Qwen3ForCausalLM(Qwen3PreTrainedModel, GenerationMixin):
     _tied_weights_keys = ["lm_head.weight"]
+    _supports_chunked_loss = True
     _tp_plan = {"lm_head": "colwise_rep"}
     _pp_plan = {"lm_head": (["hidden_states"], ["logits"])}
 
@@ -1064,10 +1070,21 @@ class Qwen3ForCausalLM(Qwen3PreTrainedModel, GenerationMixin):
         hidden_states = outputs[0]
         # Only compute necessary logits, and do not upcast them to float if we are not computing the loss
         slice_indices = slice(-logits_to_keep, None) if isinstance(logits_to_keep, int) else logits_to_keep
-        logits = self.lm_head(hidden_states[:, slice_indices, :])
+        logits = None
+        if labels is None or self.loss_type != "ForCausalLMChunked":
+            logits = self.lm_head(hidden_states[:, slice_indices, :])
 
         loss = None
-        if labels is not None:
+        if labels is not None and logits is None:
+            # the logits are computed by chunks within the loss, and are not materialized
+            loss = self.loss_function(
+                hidden_states=hidden_states[:, slice_indices, :],
+                lm_head_weight=self.lm_head.weight,
+                labels=labels,
+                vocab_size=self.config.vocab_size,
+                **kwargs,
+            )
+        elif labels is not None:
             loss = self.loss_function(logits=logits, labels=labels, vocab_size=self.config.vocab_size, **kwargs)
 
         result = (loss, logits) + outputs[1:]
@@ -20,6 +20,7 @@ The Trainer class, to easily train a 🤗 Transformers from scratch or finetune
 
 import functools
 import inspect
+import json
 import math
 import os
 import re
@@ -49,8 +50,10 @@ from transformers.trainer_callback import (
     TrainerState,
 )
 from transformers.trainer_utils import (
+    EvalLoopOutput,
     EvalPrediction,
     RemoveColumnsCollator,
+    denumpify_detensorize,
     get_last_checkpoint,
     has_length,
     number_of_arguments,
@@ -62,14 +65,31 @@ import mindspore as ms
 from mindspore import Tensor, nn, ops
 from mindspore.communication.management import get_group_size
 
+from ..data.sampler import ResumableDistributedSampler
 from ..safetensors.mindspore import save_file
-from .data.data_collator import DataCollator, DataCollatorWithPadding, default_data_collator
-from .mindspore_adapter import RandomSampler, Sampler, TrainOneStepWrapper, auto_mixed_precision
+from .data.data_collator import (
+    DataCollator,
+    DataCollatorForPacking,
+    DataCollatorWithPadding,
+    PackedDataset,
+    default_data_collator,
+)
+from .loss.loss_utils import LOSS_MAPPING
+from .mindspore_adapter import HF2MSDataset, Sampler, TrainOneStepWrapper, auto_mixed_precision
 from .mindspore_adapter.utils import _is_parallel
 from .mindspore_utils import ALL_LAYERNORM_LAYERS
 from .modeling_utils import MSPreTrainedModel as PreTrainedModel
 from .optimization import get_scheduler
-from .trainer_ms_utils import LabelSmoother, LengthGroupedSampler, get_model_param_count, get_parameter_names
+from .trainer_ms_utils import (
+    EvalLengthGroupedSampler,
+    LabelSmoother,
+    LengthGroupedSampler,
+    get_model_param_count,
+    get_parameter_names,
+    nested_pad_and_concatenate,
+    nested_pad_to_length,
+    nested_take,
+)
 from .trainer_utils import enable_full_determinism, set_seed
 from .training_args import OptimizerNames, TrainingArguments
 from .utils import can_return_loss, find_labels
@@ -90,6 +110,14 @@ def _is_peft_model(model):
     return False
 
 
+def _get_per_batch_map(data_collator: Callable) -> Callable:
+    # `per_batch_map` receives a `BatchInfo` after the samples, the collators taking the samples only are wrapped
+    parameters = inspect.signature(data_collator).parameters.values()
+    if len([p for p in parameters if p.default is inspect.Parameter.empty]) > 1:
+        return data_collator
+    return lambda features, batch_info: data_collator(features)
+
+
 class TrainOutput(NamedTuple):
     global_step: int
     training_loss: float
@@ -102,6 +130,7 @@ _re_checkpoint = re.compile(r"^" + PREFIX_CHECKPOINT_DIR + r"\-(\d+)$")
 
 # Name of the files used for checkpointing
 TRAINER_STATE_NAME = "trainer_state.json"
+SAMPLER_STATE_NAME = "sampler_state.json"
 OPTIMIZER_NAME = "optimizer.ckpt"
 # SCHEDULER_NAME = "scheduler.ckpt"     # Note: lr_scheduler is already included in the optimizer on MindSpore 2.3.1
 SCALER_NAME = "scaler.ckpt"
@@ -206,7 +235,7 @@ class Trainer:
         default_collator = (
             DataCollatorWithPadding(tokenizer)
             if tokenizer is not None and isinstance(tokenizer, (PreTrainedTokenizerBase, SequenceFeatureExtractor))
-            else lambda features, batch_info: default_data_collator(features, return_tensors="np")
+            else lambda features: default_data_collator(features, return_tensors="np")
         )
         self.data_collator = data_collator if data_collator is not None else default_collator
         self.train_dataset = train_dataset
@@ -270,6 +299,13 @@ class Trainer:
         else:
             self.label_smoother = None
 
+        if self.args.loss_type is not None:
+            if self.args.loss_type not in LOSS_MAPPING:
+                raise ValueError(f"`loss_type` should be one of {list(LOSS_MAPPING)}, but got {self.args.loss_type}.")
+            if self.label_smoother is not None:
+                raise ValueError("`loss_type` cannot be combined with `label_smoothing_factor`.")
+            self._set_loss_type(self.model)
+
         self.control = TrainerControl()
 
         self.state = TrainerState(
@@ -291,6 +327,7 @@ class Trainer:
         # Internal variables to help with automatic batch size reduction
         self._train_batch_size = args.train_batch_size
         self._created_lr_scheduler = False
+        self._eval_dataloaders = {}
 
     def add_callback(self, callback):
         """
@@ -582,10 +619,25 @@ class Trainer:
         else:
             data_collator = self._get_collator_with_removed_columns(data_collator, description="training")
 
+        if self.args.packing_max_length is not None:
+            lengths = None
+            if (
+                is_datasets_available()
+                and isinstance(self.train_dataset, datasets.Dataset)
+                and self.args.length_column_name in self.train_dataset.column_names
+            ):
+                lengths = self.train_dataset[self.args.length_column_name]
+            train_dataset = PackedDataset(train_dataset, self.args.packing_max_length, lengths=lengths)
+            pad_token_id = getattr(self.tokenizer, "pad_token_id", None)
+            data_collator = DataCollatorForPacking(
+                self.args.packing_max_length, pad_token_id=pad_token_id if pad_token_id is not None else 0
+            )
+            sampler = self._get_resumable_sampler(train_dataset)
+        else:
+            sampler = self._get_train_sampler()
+
         if self.args.dataloader_pin_memory:
             logger.warning("Not support `dataloader_pin_memory`")
-        if self.args.dataloader_persistent_workers:
-            logger.warning("Not support `dataloader_persistent_workers`")
 
         prefetch_factor = self.args.dataloader_prefetch_factor
         if prefetch_factor is not None and prefetch_factor > 0:
@@ -593,8 +645,8 @@ class Trainer:
 
         ds_init_params = {
             "num_parallel_workers": self.args.dataloader_num_workers,
-            "sampler": self._get_train_sampler(),
-            "python_multiprocessing": False,
+            "sampler": sampler,
+            "python_multiprocessing": self.args.dataloader_python_multiprocessing,
             "num_shards": getattr(self.args, "rank_size", 1),
             "shard_id": getattr(self.args, "rank", 0),
             "column_names": "item",
@@ -603,14 +655,16 @@ class Trainer:
         ds_batch_params = {
             "num_parallel_workers": self.args.dataloader_num_workers,  # num workers
             "batch_size": self.args.per_device_train_batch_size,  # per device batch size
-            "per_batch_map": data_collator,  # collate function
+            "per_batch_map": _get_per_batch_map(data_collator),  # collate function
             "drop_remainder": self.args.dataloader_drop_last,  # drop last
+            "python_multiprocessing": self.args.dataloader_python_multiprocessing,
         }
         ds_repeat_params = {"count": 1}  # self.args.num_train_epochs            # num_train_epochs, loop at train func
 
         loader = ms.dataset.GeneratorDataset(train_dataset, **ds_init_params)
         loader = loader.batch(**ds_batch_params)
         loader = loader.repeat(**ds_repeat_params)
+        loader.sampler = sampler
 
         logger.info(
             f"create dataloader success, \n"
@@ -645,7 +699,97 @@ class Trainer:
             )
 
         else:
-            return RandomSampler(self.train_dataset)
+            return self._get_resumable_sampler(self.train_dataset)
+
+    def _get_resumable_sampler(self, dataset) -> ResumableDistributedSampler:
+        return ResumableDistributedSampler(
+            len(dataset),
+            num_replicas=getattr(self.args, "rank_size", 1),
+            rank=getattr(self.args, "rank", 0),
+            seed=self.args.data_seed if self.args.data_seed is not None else self.args.seed,
+        )
+
+    def get_eval_dataloader(self, eval_dataset: Optional[Union[str, Iterable]] = None) -> ms.dataset.Dataset:
+        """
+        Returns the evaluation [`~mindspore.dataset.GeneratorDataset`].
+
+        The evaluation set is sharded across the processes by an [`EvalLengthGroupedSampler`], available as the
+        `sampler` attribute of the returned dataloader. The dataloaders are cached, the evaluation set is not shuffled.
+
+        Subclass and override this method if you want to inject some custom behavior.
+
+        Args:
+            eval_dataset (`str` or `Iterable`, *optional*):
+                If a `str`, will use `self.eval_dataset[eval_dataset]` as the evaluation dataset. If an `Iterable`, will
+                override `self.eval_dataset`.
+        """
+        if eval_dataset is None and self.eval_dataset is None:
+            raise ValueError("Trainer: evaluation requires an eval_dataset.")
+
+        # only the dataloaders of `self.eval_dataset` are cached
+        dataloader_key = None
+        if eval_dataset is None or isinstance(eval_dataset, str):
+            dataloader_key = eval_dataset if isinstance(eval_dataset, str) else "eval"
+            if dataloader_key in self._eval_dataloaders:
+                return self._eval_dataloaders[dataloader_key]
+            eval_dataset = self.eval_dataset[eval_dataset] if isinstance(eval_dataset, str) else self.eval_dataset
+
+        data_collator = self.data_collator
+        sampler = self._get_eval_sampler(eval_dataset)
+        if is_datasets_available() and isinstance(eval_dataset, datasets.Dataset):
+            eval_dataset = HF2MSDataset(self._remove_unused_columns(eval_dataset, description="evaluation"))
+        else:
+            data_collator = self._get_collator_with_removed_columns(data_collator, description="evaluation")
+
+        ds_init_params = {
+            "num_parallel_workers": self.args.dataloader_num_workers,
+            "sampler": sampler,
+            "python_multiprocessing": self.args.dataloader_python_multiprocessing,
+            "column_names": "item",
+        }
+        ds_batch_params = {
+            "num_parallel_workers": self.args.dataloader_num_workers,
+            "batch_size": self.args.per_device_eval_batch_size,
+            "per_batch_map": _get_per_batch_map(data_collator),
+            "drop_remainder": False,  # the sampler completes the last batch
+            "python_multiprocessing": self.args.dataloader_python_multiprocessing,
+        }
+
+        loader = ms.dataset.GeneratorDataset(eval_dataset, **ds_init_params)
+        loader = loader.batch(**ds_batch_params)
+        loader.sampler = sampler
+
+        if dataloader_key is not None:
+            self._eval_dataloaders[dataloader_key] = loader
+
+        return loader
+
+    def _get_eval_sampler(self, eval_dataset) -> EvalLengthGroupedSampler:
+        lengths = None
+        if self.args.eval_group_by_length:
+            if (
+                is_datasets_available()
+                and isinstance(eval_dataset, datasets.Dataset)
+                and self.args.length_column_name in eval_dataset.column_names
+            ):
+                lengths = eval_dataset[self.args.length_column_name]
+            else:
+                model_input_name = self.tokenizer.model_input_names[0] if self.tokenizer is not None else "input_ids"
+                if isinstance(eval_dataset[0], Mapping) and model_input_name in eval_dataset[0]:
+                    lengths = [len(feature[model_input_name]) for feature in eval_dataset]
+                else:
+                    logger.warning(
+                        f"Cannot infer the lengths of the evaluation samples without a '{model_input_name}' key, "
+                        "they are not grouped by length."
+                    )
+
+        return EvalLengthGroupedSampler(
+            self.args.per_device_eval_batch_size,
+            len(eval_dataset),
+            lengths=lengths,
+            num_replicas=getattr(self.args, "rank_size", 1),
+            rank=getattr(self.args, "rank", 0),
+        )
 
     def num_examples(self, dataloader: ms.dataset.Dataset) -> int:
         if not isinstance(dataloader, ms.dataset.Dataset):
@@ -993,11 +1137,31 @@ class Trainer:
         steps_trained_in_current_epoch = 0
         steps_trained_progress_bar = None
 
+        self._train_sampler = getattr(train_dataloader, "sampler", None)
+        self._train_position = (0, 0)
+
         # Check if continuing training from a checkpoint
         if resume_from_checkpoint is not None and os.path.isfile(
             os.path.join(resume_from_checkpoint, TRAINER_STATE_NAME)
         ):
-            raise NotImplementedError
+            self.state = TrainerState.load_from_json(os.path.join(resume_from_checkpoint, TRAINER_STATE_NAME))
+            epochs_trained = int(self.state.global_step // num_update_steps_per_epoch)
+            if not args.ignore_data_skip:
+                steps_trained_in_current_epoch = self.state.global_step % (num_update_steps_per_epoch)
+                steps_trained_in_current_epoch *= args.gradient_accumulation_steps
+            else:
+                steps_trained_in_current_epoch = 0
+
+            logger.info("  Continuing training from checkpoint, will skip to saved global_step")
+            logger.info(f"  Continuing training from epoch {epochs_trained}")
+            logger.info(f"  Continuing training from global step {self.state.global_step}")
+            if not args.ignore_data_skip:
+                logger.info(
+                    f"  Will skip the first {epochs_trained} epochs then the first"
+                    f" {steps_trained_in_current_epoch} batches in the first epoch."
+                )
+            if isinstance(self._train_sampler, ResumableDistributedSampler):
+                self._load_sampler_state(resume_from_checkpoint, epochs_trained, steps_trained_in_current_epoch)
 
         # Update the references
         self.callback_handler.model = self.model
@@ -1031,10 +1195,29 @@ class Trainer:
         if args.eval_on_start:
             self._evaluate(trial, ignore_keys_for_eval, skip_scheduler=True)
 
+        is_resumable = isinstance(self._train_sampler, ResumableDistributedSampler)
+        resumed_mid_epoch = is_resumable and steps_trained_in_current_epoch > 0
+        persistent_iterator = None
+
         total_batched_samples = 0
         for epoch in range(epochs_trained, num_train_epochs):
-            epoch_iterator = train_dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)
-            # FIXME: consider resume, skip the previous steps
+            if epoch == epochs_trained and resumed_mid_epoch:
+                # the sampler starts right after the trained batches, the iteration is stopped at the end of the epoch
+                epoch_iterator = train_dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)
+            elif args.dataloader_persistent_workers:
+                if persistent_iterator is None:
+                    if is_resumable:
+                        self._train_sampler.set_epoch(epoch)
+                    # a single iterator for the epochs keeps the data pipeline and its workers alive between the epochs
+                    num_iterator_epochs = num_train_epochs - epoch if len_dataloader is not None else -1
+                    persistent_iterator = train_dataloader.create_dict_iterator(
+                        num_epochs=num_iterator_epochs, output_numpy=True
+                    )
+                epoch_iterator = persistent_iterator
+            else:
+                if is_resumable:
+                    self._train_sampler.set_epoch(epoch)
+                epoch_iterator = train_dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)
             if hasattr(epoch_iterator, "set_epoch"):
                 epoch_iterator.set_epoch(epoch)
 
@@ -1056,13 +1239,18 @@ class Trainer:
             rng_to_sync = False
             steps_skipped = 0
             if steps_trained_in_current_epoch > 0:
-                raise NotImplementedError
+                if not is_resumable:
+                    raise NotImplementedError
+                # the trained batches are not read again to be skipped
+                steps_skipped = steps_trained_in_current_epoch
+                steps_trained_in_current_epoch = 0
 
             step = -1
             for step, inputs in enumerate(epoch_iterator):
                 inputs = inputs["item"]
 
                 total_batched_samples += 1
+                self._train_position = (epoch, steps_skipped + step + 1)
 
                 if self.args.include_num_input_tokens_seen:
                     raise NotImplementedError
@@ -1124,6 +1312,9 @@ class Trainer:
 
                 if self.control.should_epoch_stop or self.control.should_training_stop:
                     break
+                if steps_skipped > 0 and steps_skipped + step + 1 >= steps_in_epoch:
+                    # the iteration of the resumed epoch goes on with the beginning of the next epoch
+                    break
 
             if step < 0:
                 logger.warning(
@@ -1241,6 +1432,23 @@ class Trainer:
 
         print("Loaded optimizer and lr scheduler state done.")
 
+    def _save_sampler_state(self, output_dir):
+        epoch, num_batches = self._train_position
+        num_consumed_samples = min(num_batches * self._train_batch_size, len(self._train_sampler))
+        with open(os.path.join(output_dir, SAMPLER_STATE_NAME), "w", encoding="utf-8") as f:
+            json.dump(self._train_sampler.state_dict(epoch, num_consumed_samples), f)
+
+    def _load_sampler_state(self, resume_from_checkpoint, epochs_trained, steps_trained_in_current_epoch):
+        sampler_state_path = os.path.join(resume_from_checkpoint, SAMPLER_STATE_NAME)
+        if os.path.isfile(sampler_state_path) and not self.args.ignore_data_skip:
+            with open(sampler_state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        else:
+            num_consumed_samples = steps_trained_in_current_epoch * self._train_batch_size
+            state = self._train_sampler.state_dict(epochs_trained, num_consumed_samples)
+        self._train_sampler.load_state_dict(state)
+        logger.info(f"  Resuming the train sampler from epoch {state['epoch']}, sample {state['offset']}")
+
     def _nested_reduce_sum(self, tensors, name=None):
         """
         Gather value of `tensors` (tensor or list/tuple of nested tensors) and convert them to numpy before
@@ -1343,6 +1551,8 @@ class Trainer:
             # Update the `TrainerControl` state to where we are currently
             self.state.stateful_callbacks["TrainerControl"] = self.control.state()
             self.state.save_to_json(os.path.join(output_dir, TRAINER_STATE_NAME))
+            if isinstance(getattr(self, "_train_sampler", None), ResumableDistributedSampler):
+                self._save_sampler_state(output_dir)
 
         if self.args.push_to_hub:
             # self._push_from_checkpoint(output_dir)
@@ -1481,8 +1691,18 @@ class Trainer:
         if model is None:
             raise RuntimeError("model_init should not return None.")
 
+        if self.args.loss_type is not None:
+            self._set_loss_type(model)
         return model
 
+    def _set_loss_type(self, model: nn.Cell):
+        if self.args.loss_type == "ForCausalLMChunked" and not getattr(model, "_supports_chunked_loss", False):
+            raise ValueError(
+                f"{model.__class__.__name__} does not support `loss_type='ForCausalLMChunked'`, which requires the model "
+                "to pass its hidden states to the loss instead of its logits (`_supports_chunked_loss = True`)."
+            )
+        model.loss_type = self.args.loss_type
+
     def training_step(self, model: nn.Cell, inputs: Dict[str, Union[ms.Tensor, Any]]) -> Tuple[ms.Tensor, ms.Tensor]:
         """
         Perform a training step on a batch of inputs.
@@ -1521,10 +1741,345 @@ class Trainer:
         return loss / self.args.gradient_accumulation_steps, overflow
 
     def compute_loss(self, model, inputs, return_outputs=False):
-        raise NotImplementedError
+        """
+        How the loss is computed by Trainer. By default, all models return the loss in the first element.
+
+        Subclass and override for custom behavior.
+        """
+        inputs = dict(inputs)
+        if self.label_smoother is not None and "labels" in inputs:
+            labels = ms.Tensor(inputs.pop("labels"), dtype=ms.int32)
+        else:
+            labels = None
+        # the inputs are consumed when they are converted to the positional arguments of the model
+        input_names = list(inputs)
+        outputs = model(*self._prepare_inputs_ms(inputs))
+        # the model does not compute the loss of the labels taken by the label smoother
+        self._save_past_state(outputs, has_loss=labels is None)
+
+        if labels is not None:
+            logits = outputs["logits"] if isinstance(outputs, dict) else outputs[0]
+            shift_labels = model._get_name() in MODEL_FOR_CAUSAL_LM_MAPPING_NAMES.values()
+            loss = self.label_smoother(logits, labels, shift_labels)
+        else:
+            if isinstance(outputs, dict) and "loss" not in outputs:
+                raise ValueError(
+                    "The model did not return a loss from the inputs, only the following keys: "
+                    f"{','.join(outputs.keys())}. For reference, the inputs it received are {','.join(input_names)}."
+                )
+            # We don't use .loss here since the model may return tuples instead of ModelOutput.
+            loss = outputs["loss"] if isinstance(outputs, dict) else outputs[0]
+
+        return (loss, outputs) if return_outputs else loss
+
+    def _save_past_state(self, outputs, has_loss: bool = True):
+        """
+        Keeps the output at `args.past_index` as the past state of models like TransformerXL or XLNet, it is fed to
+        their next forward pass as `mems`. The index counts the loss, which is missing from the outputs computed without
+        labels.
+        """
+        if self.args.past_index < 0:
+            return
+        if isinstance(outputs, dict):
+            outputs = tuple(output for output in outputs.values() if output is not None)
+        past_index = self.args.past_index if has_loss else self.args.past_index - 1
+        if past_index < 0:
+            raise ValueError(f"`past_index={self.args.past_index}` points at the loss, which is not a past state.")
+        self._past = outputs[past_index]
 
     def _evaluate(self, trial, ignore_keys_for_eval, skip_scheduler=False):
-        raise NotImplementedError
+        # the learning rate schedule is included in the optimizer, it does not depend on the metrics
+        return self.evaluate(ignore_keys=ignore_keys_for_eval)
+
+    def evaluate(
+        self,
+        eval_dataset: Optional[Union[Iterable, Dict[str, Iterable]]] = None,
+        ignore_keys: Optional[List[str]] = None,
+        metric_key_prefix: str = "eval",
+    ) -> Dict[str, float]:
+        """
+        Run evaluation and returns metrics.
+
+        The calling script will be responsible for providing a method to compute metrics, as they are task-dependent
+        (pass it to the init `compute_metrics` argument).
+
+        The forward passes run on `self.model` in inference mode, the training graph of `self.train_model` is left as
+        it is, so that evaluation can run at the `eval_steps` cadence of the training loop.
+
+        Args:
+            eval_dataset (`Iterable` or `Dict[str, Iterable]`, *optional*):
+                Pass a dataset if you wish to override `self.eval_dataset`. If it is a dictionary, it will evaluate on
+                each dataset, prepending the dictionary key to the metric name.
+            ignore_keys (`List[str]`, *optional*):
+                A list of keys in the output of your model (if it is a dictionary) that should be ignored when
+                gathering predictions.
+            metric_key_prefix (`str`, *optional*, defaults to `"eval"`):
+                An optional prefix to be used as the metrics key prefix. For example the metrics "bleu" will be named
+                "eval_bleu" if the prefix is "eval" (default)
+
+        Returns:
+            A dictionary containing the evaluation loss and the potential metrics computed from the predictions.
+        """
+        # handle multiple eval datasets
+        override = eval_dataset is not None
+        eval_dataset = eval_dataset if override else self.eval_dataset
+        if isinstance(eval_dataset, dict):
+            metrics = {}
+            for eval_dataset_name, _eval_dataset in eval_dataset.items():
+                dataset_metrics = self.evaluate(
+                    eval_dataset=_eval_dataset if override else eval_dataset_name,
+                    ignore_keys=ignore_keys,
+                    metric_key_prefix=f"{metric_key_prefix}_{eval_dataset_name}",
+                )
+                metrics.update(dataset_metrics)
+            return metrics
+
+        eval_dataloader = self.get_eval_dataloader(eval_dataset if override else None)
+
+        start_time = time.time()
+        output = self.evaluation_loop(
+            eval_dataloader,
+            description="Evaluation",
+            # No point gathering the predictions if there are no metrics, otherwise we defer to
+            # self.args.prediction_loss_only
+            prediction_loss_only=True if self.compute_metrics is None else None,
+            ignore_keys=ignore_keys,
+            metric_key_prefix=metric_key_prefix,
+        )
+
+        total_batch_size = self.args.per_device_eval_batch_size * getattr(self.args, "rank_size", 1)
+        output.metrics.update(
+            speed_metrics(
+                metric_key_prefix,
+                start_time,
+                num_samples=output.num_samples,
+                num_steps=math.ceil(output.num_samples / total_batch_size),
+            )
+        )
+
+        self.log(output.metrics)
+        self.control = self.callback_handler.on_evaluate(self.args, self.state, self.control, output.metrics)
+
+        return output.metrics
+
+    def evaluation_loop(
+        self,
+        dataloader: ms.dataset.Dataset,
+        description: str,
+        prediction_loss_only: Optional[bool] = None,
+        ignore_keys: Optional[List[str]] = None,
+        metric_key_prefix: str = "eval",
+    ) -> EvalLoopOutput:
+        """
+        Prediction/evaluation loop, shared by `Trainer.evaluate()`.
+
+        Each process accumulates the predictions and labels of its shard of the dataset on the host, they are gathered
+        from all the processes once at the end of the loop and put back in the order of the dataset.
+        """
+        args = self.args
+        prediction_loss_only = prediction_loss_only if prediction_loss_only is not None else args.prediction_loss_only
+        sampler = dataloader.sampler
+
+        logger.info(f"\n***** Running {description} *****")
+        logger.info(f"  Num examples = {sampler.num_samples}")
+        logger.info(f"  Batch size = {args.per_device_eval_batch_size}")
+
+        model = self.model
+        model.set_train(False)
+        self.callback_handler.eval_dataloader = dataloader
+
+        if args.past_index >= 0:
+            self._past = None
+
+        # the batches of predictions, labels and losses of this process
+        all_preds, all_labels = [], []
+        # the losses of the batches are weighted by their number of samples, without the samples completing the last
+        # batches of the processes
+        losses_sum, num_loss_samples = 0.0, 0
+        batch_num_samples = sampler.rank_batch_num_samples(sampler.rank)
+        metrics = None
+
+        for step, inputs in enumerate(dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)):
+            inputs = inputs["item"]
+            loss, logits, labels = self.prediction_step(model, inputs, prediction_loss_only, ignore_keys=ignore_keys)
+
+            if loss is not None:
+                num_samples = int(batch_num_samples[step])
+                losses_sum += loss * num_samples
+                num_loss_samples += num_samples
+            if logits is not None:
+                all_preds.append(logits)
+            if labels is not None:
+                all_labels.append(labels)
+
+            if self.args.batch_eval_metrics and self.compute_metrics is not None and logits is not None:
+                is_last_step = step == len(sampler) // args.per_device_eval_batch_size - 1
+                metrics = self.compute_metrics(
+                    EvalPrediction(predictions=self._nested_gather(logits), label_ids=self._nested_gather(labels)),
+                    compute_result=is_last_step,
+                )
+                all_preds, all_labels = [], []
+
+            self.control = self.callback_handler.on_prediction_step(args, self.state, self.control)
+
+        # After all calls to `.on_prediction_step`, clear the dataloader of the callback handler
+        self.callback_handler.eval_dataloader = None
+        if args.past_index and hasattr(self, "_past"):
+            # Clean the state at the end of the evaluation loop
+            delattr(self, "_past")
+
+        # Gather all the results of the processes and put them back in the order of the dataset
+        _, dataset_indices = np.unique(sampler.gathered_indices(), return_index=True)
+        if all_preds:
+            all_preds = nested_take(self._nested_gather(nested_pad_and_concatenate(all_preds)), dataset_indices)
+        else:
+            all_preds = None
+        if all_labels:
+            all_labels = nested_take(self._nested_gather(nested_pad_and_concatenate(all_labels)), dataset_indices)
+        else:
+            all_labels = None
+        if _is_parallel():
+            losses_sum, num_loss_samples = ops.AllReduce()(
+                ms.Tensor([losses_sum, num_loss_samples], ms.float32)
+            ).tolist()
+
+        if self.args.batch_eval_metrics:
+            metrics = metrics if metrics is not None else {}
+        elif self.compute_metrics is not None and all_preds is not None and all_labels is not None:
+            metrics = self.compute_metrics(EvalPrediction(predictions=all_preds, label_ids=all_labels))
+        else:
+            metrics = {}
+
+        # To be JSON-serializable, we need to remove numpy types or zero-d tensors
+        metrics = denumpify_detensorize(metrics)
+
+        if num_loss_samples > 0:
+            metrics[f"{metric_key_prefix}_loss"] = losses_sum / num_loss_samples
+
+        # Prefix all keys with metric_key_prefix + '_'
+        for key in list(metrics.keys()):
+            if not key.startswith(f"{metric_key_prefix}_"):
+                metrics[f"{metric_key_prefix}_{key}"] = metrics.pop(key)
+
+        return EvalLoopOutput(
+            predictions=all_preds, label_ids=all_labels, metrics=metrics, num_samples=sampler.num_samples
+        )
+
+    def _nested_gather(self, arrays, padding_index=-100):
+        """
+        Gather the numpy arrays (or nested list/tuple of arrays) of all the processes on their first dimension, their
+        second dimension is padded to the longest one with `padding_index`.
+        """
+        if arrays is None or not _is_parallel():
+            return arrays
+        if isinstance(arrays, (list, tuple)):
+            return type(arrays)(self._nested_gather(array, padding_index) for array in arrays)
+
+        if arrays.ndim > 1:
+            length = ops.AllReduce(ops.ReduceOp.MAX)(ms.Tensor([arrays.shape[1]], ms.int32)).item()
+            arrays = nested_pad_to_length(arrays, length, padding_index)
+        return ops.AllGather()(ms.Tensor(arrays)).asnumpy()
+
+    def prediction_step(
+        self,
+        model: nn.Cell,
+        inputs: Dict[str, np.ndarray],
+        prediction_loss_only: bool,
+        ignore_keys: Optional[List[str]] = None,
+    ) -> Tuple[Optional[float], Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Perform an evaluation step on `model` using `inputs`.
+
+        Subclass and override to inject custom behavior.
+
+        Args:
+            model (`nn.Cell`):
+                The model to evaluate.
+            inputs (`Dict[str, np.ndarray]`):
+                The inputs and targets of the model.
+
+                The dictionary will be unpacked before being fed to the model. Most models expect the targets under the
+                argument `labels`. Check your model's documentation for all accepted arguments.
+            prediction_loss_only (`bool`):
+                Whether or not to return the loss only.
+            ignore_keys (`List[str]`, *optional*):
+                A list of keys in the output of your model (if it is a dictionary) that should be ignored when
+                gathering predictions.
+
+        Return:
+            Tuple[Optional[float], Optional[np.ndarray], Optional[np.ndarray]]: A tuple with the loss, logits (or the
+            generated tokens if `args.predict_with_generate`) and labels (each being optional).
+        """
+        has_labels = len(self.label_names) > 0 and all(inputs.get(k) is not None for k in self.label_names)
+        # For CLIP-like models capable of returning loss values.
+        # If `return_loss` is not specified or being `None` in `inputs`, we check if the default value of `return_loss`
+        # is `True` in `model.construct`.
+        return_loss = inputs.get("return_loss", None)
+        if return_loss is None:
+            return_loss = self.can_return_loss
+        loss_without_labels = True if len(self.label_names) == 0 and return_loss else False
+
+        if ignore_keys is None:
+            if hasattr(self.model, "config"):
+                ignore_keys = getattr(self.model.config, "keys_to_ignore_at_inference", ["past_key_values"])
+            else:
+                ignore_keys = []
+
+        # LM models may predict with their `labels` shifted, keep them before they are consumed by the model
+        if has_labels or loss_without_labels:
+            labels = tuple(inputs.get(name) for name in self.label_names)
+            labels = labels[0] if len(labels) == 1 else labels
+        else:
+            labels = None
+
+        if has_labels or loss_without_labels:
+            loss, outputs = self.compute_loss(model, inputs, return_outputs=True)
+            loss = loss.mean().item()
+            if isinstance(outputs, dict):
+                logits = tuple(v for k, v in outputs.items() if k not in ignore_keys + ["loss"])
+            else:
+                logits = outputs[1:]
+        else:
+            loss = None
+            outputs = model(*self._prepare_inputs_ms(dict(inputs)))
+            if isinstance(outputs, dict):
+                logits = tuple(v for k, v in outputs.items() if k not in ignore_keys)
+            else:
+                logits = outputs
+            self._save_past_state(outputs, has_loss=False)
+
+        if prediction_loss_only:
+            return loss, None, None
+
+        if self.args.predict_with_generate:
+            return loss, self._generate_predictions(model, inputs), labels
+
+        logits = tuple(logit for logit in logits if isinstance(logit, Tensor))
+        logits = logits[0] if len(logits) == 1 else logits
+        if self.preprocess_logits_for_metrics is not None:
+            tensor_labels = ms.Tensor(labels) if isinstance(labels, np.ndarray) else labels
+            logits = self.preprocess_logits_for_metrics(logits, tensor_labels)
+
+        def _to_numpy(tensor):
+            if isinstance(tensor, (list, tuple)):
+                return type(tensor)(_to_numpy(t) for t in tensor)
+            return tensor.float().asnumpy() if tensor.dtype == ms.bfloat16 else tensor.asnumpy()
+
+        return loss, _to_numpy(logits), labels
+
+    def _generate_predictions(self, model: nn.Cell, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        gen_kwargs = {}
+        if self.args.generation_max_length is not None:
+            gen_kwargs["max_length"] = self.args.generation_max_length
+        if self.args.generation_num_beams is not None:
+            gen_kwargs["num_beams"] = self.args.generation_num_beams
+        generation_inputs = {
+            name: ms.Tensor(inputs[name], dtype=ms.int32)
+            for name in ("input_ids", "attention_mask")
+            if inputs.get(name) is not None
+        }
+        generated_tokens = model.generate(**generation_inputs, **gen_kwargs)
+        return generated_tokens.asnumpy()
 
     def _get_output_dir(self, trial):
         if self.hp_search_backend is not None and trial is not None:
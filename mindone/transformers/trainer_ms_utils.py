@@ -1,5 +1,6 @@
 """Adapted from https://github.com/huggingface/transformers/tree/main/src/transformers/trainer_pt_utils.py."""
 
+import math
 import os
 from dataclasses import dataclass
 from typing import Iterable, List, Optional
@@ -136,6 +137,91 @@ class LengthGroupedSampler(Sampler):
         return iter(indices)
 
 
+class EvalLengthGroupedSampler(Sampler):
+    r"""
+    Sequential sampler for evaluation, sharded across the processes of data parallel evaluation.
+
+    If `lengths` are given, the samples are sorted by decreasing length so that each batch only holds samples of
+    similar lengths. The batches are then dealt to the processes in turn, the last ones being completed with the
+    shortest sample so that every process runs the same number of full batches. [`gathered_indices`] gives the
+    dataset index of each result once they are gathered from all the processes.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        num_samples: int,
+        lengths: Optional[List[int]] = None,
+        num_replicas: int = 1,
+        rank: int = 0,
+    ):
+        if lengths is not None and len(lengths) != num_samples:
+            raise ValueError(f"Got {len(lengths)} lengths for {num_samples} samples.")
+
+        self.batch_size = batch_size
+        self.num_samples = num_samples
+        self.num_replicas = num_replicas
+        self.rank = rank
+
+        if lengths is not None:
+            # the longest batch first, so that an OOM happens sooner rather than later
+            indices = np.argsort(-np.asarray(lengths), kind="stable")
+        else:
+            indices = np.arange(num_samples)
+        num_batches = math.ceil(num_samples / (batch_size * num_replicas)) * num_replicas
+        # the last batches are completed with the last (shortest) sample
+        padding = np.full(num_batches * batch_size - num_samples, indices[-1] if num_samples > 0 else 0)
+        self.batches = np.concatenate([indices, padding]).reshape(num_batches, batch_size)
+
+    def rank_indices(self, rank: int) -> np.ndarray:
+        return self.batches[rank :: self.num_replicas].reshape(-1)
+
+    def rank_batch_num_samples(self, rank: int) -> np.ndarray:
+        """The number of samples of each batch of a process, not counting the samples completing the last batches."""
+        batch_starts = np.arange(rank, len(self.batches), self.num_replicas) * self.batch_size
+        return np.clip(self.num_samples - batch_starts, 0, self.batch_size)
+
+    def gathered_indices(self) -> np.ndarray:
+        return np.concatenate([self.rank_indices(rank) for rank in range(self.num_replicas)])
+
+    def __len__(self):
+        return len(self.batches) // self.num_replicas * self.batch_size
+
+    def __iter__(self):
+        return iter(self.rank_indices(self.rank).tolist())
+
+
+def nested_pad_and_concatenate(batches, padding_index=-100):
+    """
+    Concatenate a list of (nested list/tuple of) arrays on their first dimension, padding their second dimension to the
+    longest one with `padding_index`.
+    """
+    if isinstance(batches[0], (list, tuple)):
+        return type(batches[0])(nested_pad_and_concatenate(list(arrays), padding_index) for arrays in zip(*batches))
+    if batches[0].ndim < 2:
+        return np.concatenate(batches)
+    length = max(array.shape[1] for array in batches)
+    return np.concatenate([nested_pad_to_length(array, length, padding_index) for array in batches])
+
+
+def nested_pad_to_length(arrays, length, padding_index=-100):
+    "Pad the second dimension of (nested list/tuple of) arrays to `length` with `padding_index`."
+    if isinstance(arrays, (list, tuple)):
+        return type(arrays)(nested_pad_to_length(array, length, padding_index) for array in arrays)
+    if arrays.ndim < 2 or arrays.shape[1] == length:
+        return arrays
+    pad_width = [(0, 0)] * arrays.ndim
+    pad_width[1] = (0, length - arrays.shape[1])
+    return np.pad(arrays, pad_width, constant_values=padding_index)
+
+
+def nested_take(arrays, indices):
+    "Select the `indices` on the first dimension of (nested list/tuple of) arrays."
+    if isinstance(arrays, (list, tuple)):
+        return type(arrays)(nested_take(array, indices) for array in arrays)
+    return arrays[indices]
+
+
 def get_model_param_count(model, trainable_only=False):
     """
     Calculate model's total param count. If trainable_only is True then count only those requiring grads
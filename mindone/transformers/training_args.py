@@ -294,8 +294,12 @@ class TrainingArguments:
             value as `logging_steps` if not set. Should be an integer or a float in range `[0,1)`. If smaller than 1,
             will be interpreted as ratio of total training steps.
         dataloader_num_workers (`int`, *optional*, defaults to 0):
-            Number of subprocesses to use for data loading (PyTorch only). 0 means that the data will be loaded in the
-            main process.
+            Number of parallel workers running the `__getitem__` of the dataset and the `data_collator`, threads unless
+            `dataloader_python_multiprocessing=True`.
+        dataloader_python_multiprocessing (`bool`, *optional*, defaults to `False`):
+            Whether to run the `__getitem__` of the dataset and the `data_collator` in `dataloader_num_workers` worker
+            processes rather than threads, so that Python-heavy tokenization and collation are not bound by the GIL.
+            The samples and batches are sent back to the main process through shared memory.
         past_index (`int`, *optional*, defaults to -1):
             Some models like [TransformerXL](../model_doc/transformerxl) or [XLNet](../model_doc/xlnet) can make use of
             the past hidden states for their predictions. If this argument is set to a positive int, the `Trainer` will
@@ -351,6 +355,10 @@ class TrainingArguments:
             The label smoothing factor to use. Zero means no label smoothing, otherwise the underlying onehot-encoded
             labels are changed from 0s and 1s to `label_smoothing_factor/num_labels` and `1 - label_smoothing_factor +
             label_smoothing_factor/num_labels` respectively.
+        loss_type (`str`, *optional*):
+            The key in `LOSS_MAPPING` of the loss function of the model, e.g. `"ForCausalLMChunked"` to compute the
+            loss of causal language models by chunks of tokens, without materializing their logits. Cannot be combined
+            with `label_smoothing_factor`.
         debug (`str` or list of [`~debug_utils.DebugOption`], *optional*, defaults to `""`):
             Enable one or more debug features. This is an experimental feature.
 
@@ -370,8 +378,16 @@ class TrainingArguments:
             padding applied and be more efficient). Only useful if applying dynamic padding.
         length_column_name (`str`, *optional*, defaults to `"length"`):
             Column name for precomputed lengths. If the column exists, grouping by length will use these values rather
-            than computing them on train startup. Ignored unless `group_by_length` is `True` and the dataset is an
-            instance of `Dataset`.
+            than computing them on train startup. Ignored unless `group_by_length` is `True`, `eval_group_by_length` is
+            `True` or `packing_max_length` is set, and the dataset is an instance of `Dataset`.
+        eval_group_by_length (`bool`, *optional*, defaults to `False`):
+            Whether or not to sort the evaluation samples by length before batching them, so that each batch is only
+            padded to the length of similar samples. The predictions are returned in the order of the dataset.
+        packing_max_length (`int`, *optional*):
+            If set, the training examples are packed into rows of `packing_max_length` tokens with
+            [`~data.data_collator.PackedDataset`] and [`~data.data_collator.DataCollatorForPacking`], which replaces
+            the `data_collator` and `group_by_length` for training. `per_device_train_batch_size` is then a number of
+            rows. The model must restrict its attention to the examples of the rows from their `position_ids`.
         report_to (`str` or `List[str]`, *optional*, defaults to `"all"`):
             The list of integrations to report the results and logs to. Supported platforms are `"azure_ml"`,
             `"clearml"`, `"codecarbon"`, `"comet_ml"`, `"dagshub"`, `"dvclive"`, `"flyte"`, `"mlflow"`, `"neptune"`,
@@ -388,8 +404,8 @@ class TrainingArguments:
         dataloader_pin_memory (`bool`, *optional*, defaults to `True`):
             Whether you want to pin memory in data loaders or not. Will default to `True`.
         dataloader_persistent_workers (`bool`, *optional*, defaults to `False`):
-            If True, the data loader will not shut down the worker processes after a dataset has been consumed once.
-            This allows to maintain the workers Dataset instances alive. Can potentially speed up training, but will
+            If True, a single iterator is created for all the training epochs, so that the data pipeline and its
+            workers are not shut down and restarted after each epoch. Can potentially speed up training, but will
             increase RAM usage. Will default to `False`.
         dataloader_prefetch_factor (`int`, *optional*):
             Number of batches loaded in advance by each worker.
@@ -498,6 +514,16 @@ class TrainingArguments:
 
         eval_on_start(`bool`, *optional*, defaults to `False`):
             Whether to perform a evaluation step (sanity check) before the training to ensure the validation steps works correctly.
+
+        predict_with_generate (`bool`, *optional*, defaults to `False`):
+            Whether to use `generate` to compute the predictions passed to `compute_metrics` during evaluation, instead
+            of the logits of a forward pass.
+        generation_max_length (`int`, *optional*):
+            The `max_length` to use on each evaluation loop when `predict_with_generate=True`. Will default to the
+            `max_length` value of the model generation configuration.
+        generation_num_beams (`int`, *optional*):
+            The `num_beams` to use on each evaluation loop when `predict_with_generate=True`. Will default to the
+            `num_beams` value of the model generation configuration.
     """
 
     framework = "mindspore"
@@ -785,6 +811,12 @@ class TrainingArguments:
             )
         },
     )
+    dataloader_python_multiprocessing: bool = field(
+        default=False,
+        metadata={
+            "help": "Whether to run the dataset `__getitem__` and the `data_collator` in worker processes rather than threads."
+        },
+    )
     past_index: int = field(
         default=-1,
         metadata={"help": "If >=0, uses the corresponding part of the output as the past state for next step."},
@@ -831,6 +863,13 @@ class TrainingArguments:
     label_smoothing_factor: float = field(
         default=0.0, metadata={"help": "The label smoothing epsilon to apply (zero means no label smoothing)."}
     )
+    loss_type: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "The key in `LOSS_MAPPING` of the loss function of the model, e.g. `ForCausalLMChunked` to compute "
+            "the loss of causal language models without materializing their logits."
+        },
+    )
 
     default_optim = "adamw_mindspore"
     optim: Union[OptimizerNames, str] = field(
@@ -851,6 +890,14 @@ class TrainingArguments:
         default="length",
         metadata={"help": "Column name with precomputed lengths to use when grouping by length."},
     )
+    packing_max_length: Optional[int] = field(
+        default=None,
+        metadata={"help": "If set, pack the training examples into rows of this number of tokens."},
+    )
+    eval_group_by_length: bool = field(
+        default=False,
+        metadata={"help": "Whether or not to sort the evaluation samples by length before batching them."},
+    )
     report_to: Union[None, str, List[str]] = field(
         default=None, metadata={"help": "The list of integrations to report the results and logs to."}
     )
@@ -1040,6 +1087,18 @@ class TrainingArguments:
         },
     )
 
+    predict_with_generate: bool = field(
+        default=False, metadata={"help": "Whether to use generate to calculate generative metrics (ROUGE, BLEU)."}
+    )
+    generation_max_length: Optional[int] = field(
+        default=None,
+        metadata={"help": "The `max_length` to use on each evaluation loop when `predict_with_generate=True`."},
+    )
+    generation_num_beams: Optional[int] = field(
+        default=None,
+        metadata={"help": "The `num_beams` to use on each evaluation loop when `predict_with_generate=True`."},
+    )
+
     def __post_init__(self):
         # Parse in args that could be `dict` sent in from the CLI as a string
         for _field in _VALID_DICT_FIELDS:
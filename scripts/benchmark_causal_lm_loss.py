@@ -0,0 +1,71 @@
+"""
+Peak memory and throughput of a training step of the causal LM loss of `mindone.transformers`: the LM head and the
+loss, forward and backward, computed from the logits (`ForCausalLMLoss`) or by chunks of tokens from the last hidden
+states (`ForCausalLMChunkedLoss`).
+
+Usage:
+    python scripts/benchmark_causal_lm_loss.py --num_tokens 8192 --vocab_size 151936 --hidden_size 3584 --device_target Ascend
+"""
+import argparse
+import time
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import ops
+
+from mindone.transformers.loss.loss_utils import ForCausalLMChunkedLoss, ForCausalLMLoss
+
+
+def benchmark(grad_fn, hidden_states, weight, num_steps):
+    latencies = []
+    ms.runtime.synchronize()
+    ms.runtime.reset_peak_memory_stats()
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        loss, grads = grad_fn(hidden_states, weight)
+        loss.asnumpy()  # wait for the device
+        latencies.append(time.perf_counter() - start)
+    # the first step includes the memory allocation
+    return np.median(latencies[1:]), ms.runtime.max_memory_allocated() / 2**30
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_tokens", type=int, default=8192)
+    parser.add_argument("--vocab_size", type=int, default=151936)
+    parser.add_argument("--hidden_size", type=int, default=3584)
+    parser.add_argument("--chunk_size", type=int, default=1024)
+    parser.add_argument("--dtype", type=str, default="bfloat16", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--num_steps", type=int, default=10)
+    parser.add_argument("--device_target", type=str, default="Ascend")
+    args = parser.parse_args()
+
+    ms.set_context(mode=ms.PYNATIVE_MODE, device_target=args.device_target)
+    dtype = getattr(ms, args.dtype)
+    hidden_states = ops.randn((1, args.num_tokens, args.hidden_size), dtype=dtype)
+    weight = ms.Parameter(ops.randn((args.vocab_size, args.hidden_size), dtype=dtype) * 0.02, name="weight")
+    labels = ops.randint(0, args.vocab_size, (1, args.num_tokens), dtype=ms.int32)
+
+    def logits_loss(hidden_states, weight):
+        logits = ops.matmul(hidden_states, weight.swapaxes(0, 1))
+        return ForCausalLMLoss(logits, labels, args.vocab_size)
+
+    def chunked_loss(hidden_states, weight):
+        return ForCausalLMChunkedLoss(hidden_states, weight, labels, args.vocab_size, chunk_size=args.chunk_size)
+
+    print(
+        f"num_tokens={args.num_tokens}, vocab_size={args.vocab_size}, hidden_size={args.hidden_size}, "
+        f"dtype={args.dtype}"
+    )
+    for name, loss_fn in [("ForCausalLMLoss", logits_loss), ("ForCausalLMChunkedLoss", chunked_loss)]:
+        grad_fn = ms.value_and_grad(loss_fn, grad_position=(0, 1))
+        latency, peak_memory = benchmark(grad_fn, hidden_states, weight, args.num_steps)
+        print(
+            f"{name:<25} {latency * 1000:10.3f} ms/step {args.num_tokens / latency:12.0f} tokens/s "
+            f"{peak_memory:8.2f} GiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
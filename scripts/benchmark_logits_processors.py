@@ -0,0 +1,86 @@
+"""
+Per-step latency of the n-gram and sequence bias logits processors of `mindone.transformers`.
+
+Each processor is called on a context of `--seq_len` tokens growing by one token per step, as in `generate`, and
+compared to the host-side implementation it replaces, which copies the token ids back to the host at every step.
+
+Usage:
+    python scripts/benchmark_logits_processors.py --batch_size 64 --seq_len 4096 --device_target Ascend
+"""
+import argparse
+import time
+
+import numpy as np
+
+import mindspore as ms
+
+from mindone.transformers.generation.logits_process import (
+    EncoderNoRepeatNGramLogitsProcessor,
+    NoBadWordsLogitsProcessor,
+    NoRepeatNGramLogitsProcessor,
+)
+
+
+class HostNoRepeatNGramLogitsProcessor:
+    """The dict-based implementation, from fairseq."""
+
+    def __init__(self, ngram_size):
+        self.ngram_size = ngram_size
+
+    def __call__(self, input_ids, scores):
+        scores = scores.asnumpy().copy()
+        for i, gen_tokens in enumerate(input_ids.asnumpy().tolist()):
+            generated_ngrams = {}
+            for ngram in zip(*[gen_tokens[j:] for j in range(self.ngram_size)]):
+                generated_ngrams.setdefault(tuple(ngram[:-1]), []).append(ngram[-1])
+            banned_tokens = generated_ngrams.get(tuple(gen_tokens[len(gen_tokens) + 1 - self.ngram_size :]), [])
+            scores[i, banned_tokens] = -float("inf")
+        return ms.tensor(scores)
+
+
+def benchmark(processor, input_ids, scores, num_steps):
+    latencies = []
+    for step in range(num_steps):
+        context = input_ids[:, : input_ids.shape[1] - num_steps + step]
+        start = time.perf_counter()
+        processor(context, scores).asnumpy()  # wait for the device
+        latencies.append(time.perf_counter() - start)
+    # the first steps include compilation and memory allocation
+    return np.median(latencies[num_steps // 2 :]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--seq_len", type=int, default=4096)
+    parser.add_argument("--vocab_size", type=int, default=32000)
+    parser.add_argument("--ngram_size", type=int, default=3)
+    parser.add_argument("--num_bad_words", type=int, default=256)
+    parser.add_argument("--num_steps", type=int, default=20)
+    parser.add_argument("--device_target", type=str, default="Ascend")
+    parser.add_argument("--skip_host", action="store_true", help="do not run the host-side reference")
+    args = parser.parse_args()
+
+    ms.set_context(mode=ms.PYNATIVE_MODE, device_target=args.device_target)
+    rng = np.random.default_rng(0)
+    # a small effective vocabulary makes repeated n-grams, hence banned tokens, likely
+    input_ids = ms.tensor(rng.integers(0, 512, size=(args.batch_size, args.seq_len)), dtype=ms.int32)
+    scores = ms.tensor(rng.standard_normal((args.batch_size, args.vocab_size)), dtype=ms.float32)
+    bad_words_ids = [rng.integers(1, 512, size=rng.integers(1, 4)).tolist() for _ in range(args.num_bad_words)]
+
+    processors = {
+        "NoRepeatNGramLogitsProcessor": NoRepeatNGramLogitsProcessor(args.ngram_size),
+        "EncoderNoRepeatNGramLogitsProcessor": EncoderNoRepeatNGramLogitsProcessor(args.ngram_size, input_ids),
+        "NoBadWordsLogitsProcessor": NoBadWordsLogitsProcessor(bad_words_ids),
+    }
+    if not args.skip_host:
+        processors["NoRepeatNGramLogitsProcessor (host reference)"] = HostNoRepeatNGramLogitsProcessor(args.ngram_size)
+
+    print(f"batch_size={args.batch_size}, seq_len={args.seq_len}, vocab_size={args.vocab_size}")
+    for name, processor in processors.items():
+        latency = benchmark(processor, input_ids, scores, args.num_steps)
+        print(f"{name:<50} {latency:10.3f} ms/step")
+
+
+if __name__ == "__main__":
+    main()
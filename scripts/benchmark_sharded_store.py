@@ -0,0 +1,122 @@
+"""
+Throughput in samples/sec of the random access reads of the precomputed VAE latents and text embeddings, stored as a
+`.npz` file per sample (as the OpenSora datasets read them) and as a `mindone.data.ShardedStoreDataset`, and the number
+of file system metadata operations (opens and stats) of an epoch.
+
+The page cache is not dropped between the runs: run it on the shared file system of the datasets, with a number of
+samples larger than the memory, for the cold read numbers.
+
+Usage:
+    python scripts/benchmark_sharded_store.py --root /path/to/shared/fs --num_samples 10000
+"""
+import argparse
+import builtins
+import os
+import time
+from unittest import mock
+
+import numpy as np
+
+from mindone.data import ShardedStoreDataset, ShardedStoreWriter
+
+
+def generate_records(args):
+    rng = np.random.default_rng(0)
+    for i in range(args.num_samples):
+        yield f"videos/{i // 1000:04d}/clip_{i:08d}.mp4", {
+            "latent_mean": rng.standard_normal((args.latent_frames, 4, 32, 32), dtype=np.float32),
+            "latent_std": rng.random((args.latent_frames, 4, 32, 32), dtype=np.float32),
+            "text_emb": rng.standard_normal((300, 4096), dtype=np.float32).astype(np.float16),
+            "mask": np.ones(300, dtype=np.uint8),
+            "fps": np.array(24.0),
+        }
+
+
+def write_npz(args, root, compressed):
+    paths = []
+    for key, arrays in generate_records(args):
+        path = os.path.join(root, os.path.splitext(key)[0] + ".npz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        (np.savez_compressed if compressed else np.savez)(path, **arrays)
+        paths.append(path)
+    return paths
+
+
+def write_store(args, root, compression):
+    with ShardedStoreWriter(root, compression=compression) as writer:
+        for key, arrays in generate_records(args):
+            writer.write(key, **arrays)
+
+
+def read_sample(arrays):
+    # copy all the arrays, as the batching of the data pipeline does
+    return sum(np.array(arrays[name]).nbytes for name in ("latent_mean", "latent_std", "text_emb", "mask", "fps"))
+
+
+class MetadataCounter:
+    def __init__(self):
+        self.count = 0
+        self._patches = []
+        for module, name in [(builtins, "open"), (os, "stat"), (os, "open")]:
+            func = getattr(module, name)
+            self._patches.append(mock.patch.object(module, name, side_effect=self._counted(func)))
+
+    def _counted(self, func):
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *args):
+        for patch in self._patches:
+            patch.stop()
+
+
+def benchmark_npz(paths, order):
+    with MetadataCounter() as counter:
+        start = time.perf_counter()
+        for idx in order:
+            with np.load(paths[idx]) as data:
+                read_sample(data)
+        elapsed = time.perf_counter() - start
+    return len(order) / elapsed, counter.count
+
+
+def benchmark_store(root, order):
+    with MetadataCounter() as counter:
+        start = time.perf_counter()
+        dataset = ShardedStoreDataset(root)
+        for idx in order:
+            read_sample(dataset.read(idx))
+        elapsed = time.perf_counter() - start
+    return len(order) / elapsed, counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", type=str, default="benchmark_sharded_store")
+    parser.add_argument("--num_samples", type=int, default=2000)
+    parser.add_argument("--latent_frames", type=int, default=16)
+    args = parser.parse_args()
+
+    order = np.random.default_rng(1).permutation(args.num_samples)
+    print(f"num_samples={args.num_samples}, latent_frames={args.latent_frames}")
+    for name, compressed in [("npz", False), ("npz (compressed)", True)]:
+        paths = write_npz(args, os.path.join(args.root, name.replace(" ", "_")), compressed)
+        throughput, metadata_ops = benchmark_npz(paths, order)
+        print(f"{name:<25} {throughput:10.1f} samples/s {metadata_ops:10d} metadata ops")
+    for name, compression in [("sharded store", None), ("sharded store (zlib)", "zlib")]:
+        root = os.path.join(args.root, name.replace(" ", "_"))
+        write_store(args, root, compression)
+        throughput, metadata_ops = benchmark_store(root, order)
+        print(f"{name:<25} {throughput:10.1f} samples/s {metadata_ops:10d} metadata ops")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Throughput in samples/sec of the training dataloader of `mindone.transformers.Trainer`, with the dataset `__getitem__`
+and the `data_collator` running on threads (the default) or in worker processes
+(`dataloader_python_multiprocessing=True`), and with an iterator per epoch or a single one for all the epochs
+(`dataloader_persistent_workers=True`).
+
+The samples are tokenized in pure Python on the fly, as a stand-in for the GIL-bound preprocessing of real datasets.
+
+Usage:
+    python scripts/benchmark_train_dataloader.py --num_samples 4096 --num_workers 8 --num_epochs 2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from mindspore import nn
+
+from mindone.transformers.trainer import Trainer
+from mindone.transformers.training_args import TrainingArguments
+
+
+class TextDataset:
+    def __init__(self, num_samples, text_length, vocab_size):
+        self.num_samples = num_samples
+        self.text_length = text_length
+        self.vocab_size = vocab_size
+
+    def __getitem__(self, index):
+        rng = np.random.default_rng(int(index))
+        text = "".join(chr(ord("a") + c) for c in rng.integers(0, 26, size=self.text_length))
+        # a character level byte-pair style merge loop, in pure Python
+        tokens = [ord(c) for c in text]
+        for _ in range(4):
+            tokens = [(a * 31 + b) % self.vocab_size for a, b in zip(tokens[::2], tokens[1::2])] + tokens[len(tokens) :]
+        return {"input_ids": tokens}
+
+    def __len__(self):
+        return self.num_samples
+
+
+def data_collator(features):
+    max_length = max(len(feature["input_ids"]) for feature in features)
+    input_ids = np.zeros((len(features), max_length), dtype=np.int32)
+    for i, feature in enumerate(features):
+        input_ids[i, : len(feature["input_ids"])] = feature["input_ids"]
+    return {"input_ids": input_ids, "labels": input_ids.copy()}
+
+
+class DummyModel(nn.Cell):
+    def construct(self, input_ids=None, labels=None):
+        return input_ids.sum()
+
+
+def benchmark(args, multiprocessing, persistent_workers):
+    training_args = TrainingArguments(
+        output_dir="benchmark_train_dataloader",
+        per_device_train_batch_size=args.batch_size,
+        dataloader_num_workers=args.num_workers,
+        dataloader_python_multiprocessing=multiprocessing,
+        dataloader_persistent_workers=persistent_workers,
+        remove_unused_columns=False,
+        report_to="none",
+        save_strategy="no",
+    )
+    trainer = Trainer(
+        model=DummyModel(),
+        args=training_args,
+        data_collator=data_collator,
+        train_dataset=TextDataset(args.num_samples, args.text_length, args.vocab_size),
+    )
+    train_dataloader = trainer.get_train_dataloader()
+
+    # iterate over the epochs as `Trainer._inner_training_loop` does
+    start = time.perf_counter()
+    num_samples = 0
+    if persistent_workers:
+        iterator = train_dataloader.create_dict_iterator(num_epochs=args.num_epochs, output_numpy=True)
+    for _ in range(args.num_epochs):
+        if not persistent_workers:
+            iterator = train_dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)
+        for inputs in iterator:
+            num_samples += len(inputs["item"]["input_ids"])
+    return num_samples / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=4096)
+    parser.add_argument("--text_length", type=int, default=2048)
+    parser.add_argument("--vocab_size", type=int, default=32000)
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--num_workers", type=int, default=8)
+    parser.add_argument("--num_epochs", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"num_samples={args.num_samples}, num_workers={args.num_workers}, num_epochs={args.num_epochs}")
+    for name, multiprocessing, persistent_workers in [
+        ("threads", False, False),
+        ("processes", True, False),
+        ("processes, persistent", True, True),
+    ]:
+        throughput = benchmark(args, multiprocessing, persistent_workers)
+        print(f"{name:<25} {throughput:10.1f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput in frames/sec of the strided frame sampling of `mindone.data.VideoReader`, against the previous reader that
+seeks to every strided frame, with a number of decoding threads and resizing at decode time.
+
+A synthetic video is written with OpenCV if no video is given.
+
+Usage:
+    python scripts/benchmark_video_reader.py --video_path video.mp4 --num_frames 16 --step 4 --num_threads 4
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from mindone.data import VideoReader
+
+
+def legacy_fetch_frames(video_path, num, start_pos, step):
+    # the previous `VideoReader.fetch_frames`: a seek per strided frame
+    cap = cv2.VideoCapture(video_path, apiPreference=cv2.CAP_FFMPEG)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_pos)
+    frames = []
+    i = start_pos
+    ret, frame = cap.read()
+    while ret and len(frames) < num:
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if step > 1:
+            i += step
+            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = cap.read()
+    cap.release()
+    return np.stack(frames)
+
+
+def reader_fetch_frames(video_path, num, start_pos, step, **kwargs):
+    with VideoReader(video_path, **kwargs) as reader:
+        return reader.fetch_frames(num=num, start_pos=start_pos, step=step)
+
+
+def write_video(video_path, num_frames, width, height, fps=25):
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    for i in range(num_frames):
+        writer.write(np.roll(frame, 4 * i, axis=1))
+    writer.release()
+
+
+def benchmark(fetch_fn, video_path, num_clips, num_frames, step, video_length):
+    rng = np.random.default_rng(0)
+    start_positions = rng.integers(0, video_length - (num_frames - 1) * step, size=num_clips)
+    start = time.perf_counter()
+    for start_pos in start_positions:
+        fetch_fn(video_path, num_frames, int(start_pos), step)
+    return num_clips * num_frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video_path", type=str, default=None)
+    parser.add_argument("--num_clips", type=int, default=20)
+    parser.add_argument("--num_frames", type=int, default=16)
+    parser.add_argument("--step", type=int, default=4)
+    parser.add_argument("--num_threads", type=int, default=4)
+    parser.add_argument("--size", type=int, nargs=2, default=[256, 256], help="The resize (width, height).")
+    args = parser.parse_args()
+
+    if args.video_path is None:
+        args.video_path = "benchmark_video_reader.mp4"
+        write_video(args.video_path, num_frames=600, width=1280, height=720)
+    with VideoReader(args.video_path) as reader:
+        video_length = len(reader)
+        print(f"video {reader.shape[0]}x{reader.shape[1]}, {video_length} frames")
+    print(f"num_frames={args.num_frames}, step={args.step}")
+
+    for name, fetch_fn in [
+        ("legacy (seek per frame)", legacy_fetch_frames),
+        ("VideoReader", reader_fetch_frames),
+        (
+            f"VideoReader, {args.num_threads} threads",
+            lambda *inputs: reader_fetch_frames(*inputs, num_threads=args.num_threads),
+        ),
+        (
+            f"VideoReader, {args.num_threads} threads, resize",
+            lambda *inputs: reader_fetch_frames(*inputs, num_threads=args.num_threads, size=tuple(args.size)),
+        ),
+    ]:
+        throughput = benchmark(fetch_fn, args.video_path, args.num_clips, args.num_frames, args.step, video_length)
+        print(f"{name:<40} {throughput:10.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
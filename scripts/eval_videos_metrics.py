@@ -1,16 +1,19 @@
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import cv2
+import numpy as np
 import pandas as pd
-from PIL import Image
 from tqdm import tqdm
 from transformers import CLIPProcessor
 
-from mindone.metrics import ClipScoreFrame, ClipScoreText
-from mindone.transformers import CLIPModel
+import mindspore as ms
+from mindspore.mint.distributed import all_gather_object
 
-VIDEO_EXTENSIONS = {".mp4"}
+from mindone.metrics import ClipScoreFrame, ClipScoreText, load_video_frames
+from mindone.metrics.video_metrics import VIDEO_EXTENSIONS
+from mindone.transformers import CLIPModel
+from mindone.utils.env import init_env
 
 parser = argparse.ArgumentParser()
 parser.add_argument(
@@ -22,47 +25,73 @@ parser.add_argument(
 parser.add_argument("--video_data_dir", type=str, default=None, help="path to data folder." "Default: None")
 parser.add_argument("--video_caption_path", type=str, default=None, help="path to video caption path." "Default: None")
 parser.add_argument("--metric", type=str, default="clip_score_text", choices=["clip_score_text", "clip_score_frame"])
+parser.add_argument(
+    "--num_frames",
+    type=int,
+    default=16,
+    help="number of frames sampled uniformly from each video, -1 for all the frames." "Default: 16",
+)
+parser.add_argument("--batch_size", type=int, default=8, help="number of videos scored at once." "Default: 8")
+parser.add_argument(
+    "--frame_batch_size", type=int, default=64, help="number of frames per CLIP forward pass." "Default: 64"
+)
+parser.add_argument("--num_workers", type=int, default=4, help="number of decoding threads." "Default: 4")
+parser.add_argument("--device_target", type=str, default="Ascend", choices=["Ascend", "GPU", "CPU"])
+parser.add_argument("--distributed", action="store_true", help="evaluate the videos on all the ranks.")
 args = parser.parse_args()
 
 assert args.video_data_dir is not None
 
+_, rank_id, device_num = init_env(mode=ms.PYNATIVE_MODE, device_target=args.device_target, distributed=args.distributed)
+
 model = CLIPModel.from_pretrained(args.model_name)
 processor = CLIPProcessor.from_pretrained(args.model_name)
-clip_score_text = ClipScoreText(model, processor)
-clip_score_frame = ClipScoreFrame(model, processor)
+if args.metric == "clip_score_text":
+    metric = ClipScoreText(model, processor, batch_size=args.frame_batch_size)
+elif args.metric == "clip_score_frame":
+    metric = ClipScoreFrame(model, processor, batch_size=args.frame_batch_size)
+else:
+    raise NotImplementedError(args.metric)
+# the frames are resized to the input size of the model while decoding
+size = metric.encoder.image_size[::-1]
 
-scores = []
 df = pd.read_csv(args.video_caption_path)
-for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-    video_name = row["video"]
-    edited_prompt = row["caption"]
-    if os.path.splitext(video_name)[1] in VIDEO_EXTENSIONS:
-        video_path = f"{args.video_data_dir}/{video_name}"
-    else:
+samples = []
+for video_name, caption in zip(df["video"], df["caption"]):
+    if os.path.splitext(video_name)[1] not in VIDEO_EXTENSIONS:
         print(f"Not support format: {video_name}. ")
         continue
+    video_path = f"{args.video_data_dir}/{video_name}"
     if not os.path.exists(video_path):
         raise FileNotFoundError(video_path)
-    cap = cv2.VideoCapture(video_path)
-    frames = []
-    index = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if ret:
-            frame = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            frames.append(frame)
-            index += 1
+    samples.append((video_path, caption))
+
+samples = samples[rank_id::device_num]
+batches = [samples[i : i + args.batch_size] for i in range(0, len(samples), args.batch_size)]
+scores = []
+with ThreadPoolExecutor(args.num_workers) as executor:
+
+    def submit(batch):
+        return [executor.submit(load_video_frames, video_path, args.num_frames, size) for video_path, _ in batch]
+
+    # the videos of the next batch are decoded while the current one is scored
+    decoded = submit(batches[0]) if batches else []
+    for i in tqdm(range(len(batches))):
+        current, decoded = decoded, submit(batches[i + 1]) if i + 1 < len(batches) else []
+        videos = [future.result() for future in current]
+        if args.metric == "clip_score_text":
+            scores.extend(metric.score_videos(videos, [caption for _, caption in batches[i]]))
         else:
-            break
-    cap.release()
-    frames = [i.resize((224, 224)) for i in frames]
-    if args.metric == "clip_score_text":
-        score = clip_score_text.score(frames, edited_prompt)
-        scores.append(score)
-    elif args.metric == "clip_score_frame":
-        score = clip_score_frame.score(frames)
-        scores.append(score)
-    else:
-        raise NotImplementedError(args.metric)
+            scores.extend(metric.score_videos(videos))
+
+if device_num > 1:
+    gathered = [None] * device_num
+    all_gather_object(gathered, scores)
+    scores = sum(gathered, [])
 
-print("{}: {}".format(args.metric, sum(scores) / len(scores)))
+if rank_id == 0:
+    # the frame consistency of a single frame video is undefined (NaN), such videos are left out of the mean
+    num_skipped = int(np.isnan(scores).sum())
+    if num_skipped > 0:
+        print(f"Skipped {num_skipped} of {len(scores)} videos without a {args.metric} (single frame videos).")
+    print("{}: {}".format(args.metric, np.nanmean(scores)))
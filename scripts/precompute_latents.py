@@ -0,0 +1,96 @@
+"""
+Precomputes the VAE latents and the text embeddings of the videos of a CSV manifest into a
+`mindone.data.ShardedStoreDataset`, with the VAE and the text encoder of a `mindone.diffusers` pipeline, on any number of
+ranks. Relaunching the same command resumes the precomputation, with any number of ranks.
+
+Usage:
+    msrun --worker_num 8 --local_worker_num 8 scripts/precompute_latents.py \
+        --pretrained_model_name_or_path Wan-AI/Wan2.1-T2V-1.3B-Diffusers --vae_class AutoencoderKLWan \
+        --text_encoder_class UMT5EncoderModel --max_length 512 \
+        --manifest train.csv --video_folder videos --output_dir latents \
+        --resolutions 480x832 832x480 --frame_counts 17 33 81 --batch_size 1
+"""
+import argparse
+import logging
+
+from transformers import AutoTokenizer
+
+import mindspore as ms
+
+from mindone import diffusers, transformers
+from mindone.data import PrecomputeEngine, TextEmbeddingEncoder, VAEVideoEncoder
+from mindone.utils.env import init_env
+
+logging.basicConfig(level=logging.INFO)
+
+DTYPES = {"fp32": ms.float32, "fp16": ms.float16, "bf16": ms.bfloat16}
+
+
+def parse_resolution(resolution):
+    height, width = resolution.split("x")
+    return int(height), int(width)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pretrained_model_name_or_path", type=str, required=True)
+    parser.add_argument("--vae_class", type=str, default="AutoencoderKLWan", help="Empty for no latents.")
+    parser.add_argument("--temporal_vae", type=lambda x: x.lower() == "true", default=True)
+    parser.add_argument("--text_encoder_class", type=str, default="UMT5EncoderModel", help="Empty for no embeddings.")
+    parser.add_argument("--max_length", type=int, default=512)
+    parser.add_argument("--dtype", type=str, default="bf16", choices=list(DTYPES))
+    parser.add_argument("--manifest", type=str, required=True)
+    parser.add_argument("--video_folder", type=str, default="")
+    parser.add_argument("--output_dir", type=str, required=True)
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(256, 256)], help="HxW")
+    parser.add_argument("--frame_counts", type=int, nargs="+", default=[16])
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_workers", type=int, default=4)
+    parser.add_argument("--checkpoint_interval", type=int, default=10)
+    parser.add_argument(
+        "--stat_files", action="store_true", help="Balance the videos without cost metadata by their file size."
+    )
+    parser.add_argument("--device_target", type=str, default="Ascend")
+    parser.add_argument("--distributed", action="store_true")
+    args = parser.parse_args()
+
+    _, rank_id, device_num = init_env(
+        mode=ms.PYNATIVE_MODE, device_target=args.device_target, distributed=args.distributed
+    )
+    dtype = DTYPES[args.dtype]
+
+    video_encoder = text_encoder = None
+    if args.vae_class:
+        vae = getattr(diffusers, args.vae_class).from_pretrained(
+            args.pretrained_model_name_or_path, subfolder="vae", mindspore_dtype=dtype
+        )
+        video_encoder = VAEVideoEncoder(vae, temporal=args.temporal_vae, dtype=dtype)
+    if args.text_encoder_class:
+        tokenizer = AutoTokenizer.from_pretrained(args.pretrained_model_name_or_path, subfolder="tokenizer")
+        model = getattr(transformers, args.text_encoder_class).from_pretrained(
+            args.pretrained_model_name_or_path, subfolder="text_encoder", mindspore_dtype=dtype
+        )
+        text_encoder = TextEmbeddingEncoder(tokenizer, model, max_length=args.max_length)
+
+    engine = PrecomputeEngine(
+        args.manifest,
+        args.output_dir,
+        video_folder=args.video_folder,
+        video_encoder=video_encoder,
+        text_encoder=text_encoder,
+        resolutions=args.resolutions,
+        frame_counts=args.frame_counts,
+        stride=args.stride,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        checkpoint_interval=args.checkpoint_interval,
+        stat_files=args.stat_files,
+        rank_id=rank_id,
+        device_num=device_num,
+    )
+    engine.run()
+
+
+if __name__ == "__main__":
+    main()
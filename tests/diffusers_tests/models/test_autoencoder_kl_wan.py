@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+from mindspore import mint
+
+from mindone.diffusers import AutoencoderKLWan
+
+# the causal convolutions and the attention of the VAE have no CPU kernels
+pytestmark = pytest.mark.skipif(ms.get_context("device_target") == "CPU", reason="requires an Ascend device")
+
+
+@pytest.fixture(scope="module")
+def vae():
+    ms.set_seed(0)
+    vae = AutoencoderKLWan(
+        base_dim=3, z_dim=4, dim_mult=[1, 1, 1, 1], num_res_blocks=1, temperal_downsample=[False, True, True]
+    )
+    vae.set_train(False)
+    return vae
+
+
+@pytest.fixture(scope="module")
+def latents():
+    # 2 videos of 5 frames of 64x64 pixels
+    return ms.tensor(np.random.default_rng(0).standard_normal((2, 4, 2, 8, 8)), dtype=ms.float32)
+
+
+def test_tiled_decode_matches_decode(vae, latents):
+    expected = vae.decode(latents)[0].asnumpy()
+
+    vae.enable_tiling(
+        tile_sample_min_height=32, tile_sample_min_width=32, tile_sample_stride_height=24, tile_sample_stride_width=24
+    )
+    try:
+        tiled = vae.decode(latents)[0].asnumpy()
+    finally:
+        vae.disable_tiling()
+
+    assert tiled.shape == expected.shape == (2, 3, 5, 64, 64)
+    # the tiles see less context than the whole frame, and their overlaps are blended
+    assert np.abs(tiled - expected).mean() < 0.02
+
+
+def test_sliced_decode_matches_decode(vae, latents):
+    expected = vae.decode(latents)[0].asnumpy()
+
+    vae.enable_slicing()
+    try:
+        sliced = vae.decode(latents)[0].asnumpy()
+    finally:
+        vae.disable_slicing()
+
+    np.testing.assert_allclose(sliced, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_decode_iter_matches_decode(vae, latents):
+    expected = vae.decode(latents)[0].asnumpy()
+
+    chunks = list(vae.decode_iter(latents))
+    assert [chunk.shape[2] for chunk in chunks] == [1, 4]
+    np.testing.assert_allclose(mint.cat(chunks, dim=2).asnumpy(), expected, rtol=1e-5, atol=1e-5)
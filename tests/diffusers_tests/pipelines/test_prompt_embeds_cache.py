@@ -0,0 +1,91 @@
+import numpy as np
+
+import mindspore as ms
+from mindspore import nn
+
+from mindone.diffusers import PromptEmbedsCache
+from mindone.diffusers._peft import LoraConfig, inject_adapter_in_model
+from mindone.diffusers.utils.peft_utils import scale_lora_layers, unscale_lora_layers
+
+
+class DummyTextEncoder:
+    class config:
+        _name_or_path = "dummy-t5"
+
+
+class CountingEncodeFn:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompt):
+        self.calls.append(list(prompt))
+        embeds = np.array([[len(p)] * 4 for p in prompt], dtype=np.float32)
+        return ms.tensor(embeds).to(ms.bfloat16), ms.tensor(np.ones((len(prompt), 2), dtype=np.int64))
+
+
+def test_prompt_embeds_cache_memory_tier():
+    cache = PromptEmbedsCache(max_size=8)
+    encode_fn = CountingEncodeFn()
+
+    embeds, mask = cache.encode(DummyTextEncoder(), ["a cat", "", "a cat"], encode_fn, max_sequence_length=4)
+    assert encode_fn.calls == [["a cat", ""]]
+    assert embeds.shape == (3, 4) and mask.shape == (3, 2)
+    np.testing.assert_allclose(embeds.float().asnumpy()[:, 0], [5, 0, 5])
+
+    cache.encode(DummyTextEncoder(), ["", "a dog"], encode_fn, max_sequence_length=4)
+    assert encode_fn.calls == [["a cat", ""], ["a dog"]]
+
+    # different tokenizer settings must not hit the cache
+    cache.encode(DummyTextEncoder(), [""], encode_fn, max_sequence_length=8)
+    assert encode_fn.calls[-1] == [""]
+
+
+def test_prompt_embeds_cache_lru_eviction():
+    cache = PromptEmbedsCache(max_size=1)
+    encode_fn = CountingEncodeFn()
+
+    cache.encode(DummyTextEncoder(), ["a"], encode_fn)
+    cache.encode(DummyTextEncoder(), ["b"], encode_fn)
+    cache.encode(DummyTextEncoder(), ["a"], encode_fn)
+    assert encode_fn.calls == [["a"], ["b"], ["a"]]
+    assert len(cache) == 1
+
+
+def test_prompt_embeds_cache_disk_tier(tmp_path):
+    encode_fn = CountingEncodeFn()
+    PromptEmbedsCache(cache_dir=tmp_path).encode(DummyTextEncoder(), ["a cat"], encode_fn)
+
+    embeds, mask = PromptEmbedsCache(cache_dir=tmp_path).encode(DummyTextEncoder(), ["a cat"], encode_fn)
+    assert len(encode_fn.calls) == 1
+    assert embeds.dtype == ms.bfloat16 and mask.dtype == ms.int64
+    np.testing.assert_allclose(embeds.float().asnumpy(), [[5, 5, 5, 5]])
+
+
+def test_prompt_embeds_cache_lora_scale():
+    class LoraTextEncoder(nn.Cell):
+        def __init__(self):
+            super().__init__()
+            self.proj = nn.Dense(4, 4)
+
+        def construct(self, x):
+            return self.proj(x)
+
+    encoder = inject_adapter_in_model(LoraConfig(r=2, target_modules=["proj"]), LoraTextEncoder())
+    cache = PromptEmbedsCache()
+    encode_fn = CountingEncodeFn()
+
+    def encode(lora_scale):
+        # as the pipelines do, the LoRA layers of the text encoder are scaled while encoding the prompt
+        scale_lora_layers(encoder, lora_scale)
+        cache.encode(encoder, ["a cat"], encode_fn)
+        unscale_lora_layers(encoder, lora_scale)
+
+    encode(1.0)
+    encode(0.5)
+    assert len(encode_fn.calls) == 2
+    encode(0.5)
+    assert len(encode_fn.calls) == 2
+
+    encoder.proj.enable_adapters(False)
+    cache.encode(encoder, ["a cat"], encode_fn)
+    assert len(encode_fn.calls) == 3
@@ -0,0 +1,65 @@
+import numpy as np
+
+import mindspore as ms
+from mindspore import mint
+
+from mindone.diffusers import DiffusionRequest, RequestBatchingEngine
+from mindone.diffusers.configuration_utils import ConfigMixin, register_to_config
+
+
+class DummyScheduler(ConfigMixin):
+    config_name = "scheduler_config.json"
+
+    @register_to_config
+    def __init__(self, num_train_timesteps: int = 1000):
+        self.timesteps = None
+
+    def set_timesteps(self, num_inference_steps):
+        self.timesteps = ms.tensor(np.linspace(999, 0, num_inference_steps).astype(np.float32))
+
+    def step(self, model_output, timestep, sample, return_dict=False):
+        return (sample + model_output,)
+
+
+class DummyPipeline:
+    scheduler = DummyScheduler()
+
+
+class DummyEngine(RequestBatchingEngine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+
+    def encode(self, request):
+        cond = {"embeds": ms.tensor([[float(len(request.prompt))]])}
+        uncond = {"embeds": ms.tensor([[0.0]])}
+        return cond, uncond
+
+    def prepare_latents(self, request):
+        return mint.zeros((1, 1), dtype=ms.float32)
+
+    def predict(self, latents, timesteps, inputs, states):
+        self.batch_sizes.append(latents.shape[0])
+        # the conditional prediction is the prompt length, the unconditional one is 0
+        return inputs["embeds"]
+
+    def decode(self, latents):
+        return latents.asnumpy()
+
+
+def test_mixed_guidance_and_steps():
+    engine = DummyEngine(DummyPipeline(), height=8, width=8, max_batch_size=4)
+    requests = [
+        DiffusionRequest("abc", guidance_scale=2.0, num_inference_steps=2),
+        DiffusionRequest("abcd", guidance_scale=1.0, num_inference_steps=3),
+        DiffusionRequest("ab", guidance_scale=3.0, num_inference_steps=1),
+    ]
+    results = engine.run(requests)
+
+    # guided rows: len(prompt) * scale per step, unguided rows: len(prompt) per step
+    np.testing.assert_allclose(results[requests[0].request_id], [3 * 2.0 * 2])
+    np.testing.assert_allclose(results[requests[1].request_id], [4 * 1.0 * 3])
+    np.testing.assert_allclose(results[requests[2].request_id], [2 * 3.0 * 1])
+    # the first two requests fill 3 rows, the third one joins once the first one has left
+    assert engine.batch_sizes == [3, 3, 3]
+    assert engine.num_pending == 0
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+
+from mindone.data import BucketSampler, create_dataloader
+
+BUCKETS = [(16, 256, 256), (16, 256, 448), (16, 448, 256), (32, 256, 448), (32, 512, 896)]
+
+
+def _sample_shapes(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = rng.integers(8, 100, num_samples)
+    heights, widths = rng.integers(200, 1100, (2, num_samples))
+    return np.stack([frames, heights, widths], axis=1)
+
+
+def test_bucket_sampler_assign_buckets():
+    shapes = [
+        (20, 720, 1280),  # 16 frames, landscape
+        (40, 720, 1280),  # 32 frames, landscape, closest area
+        (40, 240, 426),  # 32 frames, landscape, closest area
+        (40, 1280, 720),  # no portrait bucket of 32 frames
+        (17, 500, 500),  # square
+        (4, 500, 500),  # too short for all the buckets
+    ]
+    assert BucketSampler.assign_buckets(np.array(shapes), BUCKETS).tolist() == [1, 4, 3, 4, 0, 0]
+
+
+def test_bucket_sampler_batch_sizes():
+    sampler = BucketSampler(_sample_shapes(10), BUCKETS, max_tokens=16 * 256 * 256 * 4, patch_size=(1, 1, 1))
+    assert sampler.batch_sizes == [4, 2, 2, 1, 1]
+    sampler = BucketSampler(_sample_shapes(10), BUCKETS, max_tokens=20000, patch_size=(4, 16, 16))
+    assert sampler.batch_sizes == [19, 11, 11, 5, 1]
+    with pytest.raises(ValueError):
+        BucketSampler(_sample_shapes(10), BUCKETS)
+
+
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_bucket_sampler_shards(shuffle):
+    shapes = _sample_shapes(503)
+    batch_sizes = [8, 5, 5, 3, 2]
+    samplers = [
+        BucketSampler(shapes, BUCKETS, batch_sizes=batch_sizes, num_replicas=3, rank=rank, shuffle=shuffle, seed=1)
+        for rank in range(3)
+    ]
+    epochs = [[sampler._epoch_batches(epoch) for sampler in samplers] for epoch in range(2)]
+    for rank_batches in epochs:
+        # the same number of samples on every process, and no sample dropped
+        assert len({sum(len(batch) for batch in batches) for batches in rank_batches}) == 1
+        assert sum(len(batch) for batch in rank_batches[0]) == len(samplers[0])
+        assert set(np.concatenate([np.concatenate(batches) for batches in rank_batches]).tolist()) == set(range(503))
+        # full batches of a single bucket, the same bucket on all the processes at each step
+        for step in zip(*rank_batches):
+            bucket_ids = {i for batch in step for i in samplers[0].bucket_ids[batch]}
+            assert len(bucket_ids) == 1
+            assert all(len(batch) == batch_sizes[bucket_ids.pop()] for batch in step[:1])
+            assert len({len(batch) for batch in step}) == 1
+    assert (epochs[0][0][0] != epochs[1][0][0]).any() == shuffle
+
+
+class _BucketDataset:
+    output_columns = ["video", "bucket_id"]
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+
+    def __getitem__(self, idx):
+        # a dataset would resize its samples to the shape of their bucket
+        num_frames, height, width = self.sampler.get_bucket(idx)
+        video = np.full((num_frames, height // 64, width // 64), idx, dtype=np.int32)
+        return video, np.array(self.sampler.bucket_ids[idx], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.sampler.bucket_ids)
+
+
+def test_bucket_sampler_dataloader():
+    sampler = BucketSampler(_sample_shapes(101), BUCKETS, batch_sizes=[8, 5, 5, 3, 2], num_replicas=2, rank=1)
+    dataloader = create_dataloader(_BucketDataset(sampler), sampler=sampler, num_workers_dataset=1)
+    iterator = dataloader.create_dict_iterator(num_epochs=1, output_numpy=True)
+    batches = list(iterator)
+    expected = sampler._epoch_batches(0)
+
+    assert len(batches) == len(expected)
+    for batch, indices in zip(batches, expected):
+        bucket_id = int(batch["bucket_id"][0])
+        num_frames, height, width = BUCKETS[bucket_id]
+        assert batch["video"].shape == (len(indices), num_frames, height // 64, width // 64)
+        assert batch["video"][:, 0, 0, 0].tolist() == indices.tolist()
+
+
+def test_bucket_sampler_ms_dataset_length():
+    sampler = BucketSampler(_sample_shapes(50), BUCKETS, batch_sizes=[4, 4, 4, 4, 4])
+    dataset = ms.dataset.GeneratorDataset(_BucketDataset(sampler), ["video", "bucket_id"], sampler=sampler)
+    assert dataset.get_dataset_size() == len(sampler)
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from mindspore import Tensor
+
+from mindone.metrics import (
+    FeatureSample,
+    FeatureStatistics,
+    FrechetInceptionDistance,
+    InceptionScore,
+    KernelInceptionDistance,
+    dataset_fingerprint,
+    frechet_distance,
+)
+
+
+def identity(x):
+    return x
+
+
+@pytest.mark.parametrize("to_tensor", [False, True])
+def test_feature_statistics(to_tensor):
+    rng = np.random.default_rng(0)
+    features = rng.normal(3.0, 2.0, (1000, 8)) @ rng.normal(size=(8, 8))
+    statistics = FeatureStatistics()
+    for batch in np.array_split(features, [1, 100, 101, 537]):
+        statistics.update(Tensor(batch.astype(np.float32)) if to_tensor else batch)
+
+    tolerance = 1e-4 if to_tensor else 1e-10
+    assert statistics.count == len(features)
+    np.testing.assert_allclose(statistics.mean, features.mean(axis=0), rtol=tolerance, atol=tolerance)
+    np.testing.assert_allclose(statistics.covariance, np.cov(features, rowvar=False), rtol=tolerance, atol=tolerance)
+
+    restored = FeatureStatistics.from_state_dict(statistics.state_dict())
+    np.testing.assert_allclose(restored.covariance, statistics.covariance)
+
+
+def test_feature_sample():
+    sample = FeatureSample(max_samples=100, seed=0)
+    for start in range(0, 10000, 64):
+        batch = np.arange(start, min(start + 64, 10000), dtype=np.float64)[:, None]
+        sample.update(batch)
+    assert sample.count == 10000
+    assert sample.features.shape == (100, 1)
+    assert len(np.unique(sample.features)) == 100
+    # a uniform sample of the stream, not biased towards its start or its end
+    assert 3000 < sample.features.mean() < 7000
+
+
+def test_frechet_distance():
+    rng = np.random.default_rng(0)
+    mean1, mean2 = rng.normal(size=4), rng.normal(size=4)
+    variances1, variances2 = rng.uniform(0.5, 2, 4), rng.uniform(0.5, 2, 4)
+    expected = ((mean1 - mean2) ** 2).sum() + (variances1 + variances2 - 2 * np.sqrt(variances1 * variances2)).sum()
+    distance = frechet_distance(mean1, np.diag(variances1), mean2, np.diag(variances2))
+    np.testing.assert_allclose(distance, expected, rtol=1e-10)
+
+    covariance = np.cov(rng.normal(size=(100, 4)), rowvar=False)
+    np.testing.assert_allclose(frechet_distance(mean1, covariance, mean1, covariance), 0, atol=1e-8)
+
+
+def test_fid_reference_cache(tmp_path):
+    rng = np.random.default_rng(0)
+    real = rng.normal(size=(256, 6)).astype(np.float32)
+    fake = rng.normal(0.5, 1.5, size=(256, 6)).astype(np.float32)
+
+    fid = FrechetInceptionDistance(identity)
+    assert not fid.load_reference(str(tmp_path), "abc")
+    for i in range(0, 256, 64):
+        fid.update(real[i : i + 64], real=True)
+    fid.save_reference(str(tmp_path), "abc")
+    for i in range(0, 256, 64):
+        fid.update(fake[i : i + 64])
+    expected = frechet_distance(
+        real.mean(axis=0).astype(np.float64),
+        np.cov(real, rowvar=False),
+        fake.mean(axis=0).astype(np.float64),
+        np.cov(fake, rowvar=False),
+    )
+    np.testing.assert_allclose(fid.compute(), expected, rtol=1e-4)
+    with pytest.raises(RuntimeError):
+        fid.update(real[:64], real=True)
+
+    # a new evaluation only extracts the features of the generated samples
+    cached = FrechetInceptionDistance(identity)
+    assert cached.load_reference(str(tmp_path), "abc")
+    cached.update(fake)
+    np.testing.assert_allclose(cached.compute(), fid.compute(), rtol=1e-6)
+
+
+def test_dataset_fingerprint(tmp_path):
+    files = []
+    for i in range(3):
+        files.append(str(tmp_path / f"{i}.png"))
+        with open(files[-1], "wb") as f:
+            f.write(b"x" * i)
+    fingerprint = dataset_fingerprint(files, resolution=299)
+    assert dataset_fingerprint(files[::-1], resolution=299) == fingerprint
+    assert dataset_fingerprint(files, resolution=256) != fingerprint
+    assert dataset_fingerprint(files[:2], resolution=299) != fingerprint
+    with open(files[0], "wb") as f:
+        f.write(b"modified")
+    assert dataset_fingerprint(files, resolution=299) != fingerprint
+
+
+def test_kernel_inception_distance():
+    rng = np.random.default_rng(0)
+    real = rng.normal(size=(50, 4)).astype(np.float32)
+    fake = rng.normal(1.0, 1.0, size=(50, 4)).astype(np.float32)
+    kid = KernelInceptionDistance(identity, subsets=3, subset_size=50, max_samples=50)
+    kid.update(real, real=True)
+    kid.update(fake)
+
+    # the subsets are all the features: the MMD does not depend on their order
+    x, y = real.astype(np.float64), fake.astype(np.float64)
+    k_xx, k_yy, k_xy = ((a @ b.T / 4 + 1) ** 3 for a, b in [(x, x), (y, y), (x, y)])
+    expected = (k_xx.sum() - np.trace(k_xx) + k_yy.sum() - np.trace(k_yy)) / (50 * 49) - 2 * k_xy.sum() / 2500
+    mean, std = kid.compute()
+    np.testing.assert_allclose(mean, expected, rtol=1e-6)
+    np.testing.assert_allclose(std, 0, atol=1e-6)
+
+
+def test_inception_score():
+    rng = np.random.default_rng(0)
+    logits = rng.normal(size=(40, 5)).astype(np.float32) * 3
+    inception_score = InceptionScore(identity, splits=4)
+    for i in range(0, 40, 16):
+        inception_score.update(logits[i : i + 16])
+
+    probabilities = np.exp(logits.astype(np.float64))
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    scores = []
+    for split in range(4):
+        p = probabilities[split::4]
+        marginal = p.mean(axis=0)
+        scores.append(np.exp((p * (np.log(p) - np.log(marginal))).sum(axis=1).mean()))
+    mean, std = inception_score.compute()
+    np.testing.assert_allclose(mean, np.mean(scores), rtol=1e-5)
+    np.testing.assert_allclose(std, np.std(scores), rtol=1e-4)
@@ -0,0 +1,135 @@
+import csv
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from mindspore import mint
+
+from mindone.data import PrecomputeEngine, ShardedStoreDataset, VAEVideoEncoder, VideoReader, shard_by_cost
+
+# (num_frames, width, height) of the videos
+VIDEOS = [(20, 64, 48), (12, 48, 64), (40, 64, 64), (9, 64, 48), (30, 32, 32), (20, 48, 64), (4, 64, 48)]
+
+
+@pytest.fixture(scope="module")
+def manifest(tmp_path_factory):
+    root = tmp_path_factory.mktemp("videos")
+    for i, (num_frames, width, height) in enumerate(VIDEOS):
+        writer = cv2.VideoWriter(str(root / f"{i}.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 25, (width, height))
+        for j in range(num_frames):
+            writer.write(np.full((height, width, 3), 5 * j + i, dtype=np.uint8))
+        writer.release()
+    with open(root / "train.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["video", "caption"])
+        writer.writerows([f"{i}.mp4", f"caption {i}"] for i in range(len(VIDEOS)))
+    return str(root / "train.csv"), str(root)
+
+
+def video_encoder(videos):
+    assert videos.dtype == np.uint8 and videos.ndim == 5
+    return {"latent_mean": videos.mean(axis=(2, 3, 4)).astype(np.float32)}
+
+
+def text_encoder(captions):
+    return {"text_emb": np.array([[float(caption.split()[-1])] for caption in captions], dtype=np.float32)}
+
+
+def test_shard_by_cost():
+    costs = np.random.default_rng(0).integers(1, 1000, size=1000)
+    shards = shard_by_cost(costs, 8)
+    np.testing.assert_array_equal(np.sort(np.concatenate(shards)), np.arange(1000))
+    loads = [costs[shard].sum() for shard in shards]
+    assert max(loads) - min(loads) <= costs.max()
+
+
+def test_precompute_engine_cost(manifest, tmp_path):
+    _, video_folder = manifest
+    rows = [
+        {"video": "0.mp4", "cost": "7"},
+        {"video": "0.mp4", "num_frames": "20", "height": "48", "width": "64"},
+        {"video": "0.mp4"},
+        {"video": "missing.mp4"},
+    ]
+    with open(tmp_path / "costs.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["video", "cost", "num_frames", "height", "width"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    kwargs = dict(video_folder=video_folder, text_encoder=text_encoder, resolutions=[(24, 32)], frame_counts=[16])
+    engine = PrecomputeEngine(str(tmp_path / "costs.csv"), str(tmp_path / "store"), **kwargs)
+    assert [engine._cost(row) for row in engine.rows] == [7.0, 16 * 24 * 32, 1.0, 1.0]
+
+    # the file sizes are only read on request, and the missing videos fall back to the uniform cost
+    engine = PrecomputeEngine(str(tmp_path / "costs.csv"), str(tmp_path / "store"), **kwargs, stat_files=True)
+    file_size = os.path.getsize(os.path.join(video_folder, "0.mp4"))
+    assert [engine._cost(row) for row in engine.rows] == [7.0, 16 * 24 * 32, file_size, 1.0]
+    assert len(engine.pending_indices()) == len(rows)
+
+
+def test_precompute_engine(manifest, tmp_path):
+    manifest, video_folder = manifest
+    kwargs = dict(
+        video_folder=video_folder,
+        video_encoder=video_encoder,
+        text_encoder=text_encoder,
+        resolutions=[(32, 32), (32, 24), (24, 32)],
+        frame_counts=[8, 16],
+        batch_size=2,
+        num_workers=2,
+        prefetch=2,
+        checkpoint_interval=1,
+        device_num=2,
+    )
+
+    # rank 0 is interrupted after its first batch, the videos are precomputed again on a single rank
+    calls = []
+
+    def interrupted_video_encoder(videos):
+        if calls:
+            raise KeyboardInterrupt
+        calls.append(len(videos))
+        return video_encoder(videos)
+
+    with pytest.raises(KeyboardInterrupt):
+        kwargs_0 = {**kwargs, "video_encoder": interrupted_video_encoder, "batch_size": 1}
+        PrecomputeEngine(manifest, str(tmp_path), **kwargs_0).run()
+    assert len(ShardedStoreDataset(str(tmp_path))) == 1
+    assert PrecomputeEngine(manifest, str(tmp_path), **kwargs, rank_id=1).run() > 0
+    engine = PrecomputeEngine(manifest, str(tmp_path), **{**kwargs, "device_num": 1})
+    assert len(engine.pending_indices()) > 0
+    engine.run()
+    # the last video is too short for the buckets
+    np.testing.assert_array_equal(engine.pending_indices(), [len(VIDEOS) - 1])
+
+    dataset = ShardedStoreDataset(str(tmp_path))
+    assert sorted(dataset.keys) == [f"{i}.mp4" for i in range(len(VIDEOS) - 1)]
+    for i, (num_frames, width, height) in enumerate(VIDEOS[:-1]):
+        record = dataset.get(f"{i}.mp4")
+        assert record["latent_mean"].shape == (16 if num_frames >= 16 else 8,)
+        with VideoReader(os.path.join(video_folder, f"{i}.mp4")) as reader:
+            # the frames are of uniform color, unchanged by resizing and cropping
+            expected = reader.fetch_frames(num=len(record["latent_mean"])).mean(axis=(1, 2, 3))
+        np.testing.assert_allclose(record["latent_mean"], expected, atol=1)
+        np.testing.assert_array_equal(record["text_emb"], [i])
+
+
+class VAE:
+    """A stand-in of a VAE of a latent of 2 channels, the mean and log variance of its inputs of 3 channels."""
+
+    def encode(self, x):
+        mean = x[:, :2]
+        return (mint.cat([mean, mint.log(mint.abs(mean) + 0.5)], dim=1),)
+
+
+@pytest.mark.parametrize("temporal", [True, False])
+def test_vae_video_encoder(temporal):
+    videos = np.random.default_rng(0).integers(0, 256, size=(2, 3, 16, 16, 3), dtype=np.uint8)
+    latents = VAEVideoEncoder(VAE(), temporal=temporal)(videos)
+    expected_mean = videos[..., :2].astype(np.float32) / 127.5 - 1.0
+    # B T H W C -> B C T H W or B T C H W
+    expected_mean = expected_mean.transpose((0, 4, 1, 2, 3) if temporal else (0, 1, 4, 2, 3))
+    np.testing.assert_allclose(latents["latent_mean"], expected_mean, atol=1e-6)
+    np.testing.assert_allclose(latents["latent_std"], np.sqrt(np.abs(expected_mean) + 0.5), atol=1e-5)
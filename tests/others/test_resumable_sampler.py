@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+
+from mindone.data import ResumableDistributedSampler
+
+
+class _IndexDataset:
+    def __getitem__(self, idx):
+        return np.array(idx, dtype=np.int32)
+
+    def __len__(self):
+        return 23
+
+
+def _iterate(sampler, num_epochs, batch_size=4):
+    dataloader = ms.dataset.GeneratorDataset(_IndexDataset(), column_names=["idx"], sampler=sampler).batch(batch_size)
+    iterator = dataloader.create_dict_iterator(num_epochs=num_epochs, output_numpy=True)
+    return [[batch["idx"].tolist() for batch in iterator] for _ in range(num_epochs)]
+
+
+@pytest.mark.parametrize("drop_last", [False, True])
+def test_resumable_distributed_sampler_shards(drop_last):
+    samplers = [ResumableDistributedSampler(23, num_replicas=3, rank=rank, drop_last=drop_last) for rank in range(3)]
+    shards = [list(sampler) for sampler in samplers]
+
+    assert all(len(shard) == len(samplers[0]) for shard in shards)
+    indices = [i for shard in shards for i in shard]
+    if drop_last:
+        assert len(set(indices)) == len(indices) == 21
+    else:
+        assert set(indices) == set(range(23)) and len(indices) == 24
+    # a new permutation at each epoch, the same on every process
+    assert list(samplers[0]) != shards[0]
+    assert list(ResumableDistributedSampler(23, num_replicas=3, rank=0, drop_last=drop_last)) == shards[0]
+
+
+def test_resumable_distributed_sampler_resume():
+    sampler = ResumableDistributedSampler(23, num_replicas=2, rank=1, seed=7)
+    stream = [i for epoch in _iterate(sampler, num_epochs=3) for batch in epoch for i in batch]
+    assert len(stream) == 3 * len(sampler)
+
+    # interrupted after 2 batches of the second epoch
+    state = sampler.state_dict(epoch=1, num_consumed_samples=2 * 4)
+    assert state == {"seed": 7, "epoch": 1, "offset": 8}
+
+    # every epoch of the dataloader has the same length, the samples are in the same order as without interruption
+    resumed_sampler = ResumableDistributedSampler(23, num_replicas=2, rank=1, seed=0)
+    resumed_sampler.load_state_dict(state)
+    resumed_epochs = _iterate(resumed_sampler, num_epochs=2)
+    assert [len(epoch) for epoch in resumed_epochs] == [3, 3]
+    resumed_stream = [i for epoch in resumed_epochs for batch in epoch for i in batch]
+    assert resumed_stream[: 2 * len(sampler) - 8] == stream[len(sampler) + 8 :]
+
+    # the end of an epoch resumes at the beginning of the next one
+    assert sampler.state_dict(epoch=1, num_consumed_samples=len(sampler)) == {"seed": 7, "epoch": 2, "offset": 0}
+    sampler.set_epoch(2)
+    assert list(sampler) == stream[2 * len(sampler) :]
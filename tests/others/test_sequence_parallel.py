@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+
+from mindone.diffusers.models.attention_processor import Attention, AttnProcessor2_0
+from mindone.models.modules.sequence_parallel import SimulatedSequenceParallelGroup, sequence_parallel_attention
+
+# (ulysses_size, ring_size): Ulysses, ring and hybrid sequence parallelism
+PARALLEL_SIZES = [(2, 1), (4, 1), (1, 3), (2, 2), (2, 3)]
+
+
+def _attention(query, key, value):
+    scores = np.einsum("bhqd,bhkd->bhqk", query, key) / np.sqrt(query.shape[-1])
+    probs = np.exp(scores - scores.max(-1, keepdims=True))
+    return np.einsum("bhqk,bhkd->bhqd", probs / probs.sum(-1, keepdims=True), value)
+
+
+@pytest.mark.parametrize("ulysses_size, ring_size", PARALLEL_SIZES)
+def test_sequence_parallel_attention(ulysses_size, ring_size):
+    rng = np.random.default_rng(0)
+    query, key, value, grad_output = (rng.standard_normal((2, 4, 24, 8)).astype(np.float32) for _ in range(4))
+    group = SimulatedSequenceParallelGroup(ulysses_size=ulysses_size, ring_size=ring_size)
+
+    def loss_fn(query, key, value):
+        # the inputs are replicated, every process attends with its shard of the sequence
+        query, key, value = (group.split(x, dim=2) for x in (query, key, value))
+        output = group.gather(sequence_parallel_attention(query, key, value, group), dim=2)
+        return (output * ms.tensor(grad_output)).sum(), output
+
+    (_, output), grads = ms.value_and_grad(loss_fn, grad_position=(0, 1, 2), has_aux=True)(
+        ms.tensor(query), ms.tensor(key), ms.tensor(value)
+    )
+    np.testing.assert_allclose(output.asnumpy(), _attention(query, key, value), rtol=1e-4, atol=1e-5)
+
+    def reference_loss_fn(query, key, value):
+        scores = ms.mint.matmul(query, key.swapaxes(-1, -2)) / np.sqrt(query.shape[-1])
+        output = ms.mint.matmul(ms.mint.softmax(scores, dim=-1), value)
+        return (output * ms.tensor(grad_output)).sum()
+
+    expected_grads = ms.grad(reference_loss_fn, grad_position=(0, 1, 2))(
+        ms.tensor(query), ms.tensor(key), ms.tensor(value)
+    )
+    for grad, expected_grad in zip(grads, expected_grads):
+        np.testing.assert_allclose(grad.asnumpy(), expected_grad.asnumpy(), rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("ulysses_size, ring_size", [(2, 1), (1, 2), (2, 2)])
+def test_attention_sequence_parallel(ulysses_size, ring_size):
+    ms.set_seed(0)
+    attn = Attention(query_dim=32, heads=4, dim_head=8, processor=AttnProcessor2_0())
+    hidden_states = ms.tensor(np.random.default_rng(0).standard_normal((2, 24, 32)).astype(np.float32))
+    expected = attn(hidden_states).asnumpy()
+
+    group = SimulatedSequenceParallelGroup(ulysses_size=ulysses_size, ring_size=ring_size)
+    attn.set_sequence_parallel_group(group)
+    output = group.gather(attn(group.split(hidden_states, dim=1)), dim=1).asnumpy()
+    np.testing.assert_allclose(output, expected, rtol=1e-4, atol=1e-5)
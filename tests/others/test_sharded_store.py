@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from mindone.data import ShardedStoreDataset, ShardedStoreWriter
+
+
+def _records(num_records):
+    rng = np.random.default_rng(0)
+    for i in range(num_records):
+        yield f"videos/clip_{i:04d}.mp4", {
+            "latent_mean": rng.standard_normal((i % 5 + 1, 4, 8, 8)).astype(np.float32),
+            "text_emb": rng.standard_normal((3, 16)).astype(np.float16),
+            "mask": (rng.random(3) > 0.5).astype(np.uint8),
+            "fps": np.array(24.0 + i),
+        }
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_sharded_store(tmp_path, compression):
+    records = list(_records(20))
+    # two writers, the first one reopened, with shards of a few records
+    with ShardedStoreWriter(str(tmp_path), name="rank_0", shard_size=8192, compression=compression) as writer:
+        for key, arrays in records[:8]:
+            writer.write(key, **arrays)
+    with ShardedStoreWriter(str(tmp_path), name="rank_1", shard_size=8192, compression=compression) as writer:
+        for key, arrays in records[8:14]:
+            writer.write(key, **arrays)
+    with ShardedStoreWriter(str(tmp_path), name="rank_0", shard_size=8192, compression=compression) as writer:
+        for key, arrays in records[14:]:
+            writer.write(key, **arrays)
+    assert len(list(tmp_path.glob("rank_0-*.bin"))) > 2
+
+    dataset = ShardedStoreDataset(str(tmp_path), output_columns=["mask", "latent_mean"])
+    expected = dict(records)
+    assert len(dataset) == len(records)
+    assert sorted(dataset.keys) == sorted(expected)
+    for idx, key in enumerate(dataset.keys):
+        record = dataset.read(idx)
+        assert list(record) == list(expected[key])
+        for name, array in expected[key].items():
+            assert record[name].dtype == array.dtype
+            np.testing.assert_array_equal(record[name], array)
+        mask, latent_mean = dataset[idx]
+        np.testing.assert_array_equal(latent_mean, expected[key]["latent_mean"])
+        if compression is None:
+            assert not latent_mean.flags.writeable and latent_mean.ctypes.data % 64 == 0
+
+    np.testing.assert_array_equal(dataset.get("videos/clip_0010.mp4")["fps"], 34.0)
+    assert "videos/clip_0019.mp4" in dataset and "videos/clip_0020.mp4" not in dataset
+
+    dataset = pickle.loads(pickle.dumps(dataset))
+    np.testing.assert_array_equal(
+        dataset.get("videos/clip_0003.mp4")["text_emb"], expected["videos/clip_0003.mp4"]["text_emb"]
+    )
+
+
+def test_sharded_store_unflushed_records(tmp_path):
+    records = list(_records(4))
+    writer = ShardedStoreWriter(str(tmp_path))
+    for key, arrays in records[:2]:
+        writer.write(key, **arrays)
+    writer.flush()
+    for key, arrays in records[2:]:
+        writer.write(key, **arrays)
+
+    # the records written since the last flush are not indexed yet
+    dataset = ShardedStoreDataset(str(tmp_path))
+    assert dataset.keys == [key for key, _ in records[:2]]
+    writer.close()
+    assert len(ShardedStoreDataset(str(tmp_path))) == 4
@@ -0,0 +1,117 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+from transformers import CLIPConfig, CLIPImageProcessor, CLIPProcessor, CLIPTokenizer
+
+import mindspore as ms
+from mindspore import Tensor
+
+from mindone.metrics import ClipScoreFrame, ClipScoreText, load_video_frames, sample_frame_indices
+from mindone.transformers import CLIPModel
+
+# the patch embedding of CLIP is a `mint` convolution, which has no CPU kernel
+requires_ascend = pytest.mark.skipif(ms.get_context("device_target") == "CPU", reason="requires an Ascend device")
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("clip")
+    # a character level vocabulary
+    vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1}
+    for c in "abcdefghijklmnopqrstuvwxyz":
+        vocab[c] = len(vocab)
+        vocab[c + "</w>"] = len(vocab)
+    (tmp_path / "vocab.json").write_text(json.dumps(vocab))
+    (tmp_path / "merges.txt").write_text("#version: 0.2\n")
+    tokenizer = CLIPTokenizer(
+        str(tmp_path / "vocab.json"), str(tmp_path / "merges.txt"), pad_token="<|endoftext|>", model_max_length=77
+    )
+    image_processor = CLIPImageProcessor(size={"shortest_edge": 32}, crop_size={"height": 32, "width": 32})
+    processor = CLIPProcessor(image_processor=image_processor, tokenizer=tokenizer)
+
+    config = CLIPConfig(
+        text_config={
+            "vocab_size": len(vocab),
+            "hidden_size": 32,
+            "intermediate_size": 37,
+            "num_hidden_layers": 2,
+            "num_attention_heads": 4,
+            "eos_token_id": 1,
+        },
+        vision_config={
+            "image_size": 32,
+            "patch_size": 8,
+            "hidden_size": 32,
+            "intermediate_size": 37,
+            "num_hidden_layers": 2,
+            "num_attention_heads": 4,
+        },
+        projection_dim=16,
+    )
+    model = CLIPModel(config)
+    model.set_train(False)
+    return model, processor
+
+
+@pytest.fixture(scope="module")
+def videos():
+    rng = np.random.default_rng(0)
+    videos = []
+    for num_frames in (5, 1, 8):
+        videos.append(rng.integers(0, 256, (num_frames, 32, 32, 3), dtype=np.uint8))
+    return videos
+
+
+def test_sample_frame_indices():
+    assert sample_frame_indices(10) == list(range(10))
+    assert sample_frame_indices(10, -1) == list(range(10))
+    assert sample_frame_indices(3, 8) == [0, 1, 2]
+    assert sample_frame_indices(100, 4) == [12, 37, 62, 87]
+
+
+def test_load_video_frames(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (64, 48))
+    for i in range(40):
+        writer.write(np.full((48, 64, 3), i * 5, dtype=np.uint8))
+    writer.release()
+
+    frames = load_video_frames(video_path, num_frames=4, size=(32, 24))
+    assert frames.shape == (4, 24, 32, 3)
+    np.testing.assert_allclose(frames[:, 0, 0, 0], [25, 75, 125, 175], atol=3)
+
+
+@requires_ascend
+def test_clip_score_text(clip, videos):
+    model, processor = clip
+    prompts = ["a cat", "a dog on the grass", "a cat"]
+    metric = ClipScoreText(model, processor, batch_size=4)
+    scores = metric.score_videos(videos, prompts)
+
+    for frames, prompt, score in zip(videos, prompts, scores):
+        inputs = processor(text=[prompt], images=list(frames), return_tensors="np")
+        logits_per_image = model(**{k: Tensor(v) for k, v in inputs.items()})[0].asnumpy()
+        np.testing.assert_allclose(score, logits_per_image.mean(), rtol=1e-4, atol=1e-4)
+    # the prompts are encoded once
+    assert len(metric.encoder._text_features) == 2
+    np.testing.assert_allclose(metric.score(videos[0], prompts[0]), scores[0], rtol=1e-5)
+
+
+@requires_ascend
+def test_clip_score_frame(clip, videos):
+    model, processor = clip
+    metric = ClipScoreFrame(model, processor, batch_size=4)
+    scores = metric.score_videos(videos)
+
+    for frames, score in zip(videos, scores):
+        pixel_values = processor(images=list(frames), return_tensors="np")["pixel_values"]
+        features = model.get_image_features(Tensor(pixel_values)).asnumpy()
+        features /= np.linalg.norm(features, axis=-1, keepdims=True)
+        similarities = features @ features.T
+        if len(frames) == 1:
+            assert np.isnan(score)
+        else:
+            expected = (similarities.sum() - np.trace(similarities)) / (len(frames) * (len(frames) - 1))
+            np.testing.assert_allclose(score, expected, rtol=1e-4, atol=1e-5)
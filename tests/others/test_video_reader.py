@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+import pytest
+
+from mindone.data import VideoReader
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    video_path = str(tmp_path_factory.mktemp("video") / "video.mp4")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (64, 48))
+    for i in range(120):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:, :, 0], frame[:, :, 1], frame[:, :, 2] = i, 255 - i, 2 * i
+        writer.write(frame)
+    writer.release()
+
+    # the frames decoded sequentially
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    ret, frame = cap.read()
+    while ret:
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        ret, frame = cap.read()
+    cap.release()
+    return video_path, np.stack(frames)
+
+
+@pytest.mark.parametrize("seek_threshold", [0, 8, 1000])
+def test_video_reader_fetch_frames(video, seek_threshold):
+    video_path, frames = video
+    with VideoReader(video_path, seek_threshold=seek_threshold) as reader:
+        assert len(reader) == len(frames)
+        for num, start_pos, step in [(16, 0, 1), (10, 5, 7), (4, 200, 3)]:
+            start_pos = min(start_pos, len(frames) - (num - 1) * step - 1)
+            expected = frames[start_pos : start_pos + (num - 1) * step + 1 : step]
+            np.testing.assert_array_equal(reader.fetch_frames(num=num, start_pos=start_pos, step=step), expected)
+
+        indices = [90, 3, 3, 119, 0]
+        np.testing.assert_array_equal(reader.get_frames(indices), frames[indices])
+
+
+def test_video_reader_resize(video):
+    video_path, frames = video
+    with VideoReader(video_path, num_threads=2, size=(32, 24)) as reader:
+        clip = reader.fetch_frames(num=8, step=2)
+    assert clip.shape == (8, 24, 32, 3) and clip.flags["C_CONTIGUOUS"]
+    expected = np.stack([cv2.resize(frame, (32, 24), interpolation=cv2.INTER_AREA) for frame in frames[0:16:2]])
+    np.testing.assert_array_equal(clip, expected)
@@ -0,0 +1,75 @@
+import numpy as np
+
+import mindspore as ms
+from mindspore import ops
+
+from mindone.transformers.data.data_collator import DataCollatorForPacking, PackedDataset, pack_sequences
+from mindone.transformers.modeling_attn_mask_utils import _prepare_4d_packed_causal_attention_mask
+
+
+def test_pack_sequences():
+    lengths = np.random.default_rng(0).integers(1, 200, size=500).tolist() + [300]
+    bins = pack_sequences(lengths, max_length=256)
+
+    assert sorted(i for indices in bins for i in indices) == list(range(len(lengths)))
+    # the longer sequences are truncated in a bin of their own
+    assert [len(indices) for indices in bins if len(lengths) - 1 in indices] == [1]
+    bin_lengths = [sum(min(lengths[i], 256) for i in indices) for indices in bins]
+    assert max(bin_lengths) <= 256
+    assert sum(bin_lengths) / (len(bins) * 256) > 0.98
+
+
+def test_data_collator_for_packing():
+    rng = np.random.default_rng(0)
+    examples = [{"input_ids": rng.integers(1, 100, size=length).tolist()} for length in [5, 3, 7, 2, 6, 1]]
+    dataset = PackedDataset(examples, max_length=8)
+    collator = DataCollatorForPacking(max_length=8, return_segment_ids=True)
+    batch = collator([dataset[i] for i in range(len(dataset))])
+
+    assert batch["input_ids"].shape == (len(dataset), 8)
+    assert "attention_mask" not in batch
+    for row in range(len(dataset)):
+        start = 0
+        for segment, i in enumerate(dataset.bins[row]):
+            input_ids = examples[i]["input_ids"]
+            end = start + len(input_ids)
+            assert batch["input_ids"][row, start:end].tolist() == input_ids
+            assert batch["position_ids"][row, start:end].tolist() == list(range(len(input_ids)))
+            assert (batch["segment_ids"][row, start:end] == segment + 1).all()
+            # the first token of an example is not predicted from the previous example
+            assert batch["labels"][row, start:end].tolist() == [-100] + input_ids[1:]
+            start = end
+        assert (batch["input_ids"][row, start:] == 0).all()
+        assert (batch["labels"][row, start:] == -100).all()
+        assert (batch["segment_ids"][row, start:] == 0).all()
+
+    # single examples are truncated and padded to the same static shape
+    batch = collator([{"input_ids": list(range(1, 11))}, {"input_ids": [1, 2]}])
+    assert batch["input_ids"].tolist() == [list(range(1, 9)), [1, 2, 0, 0, 0, 0, 0, 0]]
+    assert batch["position_ids"].tolist() == [list(range(8)), [0, 1, 0, 1, 2, 3, 4, 5]]
+
+
+def _attention(query, key, value, mask):
+    scores = ops.matmul(query, key.swapaxes(-1, -2)) + mask
+    return ops.matmul(ops.softmax(scores, axis=-1), value)
+
+
+def test_packed_causal_attention_mask():
+    rng = np.random.default_rng(0)
+    examples = [{"input_ids": [1] * length} for length in [3, 4, 1]]
+    position_ids = DataCollatorForPacking(max_length=10)([{"input_ids": [e["input_ids"] for e in examples]}])[
+        "position_ids"
+    ]
+    states = ms.tensor(rng.standard_normal((1, 1, 10, 4)), dtype=ms.float32)
+
+    mask = _prepare_4d_packed_causal_attention_mask(ms.tensor(position_ids), ms.float32)
+    packed_outputs = _attention(states, states, states, mask).asnumpy()
+
+    # the same outputs as the examples attending on their own
+    start = 0
+    for length in [3, 4, 1, 2]:
+        example_states = states[:, :, start : start + length]
+        causal_mask = ms.tensor(np.triu(np.full((length, length), -1e9), k=1), dtype=ms.float32)
+        outputs = _attention(example_states, example_states, example_states, causal_mask).asnumpy()
+        np.testing.assert_allclose(packed_outputs[:, :, start : start + length], outputs, rtol=1e-5, atol=1e-6)
+        start += length
@@ -0,0 +1,225 @@
+import numpy as np
+import pytest
+from transformers import GenerationConfig, PretrainedConfig
+
+import mindspore as ms
+from mindspore import nn, ops
+
+from mindone.transformers.cache_utils import DynamicCache, StaticCache
+from mindone.transformers.generation.candidate_generator import (
+    CandidateGenerator,
+    PromptLookupCandidateGenerator,
+    PromptLookupTreeCandidateGenerator,
+)
+from mindone.transformers.generation.logits_process import LogitsProcessorList
+from mindone.transformers.generation.stopping_criteria import MaxLengthCriteria, StoppingCriteriaList
+from mindone.transformers.generation.utils import GenerationMixin
+from mindone.transformers.modeling_outputs import CausalLMOutputWithPast
+
+VOCAB_SIZE = 6
+HIDDEN_SIZE = 16
+MAX_LENGTH = 40
+
+
+class ToyCausalLM(nn.Cell, GenerationMixin):
+    """A single attention layer language model, built with operators available on every device."""
+
+    _supports_cache_class = True
+    _supports_dynamic_input = True
+    _supports_static_cache = True
+    base_model_prefix = "model"
+    main_input_name = "input_ids"
+
+    def __init__(self):
+        super().__init__()
+        self.config = PretrainedConfig(
+            hidden_size=HIDDEN_SIZE,
+            num_attention_heads=1,
+            num_key_value_heads=1,
+            num_hidden_layers=1,
+            max_position_embeddings=MAX_LENGTH,
+            vocab_size=VOCAB_SIZE,
+        )
+        self.config._attn_implementation = "eager"
+        self.generation_config = GenerationConfig()
+        rng = np.random.default_rng(0)
+        self.token_embedding = ms.tensor(rng.standard_normal((VOCAB_SIZE, HIDDEN_SIZE)), dtype=ms.float32)
+        self.position_embedding = ms.tensor(rng.standard_normal((MAX_LENGTH, HIDDEN_SIZE)), dtype=ms.float32)
+        self.lm_head = ms.tensor(rng.standard_normal((HIDDEN_SIZE, VOCAB_SIZE)), dtype=ms.float32)
+        self.forward_calls = 0
+
+    @property
+    def dtype(self):
+        return ms.float32
+
+    @classmethod
+    def can_generate(cls):
+        return True
+
+    def _get_initial_cache_position(self, input_ids, model_kwargs):
+        # the positions of the uncached tokens, built without the `mint` operators that have no CPU kernels
+        past_length = int(model_kwargs["past_key_values"].get_seq_length())
+        model_kwargs["cache_position"] = ops.arange(past_length, input_ids.shape[1], dtype=ms.int32)
+        return model_kwargs
+
+    def prepare_inputs_for_generation(self, input_ids, cache_position=None, position_ids=None, **kwargs):
+        # the uncached tokens, positioned at their cache position unless the positions are given
+        if position_ids is None:
+            position_ids = ops.broadcast_to(cache_position[None, :], (input_ids.shape[0], -1))
+        return {
+            "input_ids": input_ids[:, -cache_position.shape[0] :],
+            "position_ids": position_ids,
+            "cache_position": cache_position,
+            **kwargs,
+        }
+
+    def construct(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        position_ids=None,
+        past_key_values=None,
+        cache_position=None,
+        use_cache=None,
+        return_dict=None,
+        **kwargs,
+    ):
+        self.forward_calls += 1
+        hidden_states = self.token_embedding[input_ids] + self.position_embedding[position_ids]
+        key_states, value_states = past_key_values.update(
+            hidden_states[:, None], hidden_states[:, None], 0, {"cache_position": cache_position}
+        )
+        if attention_mask.ndim == 2:
+            kv_indices = ops.arange(key_states.shape[2], dtype=ms.int32)
+            mask = kv_indices[None, :] <= cache_position[:, None]
+            padding_mask = ops.zeros((attention_mask.shape[0], key_states.shape[2]), dtype=ms.bool_)
+            padding_mask[:, : attention_mask.shape[1]] = attention_mask.bool()
+            mask = mask[None, None] & padding_mask[:, None, None, :]
+            attention_mask = ops.where(mask, 0.0, -1e9)
+
+        scores = ops.matmul(hidden_states[:, None], key_states.swapaxes(-1, -2)) / HIDDEN_SIZE**0.5
+        attn_output = ops.matmul(ops.softmax(scores + attention_mask, axis=-1), value_states)[:, 0]
+        logits = ops.matmul(attn_output + hidden_states, self.lm_head)
+        return CausalLMOutputWithPast(logits=logits, past_key_values=past_key_values)
+
+
+class OracleCandidateGenerator(CandidateGenerator):
+    """Proposes the next tokens of known sequences, with wrong tokens for the rows in `wrong_rows`."""
+
+    def __init__(self, target_ids, num_output_tokens, wrong_rows=()):
+        self.target_ids = target_ids
+        self.num_output_tokens = num_output_tokens
+        self.wrong_rows = list(wrong_rows)
+
+    def get_candidates(self, input_ids):
+        cur_len = input_ids.shape[1]
+        candidate_ids = self.target_ids[:, cur_len : cur_len + self.num_output_tokens].copy()
+        candidate_ids[self.wrong_rows] = (candidate_ids[self.wrong_rows] + 1) % VOCAB_SIZE
+        return ops.cat((input_ids, ms.tensor(candidate_ids, dtype=input_ids.dtype)), axis=-1), None
+
+    def update_candidate_strategy(self, input_ids, scores, num_matches):
+        pass
+
+
+def _generate(model, input_ids, cache, decoding_method, candidate_generator=None):
+    generation_config = GenerationConfig(max_length=MAX_LENGTH, do_sample=False)
+    generation_config._pad_token_tensor = None
+    generation_config._eos_token_tensor = None
+    kwargs = {"candidate_generator": candidate_generator} if candidate_generator is not None else {}
+    return decoding_method(
+        input_ids,
+        logits_processor=LogitsProcessorList(),
+        stopping_criteria=StoppingCriteriaList([MaxLengthCriteria(max_length=MAX_LENGTH)]),
+        generation_config=generation_config,
+        synced_gpus=False,
+        streamer=None,
+        attention_mask=ops.ones_like(input_ids),
+        past_key_values=cache,
+        use_cache=True,
+        **kwargs,
+    )
+
+
+def _make_cache(model, cache_implementation, batch_size):
+    if cache_implementation == "static":
+        return StaticCache(model.config, max_batch_size=batch_size, max_cache_len=MAX_LENGTH)
+    return DynamicCache()
+
+
+@pytest.mark.parametrize("cache_implementation", ["dynamic", "static"])
+@pytest.mark.parametrize("tree", [False, True])
+def test_assisted_decoding_matches_greedy_decoding(cache_implementation, tree):
+    model = ToyCausalLM()
+    input_ids = ms.tensor(np.random.default_rng(1).integers(0, VOCAB_SIZE, size=(3, 8)), dtype=ms.int32)
+    greedy_ids = _generate(model, input_ids, _make_cache(model, cache_implementation, 3), model._sample)
+    num_greedy_calls = model.forward_calls
+
+    model.forward_calls = 0
+    if tree:
+        candidate_generator = PromptLookupTreeCandidateGenerator(
+            num_output_tokens=4, max_matching_ngram_size=2, num_branches=4, max_length=MAX_LENGTH
+        )
+        decoding_method = model._tree_assisted_decoding
+    else:
+        candidate_generator = PromptLookupCandidateGenerator(
+            num_output_tokens=4, max_matching_ngram_size=2, max_length=MAX_LENGTH
+        )
+        decoding_method = model._assisted_decoding
+    assisted_ids = _generate(
+        model, input_ids, _make_cache(model, cache_implementation, 3), decoding_method, candidate_generator
+    )
+
+    np.testing.assert_array_equal(assisted_ids.asnumpy(), greedy_ids.asnumpy())
+    # several tokens are accepted per forward pass
+    assert model.forward_calls < num_greedy_calls
+
+
+def test_generate_with_prompt_lookup_trees(monkeypatch):
+    tree_decoding_calls = []
+    tree_assisted_decoding = ToyCausalLM._tree_assisted_decoding
+
+    def spy(self, *args, **kwargs):
+        tree_decoding_calls.append(kwargs["candidate_generator"])
+        return tree_assisted_decoding(self, *args, **kwargs)
+
+    monkeypatch.setattr(ToyCausalLM, "_tree_assisted_decoding", spy)
+    model = ToyCausalLM()
+    input_ids = ms.tensor(np.random.default_rng(1).integers(0, VOCAB_SIZE, size=(3, 8)), dtype=ms.int32)
+    generate_kwargs = {"attention_mask": ops.ones_like(input_ids), "max_length": MAX_LENGTH, "do_sample": False}
+    greedy_ids = model.generate(input_ids, **generate_kwargs)
+    num_greedy_calls = model.forward_calls
+
+    model.forward_calls = 0
+    tree_ids = model.generate(input_ids, prompt_lookup_num_tokens=4, prompt_lookup_num_branches=3, **generate_kwargs)
+
+    assert len(tree_decoding_calls) == 1
+    assert isinstance(tree_decoding_calls[0], PromptLookupTreeCandidateGenerator)
+    assert tree_decoding_calls[0].num_branches == 3
+    np.testing.assert_array_equal(tree_ids.asnumpy(), greedy_ids.asnumpy())
+    assert model.forward_calls < num_greedy_calls
+
+
+@pytest.mark.parametrize("cache_implementation", ["dynamic", "static"])
+def test_assisted_decoding_accepts_candidates_for_the_whole_batch(cache_implementation):
+    model = ToyCausalLM()
+    input_ids = ms.tensor(np.random.default_rng(1).integers(0, VOCAB_SIZE, size=(3, 8)), dtype=ms.int32)
+    greedy_ids = _generate(model, input_ids, _make_cache(model, cache_implementation, 3), model._sample).asnumpy()
+    num_greedy_calls = model.forward_calls
+
+    # all the candidates are accepted: 4 candidate tokens and the token selected by the model per forward pass
+    model.forward_calls = 0
+    candidate_generator = OracleCandidateGenerator(greedy_ids, num_output_tokens=4)
+    assisted_ids = _generate(
+        model, input_ids, _make_cache(model, cache_implementation, 3), model._assisted_decoding, candidate_generator
+    )
+    np.testing.assert_array_equal(assisted_ids.asnumpy(), greedy_ids)
+    assert model.forward_calls == -(-(MAX_LENGTH - input_ids.shape[1]) // 5)
+
+    # the sequences advance together: a single sequence rejecting all its candidates falls back to greedy decoding
+    model.forward_calls = 0
+    candidate_generator = OracleCandidateGenerator(greedy_ids, num_output_tokens=4, wrong_rows=[1])
+    assisted_ids = _generate(
+        model, input_ids, _make_cache(model, cache_implementation, 3), model._assisted_decoding, candidate_generator
+    )
+    np.testing.assert_array_equal(assisted_ids.asnumpy(), greedy_ids)
+    assert model.forward_calls == num_greedy_calls
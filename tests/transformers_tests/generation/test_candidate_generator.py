@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from transformers import LlamaConfig
+
+import mindspore as ms
+from mindspore import ops
+
+from mindone.transformers.cache_utils import StaticCache
+from mindone.transformers.generation.candidate_generator import PromptLookupCandidateGenerator, _crop_past_key_values
+
+EOS_TOKEN_ID = 4
+
+
+def _reference_prompt_lookup(row, num_output_tokens, max_matching_ngram_size, max_length):
+    # the batch size 1 implementation, applied row by row
+    input_length = len(row)
+    for ngram_size in range(min(max_matching_ngram_size, input_length - 1), 0, -1):
+        for idx in range(input_length - ngram_size + 1):
+            if row[idx : idx + ngram_size] != row[-ngram_size:]:
+                continue
+            start_idx = idx + ngram_size
+            end_idx = min(start_idx + num_output_tokens, input_length, max_length)
+            if start_idx < end_idx:
+                chosen_ids = row[start_idx:end_idx]
+                if EOS_TOKEN_ID in chosen_ids:
+                    chosen_ids = chosen_ids[: chosen_ids.index(EOS_TOKEN_ID)]
+                return chosen_ids
+    return []
+
+
+@pytest.mark.parametrize("max_matching_ngram_size", [1, 3])
+def test_prompt_lookup_candidate_generator(max_matching_ngram_size):
+    input_ids = np.random.default_rng(0).integers(0, 6, size=(16, 15))
+    candidate_generator = PromptLookupCandidateGenerator(
+        eos_token_id=ms.tensor([EOS_TOKEN_ID]),
+        num_output_tokens=3,
+        max_matching_ngram_size=max_matching_ngram_size,
+        max_length=40,
+    )
+    candidate_input_ids, _ = candidate_generator.get_candidates(ms.tensor(input_ids, dtype=ms.int32))
+    candidate_input_ids = candidate_input_ids.asnumpy()
+
+    np.testing.assert_array_equal(candidate_input_ids[:, : input_ids.shape[1]], input_ids)
+    expected = [_reference_prompt_lookup(row, 3, max_matching_ngram_size, 40) for row in input_ids.tolist()]
+    assert candidate_input_ids.shape[1] == input_ids.shape[1] + max(len(chosen_ids) for chosen_ids in expected)
+    for i, chosen_ids in enumerate(expected):
+        # the shorter continuations are completed with filler tokens
+        assert candidate_input_ids[i, input_ids.shape[1] :][: len(chosen_ids)].tolist() == chosen_ids
+
+    # no candidate can be added before `max_length`
+    candidate_generator.max_length = input_ids.shape[1] + 1
+    candidate_input_ids, _ = candidate_generator.get_candidates(ms.tensor(input_ids, dtype=ms.int32))
+    assert candidate_input_ids.shape == input_ids.shape
+
+
+def test_static_cache_rollback():
+    config = LlamaConfig(
+        hidden_size=8, num_attention_heads=2, num_key_value_heads=2, num_hidden_layers=2, max_position_embeddings=16
+    )
+    cache = StaticCache(config, max_batch_size=2, max_cache_len=10)
+
+    def write(value, start, length):
+        states = ops.full((2, 2, length, 4), value, dtype=ms.float32)
+        for layer_idx in range(config.num_hidden_layers):
+            cache.update(states, states, layer_idx, {"cache_position": ops.arange(start, start + length)})
+
+    write(1.0, 0, 4)
+    assert cache.get_seq_length() == 4
+
+    # rolling back only moves the sequence length back, the next states overwrite the stale ones in place
+    key_cache = cache.key_cache[0]
+    _crop_past_key_values(None, cache, 2)
+    assert cache.get_seq_length() == 2
+    np.testing.assert_array_equal(cache.key_cache[1][0, 0, :, 0].asnumpy(), [1, 1, 1, 1, 0, 0, 0, 0, 0, 0])
+    write(2.0, 2, 3)
+    assert cache.get_seq_length() == 5
+    assert cache.key_cache[0] is key_cache
+    np.testing.assert_array_equal(cache.key_cache[1][0, 0, :, 0].asnumpy(), [1, 1, 2, 2, 2, 0, 0, 0, 0, 0])
+
+    cache.crop(-1)
+    assert cache.get_seq_length() == 4
+    cache.reset()
+    assert cache.get_seq_length() == 0
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+
+from mindone.transformers.generation.logits_process import (
+    EncoderNoRepeatNGramLogitsProcessor,
+    NoBadWordsLogitsProcessor,
+    NoRepeatNGramLogitsProcessor,
+    SequenceBiasLogitsProcessor,
+)
+
+VOCAB_SIZE = 8
+
+
+def _reference_banned_ngram_tokens(ngram_source, prev_input_ids, ngram_size):
+    # host-side reference, as in fairseq
+    generated_ngrams = {}
+    for ngram in zip(*[ngram_source[i:] for i in range(ngram_size)]):
+        generated_ngrams.setdefault(tuple(ngram[:-1]), []).append(ngram[-1])
+    cur_len = len(prev_input_ids)
+    if cur_len + 1 < ngram_size:
+        return []
+    return generated_ngrams.get(tuple(prev_input_ids[cur_len + 1 - ngram_size :]), [])
+
+
+def _random_inputs(batch_size, seq_len, seed=0):
+    rng = np.random.default_rng(seed)
+    input_ids = rng.integers(0, 4, size=(batch_size, seq_len))
+    scores = rng.standard_normal((batch_size, VOCAB_SIZE)).astype(np.float32)
+    return input_ids, scores
+
+
+@pytest.mark.parametrize("ngram_size", [1, 2, 3])
+@pytest.mark.parametrize("seq_len", [2, 12])
+def test_no_repeat_ngram_logits_processor(ngram_size, seq_len):
+    input_ids, scores = _random_inputs(4, seq_len)
+    processor = NoRepeatNGramLogitsProcessor(ngram_size)
+    processed = processor(ms.tensor(input_ids, dtype=ms.int64), ms.tensor(scores)).asnumpy()
+
+    for i in range(input_ids.shape[0]):
+        banned = _reference_banned_ngram_tokens(input_ids[i].tolist(), input_ids[i].tolist(), ngram_size)
+        expected = scores[i].copy()
+        expected[banned] = -np.inf
+        np.testing.assert_array_equal(processed[i], expected)
+
+
+@pytest.mark.parametrize("num_beams", [1, 2])
+def test_encoder_no_repeat_ngram_logits_processor(num_beams):
+    encoder_input_ids, _ = _random_inputs(2, 10, seed=1)
+    input_ids, scores = _random_inputs(2 * num_beams, 6, seed=2)
+    processor = EncoderNoRepeatNGramLogitsProcessor(2, ms.tensor(encoder_input_ids, dtype=ms.int64))
+    processed = processor(ms.tensor(input_ids, dtype=ms.int64), ms.tensor(scores)).asnumpy()
+
+    for i in range(input_ids.shape[0]):
+        banned = _reference_banned_ngram_tokens(encoder_input_ids[i // num_beams].tolist(), input_ids[i].tolist(), 2)
+        expected = scores[i].copy()
+        expected[banned] = -np.inf
+        np.testing.assert_array_equal(processed[i], expected)
+
+
+def test_sequence_bias_logits_processor():
+    input_ids = np.array([[0, 1, 3, 1], [0, 1, 2, 1], [4, 4, 4, 4]])
+    scores = np.zeros((3, VOCAB_SIZE), dtype=np.float32)
+    # `[4, 4, 4, 4, 2]` is longer than the context
+    sequence_bias = [[[1, 6], 1.0], [[3, 1, 6], 2.0], [[2, 1, 3], 4.0], [[1, 3, 1, 6], 8.0], [[4, 4, 4, 4, 2], 16.0]]
+    sequence_bias.append([[5], -1.0])
+    processor = SequenceBiasLogitsProcessor(sequence_bias)
+    processed = processor(ms.tensor(input_ids, dtype=ms.int64), ms.tensor(scores)).asnumpy()
+
+    expected = np.zeros((3, VOCAB_SIZE), dtype=np.float32)
+    expected[:, 5] = -1.0
+    expected[:, 6] += [1.0 + 2.0 + 8.0, 1.0, 0.0]
+    expected[1, 3] += 4.0
+    np.testing.assert_array_equal(processed, expected)
+
+    # sequences longer than the context are ignored
+    processed = processor(ms.tensor(input_ids[:, -2:], dtype=ms.int64), ms.tensor(scores)).asnumpy()
+    expected[:, 6] = [1.0, 1.0, 0.0]
+    expected[1, 3] = 0.0
+    np.testing.assert_array_equal(processed, expected)
+
+
+def test_no_bad_words_logits_processor():
+    input_ids = np.array([[0, 1, 3], [2, 1, 1]])
+    scores = np.zeros((2, VOCAB_SIZE), dtype=np.float32)
+    processor = NoBadWordsLogitsProcessor([[2], [1, 3, 4], [3, 5], [1, 6], [7]], eos_token_id=7)
+    processed = processor(ms.tensor(input_ids, dtype=ms.int64), ms.tensor(scores)).asnumpy()
+
+    banned = np.isneginf(processed)
+    assert banned[0].nonzero()[0].tolist() == [2, 4, 5]
+    assert banned[1].nonzero()[0].tolist() == [2, 6]
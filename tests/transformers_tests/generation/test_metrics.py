@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+from transformers import LlamaConfig
+
+import mindspore as ms
+
+from mindone.transformers import LlamaForCausalLM
+from mindone.transformers.generation import GenerationMetrics
+
+MAX_NEW_TOKENS = 5
+
+
+class NullStreamer:
+    def put(self, value):
+        pass
+
+    def end(self):
+        pass
+
+
+def test_generation_metrics_summary(tmp_path):
+    metrics = GenerationMetrics(latency_buckets_ms=(10, 1000))
+    for _ in range(2):
+        metrics.on_generate_start(batch_size=2, prompt_length=4, max_length=16)
+        for step in range(3):
+            metrics.on_host_sync(1)
+            metrics.on_step_end(cache_length=5 + step, cache_capacity=16)
+        metrics.on_generate_end()
+
+    summary = metrics.summary()
+    last_call = summary["last_call"]
+    assert last_call["num_new_tokens"] == 3
+    assert last_call["host_syncs"] == 3
+    assert last_call["cache_occupancy"] == 7 / 16
+    assert last_call["time_to_first_token_s"] == last_call["prefill_time_s"]
+    assert sum(last_call["token_latency_histogram"].values()) == 2
+    assert list(last_call["token_latency_histogram"]) == ["<=10ms", "<=1000ms", ">1000ms"]
+    assert summary["aggregate"]["num_calls"] == 2
+    assert summary["aggregate"]["num_new_tokens"] == 12
+
+    path = tmp_path / "metrics.json"
+    metrics.to_json(path)
+    assert json.loads(path.read_text()) == json.loads(json.dumps(summary))
+
+
+# the generation loop and the Llama layers use `mint` operators, which have no CPU kernels
+@pytest.mark.skipif(ms.get_context("device_target") == "CPU", reason="requires an Ascend device")
+def test_generation_metrics_of_generate():
+    ms.set_seed(0)
+    config = LlamaConfig(
+        vocab_size=32,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=64,
+        pad_token_id=0,
+    )
+    model = LlamaForCausalLM(config)
+    model.set_train(False)
+    input_ids = ms.tensor(np.random.default_rng(0).integers(1, 32, size=(2, 6)), dtype=ms.int32)
+
+    metrics = GenerationMetrics()
+    for streamer in [None, NullStreamer()]:
+        model.generate(
+            input_ids,
+            attention_mask=ms.ops.ones_like(input_ids),
+            max_new_tokens=MAX_NEW_TOKENS,
+            do_sample=False,
+            streamer=streamer,
+            generation_metrics=metrics,
+        )
+
+    calls = [metrics._summarize_record(record) for record in metrics.records]
+    for call in calls:
+        assert call["batch_size"] == 2
+        assert call["prompt_length"] == 6
+        assert call["num_new_tokens"] == MAX_NEW_TOKENS
+        # the inputs and the cache are padded to the maximum length with static input shape
+        assert call["cache_length"] == 6 + MAX_NEW_TOKENS
+        assert call["cache_capacity"] == 6 + MAX_NEW_TOKENS
+        assert call["cache_occupancy"] == 1.0
+        assert sum(call["token_latency_histogram"].values()) == MAX_NEW_TOKENS - 1
+    # the prefill reads the sequence lengths to pad the inputs, the cache length and the sequence length to set the
+    # cache positions. Then every step reads the position to decode, the last cache position, the cache length and the
+    # sequence length to slice the position ids, and the sequence lengths to update the attention mask. The first step
+    # does not slice the position ids of the empty cache, but reads the position to continue from. The steps before
+    # the last one, stopped by the maximum length on the host, read whether all the sequences reached the EOS token.
+    assert calls[0]["host_syncs"] == 3 + 5 * MAX_NEW_TOKENS + MAX_NEW_TOKENS - 1
+    # streaming reads every new token
+    assert calls[1]["host_syncs"] == calls[0]["host_syncs"] + MAX_NEW_TOKENS
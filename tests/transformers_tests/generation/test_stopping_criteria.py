@@ -0,0 +1,81 @@
+import numpy as np
+
+import mindspore as ms
+from mindspore import ops
+
+from mindone.transformers.generation.stopping_criteria import (
+    EosTokenCriteria,
+    MaxLengthCriteria,
+    StoppingCriteriaList,
+    StopStringCriteria,
+)
+
+VOCAB = ["abcdef", "s", "st", "sto", "stop", "op", "opera", "pper", "las", "topper", "to", "pped", "at", "x", " ", "p"]
+
+
+class DummyTokenizer:
+    def get_vocab(self):
+        return {token: i for i, token in enumerate(VOCAB)}
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": [VOCAB.index(text)]}
+
+    def _convert_id_to_token(self, index):
+        return VOCAB[index]
+
+    def convert_tokens_to_string(self, tokens):
+        return "".join(tokens)
+
+
+def _reference_stop_string_matches(input_ids, stop_strings):
+    # the stop string must end within the last token
+    matches = []
+    for row in input_ids.tolist():
+        text = "".join(VOCAB[i] for i in row)
+        last_token_start = len(text) - len(VOCAB[row[-1]])
+        matches.append(
+            any(
+                text.rfind(stop_string) != -1 and text.rfind(stop_string) + len(stop_string) > last_token_start
+                for stop_string in stop_strings
+            )
+        )
+    return np.array(matches)
+
+
+def test_stop_string_criteria_advance():
+    stop_strings = ["stop", "pa"]
+    criteria = StopStringCriteria(DummyTokenizer(), stop_strings)
+    rng = np.random.default_rng(0)
+    input_ids = rng.integers(1, len(VOCAB), size=(16, 12))
+    input_ids[0, -3:] = [VOCAB.index("s"), VOCAB.index("to"), VOCAB.index("pped")]
+    input_ids[1, -2:] = [VOCAB.index("las"), VOCAB.index("topper")]
+
+    num_matches = 0
+    for num_tokens in range(3, input_ids.shape[1] + 1):
+        context = ms.tensor(input_ids[:, :num_tokens], dtype=ms.int32)
+        expected = _reference_stop_string_matches(input_ids[:, :num_tokens], stop_strings)
+        num_matches += expected.sum()
+        np.testing.assert_array_equal(criteria.advance(context).asnumpy(), expected)
+    assert num_matches > 2
+    # the states are rebuilt from the trailing tokens when the rows do not continue the previous call
+    assert criteria.advance(context).asnumpy()[:2].all()
+
+
+def test_update_unfinished_sequences():
+    stopping_criteria = StoppingCriteriaList([MaxLengthCriteria(max_length=4), EosTokenCriteria(eos_token_id=2)])
+    unfinished_sequences = ops.ones(3, dtype=ms.int32)
+
+    input_ids = ms.tensor([[0, 1, 2], [0, 1, 1], [0, 2, 1]], dtype=ms.int32)
+    unfinished_sequences, this_peer_finished = stopping_criteria.update_unfinished_sequences(
+        input_ids, None, unfinished_sequences
+    )
+    assert unfinished_sequences.asnumpy().tolist() == [0, 1, 1]
+    assert not this_peer_finished
+
+    # reaching `max_length` is known on the host
+    input_ids = ops.cat([input_ids, ms.tensor([[0], [1], [1]], dtype=ms.int32)], axis=1)
+    unfinished_sequences, this_peer_finished = stopping_criteria.update_unfinished_sequences(
+        input_ids, None, unfinished_sequences
+    )
+    assert this_peer_finished is True
+    assert unfinished_sequences.asnumpy().tolist() == [0, 0, 0]
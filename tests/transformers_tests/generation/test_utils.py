@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from transformers import LlamaConfig
+
+import mindspore as ms
+
+from mindone.transformers import LlamaForCausalLM
+
+# the generation loop and the Llama layers use `mint` operators, which have no CPU kernels
+pytestmark = pytest.mark.skipif(ms.get_context("device_target") == "CPU", reason="requires an Ascend device")
+
+MAX_NEW_TOKENS = 10
+
+
+@pytest.fixture(scope="module")
+def model():
+    ms.set_seed(0)
+    config = LlamaConfig(
+        vocab_size=32,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=64,
+        pad_token_id=0,
+        initializer_range=0.5,
+    )
+    model = LlamaForCausalLM(config)
+    model.set_train(False)
+    return model
+
+
+def _greedy_decoding(model, input_ids, max_new_tokens):
+    """Greedy decoding by full forward passes on the unpadded sequences."""
+    for _ in range(max_new_tokens):
+        logits = model(input_ids, attention_mask=ms.ops.ones_like(input_ids), use_cache=False, return_dict=True).logits
+        next_tokens = logits[:, -1].argmax(-1).to(input_ids.dtype)
+        input_ids = ms.ops.cat([input_ids, next_tokens[:, None]], axis=-1)
+    return input_ids
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_static_shape_greedy_decoding(model, monkeypatch, use_cache):
+    assert not model._supports_default_dynamic_input()
+    input_ids = ms.tensor(np.random.default_rng(0).integers(1, 32, size=(2, 6)), dtype=ms.int32)
+    expected = _greedy_decoding(model, input_ids, MAX_NEW_TOKENS)
+
+    logits_lengths = []
+    construct = LlamaForCausalLM.construct
+
+    def spy(self, *args, logits_to_keep=0, **kwargs):
+        outputs = construct(self, *args, logits_to_keep=logits_to_keep, **kwargs)
+        logits_lengths.append((isinstance(logits_to_keep, ms.Tensor), outputs.logits.shape[1]))
+        return outputs
+
+    monkeypatch.setattr(LlamaForCausalLM, "construct", spy)
+    output_ids = model.generate(
+        input_ids,
+        attention_mask=ms.ops.ones_like(input_ids),
+        max_new_tokens=MAX_NEW_TOKENS,
+        do_sample=False,
+        use_cache=use_cache,
+    )
+
+    np.testing.assert_array_equal(output_ids.asnumpy(), expected.asnumpy())
+    # the padded inputs only project the logits of the decoded position through the LM head
+    assert logits_lengths == [(True, 1)] * MAX_NEW_TOKENS
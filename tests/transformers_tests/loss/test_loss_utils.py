@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import mindspore as ms
+
+from mindone.transformers.loss.loss_utils import ForCausalLMChunkedLoss
+
+IGNORE_INDEX = -100
+
+
+def _reference_loss_and_grads(hidden_states, weight, labels, logit_softcapping=None):
+    # the materialized float64 logits
+    labels = labels.reshape(-1)
+    hidden_states = hidden_states.reshape(-1, hidden_states.shape[-1]).astype(np.float64)
+    logits = hidden_states @ weight.T
+    if logit_softcapping is not None:
+        capped_logits = np.tanh(logits / logit_softcapping) * logit_softcapping
+    else:
+        capped_logits = logits
+    is_valid = labels != IGNORE_INDEX
+    safe_labels = np.where(is_valid, labels, 0)
+    log_probs = capped_logits - np.log(np.exp(capped_logits).sum(-1, keepdims=True))
+    loss = -(log_probs[np.arange(len(labels)), safe_labels] * is_valid).sum() / is_valid.sum()
+
+    grad_logits = np.exp(log_probs)
+    grad_logits[np.arange(len(labels)), safe_labels] -= 1
+    grad_logits *= is_valid[:, None] / is_valid.sum()
+    if logit_softcapping is not None:
+        grad_logits *= 1 - np.tanh(logits / logit_softcapping) ** 2
+    return loss, grad_logits @ weight, grad_logits.T @ hidden_states
+
+
+@pytest.mark.parametrize("chunk_size", [5, 64])
+@pytest.mark.parametrize("logit_softcapping", [None, 3.0])
+def test_chunked_causal_lm_loss(chunk_size, logit_softcapping):
+    rng = np.random.default_rng(0)
+    hidden_states = rng.standard_normal((2, 12, 8)).astype(np.float32)
+    weight = rng.standard_normal((37, 8)).astype(np.float32)
+    # the labels are already shifted
+    labels = rng.integers(0, 37, size=(2, 12))
+    labels[0, :4] = IGNORE_INDEX
+    labels[:, -1] = IGNORE_INDEX
+
+    def loss_fn(hidden_states, weight):
+        return ForCausalLMChunkedLoss(
+            hidden_states,
+            weight,
+            None,
+            vocab_size=37,
+            shift_labels=ms.tensor(labels, dtype=ms.int32),
+            chunk_size=chunk_size,
+            logit_softcapping=logit_softcapping,
+        )
+
+    loss, (grad_hidden_states, grad_weight) = ms.value_and_grad(loss_fn, grad_position=(0, 1))(
+        ms.tensor(hidden_states), ms.tensor(weight)
+    )
+    expected_loss, expected_grad_hidden_states, expected_grad_weight = _reference_loss_and_grads(
+        hidden_states, weight, labels, logit_softcapping
+    )
+    np.testing.assert_allclose(loss.asnumpy(), expected_loss, rtol=1e-5)
+    np.testing.assert_allclose(
+        grad_hidden_states.asnumpy().reshape(-1, 8), expected_grad_hidden_states, rtol=1e-4, atol=1e-6
+    )
+    np.testing.assert_allclose(grad_weight.asnumpy(), expected_grad_weight, rtol=1e-4, atol=1e-6)
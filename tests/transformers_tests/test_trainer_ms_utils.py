@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from mindone.transformers.trainer_ms_utils import (
+    EvalLengthGroupedSampler,
+    nested_pad_and_concatenate,
+    nested_pad_to_length,
+    nested_take,
+)
+
+
+@pytest.mark.parametrize("num_replicas", [1, 3])
+@pytest.mark.parametrize("group_by_length", [False, True])
+def test_eval_length_grouped_sampler(num_replicas, group_by_length):
+    batch_size = 4
+    lengths = np.random.default_rng(0).integers(1, 50, size=37).tolist()
+    samplers = [
+        EvalLengthGroupedSampler(
+            batch_size, len(lengths), lengths=lengths if group_by_length else None, num_replicas=num_replicas, rank=rank
+        )
+        for rank in range(num_replicas)
+    ]
+
+    # every process runs the same number of full batches
+    assert len({len(sampler) for sampler in samplers}) == 1
+    assert len(samplers[0]) % batch_size == 0
+    assert sorted(set(i for sampler in samplers for i in sampler)) == list(range(len(lengths)))
+
+    # the predictions of each process, one batch at a time, padded to the longest sample of the batch
+    predictions = []
+    for sampler in samplers:
+        indices = list(sampler)
+        batches = []
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start : start + batch_size]
+            max_length = max(lengths[i] for i in batch)
+            batches.append(np.stack([[i] * lengths[i] + [-100] * (max_length - lengths[i]) for i in batch]))
+            if group_by_length and start > 0:
+                assert max_length <= max(lengths[i] for i in indices[start - batch_size : start])
+        predictions.append(nested_pad_and_concatenate(batches))
+
+    # gathered from all the processes and put back in the order of the dataset
+    max_length = max(prediction.shape[1] for prediction in predictions)
+    gathered = np.concatenate([nested_pad_to_length(prediction, max_length) for prediction in predictions])
+    _, dataset_indices = np.unique(samplers[0].gathered_indices(), return_index=True)
+    gathered = nested_take(gathered, dataset_indices)
+
+    assert gathered.shape == (len(lengths), max(lengths))
+    for i, length in enumerate(lengths):
+        assert (gathered[i, :length] == i).all() and (gathered[i, length:] == -100).all()
+
+
+def test_eval_length_grouped_sampler_batch_num_samples():
+    # 10 samples in 4 batches of 4, dealt to 2 processes
+    samplers = [EvalLengthGroupedSampler(4, 10, num_replicas=2, rank=rank) for rank in range(2)]
+    assert samplers[0].rank_batch_num_samples(0).tolist() == [4, 2]
+    assert samplers[1].rank_batch_num_samples(1).tolist() == [4, 0]
+    assert samplers[1].rank_indices(1).tolist() == [4, 5, 6, 7, 9, 9, 9, 9]
+
+
+def test_nested_pad_and_concatenate():
+    batches = [(np.ones((2, 3)), np.zeros(2)), (np.ones((1, 5)), np.zeros(1))]
+    predictions, scores = nested_pad_and_concatenate(batches, padding_index=0)
+    assert predictions.tolist() == [[1, 1, 1, 0, 0], [1, 1, 1, 0, 0], [1, 1, 1, 1, 1]]
+    assert scores.shape == (3,)
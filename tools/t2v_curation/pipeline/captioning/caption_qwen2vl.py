@@ -1,6 +1,7 @@
 import argparse
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -9,9 +10,7 @@ from tqdm import tqdm
 from transformers import AutoProcessor
 
 import mindspore as ms
-import mindspore.dataset as ds
-import mindspore.mint as mint
-from mindspore.mint.distributed import all_gather, all_gather_object, get_rank, get_world_size, init_process_group
+from mindspore.mint.distributed import all_gather_object, get_rank, get_world_size, init_process_group
 
 __dir__ = os.path.dirname(os.path.abspath(__file__))
 mindone_lib_path = os.path.abspath(os.path.join(__dir__, "../../../.."))
@@ -21,20 +20,6 @@ from mindone.transformers import Qwen2VLForConditionalGeneration  # noqa: E402
 from mindone.transformers.models.qwen2_vl.qwen_vl_utils import process_vision_info  # noqa: E402
 
 
-class VideoTextDataset:
-    def __init__(self, meta_path):
-        self.meta_path = meta_path
-        self.meta = pd.read_csv(meta_path)
-
-    def __getitem__(self, index):
-        sample = self.meta.iloc[index]
-        path = sample["path"]
-        return path, index
-
-    def __len__(self):
-        return len(self.meta)
-
-
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("meta_path", type=str, help="Path to the input CSV file")
@@ -44,12 +29,73 @@ def parse_args():
     parser.add_argument("--width", type=int, default=672, help="resized video width")
     parser.add_argument("--fps", type=int, default=4, help="fps to sample from video")
     parser.add_argument("--bs", type=int, default=1, help="Batch size")
+    parser.add_argument(
+        "--group_batches",
+        type=int,
+        default=4,
+        help="Number of batches whose videos are decoded together and sorted by number of tokens, "
+        "to batch the videos of similar lengths and minimize padding",
+    )
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of decoding threads")
     parser.add_argument("--skip_if_existing", action="store_true", help="Skip processing if output CSV already exists.")
     parser.add_argument("--max_new_tokens", type=int, default=200, help="Max tokens to generate")
     args = parser.parse_args()
     return args
 
 
+def prepare_sample(processor, video_path, args):
+    """Decodes the video and tokenizes the prompt of a sample, without padding."""
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "video",
+                    "video": video_path,
+                    "max_pixels": args.height * args.width,
+                    "fps": float(args.fps),
+                },
+                {"type": "text", "text": args.question},
+            ],
+        }
+    ]
+    text_prompt = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    _, video_inputs = process_vision_info(messages)
+    inputs = processor(text=[text_prompt], videos=video_inputs, return_tensors="np")
+    return {
+        "input_ids": inputs["input_ids"][0],
+        "pixel_values_videos": inputs["pixel_values_videos"],
+        "video_grid_thw": inputs["video_grid_thw"],
+    }
+
+
+def collate(samples, pad_token_id):
+    """Left-pads the prompts of the samples to the longest one, as required by batched generation."""
+    length = max(len(sample["input_ids"]) for sample in samples)
+    input_ids = np.full((len(samples), length), pad_token_id, dtype=np.int32)
+    attention_mask = np.zeros((len(samples), length), dtype=np.int32)
+    for i, sample in enumerate(samples):
+        input_ids[i, length - len(sample["input_ids"]) :] = sample["input_ids"]
+        attention_mask[i, length - len(sample["input_ids"]) :] = 1
+    return {
+        "input_ids": ms.Tensor(input_ids),
+        "attention_mask": ms.Tensor(attention_mask),
+        "pixel_values_videos": ms.Tensor(np.concatenate([sample["pixel_values_videos"] for sample in samples])),
+        "video_grid_thw": ms.Tensor(np.concatenate([sample["video_grid_thw"] for sample in samples]).astype(np.int32)),
+    }
+
+
+def caption_batch(model, processor, samples, max_new_tokens):
+    """Captions a batch of samples with a single `generate` call, and decodes the generated tokens only."""
+    inputs = collate(samples, processor.tokenizer.pad_token_id)
+    generated_ids = model.generate(**inputs, max_new_tokens=max_new_tokens)
+    return processor.batch_decode(
+        generated_ids[:, inputs["input_ids"].shape[1] :].asnumpy(),
+        skip_special_tokens=True,
+        clean_up_tokenization_spaces=False,
+    )
+
+
 def main():
     args = parse_args()
 
@@ -78,83 +124,55 @@ def main():
     print("Loading AutoProcessor")
     processor = AutoProcessor.from_pretrained(args.pretrained_model_name_or_path)
 
-    raw_dataset = VideoTextDataset(meta_path)
-    dataset = ds.GeneratorDataset(
-        source=raw_dataset, column_names=["video_path", "index"], shuffle=False, num_shards=rank_size, shard_id=rank_id
-    )
-    dataset = dataset.batch(args.bs, drop_remainder=False)
-    iterator = dataset.create_dict_iterator(num_epochs=1, output_numpy=True)
+    meta = pd.read_csv(meta_path)
+    indices = meta.index[rank_id::rank_size].tolist()
+    group_size = args.bs * args.group_batches
+    groups = [indices[i : i + group_size] for i in range(0, len(indices), group_size)]
 
     indices_list = []
     caption_list = []
 
-    for batch in tqdm(iterator):
-        video_paths = batch["video_path"]
-        indices = batch["index"]
-
-        for video_path, idx in zip(video_paths, indices):
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "video",
-                            "video": video_path,
-                            "max_pixels": args.height * args.width,
-                            "fps": float(args.fps),
-                        },
-                        {"type": "text", "text": args.question},
-                    ],
-                }
-            ]
-
-            try:
-                text_prompt = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-                image_inputs, video_inputs = process_vision_info(messages)
-                inputs = processor(
-                    text=[text_prompt],
-                    images=image_inputs,
-                    videos=video_inputs,
-                    padding=True,
-                    return_tensors="np",
-                )
-
-                for key, value in inputs.items():
-                    if isinstance(value, np.ndarray):
-                        inputs[key] = ms.Tensor(value)
-                    elif isinstance(value, list):
-                        inputs[key] = ms.Tensor(value)
-                    if inputs[key].dtype == ms.int64:
-                        inputs[key] = inputs[key].to(ms.int32)
-
-                generated_ids = model.generate(**inputs, max_new_tokens=args.max_new_tokens)
-                output_text = processor.batch_decode(
-                    generated_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
-                )[0]
-            except Exception as e:
-                print(f"Error processing video {video_path}: {e}")
-                output_text = ""
-
-            caption_list.append(output_text)
-            indices_list.append(idx)
+    with ThreadPoolExecutor(args.num_workers) as executor:
+
+        def submit(group):
+            return [executor.submit(prepare_sample, processor, meta.at[index, "path"], args) for index in group]
+
+        # the videos of the next group are decoded while the current one is captioned
+        prepared = submit(groups[0]) if groups else []
+        with tqdm(total=len(indices)) as pbar:
+            for i in range(len(groups)):
+                current, prepared = prepared, submit(groups[i + 1]) if i + 1 < len(groups) else []
+                samples = []
+                for index, future in zip(groups[i], current):
+                    try:
+                        samples.append((index, future.result()))
+                    except Exception as e:
+                        print(f"Error processing video {meta.at[index, 'path']}: {e}")
+                        indices_list.append(index)
+                        caption_list.append("")
+
+                # the videos with similar numbers of visual tokens are batched together
+                samples.sort(key=lambda x: len(x[1]["input_ids"]))
+                for start in range(0, len(samples), args.bs):
+                    batch_indices, batch = zip(*samples[start : start + args.bs])
+                    try:
+                        output_texts = caption_batch(model, processor, batch, args.max_new_tokens)
+                    except Exception as e:
+                        paths = ", ".join(meta.loc[list(batch_indices), "path"])
+                        print(f"Error captioning videos {paths}: {e}")
+                        output_texts = [""] * len(batch)
+                    indices_list.extend(batch_indices)
+                    caption_list.extend(output_texts)
+                pbar.update(len(groups[i]))
 
     if rank_size > 1:
-        indices_tensor = ms.Tensor(indices_list, dtype=ms.int64)
-        indices_all = [ms.Tensor(np.zeros(indices_tensor.shape, dtype=np.int64)) for _ in range(rank_size)]
-        all_gather(indices_all, indices_tensor)
-        indices_list_all = mint.concat(indices_all, dim=0).asnumpy().tolist()
-
-        captions_all = [None] * rank_size
-        all_gather_object(captions_all, caption_list)
-        caption_list_all = sum(captions_all, [])
-
-        if rank_id == 0:
-            meta_local = merge_scores([(indices_list_all, caption_list_all)], raw_dataset.meta, column="text")
-    elif rank_size == 1:
-        meta_local = raw_dataset.meta.copy()
-        meta_local["text"] = caption_list
+        gathered = [None] * rank_size
+        all_gather_object(gathered, (indices_list, caption_list))
+        indices_list = sum([rank_indices for rank_indices, _ in gathered], [])
+        caption_list = sum([rank_captions for _, rank_captions in gathered], [])
 
     if rank_id == 0:
+        meta_local = merge_scores([(indices_list, caption_list)], meta, column="text")
         meta_local.to_csv(out_path, index=False)
         print(meta_local.head())
         print(f"New meta with captions saved to '{out_path}'.")
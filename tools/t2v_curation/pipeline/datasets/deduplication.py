@@ -1,12 +1,17 @@
 import argparse
 import os
+from multiprocessing import Pool, cpu_count
 
 import numpy as np
 import pandas as pd
+from pipeline.datasets.hash_index import HammingIndex, find_duplicates_to_remove, hash_matrix_to_uint64
 from pipeline.datasets.imagededup.methods import AHash, DHash, PHash, WHash
+from pipeline.datasets.imagededup.utils.image_utils import preprocess_image
 from pipeline.datasets.utils import extract_frames, is_video, pil_loader
 from tqdm import tqdm
 
+HASHERS = {"phash": PHash, "ahash": AHash, "dhash": DHash, "whash": WHash}
+
 
 class VideoTextDataset:
     def __init__(self, meta_path):
@@ -31,6 +36,58 @@ class VideoTextDataset:
         return len(self.meta)
 
 
+# the dataset and the hasher of the hashing processes, set once by `_init_worker`
+_dataset, _hasher = None, None
+
+
+def _init_worker(dataset, hasher):
+    global _dataset, _hasher
+    _dataset, _hasher = dataset, hasher
+
+
+def _encode(index):
+    """Returns the `uint64` hash of the first frame of the sample, and whether it could be computed."""
+    try:
+        _, image = _dataset[index]
+        image = preprocess_image(image, target_size=_hasher.target_size, grayscale=True)
+        return hash_matrix_to_uint64(_hasher._hash_algo(image)), True
+    except Exception as e:
+        print(f"[Warning] Failed to hash sample {index}: {e}")
+        return np.uint64(0), False
+
+
+def encode_dataset(dataset, hasher, num_workers):
+    """Hashes the samples of the dataset in parallel, in chunks of samples per worker."""
+    hashes = np.zeros(len(dataset), dtype=np.uint64)
+    valid = np.zeros(len(dataset), dtype=bool)
+    if num_workers > 0:
+        with Pool(num_workers, initializer=_init_worker, initargs=(dataset, hasher)) as pool:
+            results = pool.imap(_encode, range(len(dataset)), chunksize=64)
+            for index, (encoding, ok) in enumerate(tqdm(results, total=len(dataset))):
+                hashes[index], valid[index] = encoding, ok
+    else:
+        _init_worker(dataset, hasher)
+        for index in tqdm(range(len(dataset))):
+            hashes[index], valid[index] = _encode(index)
+    return hashes, valid
+
+
+def load_index(index_path, hash_name):
+    """Loads the hashes of the already accepted samples, saved by a previous run with the same hash."""
+    if not os.path.exists(index_path):
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=object)
+    with np.load(index_path, allow_pickle=True) as index:
+        if str(index["hash"]) != hash_name:
+            raise ValueError(f"The index '{index_path}' holds {index['hash']} hashes, not {hash_name} ones.")
+        return index["hashes"], index["paths"]
+
+
+def save_index(index_path, hash_name, hashes, paths):
+    """Saves the hashes of the accepted samples to the exact `index_path`, which `np.savez` would suffix with `.npz`."""
+    with open(index_path, "wb") as f:
+        np.savez(f, hashes=hashes, paths=paths, hash=hash_name)
+
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("meta_path", type=str, help="Path to the input CSV file")
@@ -47,6 +104,16 @@ def parse_args():
         default=15,
         help="Max distance threshold for detecting duplication after encoding and hashing, between 1 to 64",
     )
+    parser.add_argument(
+        "--num_workers", type=int, default=cpu_count(), help="Number of hashing processes, 0 to hash in the main one"
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Path to the `.npz` index of the hashes of the already accepted samples, for incremental deduplication: "
+        "the samples that are duplicates of them are removed too, and the hashes of the kept samples are added to it.",
+    )
     args = parser.parse_args()
     return args
 
@@ -69,32 +136,38 @@ def main():
         print(f"Invalid threshold value '{args.threshold}'. Must be between 1 to 64. Exit.")
         exit()
 
-    dataset = VideoTextDataset(meta_path)
-    if args.hash == "phash":
-        hasher = PHash()
-    elif args.hash == "ahash":
-        hasher = AHash()
-    elif args.hash == "dhash":
-        hasher = DHash()
-    elif args.hash == "whash":
-        hasher = WHash()
-    else:
+    if args.hash not in HASHERS:
         print(f"Invalid hash {args.hash}. Must be one of 'phash', 'ahash', 'dhash', 'whash'. Exit.")
         exit()
 
-    encodings = {}
-    for index in tqdm(range(len(dataset))):
-        path, image = dataset[index]
-        encoding = hasher.encode_image(image_array=image)
-        encodings[path] = encoding
+    dataset = VideoTextDataset(meta_path)
+    hasher = HASHERS[args.hash](verbose=False)
+    hashes, valid = encode_dataset(dataset, hasher, args.num_workers)
+
+    index_hashes, index_paths = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=object)
+    if args.index is not None:
+        index_hashes, index_paths = load_index(args.index, args.hash)
+        print(f"Loaded {len(index_hashes)} accepted hashes from '{args.index}'.")
 
-    # find duplicates & filter
-    duplicates = hasher.find_duplicates_to_remove(encoding_map=encodings, max_distance_threshold=args.threshold)
-    duplicate_paths = set(duplicates)
+    # find duplicates & filter, the samples that could not be hashed are kept
+    index = HammingIndex(index_hashes, args.threshold) if len(index_hashes) else None
+    remove = np.zeros(len(dataset), dtype=bool)
+    remove[valid] = find_duplicates_to_remove(hashes[valid], args.threshold, index=index)
 
-    deduplicated_meta = dataset.meta[~dataset.meta["path"].isin(duplicate_paths)]
+    deduplicated_meta = dataset.meta[~remove]
     deduplicated_meta.to_csv(out_path, index=False)
-    print(f"Deduplicated videos saved to '{out_path}'.")
+    print(f"Deduplicated videos saved to '{out_path}', {remove.sum()} duplicates removed.")
+
+    if args.index is not None:
+        kept = valid & ~remove
+        paths = dataset.meta["path"].to_numpy(dtype=object)[kept]
+        save_index(
+            args.index,
+            args.hash,
+            np.concatenate([index_hashes, hashes[kept]]),
+            np.concatenate([index_paths, paths]),
+        )
+        print(f"Index of {len(index_hashes) + kept.sum()} accepted hashes saved to '{args.index}'.")
 
 
 if __name__ == "__main__":
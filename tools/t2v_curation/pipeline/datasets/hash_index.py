@@ -0,0 +1,205 @@
+"""
+Near-duplicate search of 64-bit perceptual hashes, packed as `uint64`.
+
+The hashes of `pipeline.datasets.imagededup` are hexadecimal strings, searched one by one in a BK-tree or by brute
+force. At the scale of millions of clips, `HammingIndex` instead keeps them in `uint64` arrays and searches them with
+multi-index hashing: the 64 bits are split into `m` chunks, and two hashes within a Hamming distance `r` have at least
+one chunk within a distance `r // m` (pigeonhole principle). The candidates of all the chunks within that distance are
+looked up with binary searches in sorted copies of the chunks, and the Hamming distances of the candidates are counted
+with a vectorized popcount, for whole batches of queries at once.
+"""
+
+from itertools import combinations
+from math import comb, log2
+from typing import Tuple
+
+import numpy as np
+
+HASH_BITS = 64
+_MAX_TABLE_BITS = 24
+_MAX_BATCH_CANDIDATES = 1 << 24
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def popcount64(x: np.ndarray) -> np.ndarray:
+    """Number of set bits of each element of a `uint64` array."""
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.uint8)
+
+
+def hamming_distance64(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return popcount64(np.bitwise_xor(x, y))
+
+
+def hash_matrix_to_uint64(hash_mat: np.ndarray) -> np.uint64:
+    """Packs the 8x8 binary matrix of the hashing algorithms of `imagededup` in the bit order of their hex strings."""
+    return np.packbits(hash_mat.reshape(-1)).view(">u8")[0].astype(np.uint64)
+
+
+def hex_to_uint64(hashes) -> np.ndarray:
+    """Converts the hexadecimal hash strings of `imagededup` to `uint64`."""
+    return np.array([int(h, 16) for h in hashes], dtype=np.uint64)
+
+
+def uint64_to_hex(hashes: np.ndarray):
+    return [f"{h:016x}" for h in hashes.tolist()]
+
+
+def _chunk_masks(num_bits: int, radius: int) -> np.ndarray:
+    """All the values of `num_bits` bits with at most `radius` bits set: the XOR masks of the chunk lookups."""
+    masks = [0]
+    for k in range(1, radius + 1):
+        masks.extend(sum(1 << b for b in bits) for bits in combinations(range(num_bits), k))
+    return np.array(masks, dtype=np.uint64)
+
+
+def _search_cost(num_hashes: int, num_chunks: int, max_distance: int) -> float:
+    """Estimated number of operations per query of multi-index hashing with `num_chunks` chunks."""
+    num_bits = HASH_BITS // num_chunks
+    radius = max_distance // num_chunks
+    num_probes = sum(comb(num_bits, k) for k in range(radius + 1))
+    # each probe is a table lookup or a binary search, and returns the hashes of its bucket (uniformly distributed)
+    lookup = 1 if num_bits <= _MAX_TABLE_BITS else log2(max(num_hashes, 2))
+    return num_chunks * num_probes * (lookup + num_hashes / 2**num_bits)
+
+
+class HammingIndex:
+    """
+    Index of `uint64` hashes for the search of the ones within a Hamming distance of `max_distance` of queries.
+
+    Args:
+        hashes: the `uint64` hashes of the index.
+        max_distance: maximum Hamming distance of the near-duplicates, between 0 and 64.
+        num_chunks: number of chunks of the multi-index hashing, chosen from the size of the index and `max_distance`
+            if None. 0 searches by brute force.
+    """
+
+    def __init__(self, hashes: np.ndarray, max_distance: int, num_chunks: int = None):
+        if not 0 <= max_distance <= HASH_BITS:
+            raise ValueError(f"`max_distance` must be between 0 and {HASH_BITS}, got {max_distance}.")
+        self.hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+
+        if num_chunks is None:
+            # brute force costs one popcount per hash of the index
+            costs = {0: float(len(self.hashes))}
+            costs.update({m: _search_cost(len(self.hashes), m, max_distance) for m in (1, 2, 3, 4, 6, 8)})
+            num_chunks = min(costs, key=costs.get)
+        elif num_chunks > 0 and _search_cost(1, num_chunks, max_distance) > 1 << 24:
+            raise ValueError(f"Too many lookups for `max_distance={max_distance}` with {num_chunks} chunks.")
+        self.num_chunks = num_chunks
+
+        self._chunks = []
+        if num_chunks > 0:
+            bounds = np.linspace(0, HASH_BITS, num_chunks + 1).astype(int)
+            radius = max_distance // num_chunks
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                shift, mask = np.uint64(start), np.uint64((1 << (end - start)) - 1)
+                values = (self.hashes >> shift) & mask
+                order = np.argsort(values, kind="stable")
+                table = end - start <= _MAX_TABLE_BITS
+                if table:
+                    # the buckets of the sorted chunk are looked up in a table of their offsets
+                    buckets = np.zeros(2 ** (end - start) + 1, dtype=np.int64)
+                    np.cumsum(np.bincount(values.astype(np.int64), minlength=2 ** (end - start)), out=buckets[1:])
+                else:
+                    buckets = values[order]
+                self._chunks.append((shift, mask, table, buckets, order, _chunk_masks(end - start, radius)))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _candidates(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self._chunks:
+            query_indices, hash_indices = np.meshgrid(
+                np.arange(len(queries)), np.arange(len(self.hashes)), indexing="ij", copy=False
+            )
+            return query_indices.reshape(-1), hash_indices.reshape(-1)
+
+        query_indices, hash_indices = [], []
+        for shift, mask, table, buckets, order, probe_masks in self._chunks:
+            probes = (((queries >> shift) & mask)[:, None] ^ probe_masks[None, :]).reshape(-1)
+            if table:
+                probes = probes.astype(np.int64)
+                starts = buckets[probes]
+                counts = buckets[probes + 1] - starts
+            else:
+                starts = np.searchsorted(buckets, probes, side="left")
+                counts = np.searchsorted(buckets, probes, side="right") - starts
+            total = counts.sum()
+            if total == 0:
+                continue
+            # the positions of all the hashes of the buckets of the probes, in the sorted chunk
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            query_indices.append(np.repeat(np.arange(len(probes)) // len(probe_masks), counts))
+            hash_indices.append(order[np.repeat(starts, counts) + offsets])
+        if not query_indices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(query_indices), np.concatenate(hash_indices)
+
+    def search(self, queries: np.ndarray, batch_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the pairs `(query index, index of the hash)` of the hashes of the index within `max_distance` of the
+        queries, sorted.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.uint64)
+        # bounds the number of candidates of a batch: every hash for brute force
+        candidates = _search_cost(len(self.hashes), self.num_chunks, self.max_distance) if self._chunks else len(self)
+        batch_size = max(1, min(batch_size, int(_MAX_BATCH_CANDIDATES // max(candidates, 1))))
+        query_indices, hash_indices = [], []
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start : start + batch_size]
+            q, h = self._candidates(batch)
+            within = hamming_distance64(batch[q], self.hashes[h]) <= self.max_distance
+            # a hash is a candidate of every chunk within the radius
+            pairs = np.unique(q[within].astype(np.int64) * len(self.hashes) + h[within])
+            query_indices.append(pairs // max(len(self.hashes), 1) + start)
+            hash_indices.append(pairs % max(len(self.hashes), 1))
+        if not query_indices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(query_indices), np.concatenate(hash_indices)
+
+    def contains(self, queries: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+        """Whether each query has a hash of the index within `max_distance`."""
+        found = np.zeros(len(queries), dtype=bool)
+        found[self.search(queries, batch_size)[0]] = True
+        return found
+
+
+def find_duplicates_to_remove(
+    hashes: np.ndarray, max_distance: int, index: HammingIndex = None, batch_size: int = 4096
+) -> np.ndarray:
+    """
+    Returns the mask of the hashes to remove: as `find_duplicates_to_remove` of `imagededup`, the hashes are kept in
+    order unless they are within `max_distance` of a hash kept before, and of a hash of the `index` of the already
+    accepted samples if given.
+    """
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    remove = np.zeros(len(hashes), dtype=bool)
+    if index is not None and len(index):
+        remove = index.contains(hashes, batch_size)
+
+    # the exact duplicates are removed with the first occurrence of their hash: it is either kept, or removed by a
+    # kept hash that is within `max_distance` of all of them
+    unique_hashes, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    remove |= np.arange(len(hashes)) != first[inverse]
+    order = np.argsort(first)
+    unique_hashes, first = unique_hashes[order], first[order]
+
+    # the near duplicates among the unique hashes, in the order of their first occurrence
+    queries, neighbors = HammingIndex(unique_hashes, max_distance).search(unique_hashes, batch_size)
+    later = neighbors > queries
+    queries, neighbors = queries[later], neighbors[later]
+    removed = remove[first]
+    bounds = np.searchsorted(queries, np.arange(len(unique_hashes) + 1))
+    for i in np.unique(queries):
+        if not removed[i]:
+            removed[neighbors[bounds[i] : bounds[i + 1]]] = True
+
+    return remove | removed[np.argsort(order)][inverse]
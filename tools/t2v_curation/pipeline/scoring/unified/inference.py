@@ -0,0 +1,245 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pipeline.datasets.datautil import read_file, save_file
+from pipeline.datasets.utils import is_video, pil_loader
+from pipeline.scoring.unified.scorers import (
+    AestheticScorer,
+    Clip,
+    CLIPImageFeatures,
+    LPIPSScorer,
+    MatchingScorer,
+    NSFWScorer,
+    OCRScorer,
+)
+from tqdm import tqdm
+
+import mindspore as ms
+from mindspore.mint.distributed import all_gather_object, get_rank, get_world_size, init_process_group
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+mindone_lib_path = os.path.abspath(os.path.join(__dir__, "../../../../.."))
+sys.path.insert(0, mindone_lib_path)
+
+from mindone.data import VideoReader  # noqa: E402
+
+SCORERS = ("lpips", "ocr", "aes", "nsfw", "match")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score the samples with several scorers in a single pass: the frames of each sample are decoded "
+        "once for all the scorers, and the samples filtered out by a scorer are not scored by the next ones."
+    )
+    parser.add_argument("meta_path", type=str, help="Path to the input CSV or Parquet file")
+    parser.add_argument(
+        "--scorers",
+        type=str,
+        nargs="+",
+        default=["lpips", "aes", "nsfw"],
+        choices=SCORERS,
+        help="The scorers to run, in order: put the cheap filters first.",
+    )
+    parser.add_argument("--output", type=str, default=None, help="Default: `<meta_path>_scored.<ext>`")
+    parser.add_argument("--use_cpu", action="store_true", help="Whether to use CPU")
+    parser.add_argument("--mode", type=int, default=0, help="0 for graph mode, 1 for pynative mode")
+    parser.add_argument("--bs", type=int, default=64, help="Number of samples decoded and scored at once")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of decoding threads")
+    parser.add_argument("--skip_if_existing", action="store_true")
+
+    # CLIP based scorers
+    parser.add_argument("--num_frames", type=int, default=1, help="Number of frames of aes/nsfw/match, 1, 2 or 3.")
+    parser.add_argument("--ckpt_path_aes", type=str, default="pretrained_models/aesthetic.ckpt")
+    parser.add_argument("--ckpt_path_nsfw", type=str, default="pretrained_models/nsfw_model.ckpt")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Threshold above which a frame is NSFW.")
+    parser.add_argument("--option", type=str, default=None, help="Text to match instead of the `text` column")
+    # LPIPS
+    parser.add_argument("--seconds", type=int, default=1, help="Interval of the frames of LPIPS in seconds")
+    parser.add_argument("--target_height", type=int, default=224)
+    parser.add_argument("--target_width", type=int, default=224)
+    parser.add_argument("--lpips_ckpt_path", type=str, default="pretrained_models/lpips.ckpt")
+
+    # filters, as in `pipeline.datasets.datautil`
+    parser.add_argument("--aesmin", type=float, default=None)
+    parser.add_argument("--matchmin", type=float, default=None)
+    parser.add_argument("--lpipsmin", type=float, default=None)
+    parser.add_argument("--safety_check", action="store_true", help="Filter out the samples flagged NSFW")
+    parser.add_argument("--ocr_box_max", type=int, default=None)
+    parser.add_argument("--ocr_single_max", type=float, default=None)
+    parser.add_argument("--ocr_total_max", type=float, default=None)
+
+    # the remaining arguments are the ones of the OCR in `pipeline/scoring/ocr/config.py`
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def build_scorers(args):
+    scorers = []
+    clip_features = None
+    if {"aes", "nsfw", "match"} & set(args.scorers):
+        clip_features = CLIPImageFeatures(batch_size=args.bs)
+    for name in args.scorers:
+        if name == "aes":
+            scorers.append(AestheticScorer(clip_features, args.ckpt_path_aes, args.num_frames, aesmin=args.aesmin))
+        elif name == "nsfw":
+            scorers.append(
+                NSFWScorer(clip_features, args.ckpt_path_nsfw, args.num_frames, args.threshold, args.safety_check)
+            )
+        elif name == "match":
+            scorers.append(MatchingScorer(clip_features, args.num_frames, option=args.option, matchmin=args.matchmin))
+        elif name == "lpips":
+            target_size = (args.target_height, args.target_width)
+            scorers.append(LPIPSScorer(args.lpips_ckpt_path, args.seconds, target_size, lpipsmin=args.lpipsmin))
+        elif name == "ocr":
+            from pipeline.scoring.ocr.config import create_parser
+
+            ocr_args, _ = create_parser().parse_known_args()
+            scorers.append(OCRScorer(ocr_args, args.ocr_box_max, args.ocr_single_max, args.ocr_total_max))
+    return scorers
+
+
+def decode_clip(index, sample, scorers):
+    """Decodes the frames needed by `scorers` of the sample in a single pass."""
+    path = sample["path"]
+    text = sample["text"] if isinstance(sample.get("text"), str) else ""
+    if not is_video(path):
+        frame = np.array(pil_loader(path))
+        return Clip(index, path, 1, None, text, frame.shape[0], frame.shape[1], frames={0: frame})
+
+    with VideoReader(path) as reader:
+        num_frames = int(sample["num_frames"]) if pd.notna(sample.get("num_frames")) else len(reader)
+        clip = Clip(index, path, num_frames, reader.fps, text, reader.shape[1], reader.shape[0])
+        indices = sorted({j for scorer in scorers for j in scorer.frame_indices(clip)})
+        clip.frames = dict(zip(indices, reader.get_frames(indices)))
+    return clip
+
+
+def is_scored(meta, index, scorer):
+    return all(column in meta.columns and pd.notna(meta.at[index, column]) for column in scorer.columns)
+
+
+def score_batch(meta, clips, scorers):
+    """
+    Scores the decoded `clips` with the scorers they have no scores of, and returns their new scores. The clips filtered
+    out by a scorer are not scored by the next ones.
+    """
+    results = {clip.index: {} for clip in clips}
+    for scorer in scorers:
+        if not clips:
+            break
+        pending = [clip for clip in clips if not is_scored(meta, clip.index, scorer)]
+        if pending:
+            scores = scorer.score(pending)
+            for i, clip in enumerate(pending):
+                results[clip.index].update({column: values[i] for column, values in scores.items()})
+
+        scores = {
+            column: np.asarray(
+                [
+                    results[clip.index][column] if column in results[clip.index] else meta.at[clip.index, column]
+                    for clip in clips
+                ]
+            )
+            for column in scorer.columns
+        }
+        keep = scorer.keep(scores)
+        if keep is not None:
+            clips = [clip for clip, k in zip(clips, keep) if k]
+    return results
+
+
+def main():
+    args = parse_args()
+
+    meta_path = args.meta_path
+    if not os.path.exists(meta_path):
+        print(f"Meta file '{meta_path}' not found. Exit.")
+        exit()
+
+    wo_ext, ext = os.path.splitext(meta_path)
+    out_path = args.output or f"{wo_ext}_scored{ext}"
+    if args.skip_if_existing and os.path.exists(out_path):
+        print(f"Output meta file '{out_path}' already exists. Exit.")
+        exit()
+
+    rank_id, rank_size = 0, 1
+    if not args.use_cpu:
+        ms.set_context(mode=args.mode, device_target="Ascend")
+        ms.set_auto_parallel_context(parallel_mode=ms.ParallelMode.DATA_PARALLEL)
+        init_process_group()
+        rank_id, rank_size = get_rank(), get_world_size()
+
+    meta = read_file(meta_path)
+    scorers = build_scorers(args)
+
+    # the samples already scored by a scorer (e.g. in a previous run) keep their scores, and the ones already filtered
+    # out by a scorer are skipped
+    indices = []
+    for index in meta.index[rank_id::rank_size]:
+        pending = False
+        for scorer in scorers:
+            if not is_scored(meta, index, scorer):
+                pending = True
+                break
+            keep = scorer.keep({column: np.asarray([meta.at[index, column]]) for column in scorer.columns})
+            if keep is not None and not keep[0]:
+                break
+        if pending:
+            indices.append(index)
+
+    results = {}
+    batches = [indices[i : i + args.bs] for i in range(0, len(indices), args.bs)]
+    with ThreadPoolExecutor(args.num_workers) as executor:
+
+        def submit(batch):
+            return [
+                executor.submit(
+                    decode_clip, index, meta.loc[index], [s for s in scorers if not is_scored(meta, index, s)]
+                )
+                for index in batch
+            ]
+
+        # the next batch is decoded while the current one is scored
+        decoded = submit(batches[0]) if batches else []
+        for i in tqdm(range(len(batches))):
+            current, decoded = decoded, submit(batches[i + 1]) if i + 1 < len(batches) else []
+            clips = []
+            for index, future in zip(batches[i], current):
+                try:
+                    clips.append(future.result())
+                except Exception as e:
+                    print(f"[Warning] Failed to decode {meta.at[index, 'path']}: {e}")
+            results.update(score_batch(meta, clips, scorers))
+
+    if rank_size > 1:
+        gathered = [None] * rank_size
+        all_gather_object(gathered, results)
+        results = {index: scores for rank_results in gathered for index, scores in rank_results.items()}
+
+    if rank_id == 0:
+        for index, scores in results.items():
+            for column, value in scores.items():
+                if column not in meta.columns:
+                    meta[column] = pd.Series(dtype=object if column == "ocr" else float)
+                meta.at[index, column] = value
+        save_file(meta, out_path)
+        print(f"New meta with the scores of {', '.join(args.scorers)} saved to '{out_path}'.")
+
+        keep = np.ones(len(meta), dtype=bool)
+        for scorer in scorers:
+            columns = {column: meta[column].to_numpy() for column in scorer.columns if column in meta.columns}
+            scorer_keep = scorer.keep(columns) if len(columns) == len(scorer.columns) else None
+            if scorer_keep is not None:
+                keep &= scorer_keep
+        if not keep.all():
+            filtered_path = f"{os.path.splitext(out_path)[0]}_filtered{ext}"
+            save_file(meta[keep], filtered_path)
+            print(f"{keep.sum()} of {len(meta)} samples pass the filters, saved to '{filtered_path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+from pipeline.scoring.utils import NUM_FRAMES_POINTS
+from transformers import AutoProcessor
+
+import mindspore as ms
+import mindspore.nn as nn
+import mindspore.ops as ops
+from mindspore import Tensor, load_checkpoint, load_param_into_net
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+mindone_lib_path = os.path.abspath(os.path.join(__dir__, "../../../../.."))
+sys.path.insert(0, mindone_lib_path)
+
+from mindone.transformers import CLIPModel  # noqa: E402
+
+
+@dataclass
+class Clip:
+    """A sample of the meta file and its frames, decoded once for all the scorers."""
+
+    index: int
+    path: str
+    num_frames: int  # 1 for images
+    fps: Optional[float]  # None for images
+    text: str = ""
+    height: float = -1
+    width: float = -1
+    frames: Dict[int, np.ndarray] = field(default_factory=dict)  # frame index -> RGB frame
+    clip_features: Dict[int, np.ndarray] = field(default_factory=dict)  # frame index -> CLIP image features
+
+
+def points_to_indices(points, num_frames):
+    # same as `extract_frames`
+    return [min(int(p * num_frames), num_frames - 1) for p in points]
+
+
+class Scorer:
+    """
+    A score of the clips, computed in batches on their frames decoded once for all the scorers.
+
+    Subclasses define the `columns` they write, the frames they need with `frame_indices`, the scores of a batch with
+    `score`, and the filter of their thresholds with `keep`.
+    """
+
+    columns: List[str] = []
+
+    def frame_indices(self, clip: Clip) -> List[int]:
+        return []
+
+    def score(self, clips: List[Clip]) -> Dict[str, list]:
+        raise NotImplementedError
+
+    def keep(self, scores: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """Returns whether the clips pass the filter of the scorer, None if it has no filter."""
+        return None
+
+
+class CLIPImageFeatures:
+    """The normalized CLIP image features of the frames, computed once for all the CLIP based scorers."""
+
+    def __init__(self, model_name="openai/clip-vit-large-patch14", batch_size=64):
+        self.model = CLIPModel.from_pretrained(model_name)
+        self.model.set_train(False)
+        self.processor = AutoProcessor.from_pretrained(model_name)
+        self.batch_size = batch_size
+        self.l2_norm = ops.L2Normalize(axis=-1)
+
+    def __call__(self, clips: List[Clip], indices: List[List[int]]) -> List[np.ndarray]:
+        missing = list({(i, j) for i, (clip, clip_indices) in enumerate(zip(clips, indices)) for j in clip_indices})
+        missing = [(i, j) for i, j in sorted(missing) if j not in clips[i].clip_features]
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start : start + self.batch_size]
+            images = [clips[i].frames[j] for i, j in chunk]
+            pixel_values = self.processor(images=images, return_tensors="np").pixel_values
+            features = self.l2_norm(self.model.get_image_features(Tensor(pixel_values))).astype(ms.float32).asnumpy()
+            for (i, j), feature in zip(chunk, features):
+                clips[i].clip_features[j] = feature
+        return [np.stack([clip.clip_features[j] for j in clip_indices]) for clip, clip_indices in zip(clips, indices)]
+
+
+class _AestheticHead(nn.Cell):
+    def __init__(self, input_size=768):
+        super().__init__()
+        from pipeline.scoring.aesthetic.inference import MLP
+
+        self.mlp = MLP(input_size)
+
+    def construct(self, x):
+        return self.mlp(x)
+
+
+class AestheticScorer(Scorer):
+    """The aesthetic score `aes` of `pipeline/scoring/aesthetic`, averaged over the frames."""
+
+    columns = ["aes"]
+
+    def __init__(self, clip_features: CLIPImageFeatures, ckpt_path, num_frames=1, aesmin=None):
+        self.clip_features = clip_features
+        self.head = _AestheticHead()
+        load_param_into_net(self.head.mlp, load_checkpoint(ckpt_path))
+        self.head.set_train(False)
+        self.points = NUM_FRAMES_POINTS[num_frames]
+        self.aesmin = aesmin
+
+    def frame_indices(self, clip):
+        return points_to_indices(self.points, clip.num_frames)
+
+    def score(self, clips):
+        features = self.clip_features(clips, [self.frame_indices(clip) for clip in clips])
+        scores = self.head(Tensor(np.concatenate(features))).asnumpy().reshape(-1)
+        splits = np.cumsum([len(f) for f in features])[:-1]
+        return {"aes": [s.mean().item() for s in np.split(scores, splits)]}
+
+    def keep(self, scores):
+        return None if self.aesmin is None else scores["aes"] >= self.aesmin
+
+
+class _NSFWHead(nn.Cell):
+    def __init__(self, ckpt_path):
+        super().__init__()
+        from pipeline.scoring.nsfw.nsfw_model import NSFWModel
+
+        self.nsfw_model = NSFWModel()
+        params = load_checkpoint(ckpt_path)
+        load_param_into_net(self.nsfw_model, {"nsfw_model." + key: value for key, value in params.items()})
+
+    def construct(self, x):
+        return self.nsfw_model(x)
+
+
+class NSFWScorer(Scorer):
+    """The NSFW flag `nsfw` of `pipeline/scoring/nsfw`: 1 if the score of a frame exceeds the threshold."""
+
+    columns = ["nsfw"]
+
+    def __init__(self, clip_features: CLIPImageFeatures, ckpt_path, num_frames=1, threshold=0.2, safety_check=False):
+        self.clip_features = clip_features
+        self.head = _NSFWHead(ckpt_path)
+        self.head.set_train(False)
+        self.points = NUM_FRAMES_POINTS[num_frames]
+        self.threshold = threshold
+        self.safety_check = safety_check
+
+    def frame_indices(self, clip):
+        return points_to_indices(self.points, clip.num_frames)
+
+    def score(self, clips):
+        features = self.clip_features(clips, [self.frame_indices(clip) for clip in clips])
+        scores = self.head(Tensor(np.concatenate(features))).asnumpy().reshape(-1)
+        splits = np.cumsum([len(f) for f in features])[:-1]
+        return {"nsfw": [int(s.max() > self.threshold) for s in np.split(scores, splits)]}
+
+    def keep(self, scores):
+        return scores["nsfw"] == 0 if self.safety_check else None
+
+
+class MatchingScorer(Scorer):
+    """
+    The matching score `match` of `pipeline/scoring/matching` of the frames with the `text` of the clips, or with
+    `option` if given: the maximum over the frames.
+    """
+
+    columns = ["match"]
+
+    def __init__(self, clip_features: CLIPImageFeatures, num_frames=1, option=None, matchmin=None):
+        self.clip_features = clip_features
+        self.points = NUM_FRAMES_POINTS[num_frames]
+        self.option = option
+        self.matchmin = matchmin
+        self.logit_scale = np.exp(clip_features.model.logit_scale.asnumpy())
+        self.l2_norm = ops.L2Normalize(axis=-1)
+        self._text_features = {}
+
+    def frame_indices(self, clip):
+        return points_to_indices(self.points, clip.num_frames)
+
+    def _encode_texts(self, texts):
+        missing = sorted({text for text in texts if text not in self._text_features})
+        if missing:
+            input_ids = self.clip_features.processor(
+                text=missing, padding="max_length", max_length=77, truncation=True, return_tensors="np"
+            )["input_ids"]
+            features = self.l2_norm(self.clip_features.model.get_text_features(Tensor(input_ids))).asnumpy()
+            self._text_features.update(zip(missing, features))
+        return np.stack([self._text_features[text] for text in texts])
+
+    def score(self, clips):
+        features = self.clip_features(clips, [self.frame_indices(clip) for clip in clips])
+        texts = self._encode_texts([self.option or clip.text for clip in clips])
+        return {
+            "match": [
+                (self.logit_scale * (image_features @ text_features)).max().item()
+                for image_features, text_features in zip(features, texts)
+            ]
+        }
+
+    def keep(self, scores):
+        return None if self.matchmin is None else scores["match"] >= self.matchmin
+
+
+class LPIPSScorer(Scorer):
+    """
+    The LPIPS motion score `lpips` of `pipeline/scoring/lpips`: the LPIPS of the consecutive frames sampled every
+    `seconds`, averaged weighted by their time difference, or -1 if fewer than 2 frames are sampled.
+    """
+
+    columns = ["lpips"]
+
+    def __init__(self, ckpt_path, seconds=1, target_size=(224, 224), batch_size=32, lpipsmin=None):
+        from pipeline.scoring.lpips.lpips import LPIPS
+
+        self.model = LPIPS()
+        self.model.load_from_pretrained(ckpt_path)
+        self.model.set_train(False)
+        self.seconds = seconds
+        self.target_size = target_size
+        self.batch_size = batch_size
+        self.lpipsmin = lpipsmin
+
+    def _timestamps(self, clip):
+        if clip.fps is None or clip.num_frames / clip.fps < self.seconds:
+            return [], []
+        timestamps = np.arange(0, clip.num_frames / clip.fps, self.seconds).tolist()
+        indices = np.clip([int(t * clip.fps) for t in timestamps], 0, clip.num_frames - 1).tolist()
+        return timestamps, indices
+
+    def frame_indices(self, clip):
+        return self._timestamps(clip)[1]
+
+    def score(self, clips):
+        # the pairs of consecutive frames of all the clips of the batch, scored together
+        pairs, owners = [], []
+        for i, clip in enumerate(clips):
+            images = [
+                np.array(Image.fromarray(clip.frames[j]).resize(self.target_size)).transpose(2, 0, 1)
+                for j in self.frame_indices(clip)
+            ]
+            pairs.extend(zip(images[:-1], images[1:]))
+            owners.extend([i] * max(len(images) - 1, 0))
+
+        pair_scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            images_0, images_1 = (
+                Tensor(np.stack(x).astype(np.float32)) for x in zip(*pairs[start : start + self.batch_size])
+            )
+            pair_scores.append(self.model(images_0, images_1).asnumpy().reshape(-1))
+        pair_scores = np.concatenate(pair_scores) if pair_scores else np.zeros(0)
+        owners = np.array(owners, dtype=np.int64)
+
+        scores = []
+        for i, clip in enumerate(clips):
+            timestamps = np.array(self._timestamps(clip)[0])
+            if len(timestamps) < 2:
+                scores.append(-1.0)
+                continue
+            weighted_scores = pair_scores[owners == i] * (timestamps[1:] - timestamps[:-1])
+            scores.append((weighted_scores.sum() / (timestamps[-1] - timestamps[0])).item())
+        return {"lpips": scores}
+
+    def keep(self, scores):
+        return None if self.lpipsmin is None else scores["lpips"] >= self.lpipsmin
+
+
+class OCRScorer(Scorer):
+    """
+    The OCR results `ocr` of `pipeline/scoring/ocr` on the middle frame, with the number of text boxes `num_boxes` and
+    their maximum single and total area percentages `max_single_percentage` and `total_text_percentage` of the frame.
+    """
+
+    columns = ["ocr", "num_boxes", "max_single_percentage", "total_text_percentage"]
+
+    def __init__(self, ocr_args, ocr_box_max=None, ocr_single_max=None, ocr_total_max=None):
+        from pipeline.scoring.ocr.text_system import TextSystem
+
+        self.text_system = TextSystem(ocr_args)
+        self.ocr_box_max = ocr_box_max
+        self.ocr_single_max = ocr_single_max
+        self.ocr_total_max = ocr_total_max
+
+    def frame_indices(self, clip):
+        return points_to_indices([0.5], clip.num_frames)
+
+    def score(self, clips):
+        scores = {column: [] for column in self.columns}
+        for clip in clips:
+            boxes, text_scores, _ = self.text_system(clip.frames[self.frame_indices(clip)[0]])
+            box_areas = [
+                0.5 * np.abs(np.dot(box[:, 0], np.roll(box[:, 1], 1)) - np.dot(box[:, 1], np.roll(box[:, 0], 1)))
+                for box in boxes
+            ]
+            image_area = clip.height * clip.width
+            scores["ocr"].append(repr({"boxes": boxes, "texts": text_scores}))
+            scores["num_boxes"].append(len(boxes))
+            scores["max_single_percentage"].append(max(box_areas, default=0) / image_area if image_area > 0 else 0)
+            scores["total_text_percentage"].append(sum(box_areas) / image_area if image_area > 0 else 0)
+        return scores
+
+    def keep(self, scores):
+        keep = np.ones(len(scores["num_boxes"]), dtype=bool)
+        for column, maximum in [
+            ("num_boxes", self.ocr_box_max),
+            ("max_single_percentage", self.ocr_single_max),
+            ("total_text_percentage", self.ocr_total_max),
+        ]:
+            if maximum is not None:
+                keep &= scores[column] <= maximum
+        return keep
@@ -1,15 +1,18 @@
 import argparse
 import os
+import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
+import numpy as np
 import pandas as pd
 from imageio_ffmpeg import get_ffmpeg_exe
-from pandarallel import pandarallel
 from scenedetect import FrameTimecode
 from tqdm import tqdm
 
-tqdm.pandas()
+# maximum distance in seconds between the start of a scene and a keyframe to copy the scene without re-encoding
+KEYFRAME_TOLERANCE = 0.005
 
 
 def print_log(s, logger=None):
@@ -59,11 +62,30 @@ def process_single_row(row, args):
         target_fps=args.target_fps,
         shorter_size=shorter_size,
         logger=logger,
+        stream_copy=args.stream_copy,
+        decode_threads=args.decode_threads,
     )
 
     return True
 
 
+def probe_keyframes(video_path):
+    """
+    Returns the timestamps in seconds of the keyframes of the video, its frame rate and its duration, decoding its
+    keyframes only.
+    """
+    cmd = [get_ffmpeg_exe(), "-nostdin", "-skip_frame", "nokey", "-i", video_path]
+    cmd += ["-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"]
+    log = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    keyframes = [float(t) for t in re.findall(r"pts_time:\s*([-\d.]+).*iskey:1", log)]
+    fps = re.search(r"Video:.*?, ([\d.]+) fps", log)
+    duration = re.search(r"Duration: (\d+):(\d+):([\d.]+)", log)
+    if fps is None or duration is None:
+        return keyframes, None, None
+    hours, minutes, seconds = duration.groups()
+    return keyframes, float(fps.group(1)), int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
 def split_video(
     video_path,
     scene_list,
@@ -74,23 +96,36 @@ def split_video(
     shorter_size=None,
     verbose=False,
     logger=None,
+    stream_copy=False,
+    decode_threads=None,
+    max_outputs=8,
 ):
     """
     scenes shorter than min_seconds will be ignored;
     scenes longer than max_seconds will be cut to save the beginning max_seconds.
     Currently, the saved file name pattern is f'{fname}_scene-{idx}'.mp4
 
+    The scenes starting on a keyframe and ending on a keyframe or at the end of the video are copied without
+    re-encoding if `stream_copy` is set and neither `target_fps` nor `shorter_size` is. The other scenes are
+    re-encoded by groups of `max_outputs`, each group decoded once by a single FFmpeg process with `decode_threads`
+    threads.
+
     Args:
         scene_list (List[Tuple[FrameTimecode, FrameTimecode]]): each element is (s, t): start and end of a scene.
         min_seconds (float | None)
         max_seconds (float | None)
         target_fps (int | None)
         shorter_size (int | None)
+        stream_copy (bool)
+        decode_threads (int | None)
+        max_outputs (int)
     """
     FFMPEG_PATH = get_ffmpeg_exe()
 
-    save_path_list = []
+    # the (save path, start and duration in seconds) of the clips to cut
+    clips = []
     for idx, scene in enumerate(scene_list):
+        start = duration = None
         if scene is not None:
             s, t = scene  # FrameTimecode
             if min_seconds is not None:
@@ -102,6 +137,7 @@ def split_video(
                 fps = s.framerate
                 max_duration = FrameTimecode(max_seconds, fps=fps)
                 duration = min(max_duration, duration)
+            start, duration = s.get_seconds(), duration.get_seconds()
 
         # Save path
         fname = os.path.basename(video_path)
@@ -109,32 +145,81 @@ def split_video(
         save_path = os.path.join(save_dir, f"{fname_wo_ext}_scene-{idx}.mp4")
         if os.path.exists(save_path):
             continue
+        clips.append((save_path, start, duration))
 
-        cmd = [FFMPEG_PATH]
-
-        # Clip to cut
-        if scene is None:
-            cmd += ["-nostdin", "-y", "-i", video_path]
-        else:
-            cmd += ["-nostdin", "-y", "-ss", str(s.get_seconds()), "-i", video_path, "-t", str(duration.get_seconds())]
-
-        # Target FPS
-        if target_fps is not None:
-            cmd += ["-r", f"{target_fps}"]
-
-        # Aspect ratio
-        if shorter_size is not None:
-            cmd += ["-vf", f"scale='if(gt(iw,ih),-2,{shorter_size})':'if(gt(iw,ih),{shorter_size},-2)'"]
-
-        cmd += ["-map", "0:v", save_path]
-
+    def run(cmd):
         proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
         proc.communicate()
+        return proc.returncode == 0
 
-        if os.path.exists(save_path):
-            save_path_list.append(save_path)
-            if verbose:
-                print_log(f"Video clip saved to '{save_path}'", logger)
+    save_path_list = []
+    if stream_copy and target_fps is None and shorter_size is None and clips:
+        keyframes, fps, video_duration = probe_keyframes(video_path)
+        keyframes = np.array(keyframes)
+
+        def keyframe_at(seconds):
+            near = np.flatnonzero(np.abs(keyframes - seconds) <= KEYFRAME_TOLERANCE)
+            return keyframes[near[0]] if len(near) else None
+
+        re_encode = []
+        for save_path, start, duration in clips:
+            cmd = [FFMPEG_PATH, "-nostdin", "-y"]
+            if start is None:
+                cmd += ["-i", video_path]
+            elif fps is None or keyframe_at(start) is None:
+                re_encode.append((save_path, start, duration))
+                continue
+            elif start + duration >= video_duration - KEYFRAME_TOLERANCE:
+                cmd += ["-ss", str(keyframe_at(start) + KEYFRAME_TOLERANCE / 5), "-i", video_path]
+            elif keyframe_at(start + duration) is not None:
+                # `-t` stops on the decoding timestamps when copying, which overshoots with B-frames: the frames before
+                # a (closed GOP) keyframe are counted instead
+                cmd += ["-ss", str(keyframe_at(start) + KEYFRAME_TOLERANCE / 5), "-i", video_path]
+                cmd += ["-frames:v", str(round(duration * fps))]
+            else:
+                re_encode.append((save_path, start, duration))
+                continue
+            cmd += ["-map", "0:v", "-c", "copy", "-avoid_negative_ts", "make_zero", save_path]
+            if run(cmd) and os.path.exists(save_path):
+                save_path_list.append(save_path)
+            else:
+                # e.g. a codec that the MP4 container does not support
+                if os.path.exists(save_path):
+                    os.remove(save_path)
+                re_encode.append((save_path, start, duration))
+        clips = re_encode
+
+    for i in range(0, len(clips), max_outputs):
+        group = clips[i : i + max_outputs]
+        cmd = [FFMPEG_PATH, "-nostdin", "-y"]
+        if decode_threads is not None:
+            cmd += ["-threads", str(decode_threads)]
+
+        # Clips to cut: the input is decoded once from the start of the group, and each output keeps its own clip
+        group_start = min(start or 0 for _, start, _ in group)
+        if group_start > 0:
+            cmd += ["-ss", str(group_start)]
+        cmd += ["-i", video_path]
+        for save_path, start, duration in group:
+            if start is not None:
+                cmd += ["-ss", str(start - group_start), "-t", str(duration)]
+
+            # Target FPS
+            if target_fps is not None:
+                cmd += ["-r", f"{target_fps}"]
+
+            # Aspect ratio
+            if shorter_size is not None:
+                cmd += ["-vf", f"scale='if(gt(iw,ih),-2,{shorter_size})':'if(gt(iw,ih),{shorter_size},-2)'"]
+
+            cmd += ["-map", "0:v", save_path]
+
+        run(cmd)
+        save_path_list.extend(save_path for save_path, _, _ in group if os.path.exists(save_path))
+
+    if verbose:
+        for save_path in save_path_list:
+            print_log(f"Video clip saved to '{save_path}'", logger)
 
     return save_path_list
 
@@ -153,7 +238,13 @@ def parse_args():
     parser.add_argument(
         "--shorter_size", type=int, default=None, help="resize the shorter size by keeping ratio; will not do upscale"
     )
-    parser.add_argument("--num_workers", type=int, default=None, help="#workers for pandarallel")
+    parser.add_argument("--num_workers", type=int, default=None, help="#videos cut in parallel, default: #CPUs")
+    parser.add_argument("--decode_threads", type=int, default=None, help="#decoding threads per FFmpeg process")
+    parser.add_argument(
+        "--stream_copy",
+        action="store_true",
+        help="copy the scenes that start on a keyframe without re-encoding, if no `target_fps` nor `shorter_size`",
+    )
     parser.add_argument("--disable_parallel", action="store_true", help="disable parallel processing")
     parser.add_argument("--drop_invalid_timestamps", action="store_true", help="drop rows with invalid timestamps")
     args = parser.parse_args()
@@ -170,20 +261,17 @@ def main():
     # Create save_dir
     os.makedirs(args.save_dir, exist_ok=True)
 
-    # Initialize pandarallel
-    if not args.disable_parallel:
-        if args.num_workers is not None:
-            pandarallel.initialize(progress_bar=True, nb_workers=args.num_workers)
-        else:
-            pandarallel.initialize(progress_bar=True)
     process_single_row_partial = partial(process_single_row, args=args)
 
-    # Process
+    # Process: each video is cut by FFmpeg processes, `num_workers` videos at a time
     meta = pd.read_csv(args.meta_path)
+    rows = [row for _, row in meta.iterrows()]
     if not args.disable_parallel:
-        results = meta.parallel_apply(process_single_row_partial, axis=1)
+        with ThreadPoolExecutor(args.num_workers or os.cpu_count()) as executor:
+            results = list(tqdm(executor.map(process_single_row_partial, rows), total=len(rows)))
     else:
-        results = meta.apply(process_single_row_partial, axis=1)
+        results = [process_single_row_partial(row) for row in tqdm(rows)]
+    results = pd.Series(results, index=meta.index)
     if args.drop_invalid_timestamps:
         meta = meta[results]
         assert args.meta_path.endswith("timestamp.csv"), "Only support *timestamp.csv"
@@ -0,0 +1,141 @@
+"""
+NumPy implementations of the `ContentDetector` and `AdaptiveDetector` of PySceneDetect.
+
+PySceneDetect decodes every frame at full resolution with OpenCV, downscales it, and scores it against the previous one
+frame by frame in Python. Here, each video is decoded once by FFmpeg, which downscales the frames while decoding (with
+`decode_threads` threads), and the frame scores of whole batches of frames are computed at once with NumPy. The cuts
+are then found from the scores with the same rules as PySceneDetect.
+"""
+
+import logging
+
+import cv2
+import numpy as np
+from imageio_ffmpeg import read_frames
+
+# the effective width of the frames scored by PySceneDetect
+DOWNSCALE_WIDTH = 256
+
+
+def read_frame_batches(video_path, batch_size=256, downscale_width=DOWNSCALE_WIDTH, decode_threads=1):
+    """
+    Decodes the BGR frames of the video in a single pass, downscaled by the integer factor of PySceneDetect that brings
+    their width closest to (and not below) `downscale_width`.
+
+    Returns:
+        The FFmpeg metadata of the video (with `fps`), and a generator of batches of frames of shape (B, H, W, 3).
+    """
+    factor = f"max(1\\,trunc(iw/{downscale_width}))"
+    frames = read_frames(
+        video_path,
+        pix_fmt="bgr24",
+        input_params=["-threads", str(decode_threads)],
+        output_params=["-vf", f"scale=round(iw/{factor}):round(ih/{factor}):flags=bilinear"],
+    )
+    # silences the warning that the frames are downscaled
+    logging.getLogger("imageio_ffmpeg").setLevel(logging.ERROR)
+    meta = next(frames)
+    width, height = meta["size"]
+
+    def batches():
+        batch = []
+        for frame in frames:
+            batch.append(frame)
+            if len(batch) == batch_size:
+                yield np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, height, width, 3)
+                batch = []
+        if batch:
+            yield np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, height, width, 3)
+
+    return meta, batches()
+
+
+def content_scores(batches):
+    """
+    The `content_val` of PySceneDetect of the frames: the mean absolute difference of the hue, saturation and value of
+    their pixels with the ones of the previous frame, 0 for the first frame.
+    """
+    scores, last = [], None
+    for batch in batches:
+        num_frames, height, width, _ = batch.shape
+        # a batch of frames is converted as one tall image, and each of its frames is a row of `hsv`
+        hsv = cv2.cvtColor(batch.reshape(num_frames * height, width, 3), cv2.COLOR_BGR2HSV)
+        hsv = hsv.reshape(num_frames, height * width * 3)
+        # the weights of the three components are equal: their mean is the mean over all the channels
+        dtype = np.uint32 if hsv.shape[1] * 255 < 2**32 else np.uint64
+        diff_sums = cv2.absdiff(hsv[1:], hsv[:-1]).sum(axis=1, dtype=dtype)
+        first = 0 if last is None else cv2.absdiff(hsv[:1], last).sum(dtype=dtype)
+        scores.append(np.concatenate([[first], diff_sums]) / hsv.shape[1])
+        last = hsv[-1:]
+    return np.concatenate(scores) if scores else np.zeros(0)
+
+
+def content_cuts(scores, threshold=27.0, min_scene_len=15):
+    """The cuts of `ContentDetector`, with the default `FlashFilter` of PySceneDetect merging the close cuts."""
+    above = scores >= threshold
+    if min_scene_len <= 0:
+        return np.flatnonzero(above).tolist()
+
+    cuts = []
+    last_above, merge_enabled, merge_triggered, merge_start = 0, False, False, None
+    for frame_num, is_above in enumerate(above.tolist()):
+        min_length_met = frame_num - last_above >= min_scene_len
+        if is_above:
+            last_above = frame_num
+        if merge_triggered:
+            if min_length_met and not is_above and last_above - merge_start >= min_scene_len:
+                merge_triggered = False
+                cuts.append(last_above)
+        elif is_above:
+            if min_length_met:
+                merge_enabled = True
+                cuts.append(frame_num)
+            elif merge_enabled:
+                merge_triggered, merge_start = True, frame_num
+    return cuts
+
+
+def adaptive_cuts(scores, adaptive_threshold=3.0, min_scene_len=15, window_width=2, min_content_val=15.0):
+    """
+    The cuts of `AdaptiveDetector`: the frames whose score exceeds `adaptive_threshold` times the average score of the
+    `window_width` frames before and after them.
+    """
+    num_targets = len(scores) - 2 * window_width
+    if num_targets <= 0:
+        return []
+    windows = np.lib.stride_tricks.sliding_window_view(scores, 2 * window_width + 1)
+    targets = scores[window_width : window_width + num_targets]
+    average = (windows.sum(axis=1) - targets) / (2.0 * window_width)
+
+    ratio = np.where(targets >= min_content_val, 255.0, 0.0)
+    nonzero = np.abs(average) >= 0.00001
+    ratio[nonzero] = np.minimum(targets[nonzero] / average[nonzero], 255.0)
+    candidates = np.flatnonzero((ratio >= adaptive_threshold) & (targets >= min_content_val)) + window_width
+
+    # a cut is found when the frame `window_width` frames after it is processed
+    cuts, last_cut = [], 0
+    for frame_num in candidates.tolist():
+        if frame_num + window_width - last_cut >= min_scene_len:
+            cuts.append(frame_num)
+            last_cut = frame_num
+    return cuts
+
+
+def detect_cuts(
+    video_path, detector_type="adaptive", batch_size=256, downscale_width=DOWNSCALE_WIDTH, decode_threads=1
+):
+    """
+    Detects the scene cuts of the video with the default detectors of `scene_detect.py`.
+
+    Returns:
+        The frame numbers of the cuts, the number of frames and the frame rate of the video.
+    """
+    meta, batches = read_frame_batches(video_path, batch_size, downscale_width, decode_threads)
+    scores = content_scores(batches)
+    if detector_type == "adaptive":
+        cuts = adaptive_cuts(scores, adaptive_threshold=3.0)
+    elif detector_type == "content":
+        cuts = content_cuts(scores, threshold=25, min_scene_len=15)
+    else:
+        raise ValueError(f"Detector type should be 'adaptive' or 'content', got {detector_type}.")
+    return cuts, len(scores), meta["fps"]
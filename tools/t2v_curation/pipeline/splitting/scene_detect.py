@@ -1,15 +1,14 @@
 import argparse
 import os
+from functools import partial
+from multiprocessing import Pool
 
-import cv2
 import numpy as np
 import pandas as pd
-from pandarallel import pandarallel
-from scenedetect import AdaptiveDetector, ContentDetector, detect
+from pipeline.splitting.detectors import detect_cuts
+from scenedetect import AdaptiveDetector, ContentDetector, FrameTimecode, detect
 from tqdm import tqdm
 
-tqdm.pandas()
-
 
 def convert_frames_to_timecode(frames, fps):
     total_seconds = frames / fps
@@ -20,13 +19,12 @@ def convert_frames_to_timecode(frames, fps):
     return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
 
 
-def process_single_row(row, detector_type="adaptive", max_cutscene_len=None):
-    assert detector_type in [
-        "adaptive",
-        "content",
-    ], f"Detector type should be 'adaptive' or 'content', got {detector_type}."
-
-    video_path = row["path"]
+def detect_scenes(video_path, detector_type="adaptive", backend="numpy", decode_threads=1):
+    """Returns the (start, end) frame numbers of the scenes of the video, and its frame rate."""
+    if backend == "numpy":
+        cuts, num_frames, fps = detect_cuts(video_path, detector_type=detector_type, decode_threads=decode_threads)
+        bounds = [0] + cuts + [num_frames]
+        return list(zip(bounds[:-1], bounds[1:])), fps
 
     # default option in hpcai-OpenSora
     if detector_type == "adaptive":
@@ -37,20 +35,32 @@ def process_single_row(row, detector_type="adaptive", max_cutscene_len=None):
     elif detector_type == "content":
         detector = ContentDetector(threshold=25, min_scene_len=15)
 
+    scene_list = detect(video_path, detector, start_in_scene=True)
+    return [(s.get_frames(), t.get_frames()) for s, t in scene_list], scene_list[0][0].framerate
+
+
+def process_single_row(row, detector_type="adaptive", max_cutscene_len=None, backend="numpy", decode_threads=1):
+    assert detector_type in [
+        "adaptive",
+        "content",
+    ], f"Detector type should be 'adaptive' or 'content', got {detector_type}."
+
+    video_path = row["path"]
+
     try:
-        scene_list = detect(video_path, detector, start_in_scene=True)
+        scene_list, fps = detect_scenes(video_path, detector_type, backend=backend, decode_threads=decode_threads)
         # default option for hpcai-OpenSora
         if max_cutscene_len is None:
-            timestamp = [(s.get_timecode(), t.get_timecode()) for s, t in scene_list]
+            timestamp = [
+                (FrameTimecode(s, fps=fps).get_timecode(), FrameTimecode(t, fps=fps).get_timecode())
+                for s, t in scene_list
+            ]
             return True, str(timestamp)
         # default value for Panda-70M is 5
         else:
             end_frame_idx = [0]
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
 
-            for scene in scene_list:
-                new_end_frame_idx = scene[1].get_frames()
+            for _, new_end_frame_idx in scene_list:
                 while (new_end_frame_idx - end_frame_idx[-1]) > (max_cutscene_len + 2) * fps:
                     end_frame_idx.append(end_frame_idx[-1] + int(max_cutscene_len * fps))
                 end_frame_idx.append(new_end_frame_idx)
@@ -70,7 +80,16 @@ def process_single_row(row, detector_type="adaptive", max_cutscene_len=None):
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("meta_path", type=str)
-    parser.add_argument("--num_workers", type=int, default=None, help="#workers for pandarallel")
+    parser.add_argument("--num_workers", type=int, default=None, help="#worker processes, default: #CPUs")
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="numpy",
+        choices=["numpy", "scenedetect"],
+        help="'numpy' decodes each video once at low resolution and scores batches of frames with NumPy, "
+        "'scenedetect' runs PySceneDetect.",
+    )
+    parser.add_argument("--decode_threads", type=int, default=1, help="#decoding threads per worker (numpy backend)")
     parser.add_argument(
         "--detector",
         type=str,
@@ -90,15 +109,17 @@ def main():
         print(f"Meta file '{meta_path}' not found. Exit.")
         exit()
 
-    if args.num_workers is not None:
-        pandarallel.initialize(progress_bar=True, nb_workers=args.num_workers)
-    else:
-        pandarallel.initialize(progress_bar=True)
-
     meta = pd.read_csv(meta_path)
-    ret = meta.parallel_apply(
-        process_single_row, axis=1, detector_type=args.detector, max_cutscene_len=args.max_cutscene_len
+    process = partial(
+        process_single_row,
+        detector_type=args.detector,
+        max_cutscene_len=args.max_cutscene_len,
+        backend=args.backend,
+        decode_threads=args.decode_threads,
     )
+    # each worker process detects the scenes of a whole video
+    with Pool(args.num_workers) as pool:
+        ret = list(tqdm(pool.imap(process, meta.to_dict("records")), total=len(meta)))
 
     succ, timestamps = list(zip(*ret))
     meta["timestamp"] = timestamps
@@ -114,7 +114,11 @@ def main():
                 input_meta_csv = split_video["scene_detection"]["input_meta_csv"]
                 detector = split_video["scene_detection"]["detector"]
                 max_cutscene_len = split_video["scene_detection"]["max_cutscene_len"]
-                command = f"python -m pipeline.splitting.scene_detect {input_meta_csv} --detector {detector}"
+                backend = split_video["scene_detection"]["backend"]
+                command = (
+                    f"python -m pipeline.splitting.scene_detect {input_meta_csv} --detector {detector} "
+                    f"--backend {backend}"
+                )
                 if max_cutscene_len is not None and max_cutscene_len != "None":  # just to play safe
                     command += f" --max_cutscene_len {max_cutscene_len}"
                 run_command(command)
@@ -126,6 +130,7 @@ def main():
                 target_fps = split_video["cut_videos"]["target_fps"]
                 shorter_size = split_video["cut_videos"]["shorter_size"]
                 drop_invalid_timestamps = split_video["cut_videos"]["drop_invalid_timestamps"]
+                stream_copy = split_video["cut_videos"]["stream_copy"]
                 input_meta_csv = input_meta_csv[:-4] + "_timestamp.csv"  # inferred csv name from scene detection
                 save_dir = config["paths"]["ROOT_CLIPS"]
                 command = f"python -m pipeline.splitting.cut {input_meta_csv} --save_dir {save_dir}"
@@ -139,6 +144,8 @@ def main():
                     command += f" --shorter_size {shorter_size}"
                 if drop_invalid_timestamps is not None and drop_invalid_timestamps != "None":
                     command += f" --drop_invalid_timestamps {drop_invalid_timestamps}"
+                if stream_copy:
+                    command += " --stream_copy"
                 run_command(command)
 
             # create clips meta info
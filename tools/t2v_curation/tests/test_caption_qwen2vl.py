@@ -0,0 +1,59 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+import mindspore as ms
+from mindspore import ops
+
+# the curation pipeline is imported as the `pipeline` package, as in its scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.captioning.caption_qwen2vl import caption_batch  # noqa: E402
+
+PAD_TOKEN_ID = 0
+
+
+class StubModel:
+    """Records the `generate` calls, and continues every prompt with the tokens 7, 8, 9."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, input_ids, max_new_tokens, **kwargs):
+        self.calls.append({"input_ids": input_ids, "max_new_tokens": max_new_tokens, **kwargs})
+        new_tokens = ms.Tensor(np.tile([7, 8, 9], (input_ids.shape[0], 1)), ms.int32)
+        return ops.cat([input_ids, new_tokens], axis=1)
+
+
+class StubProcessor:
+    tokenizer = SimpleNamespace(pad_token_id=PAD_TOKEN_ID)
+
+    def batch_decode(self, token_ids, **kwargs):
+        return [" ".join(str(token) for token in row) for row in token_ids.tolist()]
+
+
+def _sample(prompt, num_frames):
+    return {
+        "input_ids": np.array(prompt),
+        "pixel_values_videos": np.full((num_frames * 4, 6), num_frames, dtype=np.float32),
+        "video_grid_thw": np.array([[num_frames, 2, 2]]),
+    }
+
+
+def test_caption_batch():
+    model = StubModel()
+    samples = [_sample([3, 4], 1), _sample([3, 4, 5, 6], 2), _sample([5], 1)]
+    captions = caption_batch(model, StubProcessor(), samples, max_new_tokens=3)
+
+    # the batch is captioned by a single call, on the left-padded prompts and all the frames
+    assert len(model.calls) == 1
+    inputs = model.calls[0]
+    assert inputs["input_ids"].asnumpy().tolist() == [[0, 0, 3, 4], [3, 4, 5, 6], [0, 0, 0, 5]]
+    assert inputs["attention_mask"].asnumpy().tolist() == [[0, 0, 1, 1], [1, 1, 1, 1], [0, 0, 0, 1]]
+    assert inputs["pixel_values_videos"].shape == (16, 6)
+    assert inputs["video_grid_thw"].asnumpy().tolist() == [[1, 2, 2], [2, 2, 2], [1, 2, 2]]
+    assert inputs["max_new_tokens"] == 3
+    # only the generated tokens are decoded
+    assert captions == ["7 8 9"] * 3
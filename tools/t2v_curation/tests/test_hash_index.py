@@ -0,0 +1,102 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the curation pipeline is imported as the `pipeline` package, as in its scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.datasets.hash_index import (  # noqa: E402
+    HammingIndex,
+    find_duplicates_to_remove,
+    hamming_distance64,
+    hash_matrix_to_uint64,
+    hex_to_uint64,
+    popcount64,
+    uint64_to_hex,
+)
+
+
+def _hashes(seed=0):
+    # random hashes, near-duplicates of a third of them and exact duplicates, shuffled
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 2**64 - 1, 300, dtype=np.uint64, endpoint=True)
+    flips = [
+        np.uint64(sum(1 << int(b) for b in rng.choice(64, rng.integers(0, 20), replace=False))) for _ in range(100)
+    ]
+    hashes = np.concatenate([base, base[::3] ^ np.array(flips, dtype=np.uint64), base[:10]])
+    rng.shuffle(hashes)
+    return hashes
+
+
+def _brute_force_duplicates_to_remove(hashes, max_distance, indexed_hashes=None):
+    # keeps the first of each group of near-duplicates, removes the hashes near an indexed one
+    kept, remove = [], np.zeros(len(hashes), dtype=bool)
+    for i, h in enumerate(hashes):
+        if indexed_hashes is not None and (hamming_distance64(indexed_hashes, h) <= max_distance).any():
+            remove[i] = True
+        elif kept and (hamming_distance64(np.array(kept, dtype=np.uint64), h) <= max_distance).any():
+            remove[i] = True
+        else:
+            kept.append(h)
+    return remove
+
+
+def test_popcount64():
+    x = np.random.default_rng(0).integers(0, 2**64 - 1, 100, dtype=np.uint64, endpoint=True)
+    assert popcount64(np.array([0, 1, 2**64 - 1, 0xFF], dtype=np.uint64)).tolist() == [0, 1, 64, 8]
+    assert popcount64(x).tolist() == [bin(int(v)).count("1") for v in x]
+    assert np.array_equal(hex_to_uint64(uint64_to_hex(x)), x)
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 10, 15])
+@pytest.mark.parametrize("num_chunks", [None, 0, 4, 8])
+def test_hamming_index_search(max_distance, num_chunks):
+    hashes = _hashes()
+    query_ids, hash_ids = HammingIndex(hashes, max_distance, num_chunks).search(hashes[:50])
+    expected_query_ids, expected_hash_ids = np.nonzero(
+        hamming_distance64(hashes[:50, None], hashes[None]) <= max_distance
+    )
+    np.testing.assert_array_equal(query_ids, expected_query_ids)
+    np.testing.assert_array_equal(hash_ids, expected_hash_ids)
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 10, 30])
+def test_find_duplicates_to_remove(max_distance):
+    hashes = _hashes()
+    np.testing.assert_array_equal(
+        find_duplicates_to_remove(hashes, max_distance), _brute_force_duplicates_to_remove(hashes, max_distance)
+    )
+    # against the index of the hashes of a previous run
+    index = HammingIndex(hashes[:100], max_distance)
+    np.testing.assert_array_equal(
+        find_duplicates_to_remove(hashes[100:], max_distance, index),
+        _brute_force_duplicates_to_remove(hashes[100:], max_distance, hashes[:100]),
+    )
+
+
+@pytest.mark.parametrize("method", ["PHash", "DHash"])
+def test_hash_matrix_to_uint64(method):
+    methods = pytest.importorskip("pipeline.datasets.imagededup.methods")
+    from pipeline.datasets.imagededup.utils.image_utils import preprocess_image
+
+    hasher = getattr(methods, method)(verbose=False)
+    image = np.random.default_rng(0).integers(0, 255, (64, 80, 3), dtype=np.uint8)
+    hash_matrix = hasher._hash_algo(preprocess_image(image, hasher.target_size, True))
+    # the same bits as the hexadecimal hash string of `imagededup`
+    assert int(hash_matrix_to_uint64(hash_matrix)) == int(hasher.encode_image(image_array=image), 16)
+
+
+def test_save_and_load_index(tmp_path):
+    deduplication = pytest.importorskip("pipeline.datasets.deduplication")
+
+    # the index is saved to the given path, without the `.npz` suffix appended by `np.savez`
+    index_path = str(tmp_path / "index")
+    hashes, paths = _hashes()[:5], np.array([f"{i}.mp4" for i in range(5)], dtype=object)
+    deduplication.save_index(index_path, "phash", hashes, paths)
+    loaded_hashes, loaded_paths = deduplication.load_index(index_path, "phash")
+    np.testing.assert_array_equal(loaded_hashes, hashes)
+    np.testing.assert_array_equal(loaded_paths, paths)
+    with pytest.raises(ValueError):
+        deduplication.load_index(index_path, "dhash")
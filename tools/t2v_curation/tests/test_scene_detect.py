@@ -0,0 +1,42 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# the curation pipeline is imported as the `pipeline` package, as in its scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.splitting.scene_detect import process_single_row  # noqa: E402
+
+
+def _write_video(path, scene_lengths, size, fps):
+    # each scene slowly pans a random picture, so that the frames change within the scenes too
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for length in scene_lengths:
+        picture = cv2.resize(rng.integers(0, 255, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8), size)
+        for i in range(length):
+            writer.write(np.roll(picture, i, axis=1))
+    writer.release()
+
+
+@pytest.mark.parametrize(
+    "scene_lengths, size, fps",
+    [
+        # a scene shorter than the minimum scene length of the detectors
+        ([40, 9, 60, 30, 50], (640, 360), 25),
+        ([20, 20, 5, 5, 5, 50], (320, 240), 30),
+    ],
+)
+@pytest.mark.parametrize("detector_type", ["adaptive", "content"])
+def test_numpy_detectors_match_scenedetect(tmp_path, scene_lengths, size, fps, detector_type):
+    path = str(tmp_path / "video.mp4")
+    _write_video(path, scene_lengths, size, fps)
+    for max_cutscene_len in [None, 1]:
+        row = {"path": path}
+        success, timestamps = process_single_row(row, detector_type, max_cutscene_len, backend="numpy")
+        expected = process_single_row(row, detector_type, max_cutscene_len, backend="scenedetect")
+        assert success and timestamps.count("(") > 1
+        assert (success, timestamps) == expected
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pandas as pd
+
+# the curation pipeline is imported as the `pipeline` package, as in its scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.scoring.unified.inference import decode_clip, score_batch  # noqa: E402
+from pipeline.scoring.unified.scorers import Scorer, points_to_indices  # noqa: E402
+
+NUM_FRAMES = 30
+
+
+class BrightnessScorer(Scorer):
+    """A stand-in for the model based scorers: the mean brightness of the middle frame, kept above 100."""
+
+    columns = ["brightness"]
+
+    def frame_indices(self, clip):
+        return points_to_indices([0.1, 0.5, 0.9], clip.num_frames)
+
+    def score(self, clips):
+        return {"brightness": [float(clip.frames[clip.num_frames // 2].mean()) for clip in clips]}
+
+    def keep(self, scores):
+        return scores["brightness"] > 100
+
+
+class CountingScorer(Scorer):
+    """A stand-in recording the clips it scores, without filter."""
+
+    columns = ["count"]
+
+    def __init__(self):
+        self.scored = []
+
+    def frame_indices(self, clip):
+        return [0]
+
+    def score(self, clips):
+        self.scored.append([clip.index for clip in clips])
+        return {"count": [1.0] * len(clips)}
+
+
+def _write_video(path):
+    # the frame `i` has the uniform brightness `8 * i`
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for i in range(NUM_FRAMES):
+        writer.write(np.full((48, 64, 3), 8 * i, np.uint8))
+    writer.release()
+
+
+def test_unified_scoring(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    _write_video(path)
+    # the second clip already has a brightness score, below the threshold
+    meta = pd.DataFrame({"path": [path] * 3, "brightness": [np.nan, 50.0, np.nan]})
+    scorers = [BrightnessScorer(), CountingScorer()]
+
+    clips = [decode_clip(i, meta.loc[i], scorers) for i in range(len(meta))]
+    # the frames needed by all the scorers are decoded in a single pass
+    assert sorted(clips[0].frames) == [0, 3, 15, 27]
+    assert (clips[0].num_frames, clips[0].height, clips[0].width) == (NUM_FRAMES, 48, 64)
+
+    results = score_batch(meta, clips, scorers)
+    # the existing scores are not recomputed but still filter the clips, which the next scorers skip
+    assert results[1] == {}
+    assert scorers[1].scored == [[0, 2]]
+    for i in [0, 2]:
+        assert results[i]["count"] == 1.0
+        # up to the compression of the video
+        assert abs(results[i]["brightness"] - 8 * (NUM_FRAMES // 2)) < 5
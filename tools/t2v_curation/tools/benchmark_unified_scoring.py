@@ -0,0 +1,118 @@
+"""
+Throughput in samples/sec and number of video decoding passes of the unified scoring loop
+(`pipeline/scoring/unified/inference.py`), which decodes the frames of each sample once for all the scorers, against
+running the scorers one after the other with a decoding pass each, as the separate scoring scripts do.
+
+The scorers are cheap stand-ins reading different frames of synthetic videos, so that the numbers measure the decoding
+and the loop, not the models.
+
+Usage:
+    python tools/benchmark_unified_scoring.py --num_samples 64 --num_scorers 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import cv2
+import numpy as np
+import pandas as pd
+
+# the curation pipeline is imported as the `pipeline` package, as in its scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.scoring.unified import inference  # noqa: E402
+from pipeline.scoring.unified.inference import decode_clip, score_batch  # noqa: E402
+from pipeline.scoring.unified.scorers import Scorer, points_to_indices  # noqa: E402
+
+# the frames read by the stand-in scorers, as the fractions of the videos used by the CLIP based scorers
+SCORER_POINTS = [[0.5], [0.1, 0.5, 0.9], [0.0, 0.25, 0.5, 0.75], [0.2, 0.8]]
+
+
+class BrightnessScorer(Scorer):
+    """A stand-in for the model based scorers: the mean brightness of its frames, without filter."""
+
+    def __init__(self, name, points):
+        self.columns = [name]
+        self.points = points
+
+    def frame_indices(self, clip):
+        return points_to_indices(self.points, clip.num_frames)
+
+    def score(self, clips):
+        indices = [self.frame_indices(clip) for clip in clips]
+        return {
+            self.columns[0]: [float(np.mean([clip.frames[j].mean() for j in ii])) for clip, ii in zip(clips, indices)]
+        }
+
+
+def write_videos(root, num_samples, num_frames, width, height):
+    paths = []
+    rng = np.random.default_rng(0)
+    for i in range(num_samples):
+        path = os.path.join(root, f"{i}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (width, height))
+        for _ in range(num_frames):
+            writer.write(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        writer.release()
+        paths.append(path)
+    return paths
+
+
+def run_unified(meta, scorers, batch_size):
+    for start in range(0, len(meta), batch_size):
+        clips = [decode_clip(i, meta.loc[i], scorers) for i in meta.index[start : start + batch_size]]
+        score_batch(meta, clips, scorers)
+
+
+def run_separate(meta, scorers, batch_size):
+    for scorer in scorers:
+        run_unified(meta, [scorer], batch_size)
+
+
+def benchmark(run, meta, scorers, batch_size):
+    num_opens = 0
+    video_reader = inference.VideoReader
+
+    def counting_video_reader(*args, **kwargs):
+        nonlocal num_opens
+        num_opens += 1
+        return video_reader(*args, **kwargs)
+
+    with mock.patch.object(inference, "VideoReader", counting_video_reader):
+        start = time.perf_counter()
+        run(meta, scorers, batch_size)
+        elapsed = time.perf_counter() - start
+    return len(meta) / elapsed, num_opens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_samples", type=int, default=64)
+    parser.add_argument("--num_scorers", type=int, default=3, choices=range(1, len(SCORER_POINTS) + 1))
+    parser.add_argument("--num_frames", type=int, default=120)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--bs", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3, help="The best of `repeat` runs is reported.")
+    args = parser.parse_args()
+
+    scorers = [BrightnessScorer(f"score_{i}", points) for i, points in enumerate(SCORER_POINTS[: args.num_scorers])]
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_videos(root, args.num_samples, args.num_frames, args.width, args.height)
+        meta = pd.DataFrame({"path": paths})
+        print(
+            f"{args.num_samples} videos of {args.num_frames} frames at {args.width}x{args.height}, "
+            f"{args.num_scorers} scorers"
+        )
+        print(f"{'loop':<10}{'decoding passes':>18}{'samples/s':>12}")
+        for name, run in (("separate", run_separate), ("unified", run_unified)):
+            results = [benchmark(run, meta, scorers, args.bs) for _ in range(args.repeat)]
+            throughput, num_opens = max(results)
+            print(f"{name:<10}{num_opens:>18}{throughput:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()